@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from airmozilla.main.models import Event, EventCount, Channel
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Compare counting events per channel with GROUP BY queries '
+        'against reading the materialized EventCount table. '
+        'Use `generate-fake-data 50000` first to get a big enough '
+        'data set.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            action='store',
+            dest='iterations',
+            default=10,
+            help='Number of times to run each (default 10)'
+        )
+
+    def handle(self, **options):
+        iterations = int(options['iterations'])
+        print "{} events, {} channels, {} event count rows".format(
+            Event.objects.all().count(),
+            Channel.objects.all().count(),
+            EventCount.objects.all().count(),
+        )
+
+        def group_by():
+            events = Event.objects.filter(
+                status=Event.STATUS_SCHEDULED,
+                privacy=Event.PRIVACY_PUBLIC,
+            )
+            dict(
+                Event.channels.through.objects.filter(event__in=events)
+                .values_list('channel_id')
+                .annotate(Count('channel'))
+            )
+            for channel in Channel.objects.filter(parent__isnull=False):
+                Event.objects.archived().filter(
+                    privacy=Event.PRIVACY_PUBLIC,
+                    channels=channel
+                ).count()
+
+        def materialized():
+            EventCount.objects.get_counts(
+                'channel',
+                privacy_filter={'privacy': Event.PRIVACY_PUBLIC},
+                status=Event.STATUS_SCHEDULED,
+            )
+            EventCount.objects.get_counts(
+                'channel',
+                privacy_filter={'privacy': Event.PRIVACY_PUBLIC},
+                status__in=(Event.STATUS_SCHEDULED, Event.STATUS_PROCESSING),
+                archived=True,
+            )
+
+        for label, function in (
+            ('GROUP BY', group_by),
+            ('EventCount', materialized),
+        ):
+            with CaptureQueriesContext(connection) as captured:
+                t0 = time.time()
+                for __ in range(iterations):
+                    function()
+                t1 = time.time()
+            print "{:<12} {:>8.1f}ms per run {:>6} queries per run".format(
+                label,
+                1000 * (t1 - t0) / iterations,
+                len(captured) / iterations,
+            )
@@ -0,0 +1,117 @@
+import time
+
+import Levenshtein
+from PIL import Image
+
+from django.core.management.base import BaseCommand
+
+from airmozilla.main.utils import (
+    ImageCompare,
+    FuzzyImageCompare,
+    perceptual_hash,
+    hash_distance,
+)
+
+
+class LoopImageCompare(ImageCompare):
+    """How ImageCompare used to work, one getpixel() at a time."""
+
+    def _img_int(self, img):
+        x, y = img.size
+        pixels = []
+        for i in xrange(x):
+            for j in xrange(y):
+                pixel = img.getpixel((i, j))
+                pixels.append(pixel[0] | (pixel[1] << 8) | (pixel[2] << 16))
+        return tuple(pixels)
+
+    @property
+    def mse(self):
+        if not hasattr(self, '_mse'):
+            tmp = sum((a-b)**2 for a, b in zip(self.imga_int, self.imgb_int))
+            self._mse = float(tmp) / self.x / self.y
+        return self._mse
+
+    @property
+    def levenshtein(self):
+        if not hasattr(self, '_lv'):
+            lv = 0
+            for shift in (16, 8, 0):
+                stra = ''.join(chr((x >> shift) & 0xff) for x in self.imga_int)
+                strb = ''.join(chr((x >> shift) & 0xff) for x in self.imgb_int)
+                lv += Levenshtein.distance(stra, strb)
+            self._lv = lv / 3. / self.x / self.y
+        return self._lv
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Compare the getpixel() loop image comparison against the '
+        'NumPy one, and the perceptual hash, on frames of '
+        '160x90 and 640x360. The Levenshtein distance is always '
+        'done at 64 pixels wide.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'imagea',
+            help='Path to an image'
+        )
+        parser.add_argument(
+            'imageb',
+            help='Path to another image'
+        )
+        parser.add_argument(
+            '--iterations',
+            action='store',
+            dest='iterations',
+            default=5,
+            help='Number of times to run each (default 5)'
+        )
+
+    def handle(self, **options):
+        iterations = int(options['iterations'])
+        imga = Image.open(options['imagea']).convert('RGB')
+        imgb = Image.open(options['imageb']).convert('RGB')
+
+        for size in ((160, 90), (640, 360)):
+            framea = imga.resize(size, Image.BICUBIC)
+            frameb = imgb.resize(size, Image.BICUBIC)
+
+            def compare(class_):
+                cmp = class_(framea, frameb, maxsize=max(size))
+                return cmp.mse, cmp.psnr, cmp.nrmsd
+
+            def levenshtein(class_):
+                # The edit distance is quadratic so it's only ever
+                # worth doing on small images.
+                return class_(framea, frameb, maxsize=64).levenshtein
+
+            def fuzzy():
+                return FuzzyImageCompare(framea, frameb).similarity()
+
+            def phash():
+                return hash_distance(
+                    perceptual_hash(framea),
+                    perceptual_hash(frameb),
+                )
+
+            print "{}x{}".format(*size)
+            for label, function in (
+                ('Loop', lambda: compare(LoopImageCompare)),
+                ('NumPy', lambda: compare(ImageCompare)),
+                ('Loop Lev', lambda: levenshtein(LoopImageCompare)),
+                ('NumPy Lev', lambda: levenshtein(ImageCompare)),
+                ('Fuzzy', fuzzy),
+                ('Hash', phash),
+            ):
+                t0 = time.time()
+                for __ in range(iterations):
+                    result = function()
+                t1 = time.time()
+                print "  {:<10} {:>10.2f}ms per run  {}".format(
+                    label,
+                    1000 * (t1 - t0) / iterations,
+                    result,
+                )
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+
+from airmozilla.main.models import Event, EventLiveHits
+from airmozilla.main import livehits
+
+
+def run_viewers(viewers, workers, function):
+    """Call `function` once per viewer from `workers` threads and return
+    the time each call took."""
+    timings = []
+    lock = threading.Lock()
+    remaining = [viewers]
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        return
+                    remaining[0] -= 1
+                t0 = time.time()
+                function()
+                t1 = time.time()
+                with lock:
+                    timings.append(t1 - t0)
+        finally:
+            # every thread gets a database connection of its own
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for __ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return timings
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Simulate lots of concurrent viewers of a live event and '
+        'compare incrementing EventLiveHits with one UPDATE per viewer '
+        'against counting in the cache and flushing once. '
+        'The hits are added to the event and taken off again when done.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'event_id',
+            help='The id of an event to count hits for'
+        )
+        parser.add_argument(
+            '--viewers',
+            action='store',
+            dest='viewers',
+            default=5000,
+            help='Number of viewers (default 5000)'
+        )
+        parser.add_argument(
+            '--workers',
+            action='store',
+            dest='workers',
+            default=50,
+            help='Number of concurrent threads (default 50)'
+        )
+
+    def handle(self, **options):
+        viewers = int(options['viewers'])
+        workers = int(options['workers'])
+        try:
+            event = Event.objects.get(id=options['event_id'])
+        except Event.DoesNotExist:
+            raise CommandError('No event with that id')
+        EventLiveHits.objects.get_or_create(event=event)
+        before = EventLiveHits.objects.get(event=event).total_hits
+
+        def update():
+            EventLiveHits.objects.get_or_create(event=event)
+            EventLiveHits.objects.filter(event=event).update(
+                total_hits=F('total_hits') + 1
+            )
+
+        def flushed():
+            t0 = time.time()
+            livehits.flush()
+            return time.time() - t0
+
+        print "{} viewers, {} concurrent".format(viewers, workers)
+        for label, function, writes in (
+            ('UPDATE', update, viewers),
+            ('Cache', lambda: livehits.count_hit(event.id), 1),
+        ):
+            t0 = time.time()
+            timings = sorted(run_viewers(viewers, workers, function))
+            flush_time = flushed()
+            t1 = time.time()
+            print (
+                "{:<8} {:>8.2f}s {:>8.0f} hits/s  "
+                "median {:>7.2f}ms  max {:>8.2f}ms  "
+                "flush {:>7.2f}ms  {:>6} row writes"
+            ).format(
+                label,
+                t1 - t0,
+                viewers / (t1 - t0),
+                1000 * timings[len(timings) // 2],
+                1000 * timings[-1],
+                1000 * flush_time,
+                writes,
+            )
+
+        total = EventLiveHits.objects.get(event=event).total_hits
+        if total != before + 2 * viewers:
+            print "Expected {} hits but got {}".format(
+                before + 2 * viewers,
+                total,
+            )
+        EventLiveHits.objects.filter(event=event).update(total_hits=before)
+        cache.delete(livehits._total_key(event.id))
@@ -0,0 +1,98 @@
+import random
+import time
+
+import pyelasticsearch
+import urllib3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from airmozilla.main.models import Event
+from airmozilla.manage import related
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Index every event with both the local and the Elasticsearch '
+        'related content backends and compare how long it takes to '
+        'find related events and how much the results overlap. '
+        'Use `generate-fake-data 50000` first to get a big enough '
+        'data set.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries',
+            action='store',
+            dest='queries',
+            default=200,
+            help='Number of events to find related events for '
+                 '(default 200)'
+        )
+
+    def handle(self, **options):
+        events = list(Event.objects.scheduled_or_processing())
+        random.seed(0)
+        sample = random.sample(
+            events,
+            min(len(events), int(options['queries']))
+        )
+        print "{} events, {} queries".format(len(events), len(sample))
+
+        results = {}
+        for backend in ('local', 'elasticsearch'):
+            with override_settings(RELATED_CONTENT_BACKEND=backend):
+                try:
+                    related.delete()
+                except pyelasticsearch.ElasticHttpNotFoundError:
+                    pass
+                except urllib3.exceptions.HTTPError:
+                    pass
+                try:
+                    related.create()
+                    t0 = time.time()
+                    related.index(all=True)
+                except urllib3.exceptions.HTTPError as exception:
+                    print "{:<14} unavailable ({})".format(backend, exception)
+                    continue
+                t1 = time.time()
+                results[backend] = {}
+                times = []
+                for event in sample:
+                    t2 = time.time()
+                    ids, __, __ = related.find(
+                        event,
+                        Event.PRIVACY_COMPANY,
+                        boost_title=settings.RELATED_CONTENT_BOOST_TITLE,
+                        boost_tags=settings.RELATED_CONTENT_BOOST_TAGS,
+                        boost_channels=0,
+                        size=settings.RELATED_CONTENT_SIZE,
+                    )
+                    times.append(time.time() - t2)
+                    results[backend][event.id] = ids
+                times.sort()
+                print (
+                    "{:<14} index {:>8.2f}s  "
+                    "median {:>7.2f}ms  p95 {:>7.2f}ms per query"
+                ).format(
+                    backend,
+                    t1 - t0,
+                    1000 * times[len(times) // 2],
+                    1000 * times[int(len(times) * 0.95)],
+                )
+
+        if len(results) == 2:
+            overlap = []
+            for event in sample:
+                local = set(results['local'][event.id])
+                elasticsearch = set(results['elasticsearch'][event.id])
+                if local or elasticsearch:
+                    overlap.append(
+                        float(len(local & elasticsearch)) /
+                        len(local | elasticsearch)
+                    )
+            print "Average overlap of the results {:.0f}%".format(
+                100 * sum(overlap) / max(1, len(overlap))
+            )
@@ -0,0 +1,96 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from airmozilla.main.models import Event
+from airmozilla.search.models import LoggedSearch
+from airmozilla.search.views import _search, _search_ids, _get_events
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Compare running the whole search query (and counting it) for '
+        'every search against looking up the (cached) IDs of the events '
+        'found and only fetching the events of the first page. '
+        'Uses the most common logged search terms or, if there are none, '
+        'words from the event titles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--terms',
+            action='store',
+            dest='terms',
+            default=20,
+            help='Number of different search terms (default 20)'
+        )
+        parser.add_argument(
+            '--repeats',
+            action='store',
+            dest='repeats',
+            default=10,
+            help='Number of times each term is searched for (default 10)'
+        )
+
+    def handle(self, **options):
+        size = int(options['terms'])
+        terms = list(
+            LoggedSearch.objects
+            .values_list('term', flat=True)
+            .annotate(count=Count('id'))
+            .order_by('-count')[:size]
+        )
+        if not terms:
+            random.seed(0)
+            words = set()
+            for title in Event.objects.values_list('title', flat=True)[:1000]:
+                words.update(x.lower() for x in title.split() if len(x) > 3)
+            terms = random.sample(sorted(words), min(size, len(words)))
+        if not terms:
+            print "Nothing to search for. Run `generate-fake-data` first."
+            return
+        searches = terms * int(options['repeats'])
+        random.shuffle(searches)
+        qs = Event.objects.scheduled_or_processing().approved()
+        search_options = {
+            'privacy_exclude': {'privacy': Event.PRIVACY_COMPANY},
+        }
+        print "{} events, {} searches for {} terms".format(
+            qs.count(),
+            len(searches),
+            len(terms),
+        )
+
+        def whole(term):
+            events = _search(qs, term, **search_options)
+            events.count()
+            list(events[:10])
+
+        def two_phase(term):
+            ids = _search_ids(qs, term, 'public', **search_options)
+            _get_events(ids[:10], term, **search_options)
+
+        cache.clear()
+        for name, function in (
+            ('whole', whole),
+            ('two phase', two_phase),
+        ):
+            times = []
+            for term in searches:
+                t0 = time.time()
+                function(term)
+                times.append(time.time() - t0)
+            times.sort()
+            print (
+                "{:<10} median {:>7.2f}ms  p95 {:>7.2f}ms  "
+                "total {:>7.2f}s"
+            ).format(
+                name,
+                1000 * times[len(times) // 2],
+                1000 * times[int(len(times) * 0.95)],
+                sum(times),
+            )
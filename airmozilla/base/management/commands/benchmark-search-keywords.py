@@ -0,0 +1,93 @@
+import random
+import re
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from airmozilla.search.keywords import KeywordMatcher
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Compare finding tag names in search queries with a regular '
+        'expression of all the names (compiled for every search) '
+        'against the keyword automaton (built once). '
+        'Uses made up names so no data is needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tags',
+            action='store',
+            dest='tags',
+            default=10000,
+            help='Number of tag names to make up (default 10000)'
+        )
+        parser.add_argument(
+            '--queries',
+            action='store',
+            dest='queries',
+            default=100,
+            help='Number of search queries (default 100)'
+        )
+
+    def handle(self, **options):
+        random.seed(0)
+
+        def word():
+            return ''.join(
+                random.choice(string.ascii_lowercase)
+                for __ in range(random.randint(3, 9))
+            )
+
+        names = set()
+        while len(names) < int(options['tags']):
+            names.add(' '.join(word() for __ in range(random.randint(1, 2))))
+        names = sorted(names)
+        queries = []
+        for __ in range(int(options['queries'])):
+            query = [word() for __ in range(3)]
+            query.append(random.choice(names).title())
+            random.shuffle(query)
+            queries.append(' '.join(query))
+        print "{} tag names, {} queries".format(len(names), len(queries))
+
+        t0 = time.time()
+        regex_found = []
+        for query in queries:
+            tags_regex = re.compile(
+                r'\b(%s)\b' % ('|'.join(re.escape(x) for x in names),),
+                re.I
+            )
+            regex_found.append(set(
+                x.lower() for x in tags_regex.findall(query)
+            ))
+        t1 = time.time()
+        matcher = KeywordMatcher(enumerate(names), [])
+        t2 = time.time()
+        automaton_found = []
+        for query in queries:
+            automaton_found.append(set(
+                names[x] for x in matcher.find_tags(query)
+            ))
+        t3 = time.time()
+
+        print "{:<10} {:>9.2f}ms per query".format(
+            'regex',
+            1000 * (t1 - t0) / len(queries),
+        )
+        print "{:<10} {:>9.2f}ms per query (built once in {:.2f}s)".format(
+            'automaton',
+            1000 * (t3 - t2) / len(queries),
+            t2 - t1,
+        )
+        agreed = sum(
+            # the automaton also finds names that overlap
+            1 for a, b in zip(regex_found, automaton_found) if a <= b
+        )
+        print "The automaton found what the regex found in {} of {}".format(
+            agreed,
+            len(queries),
+        )
@@ -1,17 +1,39 @@
+import time
+
+from django.conf import settings
+
 from airmozilla.manage.videoinfo import fetch_screencapture
 
 
 def create_all_timestamp_pictures(event, verbose=False, video_url=None):
     assert event.duration
     timestamps = get_timenail_timestamps(event)
-    groups = [timestamps[i:i + 10] for i in range(0, len(timestamps), 10)]
+    if settings.SCREENCAPTURES_SINGLE_PASS:
+        # Going through the video once for each group would defeat
+        # the purpose.
+        size = len(timestamps) or 1
+    else:
+        size = 10
+    groups = [
+        timestamps[i:i + size] for i in range(0, len(timestamps), size)
+    ]
+    t0 = time.time()
+    created = 0
     for group in groups:
-        create_timestamp_pictures(
+        created += create_timestamp_pictures(
             event,
             group,
             verbose=verbose,
             video_url=video_url,
         )
+    t1 = time.time()
+    if verbose:  # pragma: no cover
+        print "{} frames in {:.1f}s ({:.2f} frames per second)".format(
+            created,
+            t1 - t0,
+            created / (t1 - t0),
+        )
+    return created
 
 
 def create_timestamp_pictures(
@@ -20,7 +42,7 @@ def create_timestamp_pictures(
     verbose=False,
     video_url=None
 ):
-    fetch_screencapture(
+    return fetch_screencapture(
         event,
         timestamps=timestamps,
         import_=True,
@@ -11,6 +11,7 @@ from selenium import webdriver
 from django.test import TestCase, LiveServerTestCase
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files import File
 from django.utils import timezone
 
@@ -18,6 +19,8 @@ from pipeline.storage import PipelineCachedStorage
 from sorl.thumbnail.kvstores.base import KVStoreBase
 from sorl.thumbnail.engines.base import EngineBase
 
+from airmozilla.main import thumbnail_manifest
+
 # Calm down the overly verbose sorl.thumbnail logging
 logging.getLogger('sorl.thumbnail.base').setLevel(logging.INFO)
 
@@ -31,6 +34,13 @@ class DjangoTestCase(TestCase):
         self._upload_media(self.main_image)
         self.created_static_files = []
 
+        # Things like the event page bundles are cached against versions
+        # that live in the cache too. The database is rolled back between
+        # tests but the cache isn't.
+        cache.clear()
+        # ...and so is the manifest of thumbnails each process keeps.
+        thumbnail_manifest.clear()
+
         self.fanout_patcher = mock.patch('airmozilla.base.utils.fanout')
         self.fanout = self.fanout_patcher.start()
 
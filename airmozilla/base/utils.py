@@ -21,6 +21,7 @@ from django.contrib.sites.requests import RequestSite
 from django.contrib.sites.models import Site
 from django.core.mail.backends.filebased import EmailBackend
 from django.forms.utils import ErrorList
+from django.utils.http import parse_etags, parse_http_date_safe
 from django.contrib.staticfiles.storage import staticfiles_storage
 
 from airmozilla.base.akamai_token_v2 import AkamaiToken
@@ -285,6 +286,20 @@ def get_base_url(request):
     )
 
 
+def is_not_modified(request, etag, last_modified):
+    """Return true if the request is conditional and what it already
+    has is the content with this `etag` (without the quotes) that was
+    last modified at `last_modified` (seconds since the epoch)."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return etag in etags or '*' in etags
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    return bool(if_modified_since and if_modified_since >= last_modified)
+
+
 def prepare_vidly_video_url(url):
     """Return the URL prepared for Vid.ly
     See # See http://help.encoding.com/knowledge-base/article/\
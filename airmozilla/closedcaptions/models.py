@@ -5,10 +5,15 @@ import pycaption
 from django.contrib.auth.models import User
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
+from django.dispatch import receiver
 
 from jsonfield import JSONField
 
-from airmozilla.main.models import Event, upload_path_tagged
+from airmozilla.main.models import (
+    Event,
+    upload_path_tagged,
+    bump_event_version,
+)
 from airmozilla.base import rev
 
 
@@ -117,3 +122,10 @@ class RevOrder(models.Model):
 
     def get_order(self):
         return rev.get_order(self.uri)
+
+
+@receiver(models.signals.post_save, sender=ClosedCaptions)
+@receiver(models.signals.post_save, sender=ClosedCaptionsTranscript)
+@receiver(models.signals.post_delete, sender=ClosedCaptionsTranscript)
+def closedcaptions_bump_event_version(sender, instance, **kwargs):
+    bump_event_version(instance.event_id)
@@ -3,8 +3,11 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.dispatch import receiver
 
-from airmozilla.main.models import Event, SuggestedEvent
-from airmozilla.base.utils import send_fanout
+from airmozilla.main.models import (
+    Event,
+    SuggestedEvent,
+    bump_event_version,
+)
 
 
 class Comment(models.Model):
@@ -43,12 +46,17 @@ def invalidate_latest_comment_cache(sender, instance, **kwargs):
 
 
 @receiver(models.signals.post_save, sender=Comment)
-def notify_fanout(sender, instance, **kwargs):
-    event = instance.event
-    # This channel must match `subscription_channel_comments` set in the
-    # view class for holding the comments container.
-    channel = 'comments-{}'.format(event.id)
-    send_fanout(channel, instance.id)
+def comment_saved(sender, instance, **kwargs):
+    # avoid circular import
+    from airmozilla.comments import thread
+    thread.changed(instance.event_id, instance.id)
+
+
+@receiver(models.signals.post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # avoid circular import
+    from airmozilla.comments import thread
+    thread.changed(instance.event_id)
 
 
 class Discussion(models.Model):
@@ -76,6 +84,12 @@ class Discussion(models.Model):
     moderators = models.ManyToManyField(User, related_name='moderators')
 
 
+@receiver(models.signals.post_save, sender=Discussion)
+@receiver(models.signals.post_delete, sender=Discussion)
+def discussion_bump_event_version(sender, instance, **kwargs):
+    bump_event_version(instance.event_id)
+
+
 class SuggestedDiscussion(models.Model):
     event = models.OneToOneField(SuggestedEvent)
     enabled = models.BooleanField(default=False)
@@ -1,6 +1,7 @@
 var Comments = (function() {
 
     var previous_latest_comment = null;
+    var since = null;
     var halt_reload_loop = false;
     var pause_reload_loop = false;
     var can_manage_comments = null;
@@ -114,69 +115,100 @@ var Comments = (function() {
         });
     }
 
-    return {
-        load: function(container, since, callback) {
-            if ($.isFunction(since) && !callback) {
-                /* This function was called like this:
-                   Comments.load(container, function() {...})
-                   not like this:
-                   Comments.load(container, since, function() {...})
-                */
-                callback = since;
-                since = null;
-            }
-            var url = container.data('url');
-            if (since) {
-                url += '?since=' + since;
+    function setup_comments(container) {
+        $('time.timeago', container).timeago();
+    }
+
+    function apply_changes(container, changes) {
+        $.each(changes.removed, function(i, id) {
+            $('#comment-' + id, container).remove();
+        });
+        $.each(changes.comments, function(i, comment) {
+            var $comment = $(comment.html);
+            var $existing = $('#comment-' + comment.id, container);
+            if ($existing.length) {
+                // keep the replies, and the form if it's replying
+                // to this one, that are already there
+                $('.replies', $comment).first().replaceWith(
+                    $('.replies', $existing).first()
+                );
+                $existing.children('form').detach().appendTo($comment);
+                $existing.replaceWith($comment);
+            } else if (comment.reply_to) {
+                $('#comment-' + comment.reply_to + ' > .replies', container).append($comment);
+            } else {
+                $('.comments-outer', container).append($comment);
             }
-            var req = $.getJSON(url);
+            setup_comments($comment);
+        });
+        if (changes.comments.length) {
+            $('.no-comments', container).remove();
+        }
+    }
+
+    function handle_response(container, response, callback) {
+        if (!response.discussion.enabled) {
+            container.remove();
+            return;
+        }
+        can_manage_comments = response.can_manage_comments;
+        previous_latest_comment = response.latest_comment;
+        if (response.html !== undefined) {
+            $('.comments-outer', container).html(response.html).show();
+            setup_comments(container);
+        } else {
+            apply_changes(container, response);
+        }
+        if (response.since) {
+            since = response.since;
+        }
+        $('.failed-loading:visible', container).hide();
+        if (callback) callback();
+    }
+
+    return {
+        bind: function(container) {
+            container.on('click', 'a.permalink', function() {
+                $(this).closest('.comment').addClass('focus-on');
+                setTimeout(function() {
+                    $('.focus-on').removeClass('focus-on');
+                }, 500);
+            });
+            container.on('click', 'a.action-reply', function() {
+                var parent = $(this).closest('.comment');
+                $('form input[name="reply_to"]', container).val(parent.data('id'));
+                // put the comment form under this
+                $('form', container).detach().appendTo(parent);
+                $('form button.cancel', container).show();
+                $('textarea', container).focus();
+                return false;
+            });
+            container.on('click', 'a.action-approve', function() {
+                approve_comment(this, container);
+                return false;
+            });
+            container.on('click', 'a.action-unapprove', function() {
+                unapprove_comment(this, container);
+                return false;
+            });
+            container.on('click', 'a.action-remove', function() {
+                remove_comment(this, container);
+                return false;
+            });
+            container.on('click', 'a.action-flag', function() {
+                flag_comment(this, container);
+                return false;
+            });
+            container.on('click', 'a.action-unflag', function() {
+                unflag_comment(this, container);
+                return false;
+            });
+        },
+        load: function(container, callback) {
+            // (re)loads all the comments
+            var req = $.getJSON(container.data('url'));
             req.then(function(response) {
-                if (!response.discussion.enabled) {
-                    container.remove();
-                    return;
-                }
-                can_manage_comments = response.can_manage_comments;
-                previous_latest_comment = response.latest_comment;
-                $('.comments-outer', container).html(response.html).show();
-                $('time.timeago', container).timeago();
-                $('a.permalink', container).click(function() {
-                    $(this).closest('.comment').addClass('focus-on');
-                    setTimeout(function() {
-                        $('.focus-on').removeClass('focus-on');
-                    }, 500);
-                });
-                $('a.action-reply', container).click(function() {
-                    var parent = $(this).closest('.comment');
-                    $('form input[name="reply_to"]', container).val(parent.data('id'));
-                    // put the comment form under this
-                    var comment_container = $(this).closest('.comment');
-                    $('form', container).detach().appendTo(comment_container);
-                    $('form button.cancel', container).show();
-                    $('textarea', container).focus();
-                    return false;
-                });
-                $('a.action-approve', container).click(function() {
-                    approve_comment(this, container);
-                    return false;
-                });
-                $('a.action-unapprove', container).click(function() {
-                    unapprove_comment(this, container);
-                    return false;
-                });
-                $('a.action-remove', container).click(function() {
-                    remove_comment(this, container);
-                    return false;
-                });
-                $('a.action-flag', container).click(function() {
-                    flag_comment(this, container);
-                    return fafalse && lse;
-                });
-                $('a.action-unflag', container).click(function() {
-                    unflag_comment(this, container);
-                    return false;
-                });
-                $('.failed-loading:visible', container).hide();
-                if (callback) callback();
+                handle_response(container, response, callback);
             });
             req.fail(function() {
                 $('.failed-loading', container).fadeIn(300);
@@ -185,6 +217,19 @@ var Comments = (function() {
                 $('.loading', container).remove();
             });
         },
+        refresh: function(container) {
+            // only loads what has changed since last time
+            if (since === null) {
+                return Comments.load(container);
+            }
+            var req = $.getJSON(container.data('url'), {since: since});
+            req.then(function(response) {
+                handle_response(container, response);
+            });
+            req.fail(function() {
+                $('.failed-loading', container).fadeIn(300);
+            });
+        },
         reload_loop: function(container) {
             if (halt_reload_loop || pause_reload_loop) {
                 return;
@@ -196,7 +241,7 @@ var Comments = (function() {
             var req = $.getJSON(container.data('reload-url'), data);
             req.then(function(response) {
                 if (response.latest_comment != previous_latest_comment) {
-                    Comments.load(container, data);
+                    Comments.refresh(container);
                 }
             });
             req.fail(function(response) {
@@ -231,6 +276,7 @@ var Comments = (function() {
                 }
             });
         }
+        Comments.bind(container);
         Comments.load(container, function() {
             if (location.hash && location.hash.search(/#comment-\d+/) > -1) {
                 // we should find a permalink with this href
@@ -254,7 +300,7 @@ var Comments = (function() {
                         // For security, let's not trust the data but just take it
                         // as a hint that it's worth doing an AJAX query
                         // now.
-                        Comments.load(container, data);
+                        Comments.refresh(container);
                     });
                     // If Fanout doesn't work for some reason even though it
                     // was made available, still use the regular old
@@ -299,7 +345,7 @@ var Comments = (function() {
                 $('textarea[name="comment"]', $form).val('');
                 $('.submission-success', $form).show();
                 $('form button.cancel:visible', container).click();
-                Comments.load(container);
+                Comments.refresh(container);
                 setTimeout(function() {
                     $('.submission-success', $form).fadeOut(600);
                 }, 10 * 1000);
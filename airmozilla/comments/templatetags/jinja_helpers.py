@@ -1,32 +1,8 @@
 import hashlib
 import re
 
-import jinja2
 from django_jinja import library
 
-from django.template.loader import render_to_string
-
-from airmozilla.comments.models import Comment
-
-
-@library.global_function
-def recurse_comments(comment, discussion,
-                     request, query_filter, can_manage_comments):
-    comments = Comment.objects.filter(reply_to=comment)
-    comments = comments.filter(query_filter)
-    context = {
-        'comments': comments.order_by('created'),
-        'discussion': discussion,
-        'request': request,
-        'Comment': Comment,
-        'can_manage_comments': can_manage_comments,
-        'root': False,
-        'query_filter': query_filter,
-    }
-    return jinja2.Markup(
-        render_to_string('comments/comments.html', context)
-    )
-
 
 @library.global_function
 def gravatar_src(email, secure, size=None):
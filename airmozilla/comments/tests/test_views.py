@@ -10,6 +10,8 @@ from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.core import mail
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from airmozilla.main.models import Event
 from airmozilla.base.tests.testbase import Response, DjangoTestCase
@@ -17,6 +19,7 @@ from airmozilla.comments.views import (
     can_manage_comments,
     get_latest_comment
 )
+from airmozilla.comments import thread
 from airmozilla.comments.models import (
     Discussion,
     Comment,
@@ -111,8 +114,7 @@ class TestComments(DjangoTestCase):
         ok_('Comments' in response.content)
 
         comments_url = reverse('comments:event_data', args=(event.pk,))
-        # add the {'since': 1} to bust the cache
-        response = self.client.get(comments_url, {'since': 1})
+        response = self.client.get(comments_url)
         eq_(response.status_code, 200)
         structure = json.loads(response.content)
         eq_(structure['discussion']['enabled'], True)
@@ -171,51 +173,182 @@ class TestComments(DjangoTestCase):
         eq_(structure['discussion']['enabled'], True)
         eq_(structure['discussion']['closed'], False)
         ok_('No comments posted' in structure['html'])
+        version = structure['version']
 
         # Post a comment
-        Comment.objects.create(
+        comment = Comment.objects.create(
             event=event,
             user=jay,
             comment='Cool birds!',
             status=Comment.STATUS_APPROVED,
         )
+        # The cached comments are invalidated when it's saved
         response = self.client.get(url)
         eq_(response.status_code, 200)
         structure = json.loads(response.content)
-        # Same as before
-        ok_('No comments posted' in structure['html'])
+        ok_('No comments posted' not in structure['html'])
+        ok_('Cool birds!' in structure['html'])
+        ok_(structure['version'] != version)
+        version = structure['version']
+
+        response = self.client.get(url)
+        structure = json.loads(response.content)
+        eq_(structure['version'], version)
+
+        comment.comment = 'Flamingos Rock!'
+        comment.save()
+        response = self.client.get(url)
+        structure = json.loads(response.content)
+        ok_('Cool birds!' not in structure['html'])
+        ok_('Flamingos Rock!' in structure['html'])
 
-        # Add some noise
-        response = self.client.get(url, {'noise': 1})
+    def test_event_data_since(self):
+        event = Event.objects.get(title='Test event')
+        discussion = self._create_discussion(event)
+        jay = User.objects.create(username='jay', email='jay@example.com')
+        bob = User.objects.create(username='bob', email='bob@example.com')
+        discussion.moderators.add(jay)
+        first = Comment.objects.create(
+            event=event,
+            user=jay,
+            comment='Cool birds!',
+            status=Comment.STATUS_APPROVED,
+        )
+        url = reverse('comments:event_data', args=(event.pk,))
+        response = self.client.get(url)
         eq_(response.status_code, 200)
         structure = json.loads(response.content)
-        # Now it should be different
-        ok_('No comments posted' not in structure['html'])
         ok_('Cool birds!' in structure['html'])
+        since = structure['since']
+        ok_(since)
+        ok_(structure['version'])
 
-        # Add another comment but keep the same noise
-        Comment.objects.create(
+        # nothing has changed
+        response = self.client.get(url, {'since': repr(since)})
+        eq_(response.status_code, 200)
+        structure = json.loads(response.content)
+        ok_('html' not in structure)
+        eq_(structure['comments'], [])
+        eq_(structure['removed'], [])
+        eq_(structure['since'], since)
+
+        reply = Comment.objects.create(
             event=event,
-            user=jay,
+            user=bob,
             comment='Flamingos Rock!',
+            reply_to=first,
             status=Comment.STATUS_APPROVED,
         )
-
-        # Same noise as on the last one
-        response = self.client.get(url, {'noise': 1})
+        # not approved so nobody else can see it
+        Comment.objects.create(
+            event=event,
+            user=bob,
+            comment='Hidden',
+            status=Comment.STATUS_POSTED,
+        )
+        response = self.client.get(url, {'since': repr(since)})
         eq_(response.status_code, 200)
         structure = json.loads(response.content)
-        # Should remain the same
-        ok_('Cool birds!' in structure['html'])
-        ok_('Flamingos Rock!' not in structure['html'])
+        comment, = structure['comments']
+        eq_(comment['id'], reply.id)
+        eq_(comment['reply_to'], first.id)
+        ok_('Flamingos Rock!' in comment['html'])
+        ok_('Cool birds!' not in comment['html'])
+        ok_(structure['since'] > since)
+        since = structure['since']
+
+        # removing the first one takes away its reply too
+        first.status = Comment.STATUS_REMOVED
+        first.save()
+        response = self.client.get(url, {'since': repr(since)})
+        structure = json.loads(response.content)
+        eq_(structure['comments'], [])
+        eq_(sorted(structure['removed']), sorted([first.id, reply.id]))
+
+        response = self.client.get(url, {'since': 'junk'})
+        eq_(response.status_code, 400)
+
+    def test_changes_after_commit(self):
+        event = Event.objects.get(title='Test event')
+        bob = User.objects.create(username='bob', email='bob@example.com')
+        versions = []
+
+        @thread.changes_after_commit
+        def save():
+            comment = Comment.objects.create(
+                event=event,
+                user=bob,
+                comment='Hi',
+                status=Comment.STATUS_APPROVED,
+            )
+            # somebody fetching the comments now would cache them
+            versions.append(thread.get_version(event.id))
+            # and nobody is told until it's committed
+            assert not self.fanout.mock_calls
+            return comment
+
+        comment = save()
+        ok_(thread.get_version(event.id) != versions[0])
+        self.fanout.publish.assert_called_once_with(
+            'comments-{}'.format(event.id),
+            comment.id
+        )
+
+        # outside of it, it's right away
+        comment.save()
+        eq_(len(self.fanout.mock_calls), 2)
 
-        # Change the noise to double-check that the value of the noise matters
-        response = self.client.get(url, {'noise': 2})
+    def test_event_data_queries(self):
+        event = Event.objects.get(title='Test event')
+        self._create_discussion(event)
+        bob = User.objects.create(username='bob', email='bob@example.com')
+        parent = None
+        for i in range(5):
+            parent = Comment.objects.create(
+                event=event,
+                user=bob,
+                comment='Comment %d' % i,
+                reply_to=parent,
+                status=Comment.STATUS_APPROVED,
+            )
+        url = reverse('comments:event_data', args=(event.pk,))
+        response = self.client.get(url)
         eq_(response.status_code, 200)
         structure = json.loads(response.content)
-        # Should be different
-        ok_('Cool birds!' in structure['html'])
-        ok_('Flamingos Rock!' in structure['html'])
+        html = structure['html']
+        # nested in each other
+        ok_(re.search('Comment 0.*Comment 1.*Comment 4', html, re.DOTALL))
+        eq_(html.count('class="replies"'), 5)
+        eq_(html.count('<!--replies-->'), 0)
+
+        # the comments come from the cache after that
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        eq_(json.loads(response.content)['html'], html)
+        # only the latest comment is looked up
+        comment_queries = [
+            x['sql'] for x in queries
+            if 'FROM "comments_comment"' in x['sql']
+        ]
+        eq_(len(comment_queries), 1)
+        ok_('MAX(' in comment_queries[0])
+
+        # seeing your own comments
+        User.objects.create_user('richard', password='secret')
+        assert self.client.login(username='richard', password='secret')
+        richard = User.objects.get(username='richard')
+        Comment.objects.create(
+            event=event,
+            user=richard,
+            comment='Mine',
+            reply_to=parent,
+            status=Comment.STATUS_POSTED,
+        )
+        response = self.client.get(url)
+        ok_('Mine' in json.loads(response.content)['html'])
+        self.client.logout()
+        response = self.client.get(url)
+        ok_('Mine' not in json.loads(response.content)['html'])
 
     def test_post_comment_no_moderation(self):
         event = Event.objects.get(title='Test event')
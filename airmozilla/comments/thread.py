@@ -0,0 +1,235 @@
+"""The comments of an event, each rendered on its own, in the order they
+were posted.
+
+Rendering the whole tree of comments used to take a query per comment
+(for its replies). Instead, every comment is rendered as a node with an
+empty list of replies and those are cached for the event. There's one
+cache for the moderators (who can see the posted comments) and one for
+everybody else. Saving any comment on the event changes its version so
+these are rebuilt.
+
+From that, the whole tree can be put together or, given a `since`,
+just the comments that have changed since then can be sent.
+
+A comment saved inside a transaction changes the version before that
+is committed. Anybody fetching the comments in between would cache
+the ones from before under the new version. So views that save
+comments in a transaction are wrapped in `changes_after_commit`, which
+changes the version again, and only then tells Fanout, once it has
+been committed.
+"""
+import calendar
+import functools
+import threading
+import uuid
+from collections import defaultdict
+
+import jinja2
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from airmozilla.base.utils import send_fanout
+from .models import Comment
+
+
+# Where the replies to a comment go in its HTML.
+REPLIES_MARKER = '<!--replies-->'
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_timestamp(date):
+    return calendar.timegm(date.utctimetuple()) + date.microsecond / 1e6
+
+
+def _version_cache_key(event_id):
+    return 'comments_thread_version:{}'.format(event_id)
+
+
+def get_version(event_id):
+    cache_key = _version_cache_key(event_id)
+    version = cache.get(cache_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(cache_key, version, CACHE_TIMEOUT)
+    return version
+
+
+def bump_version(event_id):
+    cache.set(_version_cache_key(event_id), uuid.uuid4().hex, CACHE_TIMEOUT)
+
+
+def _notify(event_id, comment_id):
+    # This channel must match `subscription_channel_comments` set in the
+    # view class for holding the comments container.
+    send_fanout('comments-{}'.format(event_id), comment_id)
+
+
+# event ID -> ID of the last comment saved, while in a view wrapped
+# in `changes_after_commit`
+_pending = threading.local()
+
+
+def changed(event_id, comment_id=None):
+    """A comment on this event has been saved (`comment_id`) or
+    deleted."""
+    bump_version(event_id)
+    pending = getattr(_pending, 'changes', None)
+    if pending is not None:
+        if comment_id or event_id not in pending:
+            pending[event_id] = comment_id
+    elif comment_id:
+        _notify(event_id, comment_id)
+
+
+def changes_after_commit(view):
+    """Put this outside the view's `transaction.atomic`."""
+    @functools.wraps(view)
+    def inner(*args, **kwargs):
+        if getattr(_pending, 'changes', None) is not None:
+            # an outer one takes care of it
+            return view(*args, **kwargs)
+        _pending.changes = {}
+        try:
+            return view(*args, **kwargs)
+        finally:
+            pending = _pending.changes
+            _pending.changes = None
+            for event_id, comment_id in pending.items():
+                bump_version(event_id)
+                if comment_id:
+                    _notify(event_id, comment_id)
+    return inner
+
+
+def _render(comment, request, can_manage_comments):
+    return render_to_string('comments/comment.html', {
+        'comment': comment,
+        'request': request,
+        'Comment': Comment,
+        'can_manage_comments': can_manage_comments,
+        'replies_marker': jinja2.Markup(REPLIES_MARKER),
+    })
+
+
+def _serialize(comment, request, can_manage_comments, visible):
+    serialized = {
+        'id': comment.id,
+        'reply_to': comment.reply_to_id,
+        'modified': get_timestamp(comment.modified),
+        'visible': visible,
+    }
+    if visible:
+        serialized['html'] = _render(comment, request, can_manage_comments)
+    return serialized
+
+
+def _get_comments(event_id, request, can_manage_comments, statuses,
+                  **filters):
+    comments = (
+        Comment.objects
+        .filter(event_id=event_id, **filters)
+        .select_related('user')
+        .order_by('created')
+    )
+    return [
+        _serialize(
+            comment,
+            request,
+            can_manage_comments,
+            comment.status in statuses,
+        )
+        for comment in comments
+    ]
+
+
+def get_comments(event, request, can_manage_comments):
+    """Return a list of dicts, one for each comment on this event, in
+    the order they were posted. Only those that are `visible` have
+    `html`. A reply is only visible if what it's a reply to is too.
+    """
+    cache_key = 'comments_thread:{}:{}:{}:{}'.format(
+        event.id,
+        get_version(event.id),
+        bool(can_manage_comments),
+        request.is_secure(),
+    )
+    comments = cache.get(cache_key)
+    if comments is None:
+        statuses = [Comment.STATUS_APPROVED]
+        if can_manage_comments:
+            statuses.append(Comment.STATUS_POSTED)
+        comments = _get_comments(
+            event.id,
+            request,
+            can_manage_comments,
+            statuses,
+        )
+        cache.set(cache_key, comments, CACHE_TIMEOUT)
+
+    if not can_manage_comments and request.user.is_authenticated():
+        # You always get to see your own comments.
+        own = _get_comments(
+            event.id,
+            request,
+            can_manage_comments,
+            [x[0] for x in Comment.STATUS_CHOICES],
+            user=request.user,
+        )
+        if own:
+            own = dict((x['id'], x) for x in own)
+            comments = [own.pop(x['id'], x) for x in comments]
+            comments.extend(own.values())
+            comments.sort(key=lambda x: x['id'])
+
+    visible = set()
+    for comment in comments:
+        if comment['visible'] and (
+            comment['reply_to'] is None or comment['reply_to'] in visible
+        ):
+            visible.add(comment['id'])
+    return [dict(x, visible=x['id'] in visible) for x in comments]
+
+
+def render_tree(comments):
+    """Return the HTML of all the visible comments nested in each other."""
+    replies = defaultdict(list)
+    for comment in comments:
+        if comment['visible']:
+            replies[comment['reply_to']].append(comment)
+
+    def render(reply_to):
+        return ''.join(
+            comment['html'].replace(REPLIES_MARKER, render(comment['id']), 1)
+            for comment in replies[reply_to]
+        )
+
+    return jinja2.Markup(render(None))
+
+
+def get_changes(comments, since):
+    """Return the visible comments that have changed after `since` (a
+    timestamp) and the IDs of those that have changed and are no longer
+    visible. The replies to those that have changed are included
+    because they appear or disappear with them."""
+    changed = []
+    changed_ids = set()
+    for comment in comments:
+        if (
+            comment['modified'] > since or
+            comment['reply_to'] in changed_ids
+        ):
+            changed.append(comment)
+            changed_ids.add(comment['id'])
+    return (
+        [x for x in changed if x['visible']],
+        [x['id'] for x in changed if not x['visible']],
+    )
+
+
+def get_cursor(comments):
+    """Return what to pass as `since` next time to only get what has
+    changed after these."""
+    if comments:
+        return max(x['modified'] for x in comments)
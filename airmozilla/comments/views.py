@@ -16,6 +16,7 @@ from .models import Comment, Discussion, Unsubscription
 from airmozilla.base.mozillians import fetch_user_name
 from . import forms
 from . import sending
+from . import thread
 
 
 def get_latest_comment(event, include_posted=False):
@@ -51,8 +52,8 @@ def can_manage_comments(user, discussion):
     return False
 
 
-@cache_page(60)
 @json_view
+@thread.changes_after_commit
 @transaction.atomic
 def event_data(request, id):
     event = get_object_or_404(Event, pk=id)
@@ -167,33 +168,32 @@ def event_data(request, id):
         else:
             return http.HttpResponseBadRequest(str(form.errors))
 
-    comments = Comment.objects.filter(
-        event=event,
-        reply_to__isnull=True
-    )
-
-    if request.user.is_authenticated():
-        query_filter = Q(status=Comment.STATUS_APPROVED) | Q(user=request.user)
-        if _can_manage_comments:
-            query_filter = query_filter | Q(status=Comment.STATUS_POSTED)
+    comments = thread.get_comments(event, request, _can_manage_comments)
+    since = None
+    if request.method == 'GET' and request.GET.get('since'):
+        try:
+            since = float(request.GET['since'])
+        except ValueError:
+            return http.HttpResponseBadRequest('Invalid since')
+    if since is None:
+        context['html'] = render_to_string('comments/comments.html', {
+            'comments_html': thread.render_tree(comments),
+        })
     else:
-        query_filter = Q(status=Comment.STATUS_APPROVED)
-
-    comments = comments.filter(query_filter)
-
-    sub_context = {
-        'comments': comments.order_by('created'),
-        'discussion': discussion,
-        'request': request,
-        'Comment': Comment,
-        'can_manage_comments': _can_manage_comments,
-        'root': True,
-        'query_filter': query_filter,
-    }
-    context['html'] = render_to_string(
-        'comments/comments.html',
-        sub_context
-    )
+        # Only what has changed since last time.
+        context['comments'], context['removed'] = thread.get_changes(
+            comments,
+            since
+        )
+        for comment in context['comments']:
+            # The replies are already there.
+            comment['html'] = comment['html'].replace(
+                thread.REPLIES_MARKER,
+                '',
+                1
+            )
+    context['since'] = thread.get_cursor(comments) or since
+    context['version'] = thread.get_version(event.id)
     context['can_manage_comments'] = _can_manage_comments
     context['latest_comment'] = get_latest_comment(
         event,
@@ -2,19 +2,60 @@ import time
 import sys
 import functools
 import contextlib
+import threading
 import traceback
 from StringIO import StringIO
 
 from .models import CronLog
+from . import metrics
+
+
+class StreamRouter(object):
+    """Stands in for sys.stdout (or sys.stderr) and sends whatever is
+    written to the stream set for the current thread. Threads that
+    haven't set one write to the stream that was there before."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.local = threading.local()
+
+    def _stream(self):
+        return getattr(self.local, 'stream', None) or self.fallback
+
+    def write(self, s):
+        self._stream().write(s)
+
+    def __getattr__(self, name):
+        return getattr(self._stream(), name)
+
+
+_lock = threading.Lock()
+_active = [0]
 
 
 @contextlib.contextmanager
 def redirect_streams(stdout, stderr):
-    sys.stdout = stdout
-    sys.stderr = stderr
-    yield
-    sys.stdout = sys.__stdout__
-    sys.stderr = sys.__stderr__
+    with _lock:
+        if not isinstance(sys.stdout, StreamRouter):
+            sys.stdout = StreamRouter(sys.stdout)
+        if not isinstance(sys.stderr, StreamRouter):
+            sys.stderr = StreamRouter(sys.stderr)
+        stdout_router, stderr_router = sys.stdout, sys.stderr
+        stdout_router.local.stream = stdout
+        stderr_router.local.stream = stderr
+        _active[0] += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            stdout_router.local.stream = None
+            stderr_router.local.stream = None
+            _active[0] -= 1
+            if not _active[0]:
+                if sys.stdout is stdout_router:
+                    sys.stdout = stdout_router.fallback
+                if sys.stderr is stderr_router:
+                    sys.stderr = stderr_router.fallback
 
 
 def capture(f):
@@ -24,17 +65,10 @@ def capture(f):
         stdout = StringIO()
         stderr = StringIO()
         with redirect_streams(stdout, stderr):
+            t0 = time.time()
+            metrics.start()
             try:
-                t0 = time.time()
                 result = f(*args, **kwargs)
-                t1 = time.time()
-                CronLog.objects.create(
-                    job=f.func_name,
-                    stdout=stdout.getvalue(),
-                    stderr=stderr.getvalue(),
-                    duration='%.3f' % (t1 - t0),
-                )
-                return result
             except Exception:
                 t1 = time.time()
                 exc_type, exc_value, exc_tb = sys.exc_info()
@@ -46,7 +80,17 @@ def capture(f):
                     exc_value=str(exc_value),
                     exc_traceback=''.join(traceback.format_tb(exc_tb)),
                     duration='%.3f' % (t1 - t0),
+                    **metrics.stop().as_dict()
                 )
                 raise
+            t1 = time.time()
+            CronLog.objects.create(
+                job=f.func_name,
+                stdout=stdout.getvalue(),
+                stderr=stderr.getvalue(),
+                duration='%.3f' % (t1 - t0),
+                **metrics.stop().as_dict()
+            )
+            return result
 
     return inner
@@ -0,0 +1,131 @@
+"""Numbers about a cron job run: how many database queries and external
+HTTP requests it did, how long they took and how much memory the
+process peaked at.
+
+Only what happens in the thread that started collecting is counted.
+"""
+import httplib
+import resource
+import threading
+import time
+
+from django.db import connections
+from django.db.backends.utils import CursorWrapper
+
+
+_local = threading.local()
+
+
+class Metrics(object):
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.http_requests = 0
+        self.http_time = 0.0
+        self.max_rss = None
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'query_time': '%.3f' % self.query_time,
+            'http_requests': self.http_requests,
+            'http_time': '%.3f' % self.http_time,
+            'max_rss': self.max_rss,
+        }
+
+
+class TimingCursorWrapper(CursorWrapper):
+    """Like Django's CursorDebugWrapper but it only counts and times the
+    queries instead of keeping every SQL statement in memory."""
+
+    def __init__(self, cursor, db, metrics):
+        super(TimingCursorWrapper, self).__init__(cursor, db)
+        self.metrics = metrics
+
+    def execute(self, sql, params=None):
+        t0 = time.time()
+        try:
+            return super(TimingCursorWrapper, self).execute(sql, params)
+        finally:
+            self.metrics.queries += 1
+            self.metrics.query_time += time.time() - t0
+
+    def executemany(self, sql, param_list):
+        t0 = time.time()
+        try:
+            return super(TimingCursorWrapper, self).executemany(
+                sql,
+                param_list
+            )
+        finally:
+            self.metrics.queries += 1
+            self.metrics.query_time += time.time() - t0
+
+
+def _current():
+    return getattr(_local, 'metrics', None)
+
+
+def _wrap_httplib():
+    """Count every request made with httplib, which is what both
+    `requests` (through urllib3) and `urllib2` use underneath.
+    The time is from sending the request until the response headers
+    have come back."""
+    connection_class = httplib.HTTPConnection
+    if getattr(connection_class, '_cronlogger_wrapped', False):
+        return
+    original_request = connection_class.request
+    original_getresponse = connection_class.getresponse
+
+    def request(self, *args, **kwargs):
+        if _current() is not None:
+            self._cronlogger_t0 = time.time()
+        return original_request(self, *args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        try:
+            return original_getresponse(self, *args, **kwargs)
+        finally:
+            t0 = getattr(self, '_cronlogger_t0', None)
+            metrics = _current()
+            if t0 is not None and metrics is not None:
+                metrics.http_requests += 1
+                metrics.http_time += time.time() - t0
+            self._cronlogger_t0 = None
+
+    connection_class.request = request
+    connection_class.getresponse = getresponse
+    connection_class._cronlogger_wrapped = True
+
+
+def start():
+    """Start collecting metrics for the current thread and return
+    the `Metrics` instance that will be updated."""
+    _wrap_httplib()
+    metrics = Metrics()
+    _local.metrics = metrics
+    _local.restore = []
+    for connection in connections.all():
+        _local.restore.append((connection, connection.force_debug_cursor))
+        connection.force_debug_cursor = True
+        connection.make_debug_cursor = (
+            lambda cursor, connection=connection:
+            TimingCursorWrapper(cursor, connection, metrics)
+        )
+    return metrics
+
+
+def stop():
+    """Stop collecting and return the final `Metrics` instance."""
+    metrics = _local.metrics
+    for connection, force_debug_cursor in _local.restore:
+        connection.force_debug_cursor = force_debug_cursor
+        # drop the instance attribute so the class method is used again
+        del connection.make_debug_cursor
+    _local.metrics = None
+    _local.restore = []
+    # On Linux this is in kilobytes. Since every cron job is run in a
+    # process of its own this is the peak of the job.
+    metrics.max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return metrics
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cronlogger', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cronlog',
+            name='http_requests',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='cronlog',
+            name='http_time',
+            field=models.DecimalField(null=True, max_digits=10, decimal_places=3),
+        ),
+        migrations.AddField(
+            model_name='cronlog',
+            name='max_rss',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='cronlog',
+            name='queries',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='cronlog',
+            name='query_time',
+            field=models.DecimalField(null=True, max_digits=10, decimal_places=3),
+        ),
+        migrations.AlterIndexTogether(
+            name='cronlog',
+            index_together=set([('job', 'created')]),
+        ),
+    ]
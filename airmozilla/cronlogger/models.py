@@ -10,3 +10,21 @@ class CronLog(models.Model):
     exc_value = models.TextField(null=True, blank=True)
     exc_traceback = models.TextField(null=True, blank=True)
     duration = models.DecimalField(null=True, max_digits=10, decimal_places=3)
+    # What the job did, as collected by `metrics.py`.
+    queries = models.IntegerField(null=True)
+    query_time = models.DecimalField(
+        null=True,
+        max_digits=10,
+        decimal_places=3
+    )
+    http_requests = models.IntegerField(null=True)
+    http_time = models.DecimalField(
+        null=True,
+        max_digits=10,
+        decimal_places=3
+    )
+    # peak resident set size in kilobytes
+    max_rss = models.IntegerField(null=True)
+
+    class Meta:
+        index_together = (('job', 'created'),)
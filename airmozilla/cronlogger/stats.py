@@ -0,0 +1,103 @@
+import datetime
+from collections import defaultdict
+
+from django.db import connection
+from django.utils import timezone
+
+from airmozilla.cronlogger.models import CronLog
+
+
+METRICS = (
+    'duration',
+    'queries',
+    'query_time',
+    'http_requests',
+    'http_time',
+    'max_rss',
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+def _summaries(since, until=None, job=None, per_day=False):
+    """Return a dict of job name (or of (job name, date) if `per_day`)
+    to a dict of metric -> {'p50': ..., 'p95': ..., 'p99': ...}
+    and the number of rows.
+
+    The percentiles are calculated in the database, interpolating
+    between the two closest values like numpy.percentile does.
+    Rows that don't have a number (e.g. logged before the metric
+    was collected) are ignored.
+    """
+    groups = ['job']
+    if per_day:
+        groups.append("to_char(created AT TIME ZONE 'UTC', 'YYYY-MM-DD')")
+    fractions = ', '.join(str(p / 100.0) for p in PERCENTILES)
+    columns = groups + ['COUNT(*)'] + [
+        'percentile_cont(ARRAY[{}]) WITHIN GROUP (ORDER BY {}::float)'
+        .format(fractions, metric)
+        for metric in METRICS
+    ]
+    sql = 'SELECT {} FROM {} WHERE created >= %s'.format(
+        ', '.join(columns),
+        CronLog._meta.db_table,
+    )
+    params = [since]
+    if until:
+        sql += ' AND created < %s'
+        params.append(until)
+    if job:
+        sql += ' AND job = %s'
+        params.append(job)
+    sql += ' GROUP BY {}'.format(
+        ', '.join(str(i + 1) for i in range(len(groups)))
+    )
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    summaries = {}
+    for row in cursor.fetchall():
+        key = row[0] if len(groups) == 1 else tuple(row[:len(groups)])
+        summary = {'count': row[len(groups)]}
+        for metric, values in zip(METRICS, row[len(groups) + 1:]):
+            summary[metric] = dict(
+                ('p%d' % p, values and values[i])
+                for i, p in enumerate(PERCENTILES)
+            )
+        summaries[key] = summary
+    return summaries
+
+
+def _empty_summary():
+    summary = {'count': 0}
+    for metric in METRICS:
+        summary[metric] = dict(('p%d' % p, None) for p in PERCENTILES)
+    return summary
+
+
+def job_stats(days=30, job=None, now=None):
+    """Return the percentiles of every metric for every job, over the
+    last `days` days, per day and for the whole period. To spot what's
+    getting slower it also includes the percentiles from the `days`
+    before that.
+    """
+    now = now or timezone.now()
+    since = now - datetime.timedelta(days=days)
+    previous_since = since - datetime.timedelta(days=days)
+
+    current = _summaries(since, job=job)
+    previous = _summaries(previous_since, until=since, job=job)
+    per_day = defaultdict(list)
+    for (name, day), summary in sorted(
+        _summaries(since, job=job, per_day=True).items()
+    ):
+        summary['date'] = day
+        per_day[name].append(summary)
+
+    stats = {}
+    for name, summary in current.items():
+        stats[name] = {
+            'current': summary,
+            'previous': previous.get(name) or _empty_summary(),
+            'days': per_day[name],
+        }
+    return stats
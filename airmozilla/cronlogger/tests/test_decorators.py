@@ -1,6 +1,10 @@
 import sys
+import threading
+import urllib2
+import BaseHTTPServer
 from decimal import Decimal
 
+import mock
 from nose.tools import ok_, eq_
 
 from airmozilla.base.tests.testbase import DjangoTestCase
@@ -23,6 +27,43 @@ def complaining():
     print >>sys.stderr, "Not good!"
 
 
+@capture
+def querying():
+    CronLog.objects.count()
+    list(CronLog.objects.all())
+
+
+@capture
+def fetching(url):
+    urllib2.urlopen(url).read()
+
+
+@capture
+def threaded(event_a, event_b):
+    # the other thread has started capturing when this one prints
+    event_a.set()
+    event_b.wait(5)
+    print "From threaded"
+
+
+@capture
+def other_thread(event_a, event_b):
+    event_a.wait(5)
+    print "From other_thread"
+    event_b.set()
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write('Hi!')
+
+    def log_message(self, *args):
+        pass
+
+
 @capture
 def failing():
     print "Something"
@@ -73,3 +114,61 @@ class TestCaptureDecorator(DjangoTestCase):
         ok_(cr.exc_traceback)
         ok_(cr.duration is not None)
         ok_(cr.duration <= Decimal('0.001'))
+
+    def test_metrics(self):
+        querying()
+        cr, = CronLog.objects.all()
+        eq_(cr.queries, 2)
+        ok_(cr.query_time is not None)
+        eq_(cr.http_requests, 0)
+        eq_(cr.http_time, Decimal('0'))
+        ok_(cr.max_rss > 0)
+
+    def test_metrics_http(self):
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), _Handler)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        try:
+            fetching('http://127.0.0.1:%d/' % server.server_port)
+        finally:
+            thread.join()
+            server.server_close()
+        cr, = CronLog.objects.all()
+        eq_(cr.http_requests, 1)
+        ok_(cr.http_time is not None)
+        eq_(cr.queries, 0)
+
+    def test_metrics_failing(self):
+        try:
+            failing()
+            assert False
+        except NameError:
+            pass
+        cr, = CronLog.objects.all()
+        eq_(cr.queries, 0)
+        ok_(cr.max_rss > 0)
+
+    @mock.patch('airmozilla.cronlogger.decorators.CronLog')
+    def test_threads_capture_their_own_output(self, mocked_cronlog):
+        # The other thread would use a database connection of its own
+        # that isn't rolled back after the test.
+        outputs = {}
+
+        def mocked_create(**kwargs):
+            outputs[kwargs['job']] = kwargs['stdout']
+
+        mocked_cronlog.objects.create.side_effect = mocked_create
+
+        event_a = threading.Event()
+        event_b = threading.Event()
+        thread = threading.Thread(
+            target=other_thread,
+            args=(event_a, event_b)
+        )
+        thread.start()
+        threaded(event_a, event_b)
+        thread.join()
+        eq_(outputs['threaded'], 'From threaded\n')
+        eq_(outputs['other_thread'], 'From other_thread\n')
+        # and afterwards the streams are put back
+        ok_(sys.stdout.__class__.__name__ != 'StreamRouter')
@@ -0,0 +1,58 @@
+import datetime
+
+from nose.tools import eq_
+
+from django.utils import timezone
+
+from airmozilla.base.tests.testbase import DjangoTestCase
+from airmozilla.cronlogger.models import CronLog
+from airmozilla.cronlogger import stats
+
+
+class TestStats(DjangoTestCase):
+
+    def _create(self, job, created, **kwargs):
+        log = CronLog.objects.create(job=job, **kwargs)
+        # `created` is auto_now_add so it has to be set afterwards
+        CronLog.objects.filter(id=log.id).update(created=created)
+        return log
+
+    def test_job_stats(self):
+        now = timezone.now()
+        today = now - datetime.timedelta(hours=1)
+        yesterday = now - datetime.timedelta(days=1)
+        long_ago = now - datetime.timedelta(days=40)
+        for duration in (1, 2, 3):
+            self._create(
+                'foo',
+                today,
+                duration=duration,
+                queries=duration * 10,
+                max_rss=1000,
+            )
+        self._create('foo', yesterday, duration=5)
+        self._create('foo', long_ago, duration=1)
+        # too old to be included at all
+        self._create('foo', now - datetime.timedelta(days=70), duration=99)
+        self._create('bar', today, duration=0.5)
+
+        result = stats.job_stats(days=30, now=now)
+        eq_(sorted(result), ['bar', 'foo'])
+        foo = result['foo']
+        eq_(foo['current']['count'], 4)
+        eq_(foo['current']['duration']['p50'], 2.5)
+        eq_(foo['current']['queries']['p50'], 20.0)
+        eq_(foo['current']['max_rss']['p99'], 1000.0)
+        # not collected for any of them
+        eq_(foo['current']['http_time']['p50'], None)
+        eq_(foo['previous']['count'], 1)
+        eq_(foo['previous']['duration']['p95'], 1.0)
+        eq_(len(foo['days']), len(set([
+            today.strftime('%Y-%m-%d'),
+            yesterday.strftime('%Y-%m-%d'),
+        ])))
+        eq_(foo['days'][-1]['date'], today.strftime('%Y-%m-%d'))
+        eq_(result['bar']['previous']['count'], 0)
+
+        result = stats.job_stats(days=30, job='bar', now=now)
+        eq_(result.keys(), ['bar'])
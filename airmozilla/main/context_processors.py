@@ -1,20 +1,18 @@
 # -*- coding: utf-8 -*-
 
-import datetime
-
 from django.conf import settings
 from django.db.models import Q
-from django.utils import timezone
 from django.core.cache import cache
 from django.core.urlresolvers import reverse
 
 from airmozilla.main.models import (
     Event,
     Channel,
-    EventHitStats,
+    EventTrending,
     most_recent_event
 )
 from airmozilla.main.views import is_contributor
+from airmozilla.main.roles import get_roles
 from airmozilla.search.forms import SearchForm
 from airmozilla.staticpages.models import StaticPage
 
@@ -281,74 +279,29 @@ def get_featured_events(
         cache_key += str(event.modified.microsecond)
     featured = cache.get(cache_key)
     if featured is None:
-        featured = _get_featured_events(channels, anonymous, contributor)
-        featured = featured[:length]
+        featured = _get_featured_events(
+            channels,
+            anonymous,
+            contributor,
+            length
+        )
         cache.set(cache_key, featured, 60 * 60)
+    return featured
 
-    # Sadly, in Django when you do a left outer join on a many-to-many
-    # table you get repeats and you can't fix that by adding a simple
-    # `distinct` on the first field.
-    # In django, if you do `myqueryset.distinct('id')` it requires
-    # that that's also something you order by.
-    # In pure Postgresql you can do this:
-    #   SELECT
-    #     DISTINCT main_eventhitstats.id as id,
-    #     (some formula) AS score,
-    #     ...
-    #   FROM ...
-    #   INNER JOIN ...
-    #   INNER JOIN ...
-    #   ORDER BY score DESC
-    #   LIMIT 5;
-    #
-    # But you can't do that with Django.
-    # So we have to manually de-dupe. Hopefully we can alleviate this
-    # problem altogether when we start doing aggregates where you have
-    # many repeated EventHitStats *per* event and you need to look at
-    # their total score across multiple vidly shortcodes.
-    events = []
-    for each in featured:
-        if each.event not in events:
-            events.append(each.event)
-    return events
-
-
-def _get_featured_events(channels, anonymous, contributor):
-    """do the heavy lifting of getting the featured events"""
-    now = timezone.now()
-    yesterday = now - datetime.timedelta(days=1)
-    # subtract one second to not accidentally tip it
-    yesterday -= datetime.timedelta(seconds=1)
-    featured = (
-        EventHitStats.objects
-        .filter(
-            Q(event__status=Event.STATUS_SCHEDULED) |
-            Q(event__status=Event.STATUS_PROCESSING)
-        )
-        .exclude(event__archive_time__isnull=True)
-        .filter(event__archive_time__lt=yesterday)
-        .exclude(event__channels__exclude_from_trending=True)
-        .extra(
-            select={
-                # being 'featured' pretends the event has twice as
-                # many hits as actually does
-                'score': '(featured::int + 1) * total_hits'
-                         '/ extract(days from (now() - archive_time)) ^ 1.8',
-            }
-        )
-        .select_related('event')
-        .order_by('-score')
-    )
-    if channels:
-        featured = featured.filter(event__channels__in=channels)
 
+def _get_featured_events(channels, anonymous, contributor, length):
+    """do the heavy lifting of getting the featured events"""
     if anonymous:
-        featured = featured.filter(event__privacy=Event.PRIVACY_PUBLIC)
+        audience = Event.PRIVACY_PUBLIC
     elif contributor:
-        featured = featured.exclude(event__privacy=Event.PRIVACY_COMPANY)
-
-    featured = featured.select_related('event__picture')
-    return featured
+        audience = Event.PRIVACY_CONTRIBUTORS
+    else:
+        audience = Event.PRIVACY_COMPANY
+    return EventTrending.objects.get_top(
+        audience,
+        channels=channels,
+        length=length,
+    )
 
 
 def analytics(request):
@@ -366,16 +319,8 @@ def analytics(request):
 
 def _get_feed_privacy(user):
     """return 'public', 'contributors' or 'company' depending on the user
-    profile.
-    Because this is used very frequently and because it's expensive to
-    pull out the entire user profile every time, we use cache to remember
-    if the user is a contributor or not (applicable only if logged in)
-    """
-    if user.is_active:
-        if is_contributor(user):
-            return 'contributors'
-        return 'company'
-    return 'public'
+    profile."""
+    return get_roles(user).privacy_bucket
 
 
 def browserid(request):
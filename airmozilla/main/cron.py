@@ -5,6 +5,7 @@ from django.utils import timezone
 import cronjobs
 
 from airmozilla.main.models import VidlyTagDomain
+from airmozilla.main import livehits
 from airmozilla.cronlogger.decorators import capture
 from airmozilla.main.views.pages import get_vidly_csp_headers
 
@@ -42,3 +43,9 @@ def refresh_old_vidly_tag_domains():
             combos.add(combo)
             print 'New headers: {}'.format(headers)
         print ''
+
+
+@cronjobs.register
+@capture
+def flush_live_hits():
+    print "Flushed {} live hits".format(livehits.flush(verbose=True))
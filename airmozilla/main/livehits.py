@@ -0,0 +1,141 @@
+"""Counting the viewers of live events.
+
+Every viewer of a live event POSTs once to `event_livehits` and doing
+an `UPDATE ... SET total_hits = total_hits + 1` for each one means
+every viewer is waiting for the same row lock. Instead each hit is an
+atomic increment of a counter in the cache and, once a minute, the
+`flush_live_hits` cron job moves what's been counted into
+`EventLiveHits` with one UPDATE per event.
+
+The number shown is what's been stored plus what's still pending in
+the cache.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from airmozilla.main.models import Event, EventLiveHits
+
+
+# Longer than any event is going to be live for.
+PENDING_TIMEOUT = 60 * 60 * 24
+TOTAL_TIMEOUT = 60 * 60
+
+# The ids of the events that might have pending hits. Events that are
+# live are always flushed so if an id gets lost here because of two
+# concurrent writes it's only a problem once the event has stopped
+# being live.
+EVENTS_CACHE_KEY = 'livehits:events'
+
+
+def _pending_key(event_id):
+    return 'livehits:pending:%d' % event_id
+
+
+def _total_key(event_id):
+    return 'livehits:total:%d' % event_id
+
+
+def _register(event_id):
+    event_ids = cache.get(EVENTS_CACHE_KEY) or []
+    if event_id not in event_ids:
+        cache.set(
+            EVENTS_CACHE_KEY,
+            event_ids + [event_id],
+            PENDING_TIMEOUT
+        )
+
+
+def count_hit(event_id):
+    """Count one more hit for this event. This never touches the
+    database."""
+    key = _pending_key(event_id)
+    if cache.add(key, 0, PENDING_TIMEOUT):
+        # the first hit since the counter was last created
+        _register(event_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # it expired, or was dropped by flush(), since the add()
+        cache.set(key, 1, PENDING_TIMEOUT)
+        _register(event_id)
+
+
+def get_hits(event_id):
+    """Return the number of hits stored plus those not yet flushed."""
+    values = cache.get_many([_total_key(event_id), _pending_key(event_id)])
+    total = values.get(_total_key(event_id))
+    if total is None:
+        total = (
+            EventLiveHits.objects.filter(event_id=event_id)
+            .values_list('total_hits', flat=True)
+            .first()
+        ) or 0
+        cache.set(_total_key(event_id), total, TOTAL_TIMEOUT)
+    return total + (values.get(_pending_key(event_id)) or 0)
+
+
+def flush(verbose=False):
+    """Move all the pending hits from the cache to `EventLiveHits`.
+    Returns the number of hits flushed."""
+    registered = cache.get(EVENTS_CACHE_KEY) or []
+    live = set(Event.objects.live().values_list('id', flat=True))
+    event_ids = set(registered) | live
+    if not event_ids:
+        return 0
+
+    keys = dict((_pending_key(x), x) for x in event_ids)
+    pending = dict(
+        (keys[key], count)
+        for key, count in cache.get_many(keys.keys()).items()
+        if count
+    )
+
+    if pending:
+        with transaction.atomic():
+            existing = set(
+                EventLiveHits.objects.filter(event_id__in=pending)
+                .values_list('event_id', flat=True)
+            )
+            EventLiveHits.objects.bulk_create([
+                EventLiveHits(event_id=event_id)
+                for event_id in pending
+                if event_id not in existing
+            ])
+            for event_id, count in pending.items():
+                EventLiveHits.objects.filter(event_id=event_id).update(
+                    total_hits=F('total_hits') + count
+                )
+        totals = dict(
+            EventLiveHits.objects.filter(event_id__in=pending)
+            .values_list('event_id', 'total_hits')
+        )
+        for event_id, count in pending.items():
+            # Any hits counted since we read the counter stay pending.
+            try:
+                cache.decr(_pending_key(event_id), count)
+            except ValueError:
+                # It expired, or was evicted, since we read it. Those
+                # hits are stored now so there's nothing left pending.
+                pass
+            cache.set(_total_key(event_id), totals[event_id], TOTAL_TIMEOUT)
+            if verbose:  # pragma: no cover
+                print "Event {:<8} {:>6} hits {:>8} total".format(
+                    event_id,
+                    count,
+                    totals[event_id],
+                )
+
+    # Stop looking at events that are over and have nothing pending.
+    remaining = [
+        x for x in registered
+        if x in live or x in pending
+    ]
+    if remaining != registered:
+        cache.set(EVENTS_CACHE_KEY, remaining, PENDING_TIMEOUT)
+        cache.delete_many([
+            _pending_key(x) for x in registered
+            if x not in remaining
+        ])
+
+    return sum(pending.values())
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+
+from airmozilla.main.roles import get_roles
+
+
+class RolesMiddleware(object):
+
+    def process_request(self, request):
+        # lazy so that requests that never ask don't look anything up
+        request.roles = SimpleLazyObject(lambda: get_roles(request.user))
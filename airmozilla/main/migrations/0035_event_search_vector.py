@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0034_auto_20161111_2016'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                'ALTER TABLE main_event ADD COLUMN search_vector tsvector',
+                'CREATE INDEX main_event_search_vector_gin '
+                'ON main_event USING gin(search_vector)',
+                # SavedSearch filters on the title alone
+                "CREATE INDEX main_event_title_tsvector_gin "
+                "ON main_event USING gin(to_tsvector('english', title))",
+            ],
+            [
+                'DROP INDEX main_event_title_tsvector_gin',
+                'DROP INDEX main_event_search_vector_gin',
+                'ALTER TABLE main_event DROP COLUMN search_vector',
+            ]
+        ),
+    ]
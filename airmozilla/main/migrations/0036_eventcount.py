@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0035_event_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('privacy', models.CharField(max_length=40, choices=[(b'public', b'Public'), (b'contributors', b'Contributors'), (b'company', b'Staff')])),
+                ('status', models.CharField(max_length=20, choices=[(b'submitted', b'Submitted'), (b'scheduled', b'Scheduled'), (b'pending', b'Pending'), (b'processing', b'Processing'), (b'removed', b'Removed')])),
+                ('approved', models.BooleanField(default=True)),
+                ('archived', models.BooleanField(default=False)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('channel', models.ForeignKey(to='main.Channel', null=True)),
+                ('tag', models.ForeignKey(to='main.Tag', null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0036_eventcount'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='event',
+            index_together=set([('modified', 'id')]),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0037_event_modified_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('metric', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyrollup',
+            unique_together=set([('metric', 'date')]),
+        ),
+    ]
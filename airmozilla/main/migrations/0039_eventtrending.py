@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0038_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTrending',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('audience', models.CharField(max_length=40, choices=[(b'public', b'Public'), (b'contributors', b'Contributors'), (b'company', b'Staff')])),
+                ('score', models.FloatField()),
+                ('total_hits', models.IntegerField()),
+                ('archive_time', models.DateTimeField()),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('channel', models.ForeignKey(to='main.Channel', null=True)),
+                ('event', models.ForeignKey(to='main.Event')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='eventtrending',
+            index_together=set([('channel', 'audience', 'score')]),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0039_eventtrending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportPosition',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('name', models.CharField(unique=True, max_length=50)),
+                ('modified', models.DateTimeField()),
+                ('last_id', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import airmozilla.main.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0040_exportposition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventHitStatsSample',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('hits', models.IntegerField()),
+                ('seconds', models.FloatField()),
+                ('created', models.DateTimeField(default=airmozilla.main.models._get_now, db_index=True)),
+                ('event', models.ForeignKey(to='main.Event')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='eventhitstats',
+            name='next_refresh',
+            field=models.DateTimeField(default=airmozilla.main.models._get_now, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='eventhitstats',
+            name='velocity',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
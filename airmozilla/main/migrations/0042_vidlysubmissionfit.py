@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0041_eventhitstatssample'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VidlySubmissionFit',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('bucket', models.IntegerField(unique=True)),
+                ('slope', models.FloatField()),
+                ('intercept', models.FloatField()),
+                ('points', models.IntegerField()),
+                ('modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vidlysubmission',
+            name='estimated_duration',
+            field=models.FloatField(null=True),
+        ),
+    ]
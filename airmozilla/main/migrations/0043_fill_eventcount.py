@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    # the same counting as EventCount.objects.rebuild()
+    from airmozilla.main.models import count_events
+
+    Event = apps.get_model('main', 'Event')
+    Approval = apps.get_model('main', 'Approval')
+    EventCount = apps.get_model('main', 'EventCount')
+    EventCount.objects.all().delete()
+    for kind in ('channel', 'tag'):
+        model = apps.get_model('main', kind.capitalize())
+        ids = list(model.objects.all().values_list('id', flat=True))
+        for i in range(0, len(ids), 100):
+            EventCount.objects.bulk_create([
+                EventCount(**x)
+                for x in count_events(Event, Approval, kind, ids[i:i + 100])
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0042_vidlysubmissionfit'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    # the same as the update-search-vectors management command
+    from airmozilla.main.search_vectors import update_search_vectors
+
+    update_search_vectors()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0043_fill_eventcount'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
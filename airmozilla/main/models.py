@@ -1,24 +1,35 @@
+import bisect
+import contextlib
 import datetime
 import hashlib
+import logging
 import os
+import threading
 import unicodedata
 import math
+import uuid
+from collections import defaultdict
 
 import pytz
+from concurrent import futures
 
 from django.conf import settings
 from django.contrib.auth.models import Group, User
 from django.core.cache import cache
-from django.db import models
+from django.db import models, transaction
 from django.dispatch import receiver
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, Count
 from django.utils.encoding import smart_text
 
 from sorl.thumbnail import ImageField
 
 from airmozilla.base.utils import unique_slugify, roughly, send_fanout
 from airmozilla.main.fields import EnvironmentField
+from airmozilla.main.search_vectors import (
+    update_search_vector,
+    SEARCH_VECTOR_FIELDS,
+)
 from airmozilla.manage.utils import filename_to_notes
 from airmozilla.manage.vidly import get_video_redirect_info
 
@@ -51,13 +62,15 @@ class UserEmailAlias(models.Model):
 @receiver(models.signals.post_save, sender=UserProfile)
 @receiver(models.signals.post_save, sender=User)
 def user_profile_clear_cache(sender, instance, **kwargs):
+    from airmozilla.main.roles import contributor_cache_key, forget_roles
     if instance.__class__ is User:
-        pk = instance.pk
+        user = instance
     elif instance.__class__ is UserProfile:
-        pk = instance.user.pk
+        user = instance.user
     else:
         raise NotImplementedError
-    cache.delete('is-contributor-%s' % pk)
+    cache.delete(contributor_cache_key(user.pk))
+    forget_roles(user)
 
 
 def get_profile_safely(user, create_if_necessary=False):
@@ -417,6 +430,8 @@ class Event(models.Model):
             ('change_event_others', 'Can edit events created by other users'),
             ('add_event_scheduled', 'Can create events with scheduled status')
         )
+        # for paginating the manage events grid by the last modified
+        index_together = (('modified', 'id'),)
 
     def __unicode__(self):
         return self.title
@@ -490,8 +505,10 @@ class Event(models.Model):
             value = smart_text(value)
         return value
 
-    def _get_unique_title(self):
-        if self.has_unique_title():
+    def _get_unique_title(self, unique=None):
+        if unique is None:
+            unique = self.has_unique_title()
+        if unique:
             return self.title
         else:
             start_time = self.start_time
@@ -529,6 +546,92 @@ def most_recent_event():
     return event
 
 
+def get_unique_titles(events):
+    """Return a dict of event ID to `event.get_unique_title()` for
+    all these events without a query per event."""
+    cache_keys = dict(
+        ('unique_title_{}'.format(event.id), event.id) for event in events
+    )
+    titles = dict(
+        (cache_keys[key], smart_text(value))
+        for key, value in cache.get_many(cache_keys.keys()).items()
+    )
+    missing = [event for event in events if event.id not in titles]
+    if missing:
+        repeated = set(
+            Event.objects.filter(title__in=set(x.title for x in missing))
+            .values('title').annotate(count=Count('id'))
+            .filter(count__gt=1)
+            .values_list('title', flat=True)
+        )
+        computed = {}
+        for event in missing:
+            titles[event.id] = event._get_unique_title(
+                unique=event.title not in repeated
+            )
+            computed['unique_title_{}'.format(event.id)] = titles[event.id]
+        cache.set_many(computed, roughly(60 * 60 * 5))
+    return titles
+
+
+EVENT_VERSION_TIMEOUT = 60 * 60 * 24 * 7
+ALL_EVENTS_VERSION_CACHE_KEY = 'event_version:all'
+
+
+def _event_version_cache_key(event_id):
+    return 'event_version:{}'.format(event_id)
+
+
+def get_event_version(event_id):
+    """Return something that changes every time anything that is displayed
+    on the page of this event changes. Use it to version cache keys."""
+    keys = [_event_version_cache_key(event_id), ALL_EVENTS_VERSION_CACHE_KEY]
+    versions = cache.get_many(keys)
+    missing = {}
+    for key in keys:
+        if key not in versions:
+            versions[key] = missing[key] = uuid.uuid4().hex
+    if missing:
+        cache.set_many(missing, EVENT_VERSION_TIMEOUT)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_event_version(event_id=None):
+    """Invalidate everything cached against the version of this event.
+    If no event ID is given, it's the version of all events."""
+    if event_id is None:
+        cache_key = ALL_EVENTS_VERSION_CACHE_KEY
+    else:
+        cache_key = _event_version_cache_key(event_id)
+    cache.set(cache_key, uuid.uuid4().hex, EVENT_VERSION_TIMEOUT)
+
+
+EVENT_LIST_VERSION_CACHE_KEY = 'event_list_version'
+
+
+def get_event_list_version():
+    """Return something that changes every time anything that might
+    be in any list of events, like the iCal calendars and the feeds,
+    changes."""
+    version = cache.get(EVENT_LIST_VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(
+            EVENT_LIST_VERSION_CACHE_KEY,
+            version,
+            EVENT_VERSION_TIMEOUT
+        )
+    return version
+
+
+def bump_event_list_version():
+    cache.set(
+        EVENT_LIST_VERSION_CACHE_KEY,
+        uuid.uuid4().hex,
+        EVENT_VERSION_TIMEOUT
+    )
+
+
 @receiver(models.signals.post_save, sender=Event)
 def notify_fanout_event(sender, instance, **kwargs):
     if not kwargs['raw']:
@@ -558,6 +661,15 @@ def reset_event_unique_title(sender, instance, **kwargs):
         cache.delete(cache_key)
 
 
+@receiver(models.signals.post_save, sender=Event)
+def update_event_search_vector(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not set(update_fields) & set(SEARCH_VECTOR_FIELDS):
+        # nothing searchable has changed
+        return
+    update_search_vector(instance.id)
+
+
 class EventMetadata(models.Model):
     event = models.ForeignKey(Event)
     key = models.CharField(max_length=300)
@@ -665,6 +777,7 @@ class CuratedGroup(models.Model):
 def invalidate_curated_group_names(sender, instance, **kwargs):
     cache_key = sender.get_names_cache_key(instance.event)
     cache.delete(cache_key)
+    bump_event_version(instance.event_id)
 
 
 class SuggestedEvent(models.Model):
@@ -843,6 +956,12 @@ class VidlySubmission(models.Model):
     submission_error = models.TextField(blank=True, null=True)
     finished = models.DateTimeField(null=True, db_index=True)
     errored = models.DateTimeField(null=True)
+    # number of seconds we first estimated it would take to finish
+    estimated_duration = models.FloatField(null=True)
+
+    # event durations (in seconds) are bucketed like this and each
+    # bucket gets its own VidlySubmissionFit
+    DURATION_BUCKETS = (0, 5 * 60, 15 * 60, 30 * 60, 60 * 60, 2 * 60 * 60)
 
     @property
     def finished_duration(self):
@@ -858,7 +977,9 @@ class VidlySubmission(models.Model):
         to go from submission to finished."""
 
         assert self.event.duration
-        slope_and_intercept = self.get_least_square_slope()
+        if self.estimated_duration is not None:
+            return self.estimated_duration
+        slope_and_intercept = self.get_fit(self.event.duration)
         if slope_and_intercept is None:
             # Sometimes there simply are no good other points to compare
             # against. That's because this particular one might be
@@ -974,17 +1095,181 @@ class VidlySubmission(models.Model):
         except ZeroDivisionError:
             return None
 
-    def get_estimated_time_left(self):
-        if self.event.duration:
-            points = self.get_points()
-            slope_and_intercept = self.get_least_square_slope(
-                points=points
+    @classmethod
+    def get_duration_bucket(cls, duration):
+        return bisect.bisect_right(cls.DURATION_BUCKETS, duration) - 1
+
+    @classmethod
+    def get_fits(cls):
+        """return a dict of duration bucket -> (slope, intercept)"""
+        fits = cache.get('vidly_submission_fits')
+        if fits is None:
+            fits = dict(
+                (bucket, (slope, intercept))
+                for bucket, slope, intercept in
+                VidlySubmissionFit.objects.values_list(
+                    'bucket', 'slope', 'intercept'
+                )
+            )
+            cache.set('vidly_submission_fits', fits, 60 * 60 * 24)
+        return fits
+
+    @classmethod
+    def get_fit(cls, duration):
+        """return the (slope, intercept) for events of this duration
+        or None if we haven't got enough finished submissions yet."""
+        fits = cls.get_fits()
+        fit = fits.get(cls.get_duration_bucket(duration))
+        if fit is None:
+            fit = fits.get(VidlySubmissionFit.ALL_DURATIONS)
+        return fit
+
+    @classmethod
+    def refit(cls, duration, cutoff=datetime.timedelta(days=365), slice=50):
+        """re-calculate the fit for the bucket this duration is in and
+        the fit for all durations from the most recent finished
+        submissions."""
+        bucket = cls.get_duration_bucket(duration)
+        submissions = cls.objects.filter(
+            finished__isnull=False,
+            event__duration__gt=0,
+            submission_time__gte=timezone.now() - cutoff,
+        )
+        in_bucket = submissions.filter(
+            event__duration__gte=cls.DURATION_BUCKETS[bucket]
+        )
+        if bucket + 1 < len(cls.DURATION_BUCKETS):
+            in_bucket = in_bucket.filter(
+                event__duration__lt=cls.DURATION_BUCKETS[bucket + 1]
             )
+        for fit_bucket, qs in (
+            (bucket, in_bucket),
+            (VidlySubmissionFit.ALL_DURATIONS, submissions),
+        ):
+            points = [
+                {'x': x, 'y': (finished - submission_time).seconds}
+                for x, finished, submission_time in qs.order_by(
+                    '-submission_time'
+                ).values_list(
+                    'event__duration', 'finished', 'submission_time'
+                )[:slice]
+            ]
+            slope_and_intercept = cls._least_square_slope(points)
+            if slope_and_intercept is None:
+                VidlySubmissionFit.objects.filter(bucket=fit_bucket).delete()
+            else:
+                slope, intercept = slope_and_intercept
+                VidlySubmissionFit.objects.update_or_create(
+                    bucket=fit_bucket,
+                    defaults={
+                        'slope': slope,
+                        'intercept': intercept,
+                        'points': len(points),
+                    }
+                )
+        cache.delete('vidly_submission_fits')
+
+    def estimate_duration(self):
+        """return the number of seconds we think it will take to finish
+        or None if we can't tell"""
+        if self.event.duration:
+            slope_and_intercept = self.get_fit(self.event.duration)
             if slope_and_intercept:
                 slope, intercept = slope_and_intercept
-                estimated_time = self.event.duration * slope + intercept
-                time_gone = (timezone.now() - self.submission_time).seconds
-                return int(estimated_time - time_gone)
+                return self.event.duration * slope + intercept
+
+    def get_estimated_time_left(self):
+        estimated_time = self.estimated_duration
+        if estimated_time is None and not self.finished:
+            estimated_time = self.estimate_duration()
+            if estimated_time is not None:
+                # remember it so it can be compared with how long
+                # it actually took
+                self.__class__.objects.filter(id=self.id).update(
+                    estimated_duration=estimated_time
+                )
+                self.estimated_duration = estimated_time
+        if estimated_time is not None:
+            time_gone = (timezone.now() - self.submission_time).seconds
+            return int(estimated_time - time_gone)
+
+    @classmethod
+    def get_accuracy(cls, since=None):
+        """return how far off the estimates were, per duration bucket,
+        for finished submissions that had an estimate. Each is a dict
+        with the number of submissions, the mean error in seconds
+        (positive when it took longer than estimated) and the mean
+        absolute error as a percentage of how long it actually took."""
+        submissions = cls.objects.filter(
+            finished__isnull=False,
+            estimated_duration__isnull=False,
+            event__duration__gt=0,
+        )
+        if since is not None:
+            submissions = submissions.filter(submission_time__gte=since)
+        errors = defaultdict(list)
+        for duration, finished, submission_time, estimated in (
+            submissions.values_list(
+                'event__duration',
+                'finished',
+                'submission_time',
+                'estimated_duration',
+            )
+        ):
+            actual = (finished - submission_time).seconds
+            errors[cls.get_duration_bucket(duration)].append(
+                (actual - estimated, actual)
+            )
+        accuracy = []
+        for bucket in sorted(errors):
+            differences = errors[bucket]
+            accuracy.append({
+                'min_duration': cls.DURATION_BUCKETS[bucket],
+                'max_duration': (
+                    cls.DURATION_BUCKETS[bucket + 1]
+                    if bucket + 1 < len(cls.DURATION_BUCKETS) else None
+                ),
+                'count': len(differences),
+                'mean_error': (
+                    sum(x for x, __ in differences) / len(differences)
+                ),
+                'mean_absolute_percentage': (
+                    100.0 * sum(
+                        abs(x) / max(actual, 1) for x, actual in differences
+                    ) / len(differences)
+                ),
+            })
+        return accuracy
+
+
+class VidlySubmissionFit(models.Model):
+    """The least square slope and intercept of how many seconds it
+    takes Vid.ly to finish submissions of events in one of the
+    VidlySubmission.DURATION_BUCKETS."""
+    # for the one fit across all durations
+    ALL_DURATIONS = -1
+
+    bucket = models.IntegerField(unique=True)
+    slope = models.FloatField()
+    intercept = models.FloatField()
+    points = models.IntegerField()
+    modified = models.DateTimeField(auto_now=True)
+
+
+@receiver(models.signals.pre_save, sender=VidlySubmission)
+def estimate_vidly_submission_duration(sender, instance, raw, **kwargs):
+    if raw or instance.id or instance.finished:
+        return
+    if instance.estimated_duration is None:
+        instance.estimated_duration = instance.estimate_duration()
+
+
+@receiver(models.signals.post_save, sender=VidlySubmission)
+def refit_vidly_submissions(sender, instance, raw, **kwargs):
+    if raw or not instance.finished:
+        return
+    if instance.event.duration:
+        VidlySubmission.refit(instance.event.duration)
 
 
 class VidlyTagDomain(models.Model):
@@ -1012,16 +1297,34 @@ def invalidate_vidly_tokenization(sender, instance, **kwargs):
         cache.delete(cache_key)
         cache_key = 'event_vidly_information-{}'.format(instance.event_id)
         cache.delete(cache_key)
+    bump_event_version(instance.event_id)
 
 
 @receiver(models.signals.post_save, sender=Event)
+@receiver(models.signals.post_delete, sender=Event)
 @receiver(models.signals.post_save, sender=Approval)
-def event_clear_cache(sender, **kwargs):
-    cache.delete('calendar')
-    cache.delete('calendar_public')
-    cache.delete('calendar_company')
-    cache.delete('calendar_contributors')
+@receiver(models.signals.post_delete, sender=Approval)
+def event_clear_cache(sender, instance, **kwargs):
+    bump_event_list_version()
     cache.delete('autocomplete:patterns')
+    if sender is Event:
+        bump_event_version(instance.id)
+    else:
+        bump_event_version(instance.event_id)
+
+
+@receiver(models.signals.post_save, sender=Template)
+@receiver(models.signals.post_delete, sender=Template)
+@receiver(models.signals.post_save, sender=Channel)
+@receiver(models.signals.post_delete, sender=Channel)
+@receiver(models.signals.post_save, sender=Tag)
+@receiver(models.signals.post_delete, sender=Tag)
+@receiver(models.signals.post_save, sender=Location)
+@receiver(models.signals.post_delete, sender=Location)
+def bump_all_event_versions(sender, **kwargs):
+    # These are things that might be displayed on any event's page.
+    bump_event_version()
+    bump_event_list_version()
 
 
 @receiver(models.signals.pre_save, sender=Event)
@@ -1037,15 +1340,269 @@ def event_update_slug(sender, instance, raw, *args, **kwargs):
             instance.start_time.strftime('%Y%m%d'),
             exclude=exclude
         )
+    # avoid circular import
+    from airmozilla.main import slug_resolution
     try:
         old = Event.objects.get(id=instance.id)
         if instance.slug != old.slug:
             [x.delete() for x in EventOldSlug.objects.filter(slug=old.slug)]
             EventOldSlug.objects.create(slug=old.slug, event=instance)
+            slug_resolution.forget(old.slug, instance.slug)
     except Event.DoesNotExist:
+        slug_resolution.forget(instance.slug)
+
+
+@receiver(models.signals.post_save, sender=Event)
+def event_forget_id_resolution(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        # avoid circular import
+        from airmozilla.main import slug_resolution
+        slug_resolution.forget(str(instance.id))
+
+
+def count_events(event_model, approval_model, kind, ids):
+    """Return the `EventCount` field values for these channel or tag
+    IDs. The models are passed in so that migrations can use it with
+    their historical models."""
+    through = getattr(event_model, kind + 's').through
+    field = kind + '_id'
+
+    def count(**filters):
+        qs = (
+            through.objects
+            .filter(**{field + '__in': ids})
+            .filter(**filters)
+            .values_list(field, 'event__privacy', 'event__status')
+            .annotate(count=models.Count('event_id', distinct=True))
+            .order_by()
+        )
+        return dict((x[:3], x[3]) for x in qs)
+
+    # Remember, an event is only approved if none of its approvals
+    # are either not approved or not processed.
+    unapproved_ids = approval_model.objects.filter(
+        Q(approved=False) | Q(processed=False)
+    ).values('event_id')
+    rows = []
+    for archived in (True, False):
+        filters = {'event__archive_time__isnull': not archived}
+        totals = count(**filters)
+        unapproved = count(event_id__in=unapproved_ids, **filters)
+        for key, total in totals.items():
+            id, privacy, status = key
+            for approved, count_ in (
+                (True, total - unapproved.get(key, 0)),
+                (False, unapproved.get(key, 0)),
+            ):
+                if not count_:
+                    continue
+                rows.append({
+                    'privacy': privacy,
+                    'status': status,
+                    'approved': approved,
+                    'archived': archived,
+                    'count': count_,
+                    field: id,
+                })
+    return rows
+
+
+class EventCountManager(models.Manager):
+
+    # The Event m2m fields we keep counts for.
+    KINDS = ('channel', 'tag')
+
+    def recount(self, kind, ids):
+        """Re-calculate all the counts for these channel or tag IDs.
+
+        Rather than trying to keep track of deltas we simply count
+        again but only for the affected channels or tags."""
+        assert kind in self.KINDS, kind
+        ids = sorted(set(ids))
+        if not ids:
+            return
+        model = {'channel': Channel, 'tag': Tag}[kind]
+        with transaction.atomic():
+            # Two events saved at the same time, in the same channel,
+            # would otherwise both delete the rows before either has
+            # inserted its own and the counts would be doubled.
+            # Locking the channels or tags makes the second one wait
+            # and then count what the first one committed.
+            list(
+                model.objects.select_for_update()
+                .filter(id__in=ids)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            rows = count_events(Event, Approval, kind, ids)
+            self.get_queryset().filter(**{kind + '_id__in': ids}).delete()
+            self.bulk_create([self.model(**x) for x in rows])
+
+    def rebuild(self, verbose=False):
+        """Re-calculate everything. Use this to correct drift."""
+        for kind, model in (('channel', Channel), ('tag', Tag)):
+            ids = list(model.objects.all().values_list('id', flat=True))
+            if verbose:  # pragma: no cover
+                print "Recounting {} {}s".format(len(ids), kind)
+            # delete those that might have no events at all any more
+            self.get_queryset().filter(
+                **{kind + '__isnull': False}
+            ).exclude(
+                **{kind + '_id__in': ids}
+            ).delete()
+            for i in range(0, len(ids), 100):
+                self.recount(kind, ids[i:i + 100])
+
+    def get_counts(
+        self,
+        kind,
+        privacy_filter=None,
+        privacy_exclude=None,
+        **filters
+    ):
+        """Return a dict of channel or tag ID to number of events.
+
+        `privacy_filter` and `privacy_exclude` are dicts just like
+        the views use them to filter Event querysets. Any other
+        keyword arguments are filters on `status`, `approved`
+        and `archived`.
+        """
+        assert kind in self.KINDS, kind
+        qs = self.get_queryset().filter(**{kind + '__isnull': False})
+        if privacy_filter:
+            qs = qs.filter(**privacy_filter)
+        elif privacy_exclude:
+            qs = qs.exclude(**privacy_exclude)
+        qs = qs.filter(**filters)
+        return dict(
+            qs.values_list(kind + '_id')
+            .annotate(models.Sum('count'))
+            .order_by()
+        )
+
+
+class EventCount(models.Model):
+    """Materialized number of events per channel and per tag, broken
+    down by privacy, status, approval and whether archived.
+
+    `archived` means the event has an `archive_time` which is a good
+    enough approximation of what `Event.objects.archived()` does.
+
+    These are kept up to date by signals whenever an event, its
+    channels, its tags or its approvals change.
+    Run the `rebuild-event-counts` management command if you
+    suspect drift.
+    """
+    channel = models.ForeignKey(Channel, null=True)
+    tag = models.ForeignKey(Tag, null=True)
+    privacy = models.CharField(max_length=40, choices=Event.PRIVACY_CHOICES)
+    status = models.CharField(max_length=20, choices=Event.STATUS_CHOICES)
+    approved = models.BooleanField(default=True)
+    archived = models.BooleanField(default=False)
+    count = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = EventCountManager()
+
+
+def _recount_event(event):
+    EventCount.objects.recount(
+        'channel',
+        event.channels.all().values_list('id', flat=True)
+    )
+    EventCount.objects.recount(
+        'tag',
+        event.tags.all().values_list('id', flat=True)
+    )
+
+
+@receiver(models.signals.post_save, sender=Event)
+def event_recount(sender, instance, **kwargs):
+    _recount_event(instance)
+
+
+@receiver(models.signals.post_save, sender=Approval)
+@receiver(models.signals.post_delete, sender=Approval)
+def event_approval_recount(sender, instance, **kwargs):
+    try:
+        _recount_event(instance.event)
+    except Event.DoesNotExist:
+        # the approval is deleted because the event is deleted
         pass
 
 
+@receiver(models.signals.pre_delete, sender=Event)
+def event_remember_counted(sender, instance, **kwargs):
+    # Once deleted we can't know which channels and tags it belonged to.
+    instance._counted_ids = {
+        'channel': list(instance.channels.all().values_list('id', flat=True)),
+        'tag': list(instance.tags.all().values_list('id', flat=True)),
+    }
+
+
+@receiver(models.signals.post_delete, sender=Event)
+def event_deleted_recount(sender, instance, **kwargs):
+    for kind, ids in getattr(instance, '_counted_ids', {}).items():
+        EventCount.objects.recount(kind, ids)
+
+
+@receiver(models.signals.m2m_changed, sender=Event.channels.through)
+@receiver(models.signals.m2m_changed, sender=Event.tags.through)
+def event_m2m_bump_event_version(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        for event_id in pk_set or []:
+            bump_event_version(event_id)
+    else:
+        bump_event_version(instance.id)
+    bump_event_list_version()
+
+
+@receiver(models.signals.m2m_changed, sender=Event.channels.through)
+@receiver(models.signals.m2m_changed, sender=Event.tags.through)
+def event_m2m_recount(sender, instance, action, reverse, pk_set, **kwargs):
+    kind = sender is Event.channels.through and 'channel' or 'tag'
+    if reverse:
+        # e.g. `channel.event_set.add(event)`
+        if action.startswith('post_'):
+            EventCount.objects.recount(kind, [instance.id])
+    elif action == 'pre_clear':
+        instance._cleared_ids = list(
+            getattr(instance, kind + 's').all().values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        EventCount.objects.recount(kind, instance.__dict__.pop(
+            '_cleared_ids', []
+        ))
+    elif action in ('post_add', 'post_remove'):
+        EventCount.objects.recount(kind, pk_set)
+
+
+class DailyRollup(models.Model):
+    """A number per day for things that are expensive to count over long
+    periods, like the counts on the manage dashboard. See
+    `airmozilla.manage.dashboard` for what the metrics are and how
+    they're calculated."""
+    metric = models.CharField(max_length=50)
+    date = models.DateField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('metric', 'date')
+
+
+class ExportPosition(models.Model):
+    """How far an incremental export (e.g. to Elasticsearch or
+    autocompeter.com) has got. It's the `modified` and `id` of the last
+    thing exported so the next export starts right after it. See
+    `airmozilla.manage.export`."""
+    name = models.CharField(max_length=50, unique=True)
+    modified = models.DateTimeField()
+    last_id = models.IntegerField(default=0)
+
+
 class VidlyMedia(models.Model):
     tag = models.CharField(max_length=100)
     hd = models.BooleanField(default=False)
@@ -1076,6 +1633,61 @@ class VidlyMedia(models.Model):
             content_type=data['type']
         )
 
+    @classmethod
+    def get_or_create_many(cls, tags, video_format, hd):
+        """Like `get_or_create()` for many tags at once, looking up the
+        ones we don't already have in parallel. Returns a dict of tag
+        to `VidlyMedia`, without the tags that couldn't be looked up."""
+        tags = set(tags)
+        found = {}
+        qs = cls.objects.filter(
+            tag__in=tags,
+            video_format=video_format,
+            hd=hd
+        )
+        for obj in qs.order_by('modified'):
+            found[obj.tag] = obj
+        missing = tags - set(found)
+        if not missing:
+            return found
+        with futures.ThreadPoolExecutor(
+            max_workers=settings.VIDLY_API_WORKERS
+        ) as pool:
+            jobs = dict(
+                (
+                    pool.submit(
+                        get_video_redirect_info, tag, video_format, hd
+                    ),
+                    tag
+                )
+                for tag in missing
+            )
+            for job in futures.as_completed(jobs):
+                tag = jobs[job]
+                try:
+                    data = job.result()
+                except Exception as exception:
+                    logging.error(
+                        'Unable to look up %r (%s)', tag, exception
+                    )
+                    continue
+                found[tag] = cls.objects.create(
+                    tag=tag,
+                    hd=hd,
+                    video_format=video_format,
+                    url=data['url'],
+                    size=data['length'],
+                    content_type=data['type']
+                )
+        return found
+
+
+@receiver(models.signals.post_save, sender=VidlyMedia)
+@receiver(models.signals.post_delete, sender=VidlyMedia)
+def vidly_media_bump_event_list_version(sender, **kwargs):
+    # it's what's in the iTunes feeds
+    bump_event_list_version()
+
 
 class URLMatch(models.Model):
     name = models.CharField(max_length=200)
@@ -1105,6 +1717,18 @@ class EventHitStats(models.Model):
     total_hits = models.IntegerField()
     shortcode = models.CharField(max_length=100)
     modified = models.DateTimeField(default=_get_now)
+    # recent hits per hour, worked out from the EventHitStatsSamples
+    velocity = models.FloatField(default=0.0)
+    next_refresh = models.DateTimeField(default=_get_now, db_index=True)
+
+
+class EventHitStatsSample(models.Model):
+    """How many new hits an event got in the `seconds` leading up to
+    `created`. One is recorded every time its stats are refreshed."""
+    event = models.ForeignKey(Event)
+    hits = models.IntegerField()
+    seconds = models.FloatField()
+    created = models.DateTimeField(default=_get_now, db_index=True)
 
 
 @receiver(models.signals.pre_save, sender=EventHitStats)
@@ -1114,6 +1738,226 @@ def update_modified(sender, instance, raw, *args, **kwargs):
     instance.modified = _get_now()
 
 
+@receiver(models.signals.post_save, sender=EventHitStats)
+def event_hit_stats_bump_event_version(sender, instance, **kwargs):
+    bump_event_version(instance.event_id)
+
+
+_trending = threading.local()
+
+
+class EventTrendingManager(models.Manager):
+
+    # Which audiences can see an event of each privacy.
+    AUDIENCES = {
+        Event.PRIVACY_PUBLIC: (
+            Event.PRIVACY_PUBLIC,
+            Event.PRIVACY_CONTRIBUTORS,
+            Event.PRIVACY_COMPANY,
+        ),
+        Event.PRIVACY_CONTRIBUTORS: (
+            Event.PRIVACY_CONTRIBUTORS,
+            Event.PRIVACY_COMPANY,
+        ),
+        Event.PRIVACY_COMPANY: (
+            Event.PRIVACY_COMPANY,
+        ),
+    }
+
+    @staticmethod
+    def get_score(total_hits, featured, archive_time, now):
+        # being 'featured' pretends the event has twice as
+        # many hits as actually does
+        days = (now - archive_time).days
+        return (int(featured) + 1) * total_hits / float(days) ** 1.8
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Ignore refreshing of only some events, for when a refresh
+        of all of them comes afterwards anyway."""
+        _trending.paused = getattr(_trending, 'paused', 0) + 1
+        try:
+            yield
+        finally:
+            _trending.paused -= 1
+
+    def refresh(self, event_ids=None):
+        """Re-calculate the score of these events, or all of them.
+
+        Only events that have been archived for more than a day and
+        that aren't in any channel excluded from trending get rows.
+        """
+        if event_ids is not None and getattr(_trending, 'paused', 0):
+            return
+        now = timezone.now()
+        # subtract one second to not accidentally tip it
+        yesterday = now - datetime.timedelta(days=1, seconds=1)
+        stats = (
+            EventHitStats.objects
+            .filter(
+                event__status__in=(
+                    Event.STATUS_SCHEDULED,
+                    Event.STATUS_PROCESSING,
+                ),
+                event__archive_time__lt=yesterday,
+            )
+            .exclude(event__channels__exclude_from_trending=True)
+        )
+        channels = Event.channels.through.objects.all()
+        if event_ids is not None:
+            event_ids = list(set(event_ids))
+            stats = stats.filter(event_id__in=event_ids)
+            channels = channels.filter(event_id__in=event_ids)
+        stats = list(stats.values_list(
+            'event_id',
+            'total_hits',
+            'event__featured',
+            'event__archive_time',
+            'event__privacy',
+        ))
+        channel_ids = defaultdict(list)
+        if stats:
+            for event_id, channel_id in channels.values_list(
+                'event_id',
+                'channel_id'
+            ):
+                channel_ids[event_id].append(channel_id)
+
+        values = {}
+        for event_id, total_hits, featured, archive_time, privacy in stats:
+            score = self.get_score(total_hits, featured, archive_time, now)
+            for audience in self.AUDIENCES.get(privacy, ()):
+                for channel_id in [None] + channel_ids[event_id]:
+                    values[(event_id, channel_id, audience)] = (
+                        score,
+                        total_hits,
+                        archive_time,
+                    )
+        with transaction.atomic():
+            existing = self.get_queryset()
+            if event_ids is not None:
+                existing = existing.filter(event_id__in=event_ids)
+            # Only touch the rows that are gone, new or different
+            # instead of re-inserting the whole lot every time.
+            delete_ids = []
+            changed = defaultdict(list)
+            for row in existing.values_list(
+                'id',
+                'event_id',
+                'channel_id',
+                'audience',
+                'score',
+                'total_hits',
+                'archive_time',
+            ):
+                new = values.pop(row[1:4], None)
+                if new is None:
+                    delete_ids.append(row[0])
+                elif new != row[4:]:
+                    changed[new].append(row[0])
+            if delete_ids:
+                self.get_queryset().filter(id__in=delete_ids).delete()
+            for (score, total_hits, archive_time), ids in changed.items():
+                self.get_queryset().filter(id__in=ids).update(
+                    score=score,
+                    total_hits=total_hits,
+                    archive_time=archive_time,
+                    modified=now,
+                )
+            self.bulk_create([
+                self.model(
+                    event_id=event_id,
+                    channel_id=channel_id,
+                    audience=audience,
+                    score=score,
+                    total_hits=total_hits,
+                    archive_time=archive_time,
+                )
+                for (event_id, channel_id, audience), (
+                    score, total_hits, archive_time
+                ) in values.items()
+            ])
+
+    def get_top(self, audience, channels=None, length=10, **filters):
+        """Return a list of the `length` events with the highest score
+        in any of these channels (or in any channel at all) that the
+        audience can see."""
+        qs = self.get_queryset().filter(audience=audience, **filters)
+        if channels:
+            channel_ids = [x.id for x in channels]
+            qs = qs.filter(channel_id__in=channel_ids)
+            # the same event can be in more than one of the channels
+            limit = length * len(channel_ids)
+        else:
+            qs = qs.filter(channel__isnull=True)
+            limit = length
+        qs = qs.select_related('event', 'event__picture').order_by('-score')
+        events = []
+        for row in qs[:limit]:
+            if row.event not in events:
+                events.append(row.event)
+        return events[:length]
+
+
+class EventTrending(models.Model):
+    """Materialized trending score of archived events that have hits.
+
+    There's one row per event for every audience (the privacy of the
+    users who are allowed to see it) and for every channel it's in,
+    plus one with no channel. That way getting the top ones for a
+    channel is a single index scan.
+
+    The scores are re-calculated by the `update_event_hit_stats` cron
+    job and, for a single event, whenever it or its hit stats change.
+    """
+    event = models.ForeignKey(Event)
+    channel = models.ForeignKey(Channel, null=True)
+    audience = models.CharField(
+        max_length=40,
+        choices=Event.PRIVACY_CHOICES
+    )
+    score = models.FloatField()
+    total_hits = models.IntegerField()
+    archive_time = models.DateTimeField()
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = EventTrendingManager()
+
+    class Meta:
+        index_together = (('channel', 'audience', 'score'),)
+
+
+@receiver(models.signals.post_save, sender=EventHitStats)
+@receiver(models.signals.post_delete, sender=EventHitStats)
+def event_hit_stats_refresh_trending(sender, instance, **kwargs):
+    EventTrending.objects.refresh([instance.event_id])
+
+
+@receiver(models.signals.post_save, sender=Event)
+def event_refresh_trending(sender, instance, **kwargs):
+    EventTrending.objects.refresh([instance.id])
+
+
+@receiver(models.signals.m2m_changed, sender=Event.channels.through)
+def event_channels_refresh_trending(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        EventTrending.objects.refresh(pk_set or [])
+    else:
+        EventTrending.objects.refresh([instance.id])
+
+
+@receiver(models.signals.post_save, sender=Channel)
+def channel_refresh_trending(sender, instance, **kwargs):
+    # it might have been made excluded from trending
+    EventTrending.objects.refresh(
+        Event.channels.through.objects.filter(channel=instance)
+        .values_list('event_id', flat=True)
+    )
+
+
 class EventLiveHits(models.Model):
     event = models.OneToOneField(Event, db_index=True)
     total_hits = models.IntegerField(default=0)
@@ -1163,6 +2007,25 @@ def notify_fanout_event_pictures(sender, instance, *args, **kwargs):
     if instance.event_id:
         channel = 'event-pictures-{}'.format(instance.event_id)
         send_fanout(channel, {'id': instance.id})
+        bump_event_version(instance.event_id)
+
+
+@receiver(models.signals.post_save, sender=Picture)
+def create_picture_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # imported here because the tasks use the models
+    from airmozilla.main.tasks import create_picture_thumbnails
+    create_picture_thumbnails.delay(instance.id)
+
+
+@receiver(models.signals.post_save, sender=Channel)
+def create_cover_art_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw or not instance.cover_art:
+        return
+    # imported here because the tasks use the models
+    from airmozilla.main.tasks import create_cover_art_thumbnails
+    create_cover_art_thumbnails.delay(instance.id)
 
 
 @receiver(models.signals.pre_save, sender=Picture)
@@ -1201,3 +2064,9 @@ class Chapter(models.Model):
 
     def __unicode__(self):
         return self.text
+
+
+@receiver(models.signals.post_save, sender=Chapter)
+@receiver(models.signals.post_delete, sender=Chapter)
+def chapter_bump_event_version(sender, instance, **kwargs):
+    bump_event_version(instance.event_id)
@@ -0,0 +1,88 @@
+"""What the user of a request is, worked out at most once per request.
+
+Whether the user is a contributor, an employee, which privacy bucket
+('public', 'contributors' or 'company') of events they get to see and
+which curated groups they're in used to be looked up (in the cache,
+the database or Mozillians) every time a view, a context processor or
+a template helper asked. Instead, the `Roles` of a user is kept on the
+user object, which is only ever around for the one request, and each
+fact is looked up the first time it's needed.
+
+`airmozilla.main.middleware.RolesMiddleware` puts it on the request
+as `request.roles`. Code that only has the user gets the same object
+with `get_roles(user)`.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from airmozilla.base import mozillians
+from airmozilla.main.models import UserProfile
+
+
+CONTRIBUTOR_CACHE_TIMEOUT = 60 * 60
+
+
+def contributor_cache_key(user_id):
+    return 'is-contributor-%s' % user_id
+
+
+class Roles(object):
+
+    def __init__(self, user):
+        self.user = user
+        self._curated_groups = {}
+
+    @cached_property
+    def contributor(self):
+        if not self.user.is_authenticated():
+            return False
+        cache_key = contributor_cache_key(self.user.pk)
+        is_ = cache.get(cache_key)
+        if is_ is None:
+            is_ = UserProfile.objects.filter(
+                user_id=self.user.pk,
+                contributor=True
+            ).exists()
+            cache.set(cache_key, is_, CONTRIBUTOR_CACHE_TIMEOUT)
+        return is_
+
+    @cached_property
+    def employee(self):
+        if not self.user.is_authenticated():
+            return False
+        return any(
+            self.user.email.endswith('@%s' % bid)
+            for bid in settings.ALLOWED_BID
+        )
+
+    @cached_property
+    def privacy_bucket(self):
+        if not self.user.is_active:
+            return 'public'
+        if self.contributor:
+            return 'contributors'
+        return 'company'
+
+    def in_curated_group(self, name):
+        if name not in self._curated_groups:
+            self._curated_groups[name] = mozillians.in_group(
+                self.user.email,
+                name
+            )
+        return self._curated_groups[name]
+
+
+def get_roles(user):
+    try:
+        return user._roles
+    except AttributeError:
+        user._roles = Roles(user)
+        return user._roles
+
+
+def forget_roles(user):
+    """For when the user is still around after what they are has
+    changed."""
+    if hasattr(user, '_roles'):
+        del user._roles
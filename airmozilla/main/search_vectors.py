@@ -0,0 +1,64 @@
+"""Maintenance of the denormalized `main_event.search_vector` column.
+
+The column is not a field on the `Event` model (we never want to load
+it into Python) and is created by a raw SQL migration. It holds
+the title (weight A), the description and short description (weight B)
+and the transcript (weight C) as one pre-tokenized `tsvector`,
+and it has a GIN index on it.
+"""
+from django.db import connection
+
+
+# The fields that, if changed, means the search vector needs to
+# be re-computed.
+SEARCH_VECTOR_FIELDS = (
+    'title',
+    'description',
+    'short_description',
+    'transcript',
+)
+
+# When ranking with ts_rank_cd(weights, vector, query) the weights
+# array is in the order {D, C, B, A}.
+RANK_WEIGHTS_TITLE = '{0, 0, 0, 1}'
+RANK_WEIGHTS_DESCRIPTION = '{0, 0, 1, 0}'
+RANK_WEIGHTS_TRANSCRIPT = '{0, 1, 0, 0}'
+
+_UPDATE_SQL = """
+UPDATE main_event SET search_vector = (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector(
+        'english',
+        coalesce(description, '') || ' ' || coalesce(short_description, '')
+    ), 'B') ||
+    setweight(to_tsvector('english', coalesce(transcript, '')), 'C')
+)
+"""
+
+
+def update_search_vector(event_id):
+    cursor = connection.cursor()
+    cursor.execute(_UPDATE_SQL + ' WHERE id = %s', [event_id])
+
+
+def update_search_vectors(all=False, batch_size=500, verbose=False):
+    """Backfill the search vectors. By default only the events that
+    don't have one yet, or, with `all=True`, re-compute them all.
+    Returns the number of events updated."""
+    cursor = connection.cursor()
+    sql = 'SELECT id FROM main_event'
+    if not all:
+        sql += ' WHERE search_vector IS NULL'
+    cursor.execute(sql + ' ORDER BY id')
+    ids = [row[0] for row in cursor.fetchall()]
+    if verbose:  # pragma: no cover
+        print "{} events to update".format(len(ids))
+
+    count = 0
+    for i in range(0, len(ids), batch_size):
+        batch = ids[i:i + batch_size]
+        cursor.execute(_UPDATE_SQL + ' WHERE id IN %s', [tuple(batch)])
+        count += len(batch)
+        if verbose:  # pragma: no cover
+            print "Updated {} of {}".format(count, len(ids))
+    return count
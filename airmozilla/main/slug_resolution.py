@@ -0,0 +1,72 @@
+"""What a `/<slug>/` URL leads to.
+
+It can be the slug of an event (in any case), an old slug of an event,
+the ID of an event, the URL of a static page or nothing at all. Working
+that out can take a handful of queries so the answer, including that
+it's nothing at all, is cached per slug. When an event changes its
+slug or a static page is saved, what's cached for those slugs is
+forgotten.
+"""
+import hashlib
+
+from django.core.cache import cache
+
+from airmozilla.main.models import Event, EventOldSlug
+from airmozilla.staticpages.models import StaticPage
+
+
+EVENT = 'event'
+OLD_SLUG = 'old_slug'
+STATIC_PAGE = 'static_page'
+MISSING = 'missing'
+
+CACHE_TIMEOUT = 60 * 60 * 24
+MISSING_CACHE_TIMEOUT = 60 * 60
+
+
+def _get_cache_key(slug):
+    return 'slug_resolution:{}'.format(
+        hashlib.md5(slug.encode('utf-8')).hexdigest()
+    )
+
+
+def _resolve(slug):
+    for id in Event.objects.filter(slug=slug).values_list('id', flat=True):
+        return EVENT, id
+    for id in (
+        Event.objects.filter(slug__iexact=slug).values_list('id', flat=True)
+    ):
+        return EVENT, id
+    for event_id in (
+        EventOldSlug.objects.filter(slug=slug)
+        .values_list('event_id', flat=True)
+    ):
+        return OLD_SLUG, event_id
+    if slug.isdigit():
+        # it might be the ID of the event
+        if Event.objects.filter(id=slug).exists():
+            return EVENT, int(slug)
+    url = '/' + slug.strip('/')
+    if StaticPage.objects.filter(url__in=(url, url + '/')).exists():
+        return STATIC_PAGE, None
+    return MISSING, None
+
+
+def resolve(slug):
+    """Return a tuple of what kind of thing this slug leads to and,
+    for events and old slugs, the ID of the event."""
+    cache_key = _get_cache_key(slug)
+    resolution = cache.get(cache_key)
+    if resolution is None:
+        resolution = _resolve(slug)
+        cache.set(
+            cache_key,
+            resolution,
+            MISSING_CACHE_TIMEOUT if resolution[0] == MISSING
+            else CACHE_TIMEOUT
+        )
+    return resolution
+
+
+def forget(*slugs):
+    cache.delete_many([_get_cache_key(x) for x in slugs if x])
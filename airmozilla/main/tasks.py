@@ -2,7 +2,8 @@ from celery import shared_task
 
 from django.conf import settings
 
-from airmozilla.main.models import Chapter, Event
+from airmozilla.main.models import Chapter, Channel, Event, Picture, VidlyMedia
+from airmozilla.main import thumbnail_manifest
 from airmozilla.chapters import images
 from airmozilla.base import pictures
 from airmozilla.manage import videoinfo
@@ -52,3 +53,27 @@ def create_all_event_pictures(
         verbose=settings.DEBUG,
         set_first_available=set_first_available,
     )
+
+
+@shared_task
+def create_vidly_media(tags, video_format, hd):
+    VidlyMedia.get_or_create_many(tags, video_format, hd)
+
+
+@shared_task
+def create_picture_thumbnails(picture_id):
+    for picture in Picture.objects.filter(id=picture_id):
+        thumbnail_manifest.create(
+            picture.file,
+            thumbnail_manifest.PICTURE_GEOMETRIES
+        )
+
+
+@shared_task
+def create_cover_art_thumbnails(channel_id):
+    for channel in Channel.objects.filter(id=channel_id):
+        if channel.cover_art:
+            thumbnail_manifest.create(
+                channel.cover_art,
+                thumbnail_manifest.COVER_ART_GEOMETRIES
+            )
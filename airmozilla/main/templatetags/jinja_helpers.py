@@ -22,6 +22,7 @@ from sorl.thumbnail import get_thumbnail
 
 from airmozilla.base.utils import unhtml
 from airmozilla.main.models import Picture
+from airmozilla.main import thumbnail_manifest
 
 
 @library.filter
@@ -183,7 +184,7 @@ def show_thumbnail(
     alt = alt or event.title
     if not image:
         image = event.picture and event.picture.file or event.placeholder_img
-    thumb = thumbnail(image, geometry, crop=crop)
+    thumb = thumbnail_manifest.get(image, geometry, crop=crop)
     data = ''
     if not live and event:
         data = ' data-eventid="%s"' % event.id
@@ -223,7 +224,7 @@ def show_lazyr_thumbnail(
     alt = alt or event.title
     if not image:
         image = event.picture and event.picture.file or event.placeholder_img
-    thumb = thumbnail(image, geometry, crop=crop)
+    thumb = thumbnail_manifest.get(image, geometry, crop=crop)
     data = ''
     if not live:
         data = ' data-eventid="%s"' % event.id
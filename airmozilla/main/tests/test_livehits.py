@@ -0,0 +1,127 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+from nose.tools import eq_, ok_
+
+from airmozilla.main.models import Event, EventLiveHits
+from airmozilla.main import livehits
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class LiveHitsTestCase(DjangoTestCase):
+
+    def _get_live_event(self):
+        event = Event.objects.get(title='Test event')
+        event.start_time = timezone.now()
+        event.archive_time = None
+        event.save()
+        return event
+
+    def test_count_and_flush(self):
+        event = self._get_live_event()
+        eq_(livehits.get_hits(event.id), 0)
+        for __ in range(5):
+            livehits.count_hit(event.id)
+        eq_(livehits.get_hits(event.id), 5)
+        ok_(not EventLiveHits.objects.filter(event=event).exists())
+
+        with self.assertNumQueries(7):
+            # the live events, the existing rows, the insert, the
+            # update and the new totals (plus the savepoint)
+            eq_(livehits.flush(), 5)
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 5)
+        with self.assertNumQueries(0):
+            eq_(livehits.get_hits(event.id), 5)
+
+        livehits.count_hit(event.id)
+        eq_(livehits.get_hits(event.id), 6)
+        eq_(livehits.flush(), 1)
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 6)
+
+        # nothing pending
+        eq_(livehits.flush(), 0)
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 6)
+
+    def test_get_hits_from_database(self):
+        event = self._get_live_event()
+        EventLiveHits.objects.create(event=event, total_hits=10)
+        eq_(livehits.get_hits(event.id), 10)
+        livehits.count_hit(event.id)
+        eq_(livehits.get_hits(event.id), 11)
+        livehits.flush()
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 11)
+
+    def test_flush_after_event_is_over(self):
+        event = self._get_live_event()
+        livehits.count_hit(event.id)
+        livehits.count_hit(event.id)
+        event.archive_time = timezone.now()
+        event.save()
+        ok_(not Event.objects.live())
+
+        # it's not live any more but the hits are still flushed
+        eq_(livehits.flush(), 2)
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 2)
+        eq_(cache.get(livehits.EVENTS_CACHE_KEY), [event.id])
+
+        # and with nothing more pending it's forgotten
+        eq_(livehits.flush(), 0)
+        eq_(cache.get(livehits.EVENTS_CACHE_KEY), [])
+        eq_(livehits.get_hits(event.id), 2)
+
+        # counting again still works
+        livehits.count_hit(event.id)
+        eq_(livehits.flush(), 1)
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 3)
+
+    def test_hits_counted_during_flush_stay_pending(self):
+        event = self._get_live_event()
+        livehits.count_hit(event.id)
+
+        original_decr = cache.decr
+
+        def decr(key, delta=1, **kwargs):
+            # another viewer comes in while we're flushing
+            livehits.count_hit(event.id)
+            return original_decr(key, delta, **kwargs)
+
+        cache.decr = decr
+        try:
+            eq_(livehits.flush(), 1)
+        finally:
+            cache.decr = original_decr
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 1)
+        eq_(livehits.get_hits(event.id), 2)
+        eq_(livehits.flush(), 1)
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 2)
+
+    def test_pending_evicted_during_flush(self):
+        event = self._get_live_event()
+        other = Event.objects.create(
+            title='Other event',
+            start_time=event.start_time,
+            status=Event.STATUS_SCHEDULED,
+        )
+        livehits.count_hit(event.id)
+        livehits.count_hit(other.id)
+        livehits.count_hit(other.id)
+
+        original_decr = cache.decr
+
+        def decr(key, delta=1, **kwargs):
+            if key == livehits._pending_key(event.id):
+                # it's evicted before it's decremented
+                cache.delete(key)
+            return original_decr(key, delta, **kwargs)
+
+        cache.decr = decr
+        try:
+            eq_(livehits.flush(), 3)
+        finally:
+            cache.decr = original_decr
+        eq_(EventLiveHits.objects.get(event=event).total_hits, 1)
+        eq_(EventLiveHits.objects.get(event=other).total_hits, 2)
+        # neither is counted again
+        eq_(livehits.flush(), 0)
+        eq_(livehits.get_hits(event.id), 1)
+        eq_(livehits.get_hits(other.id), 2)
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 
 import datetime
+import importlib
 
+from django.apps import apps
 from django.contrib.auth.models import Group, User
 from django.utils import timezone
 from django.core.files import File
@@ -12,17 +14,23 @@ import mock
 
 from airmozilla.main.models import (
     Approval,
+    Channel,
     Event,
+    EventCount,
+    EventHitStats,
+    EventTrending,
     EventOldSlug,
     Location,
     most_recent_event,
     Picture,
     CuratedGroup,
     VidlySubmission,
+    VidlySubmissionFit,
     Tag,
     VidlyMedia,
+    get_unique_titles,
 )
-
+from airmozilla.manage.vidly import VidlyNotFoundError
 from airmozilla.base.tests.testbase import DjangoTestCase, Response
 # This must be imported otherwise django-nose won't import
 # that foreign key reference when you run only the tests in this file.
@@ -159,6 +167,29 @@ class EventTests(DjangoTestCase):
         event.save()
         eq_(event.get_unique_title(), event.title)
 
+    def test_get_unique_titles(self):
+        event, = Event.objects.all()
+        other = Event.objects.create(
+            title=event.title,
+            slug='other',
+            start_time=timezone.now(),
+        )
+        different = Event.objects.create(
+            title='Different',
+            slug='different',
+            start_time=timezone.now(),
+        )
+        events = [event, other, different]
+        titles = get_unique_titles(events)
+        eq_(titles[event.id], event.get_unique_title())
+        eq_(titles[other.id], other.get_unique_title())
+        ok_(titles[event.id] != event.title)
+        eq_(titles[different.id], 'Different')
+
+        # now they're all cached
+        with self.assertNumQueries(0):
+            eq_(get_unique_titles(events), titles)
+
     def test_seconds_till_live(self):
         """events that are upcoming have a property called
         `seconds_till_live` which gives a number of seconds until
@@ -496,6 +527,94 @@ class VidlySubmissionTests(DjangoTestCase):
         eq_(slope, 1.8)
         eq_(intercept, 90.0)
 
+    def _create_submissions(self, durations, ratio, now):
+        for i, duration in enumerate(durations):
+            event = Event.objects.create(
+                duration=duration,
+                slug='event-{}-{}'.format(duration, i),
+                start_time=now,
+            )
+            VidlySubmission.objects.create(
+                event=event,
+                submission_time=now,
+                finished=now + datetime.timedelta(seconds=duration * ratio)
+            )
+
+    def test_fits(self):
+        event = Event.objects.get(title='Test event')
+        event.duration = 200
+        event.save()
+        now = timezone.now()
+        submission = VidlySubmission.objects.create(
+            event=event,
+            submission_time=now,
+        )
+        eq_(VidlySubmission.get_fits(), {})
+        eq_(submission.estimated_duration, None)
+        eq_(submission.get_estimated_time_left(), None)
+
+        # refitted as each one finishes
+        self._create_submissions([1000, 1200], 3, now)
+        eq_(VidlySubmissionFit.objects.count(), 2)
+        slope, intercept = VidlySubmission.get_fit(1100)
+        eq_(round(slope, 1), 3.0)
+        eq_(round(intercept), 0)
+        # there isn't one just for short events so use the general one
+        eq_(VidlySubmission.get_fit(200), (slope, intercept))
+
+        self._create_submissions([100, 150], 2, now)
+        slope, intercept = VidlySubmission.get_fit(200)
+        eq_(round(slope, 1), 2.0)
+        eq_(round(intercept), 0)
+        slope, intercept = VidlySubmission.get_fit(1100)
+        eq_(round(slope, 1), 3.0)
+
+        # and it's looked up without touching the database
+        with self.assertNumQueries(0):
+            VidlySubmission.get_fit(200)
+
+        submission = VidlySubmission.objects.get(id=submission.id)
+        ok_(submission.get_estimated_time_left() in (399, 400))
+        # the estimate is remembered
+        eq_(
+            round(VidlySubmission.objects.get(
+                id=submission.id
+            ).estimated_duration),
+            400
+        )
+
+        # a new submission gets its estimate straight away
+        new_submission = VidlySubmission.objects.create(
+            event=event,
+            submission_time=now,
+        )
+        eq_(round(new_submission.estimated_duration), 400)
+
+    def test_get_accuracy(self):
+        eq_(VidlySubmission.get_accuracy(), [])
+        now = timezone.now()
+        self._create_submissions([100, 150], 2, now)
+        event = Event.objects.get(title='Test event')
+        event.duration = 200
+        event.save()
+        submission = VidlySubmission.objects.create(
+            event=event,
+            submission_time=now,
+        )
+        eq_(round(submission.estimated_duration), 400)
+        submission.finished = now + datetime.timedelta(seconds=500)
+        submission.save()
+        accuracy, = VidlySubmission.get_accuracy()
+        eq_(accuracy['min_duration'], 0)
+        eq_(accuracy['max_duration'], 5 * 60)
+        eq_(accuracy['count'], 1)
+        eq_(round(accuracy['mean_error']), 100)
+        eq_(round(accuracy['mean_absolute_percentage']), 20)
+
+        eq_(VidlySubmission.get_accuracy(
+            since=now + datetime.timedelta(seconds=1)
+        ), [])
+
 
 class VidlyMediaTests(DjangoTestCase):
 
@@ -577,3 +696,297 @@ class VidlyMediaTests(DjangoTestCase):
             True
         )
         eq_(information, second)
+
+    @mock.patch('airmozilla.main.models.get_video_redirect_info')
+    def test_get_or_create_many(self, r_get_redirect_info):
+        looked_up = []
+
+        def mocked_get_redirect_info(tag, format_, hd=False):
+            looked_up.append(tag)
+            if tag == 'notfound':
+                raise VidlyNotFoundError(tag)
+            return {
+                'url': 'http://cdn.vidly/{}.mp4'.format(tag),
+                'type': 'video/mp4',
+                'length': 1234567,
+            }
+
+        r_get_redirect_info.side_effect = mocked_get_redirect_info
+        existing = VidlyMedia.objects.create(
+            tag='abc123',
+            hd=True,
+            video_format='mp4',
+            url='http://first.com',
+            size=10000,
+            content_type='video/mp4'
+        )
+        found = VidlyMedia.get_or_create_many(
+            ['abc123', 'xyz123', 'notfound'],
+            'mp4',
+            True
+        )
+        eq_(sorted(looked_up), ['notfound', 'xyz123'])
+        eq_(sorted(found), ['abc123', 'xyz123'])
+        eq_(found['abc123'], existing)
+        eq_(found['xyz123'].url, 'http://cdn.vidly/xyz123.mp4')
+        eq_(found['xyz123'].size, 1234567)
+
+        found = VidlyMedia.get_or_create_many(['xyz123'], 'mp4', True)
+        eq_(sorted(looked_up), ['notfound', 'xyz123'])
+        eq_(found.keys(), ['xyz123'])
+
+
+class EventCountTests(DjangoTestCase):
+
+    def test_channel_counts(self):
+        event = Event.objects.get(title='Test event')
+        channel = Channel.objects.create(name='Culture', slug='culture')
+        eq_(EventCount.objects.get_counts('channel').get(channel.id), None)
+
+        event.channels.add(channel)
+        counts = EventCount.objects.get_counts('channel')
+        eq_(counts[channel.id], 1)
+        counts = EventCount.objects.get_counts(
+            'channel',
+            privacy_exclude={'privacy': Event.PRIVACY_PUBLIC}
+        )
+        eq_(counts.get(channel.id), None)
+
+        event.privacy = Event.PRIVACY_COMPANY
+        event.save()
+        counts = EventCount.objects.get_counts(
+            'channel',
+            privacy_filter={'privacy': Event.PRIVACY_PUBLIC}
+        )
+        eq_(counts.get(channel.id), None)
+        counts = EventCount.objects.get_counts(
+            'channel',
+            privacy_filter={'privacy': Event.PRIVACY_COMPANY}
+        )
+        eq_(counts[channel.id], 1)
+
+        # approvals
+        approval = Approval.objects.create(event=event)
+        counts = EventCount.objects.get_counts('channel', approved=True)
+        eq_(counts.get(channel.id), None)
+        approval.approved = approval.processed = True
+        approval.save()
+        counts = EventCount.objects.get_counts('channel', approved=True)
+        eq_(counts[channel.id], 1)
+
+        # from the other direction
+        channel.event_set.clear()
+        eq_(EventCount.objects.get_counts('channel').get(channel.id), None)
+        channel.event_set.add(event)
+        eq_(EventCount.objects.get_counts('channel')[channel.id], 1)
+
+        event.channels.clear()
+        eq_(EventCount.objects.get_counts('channel').get(channel.id), None)
+        event.channels.add(channel)
+
+        event.delete()
+        eq_(EventCount.objects.get_counts('channel').get(channel.id), None)
+
+    def test_tag_counts(self):
+        event = Event.objects.get(title='Test event')
+        tag = Tag.objects.create(name='firefox')
+        event.tags.add(tag)
+        eq_(EventCount.objects.get_counts('tag')[tag.id], 1)
+        eq_(
+            EventCount.objects.get_counts('tag', archived=True)[tag.id],
+            1
+        )
+        event.archive_time = None
+        event.save()
+        eq_(
+            EventCount.objects.get_counts('tag', archived=True).get(tag.id),
+            None
+        )
+        event.tags.remove(tag)
+        eq_(EventCount.objects.get_counts('tag').get(tag.id), None)
+
+    def test_rebuild(self):
+        event = Event.objects.get(title='Test event')
+        tag = Tag.objects.create(name='firefox')
+        event.tags.add(tag)
+        EventCount.objects.all().delete()
+        eq_(EventCount.objects.get_counts('tag'), {})
+        EventCount.objects.rebuild()
+        eq_(EventCount.objects.get_counts('tag')[tag.id], 1)
+        channel_counts = EventCount.objects.get_counts('channel')
+        for channel in event.channels.all():
+            eq_(channel_counts[channel.id], 1)
+
+    def test_fill_migration(self):
+        migration = importlib.import_module(
+            'airmozilla.main.migrations.0043_fill_eventcount'
+        )
+        event = Event.objects.get(title='Test event')
+        tag = Tag.objects.create(name='firefox')
+        event.tags.add(tag)
+        EventCount.objects.all().delete()
+        migration.forwards(apps, None)
+        eq_(EventCount.objects.get_counts('tag')[tag.id], 1)
+        for channel in event.channels.all():
+            eq_(EventCount.objects.get_counts('channel')[channel.id], 1)
+        # it can be run again
+        migration.forwards(apps, None)
+        eq_(EventCount.objects.get_counts('tag')[tag.id], 1)
+
+
+class EventTrendingTests(DjangoTestCase):
+
+    def test_refresh(self):
+        event = Event.objects.get(title='Test event')
+        assert event.privacy == Event.PRIVACY_PUBLIC
+        eq_(EventTrending.objects.get_top(Event.PRIVACY_PUBLIC), [])
+
+        stats = EventHitStats.objects.create(
+            event=event,
+            total_hits=100,
+            shortcode='abc123'
+        )
+        channel_ids = list(event.channels.values_list('id', flat=True))
+        ok_(channel_ids)
+        # one row per audience for every channel plus one for none
+        eq_(
+            EventTrending.objects.filter(event=event).count(),
+            3 * (len(channel_ids) + 1)
+        )
+        row = EventTrending.objects.get(
+            event=event,
+            channel__isnull=True,
+            audience=Event.PRIVACY_PUBLIC,
+        )
+        days = (timezone.now() - event.archive_time).days
+        eq_(round(row.score, 4), round(100 / float(days) ** 1.8, 4))
+        eq_(row.total_hits, 100)
+
+        # being featured doubles it
+        event.featured = True
+        event.save()
+        row = EventTrending.objects.get(
+            event=event,
+            channel__isnull=True,
+            audience=Event.PRIVACY_PUBLIC,
+        )
+        eq_(round(row.score, 4), round(200 / float(days) ** 1.8, 4))
+
+        for audience in (
+            Event.PRIVACY_PUBLIC,
+            Event.PRIVACY_CONTRIBUTORS,
+            Event.PRIVACY_COMPANY,
+        ):
+            eq_(EventTrending.objects.get_top(audience), [event])
+
+        event.privacy = Event.PRIVACY_COMPANY
+        event.save()
+        eq_(EventTrending.objects.get_top(Event.PRIVACY_PUBLIC), [])
+        eq_(EventTrending.objects.get_top(Event.PRIVACY_CONTRIBUTORS), [])
+        eq_(EventTrending.objects.get_top(Event.PRIVACY_COMPANY), [event])
+
+        # not if it's only just been archived
+        event.archive_time = timezone.now()
+        event.save()
+        eq_(EventTrending.objects.get_top(Event.PRIVACY_COMPANY), [])
+        event.archive_time = timezone.now() - datetime.timedelta(days=3)
+        event.save()
+        eq_(EventTrending.objects.get_top(Event.PRIVACY_COMPANY), [event])
+
+        stats.delete()
+        eq_(EventTrending.objects.get_top(Event.PRIVACY_COMPANY), [])
+
+    def test_channels(self):
+        event = Event.objects.get(title='Test event')
+        EventHitStats.objects.create(
+            event=event,
+            total_hits=100,
+            shortcode='abc123'
+        )
+        other = Event.objects.create(
+            title='Other',
+            slug='other',
+            status=Event.STATUS_SCHEDULED,
+            start_time=event.start_time,
+            archive_time=event.archive_time,
+            description='Something',
+        )
+        EventHitStats.objects.create(
+            event=other,
+            total_hits=1000,
+            shortcode='xyz987'
+        )
+        culture = Channel.objects.create(name='Culture', slug='culture')
+        music = Channel.objects.create(name='Music', slug='music')
+
+        get_top = EventTrending.objects.get_top
+        eq_(get_top(Event.PRIVACY_PUBLIC), [other, event])
+        eq_(get_top(Event.PRIVACY_PUBLIC, channels=[culture]), [])
+
+        event.channels.add(culture)
+        eq_(get_top(Event.PRIVACY_PUBLIC, channels=[culture]), [event])
+        music.event_set.add(event, other)
+        eq_(get_top(Event.PRIVACY_PUBLIC, channels=[music]), [other, event])
+        # no duplicates
+        eq_(
+            get_top(Event.PRIVACY_PUBLIC, channels=[culture, music]),
+            [other, event]
+        )
+        eq_(
+            get_top(Event.PRIVACY_PUBLIC, channels=[culture, music], length=1),
+            [other]
+        )
+
+        music.exclude_from_trending = True
+        music.save()
+        eq_(get_top(Event.PRIVACY_PUBLIC), [])
+
+        music.event_set.remove(other)
+        eq_(get_top(Event.PRIVACY_PUBLIC), [other])
+
+        # the periodic refresh puts back anything missing
+        EventTrending.objects.all().delete()
+        EventTrending.objects.refresh()
+        eq_(get_top(Event.PRIVACY_PUBLIC), [other])
+
+    def test_refresh_only_changes(self):
+        event = Event.objects.get(title='Test event')
+        stats = EventHitStats.objects.create(
+            event=event,
+            total_hits=100,
+            shortcode='abc123'
+        )
+        before = dict(EventTrending.objects.values_list('id', 'modified'))
+        ok_(before)
+        EventTrending.objects.refresh()
+        eq_(
+            dict(EventTrending.objects.values_list('id', 'modified')),
+            before
+        )
+
+        EventHitStats.objects.filter(id=stats.id).update(total_hits=200)
+        EventTrending.objects.refresh()
+        # the same rows, only updated
+        eq_(
+            sorted(EventTrending.objects.values_list('id', flat=True)),
+            sorted(before)
+        )
+        eq_(
+            set(EventTrending.objects.values_list('total_hits', flat=True)),
+            set([200])
+        )
+
+    def test_paused(self):
+        event = Event.objects.get(title='Test event')
+        with EventTrending.objects.paused():
+            stats = EventHitStats.objects.create(
+                event=event,
+                total_hits=100,
+                shortcode='abc123'
+            )
+            ok_(not EventTrending.objects.all().exists())
+            # but not a refresh of everything
+            EventTrending.objects.refresh()
+            ok_(EventTrending.objects.all().exists())
+        stats.delete()
+        ok_(not EventTrending.objects.all().exists())
@@ -0,0 +1,57 @@
+import mock
+from nose.tools import eq_, ok_
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+
+from airmozilla.main.models import UserProfile
+from airmozilla.main.roles import get_roles
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class TestRoles(DjangoTestCase):
+
+    def test_anonymous(self):
+        roles = get_roles(AnonymousUser())
+        with self.assertNumQueries(0):
+            ok_(not roles.contributor)
+            ok_(not roles.employee)
+            eq_(roles.privacy_bucket, 'public')
+
+    def test_employee(self):
+        user = User.objects.create(username='e', email='e@mozilla.com')
+        roles = get_roles(user)
+        ok_(get_roles(user) is roles)
+        ok_(roles.employee)
+        ok_(not roles.contributor)
+        eq_(roles.privacy_bucket, 'company')
+
+    def test_contributor(self):
+        user = User.objects.create(username='c', email='c@example.com')
+        ok_(not get_roles(user).contributor)
+        profile = UserProfile.objects.create(user=user, contributor=True)
+        # saving the profile forgets what was worked out
+        roles = get_roles(user)
+        ok_(roles.contributor)
+        ok_(not roles.employee)
+        eq_(roles.privacy_bucket, 'contributors')
+
+        # and for the next request it comes from the cache
+        fresh = User.objects.get(id=user.id)
+        with self.assertNumQueries(0):
+            ok_(get_roles(fresh).contributor)
+
+        profile.contributor = False
+        profile.save()
+        ok_(not get_roles(user).contributor)
+        ok_(cache.get('is-contributor-%s' % user.id) is False)
+
+    @mock.patch('airmozilla.base.mozillians.in_group')
+    def test_in_curated_group(self, in_group):
+        in_group.side_effect = lambda email, name: name == 'yes'
+        user = User.objects.create(username='c', email='c@example.com')
+        roles = get_roles(user)
+        ok_(roles.in_curated_group('yes'))
+        ok_(not roles.in_curated_group('no'))
+        ok_(roles.in_curated_group('yes'))
+        eq_(in_group.call_count, 2)
@@ -0,0 +1,61 @@
+import importlib
+import re
+
+from django.apps import apps
+from django.db import connection
+
+from nose.tools import eq_, ok_
+
+from airmozilla.main.models import Event
+from airmozilla.main.search_vectors import update_search_vectors
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class SearchVectorsTestCase(DjangoTestCase):
+
+    def _get_vector(self, event):
+        cursor = connection.cursor()
+        cursor.execute(
+            'SELECT search_vector FROM main_event WHERE id = %s',
+            [event.id]
+        )
+        return cursor.fetchone()[0]
+
+    def test_updated_on_save(self):
+        event = Event.objects.get(title='Test event')
+        ok_("'test':1A" in self._get_vector(event))
+        ok_('fingerfood' not in self._get_vector(event))
+
+        event.transcript = 'I love fingerfoods'
+        event.save()
+        ok_(re.findall(r"'fingerfood':\d+C", self._get_vector(event)))
+
+        # saving something unrelated doesn't change it
+        cursor = connection.cursor()
+        cursor.execute('UPDATE main_event SET search_vector = NULL')
+        event.save(update_fields=['status'])
+        eq_(self._get_vector(event), None)
+        event.save(update_fields=['status', 'title'])
+        ok_(self._get_vector(event))
+
+    def test_update_search_vectors(self):
+        event = Event.objects.get(title='Test event')
+        cursor = connection.cursor()
+        cursor.execute('UPDATE main_event SET search_vector = NULL')
+        eq_(self._get_vector(event), None)
+
+        eq_(update_search_vectors(), Event.objects.all().count())
+        ok_("'test':1A" in self._get_vector(event))
+        # nothing left to backfill
+        eq_(update_search_vectors(), 0)
+        eq_(update_search_vectors(all=True), Event.objects.all().count())
+
+    def test_fill_migration(self):
+        migration = importlib.import_module(
+            'airmozilla.main.migrations.0044_fill_event_search_vector'
+        )
+        event = Event.objects.get(title='Test event')
+        cursor = connection.cursor()
+        cursor.execute('UPDATE main_event SET search_vector = NULL')
+        migration.forwards(apps, None)
+        ok_("'test':1A" in self._get_vector(event))
@@ -0,0 +1,89 @@
+from nose.tools import eq_, ok_
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from airmozilla.main.models import Event, EventOldSlug
+from airmozilla.main import slug_resolution
+from airmozilla.staticpages.models import StaticPage
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class TestSlugResolution(DjangoTestCase):
+
+    def test_resolve(self):
+        event = Event.objects.get(title='Test event')
+        resolve = slug_resolution.resolve
+        eq_(resolve(event.slug), (slug_resolution.EVENT, event.id))
+        eq_(resolve(event.slug.upper()), (slug_resolution.EVENT, event.id))
+        eq_(resolve(str(event.id)), (slug_resolution.EVENT, event.id))
+        eq_(resolve('9999'), (slug_resolution.MISSING, None))
+        eq_(resolve('never-heard-of'), (slug_resolution.MISSING, None))
+
+        eq_(resolve('old-slug'), (slug_resolution.MISSING, None))
+        EventOldSlug.objects.create(event=event, slug='old-slug')
+        # still cached
+        eq_(resolve('old-slug'), (slug_resolution.MISSING, None))
+        slug_resolution.forget('old-slug')
+        eq_(resolve('old-slug'), (slug_resolution.OLD_SLUG, event.id))
+
+        with self.assertNumQueries(0):
+            eq_(resolve(event.slug), (slug_resolution.EVENT, event.id))
+            eq_(resolve('never-heard-of'), (slug_resolution.MISSING, None))
+
+    def test_maintained_by_signals(self):
+        event = Event.objects.get(title='Test event')
+        old_slug = event.slug
+        resolve = slug_resolution.resolve
+        eq_(resolve('new-slug'), (slug_resolution.MISSING, None))
+        eq_(resolve(old_slug), (slug_resolution.EVENT, event.id))
+
+        event.slug = 'new-slug'
+        event.save()
+        eq_(resolve('new-slug'), (slug_resolution.EVENT, event.id))
+        eq_(resolve(old_slug), (slug_resolution.OLD_SLUG, event.id))
+
+        eq_(resolve('about'), (slug_resolution.MISSING, None))
+        page = StaticPage.objects.create(url='/about/', title='About')
+        eq_(resolve('about'), (slug_resolution.STATIC_PAGE, None))
+        page.delete()
+        eq_(resolve('about'), (slug_resolution.MISSING, None))
+
+        other = Event.objects.create(
+            title='Other',
+            slug='other',
+            start_time=event.start_time,
+        )
+        eq_(resolve('other'), (slug_resolution.EVENT, other.id))
+
+    def test_event_view(self):
+        event = Event.objects.get(title='Test event')
+        url = reverse('main:event', args=('never-heard-of',))
+        response = self.client.get(url)
+        eq_(response.status_code, 404)
+        # the second time it's known to not exist
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        eq_(response.status_code, 404)
+        ok_(not [
+            x for x in queries
+            if 'FROM "main_event' in x['sql']
+        ])
+
+        old_slug = event.slug
+        event.slug = 'new-slug'
+        event.save()
+        response = self.client.get(reverse('main:event', args=(old_slug,)))
+        eq_(response.status_code, 302)
+        eq_(
+            response['Location'].split('testserver')[-1],
+            reverse('main:event', args=('new-slug',))
+        )
+
+        # what's cached can be out of date if the event is deleted
+        response = self.client.get(reverse('main:event', args=('new-slug',)))
+        eq_(response.status_code, 200)
+        Event.objects.filter(id=event.id).delete()
+        response = self.client.get(reverse('main:event', args=('new-slug',)))
+        eq_(response.status_code, 404)
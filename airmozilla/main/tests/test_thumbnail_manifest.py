@@ -0,0 +1,116 @@
+import os
+
+import mock
+from nose.tools import eq_, ok_
+
+from django.core.cache import cache
+from django.core.files import File
+
+from airmozilla.main.models import Channel, Picture
+from airmozilla.main import thumbnail_manifest
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class ThumbnailResult(object):
+
+    def __init__(self, url, width, height):
+        self.url = url
+        self.width = width
+        self.height = height
+
+
+class TestThumbnailManifest(DjangoTestCase):
+
+    def setUp(self):
+        super(TestThumbnailManifest, self).setUp()
+        self.rendered = []
+        self.patch_get_thumbnail = mock.patch(
+            'airmozilla.main.templatetags.jinja_helpers.get_thumbnail'
+        )
+        mocked_get_thumbnail = self.patch_get_thumbnail.start()
+
+        def get_thumbnail(image, geometry, **options):
+            self.rendered.append((getattr(image, 'name', image), geometry))
+            width, height = [int(x) for x in geometry.split('x')]
+            return ThumbnailResult(
+                '/media/{}-{}.png'.format(geometry, options.get('crop')),
+                width,
+                height
+            )
+
+        mocked_get_thumbnail.side_effect = get_thumbnail
+
+    def tearDown(self):
+        super(TestThumbnailManifest, self).tearDown()
+        self.patch_get_thumbnail.stop()
+
+    def test_get(self):
+        thumb = thumbnail_manifest.get('image.png', '10x20', crop='center')
+        eq_(thumb.url, '/media/10x20-center.png')
+        eq_(thumb.width, 10)
+        eq_(thumb.height, 20)
+        eq_(self.rendered, [('image.png', '10x20')])
+        eq_(thumbnail_manifest.get_stats(), {'hits': 0, 'misses': 1})
+
+        # in memory
+        thumb = thumbnail_manifest.get('image.png', '10x20', crop='center')
+        eq_(thumb.url, '/media/10x20-center.png')
+        eq_(len(self.rendered), 1)
+        eq_(thumbnail_manifest.get_stats(), {'hits': 1, 'misses': 1})
+        # in the cache
+        thumbnail_manifest.clear()
+        thumb = thumbnail_manifest.get('image.png', '10x20', crop='center')
+        eq_(thumb.url, '/media/10x20-center.png')
+        eq_(len(self.rendered), 1)
+        eq_(thumbnail_manifest.get_stats(), {'hits': 2, 'misses': 1})
+
+        # different options is a different thumbnail
+        thumb = thumbnail_manifest.get('image.png', '10x20')
+        eq_(thumb.url, '/media/10x20-None.png')
+        eq_(len(self.rendered), 2)
+
+    def test_create_picture_thumbnails(self):
+        with open(self.main_image) as fp:
+            picture = Picture.objects.create(file=File(fp))
+        # made by the task when it was saved
+        rendered = sorted(x[1] for x in self.rendered)
+        eq_(rendered, sorted(
+            x[0] for x in thumbnail_manifest.PICTURE_GEOMETRIES
+        ))
+
+        thumbnail_manifest.clear()
+        thumb = thumbnail_manifest.get(picture.file, '160x90', crop='center')
+        eq_(thumb.url, '/media/160x90-center.png')
+        eq_(len(self.rendered), len(rendered))
+        eq_(thumbnail_manifest.get_stats(), {'hits': 1, 'misses': 0})
+
+    def test_create_cover_art_thumbnails(self):
+        channel = Channel.objects.create(name='Rust', slug='rust')
+        eq_(self.rendered, [])
+        with open(self.main_image) as fp:
+            channel.cover_art.save(os.path.basename(self.main_image), File(fp))
+        eq_(
+            sorted(x[1] for x in self.rendered),
+            ['1400x1400', '144x144']
+        )
+        thumb = thumbnail_manifest.get(channel.cover_art, '144x144')
+        eq_(thumb.width, 144)
+        eq_(len(self.rendered), 2)
+
+    def test_create_failing(self):
+        self.patch_get_thumbnail.stop()
+        with mock.patch(
+            'airmozilla.main.templatetags.jinja_helpers.get_thumbnail'
+        ) as get_thumbnail:
+            get_thumbnail.side_effect = IOError('broken')
+            made = thumbnail_manifest.create(
+                'image.png',
+                thumbnail_manifest.PICTURE_GEOMETRIES
+            )
+        self.patch_get_thumbnail.start()
+        eq_(made, 0)
+        ok_(not cache.get(thumbnail_manifest._get_key(
+            'image.png',
+            '160x90',
+            {'crop': 'center'}
+        )))
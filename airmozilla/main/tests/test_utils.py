@@ -1,8 +1,16 @@
-from nose.tools import eq_
+from nose.tools import eq_, ok_
+from PIL import Image
 
 from airmozilla.base.tests.testbase import DjangoTestCase
 from airmozilla.main.models import Event, Channel
-from airmozilla.main.utils import get_event_channels
+from airmozilla.main.utils import (
+    get_event_channels,
+    BWImageCompare,
+    ImageCompare,
+    FuzzyImageCompare,
+    perceptual_hash,
+    hash_distance,
+)
 
 
 class TestEventsToChannels(DjangoTestCase):
@@ -28,3 +36,57 @@ class TestEventsToChannels(DjangoTestCase):
         channels = get_event_channels(events)
         assert len(channels[event]) == 2
         eq_(channels[event], list(event.channels.all()))
+
+
+class TestImageCompare(DjangoTestCase):
+    sample_jpg = 'airmozilla/manage/tests/presenting.jpg'
+    sample_jpg2 = 'airmozilla/manage/tests/tucker.jpg'
+
+    def assert_almost_equal(self, a, b):
+        ok_(abs(a - b) < 1e-9 * max(abs(a), 1), (a, b))
+
+    def test_bw_image_compare(self):
+        # The expected numbers are what the original implementation,
+        # that used getpixel() for every pixel, returned.
+        cmp = BWImageCompare(
+            Image.open(self.sample_jpg),
+            Image.open(self.sample_jpg2),
+            32
+        )
+        self.assert_almost_equal(cmp.mse, 8582.9619140625)
+        self.assert_almost_equal(cmp.psnr, 8.794431754721)
+        self.assert_almost_equal(cmp.nrmsd, 0.36331088708931364)
+        self.assert_almost_equal(cmp.levenshtein, 0.9833984375)
+
+    def test_image_compare(self):
+        cmp = ImageCompare(
+            Image.open(self.sample_jpg),
+            Image.open(self.sample_jpg2),
+            32
+        )
+        self.assert_almost_equal(cmp.mse, 48203286649983.04)
+        self.assert_almost_equal(cmp.psnr, 7.561644318070165)
+        self.assert_almost_equal(cmp.nrmsd, 0.41871429118310605)
+        self.assert_almost_equal(cmp.levenshtein, 0.9899088541666666)
+
+    def test_fuzzy_image_compare(self):
+        imga = Image.open(self.sample_jpg)
+        imgb = Image.open(self.sample_jpg2)
+        cmp = FuzzyImageCompare(imga, imgb)
+        self.assert_almost_equal(cmp.similarity(), 30.69857225446099)
+        cmp = FuzzyImageCompare(imga, imga)
+        eq_(cmp.similarity(), 100.0)
+        eq_(cmp.compare()['psnr'], 100.0)
+
+    def test_perceptual_hash(self):
+        imga = Image.open(self.sample_jpg)
+        imgb = Image.open(self.sample_jpg2)
+        hasha = perceptual_hash(imga)
+        ok_(isinstance(hasha, (int, long)))
+        ok_(hasha < 2 ** 64)
+        eq_(hash_distance(hasha, perceptual_hash(imga)), 0)
+        # a smaller version of the same picture is near-identical
+        smaller = imga.resize((200, 137), Image.BICUBIC)
+        ok_(hash_distance(hasha, perceptual_hash(smaller)) <= 2)
+        # a different picture is not
+        ok_(hash_distance(hasha, perceptual_hash(imgb)) > 10)
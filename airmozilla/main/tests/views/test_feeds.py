@@ -20,7 +20,10 @@ from airmozilla.main.models import (
     Channel,
     Template,
     Tag,
+    VidlyMedia,
 )
+from airmozilla.main.views import feeds
+from airmozilla.main import thumbnail_manifest
 from airmozilla.search.models import SavedSearch
 from airmozilla.base.tests.testbase import DjangoTestCase
 
@@ -292,10 +295,6 @@ class TestFeeds(DjangoTestCase):
         event.title = 'Flying to the Moon'
         event.save()
         response = self.client.get(url, {'ss': savedsearch.id})
-        ok_('Flying to the Moon' not in response.content)
-        # because the feed is cached
-        cache.clear()
-        response = self.client.get(url, {'ss': savedsearch.id})
         ok_('Flying to the Moon' in response.content)
 
     def test_feed_cache(self):
@@ -311,13 +310,29 @@ class TestFeeds(DjangoTestCase):
         eq_(Event.objects.archived().count(), 1)
         response = self.client.get(url)
         ok_('Test event' in response.content)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        with mock.patch.object(feeds.EventsFeed, 'items') as items:
+            response = self.client.get(url)
+            ok_('Test event' in response.content)
+            eq_(response['ETag'], etag)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            eq_(response.status_code, 304)
+            response = self.client.get(
+                url,
+                HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+            eq_(response.status_code, 304)
+            ok_(not items.called)
 
         event.title = 'Totally different'
         event.save()
 
-        response = self.client.get(url)
-        ok_('Test event' in response.content)
-        ok_('Totally different' not in response.content)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        eq_(response.status_code, 200)
+        ok_('Test event' not in response.content)
+        ok_('Totally different' in response.content)
 
     def test_private_feeds_by_channel(self):
         channel = Channel.objects.create(
@@ -461,6 +476,8 @@ class TestFeeds(DjangoTestCase):
         ok_('podcast-cover-1400x1400.png' not in response.content)
 
         with self.settings(MEDIA_URL='//somecdn.example/'):
+            cache.clear()
+            thumbnail_manifest.clear()
             response = self.client.get(url)
             eq_(response.status_code, 200)
             href = itunes_image_regex.findall(response.content)[0]
@@ -517,6 +534,37 @@ class TestFeeds(DjangoTestCase):
         ok_('<itunes:duration>01:01:01</itunes:duration>' in xml_)
         ok_('<itunes:keywords>Tag1,Tag2</itunes:keywords>' in xml_)
 
+    @mock.patch('airmozilla.main.tasks.create_vidly_media.delay')
+    def test_itunes_feed_item_without_vidly_media(self, create_vidly_media):
+        event = Event.objects.get(title='Test event')
+        event.archive_time = timezone.now()
+        event.template_environment = {'tag': 'abc123'}
+        event.duration = 60
+        event.save()
+        event.template.name = 'Vid.ly something'
+        event.template.save()
+
+        url = reverse('main:itunes_feed')
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        # it's looked up in the background instead
+        ok_('<item>' not in response.content)
+        create_vidly_media.assert_called_with(['abc123'], 'mp4', True)
+
+        VidlyMedia.objects.create(
+            tag='abc123',
+            hd=True,
+            video_format='mp4',
+            url='http://cdn.vidly/file.mp4',
+            size=1234567,
+            content_type='video/mp4'
+        )
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        ok_('<item>' in response.content)
+        ok_('http://cdn.vidly/file.mp4' in response.content)
+        eq_(create_vidly_media.call_count, 1)
+
     @mock.patch('airmozilla.main.models.get_video_redirect_info')
     def test_itunes_feed_from_sub_channel(self, r_get_redirect_info):
 
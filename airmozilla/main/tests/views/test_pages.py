@@ -19,6 +19,8 @@ from django.conf import settings
 from django.core.cache import cache
 from django.core.files import File
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.encoding import smart_text
 
 from airmozilla.main.models import (
@@ -54,7 +56,9 @@ from airmozilla.base.tests.test_mozillians import (
     NO_USERS,
 )
 from airmozilla.base.tests.testbase import DjangoTestCase
+from airmozilla.main.views.calendar import _get_vevents
 from airmozilla.main.views.pages import get_vidly_csp_headers
+from airmozilla.main import livehits
 
 
 class TestPages(DjangoTestCase):
@@ -237,6 +241,44 @@ class TestPages(DjangoTestCase):
         ok_(timestamp in title_2)
         ok_(timestamp in og_title_2)
 
+    def test_view_event_bundle_cached(self):
+        event = Event.objects.get(title='Test event')
+        url = reverse('main:event', args=(event.slug,))
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        ok_('Test event' in response.content)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        eq_(response.status_code, 200)
+        # all of it came out of the cache
+        eq_(len(captured), 0)
+
+        # changes that don't send signals aren't noticed
+        Event.objects.filter(id=event.id).update(title='Different')
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        ok_('Test event' in response.content)
+        ok_('Different' not in response.content)
+
+        # but saving it properly bumps the version
+        event.title = 'Different title'
+        event.save()
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        ok_('Test event' not in response.content)
+        ok_('Different title' in response.content)
+
+        # and so does adding a chapter
+        Chapter.objects.create(
+            event=event,
+            timestamp=70,
+            text='Chaptered!',
+            user=User.objects.create(username='chap'),
+        )
+        response = self.client.get(url)
+        ok_('Chaptered!' in response.content)
+
     def test_view_event_with_pin(self):
         cache.clear()
         event = Event.objects.get(title='Test event')
@@ -374,6 +416,41 @@ class TestPages(DjangoTestCase):
             reverse('main:home', kwargs={'page': 10000}))
         eq_(response_empty_page.status_code, 200)
 
+    def test_roles_looked_up_once_per_request(self):
+        event = Event.objects.get(title='Test event')
+        event.privacy = Event.PRIVACY_CONTRIBUTORS
+        event.save()
+        contributor = User.objects.create_user(
+            'nigel', 'nigel@live.com', 'secret'
+        )
+        UserProfile.objects.create(
+            user=contributor,
+            contributor=True
+        )
+        urls = (
+            reverse('main:home'),
+            reverse('main:event', args=(event.slug,)),
+        )
+
+        def get_cache_keys(url):
+            # the first time around fills the caches
+            self.client.get(url)
+            with mock.patch.object(cache, 'get', wraps=cache.get) as get:
+                response = self.client.get(url)
+            eq_(response.status_code, 200)
+            return [x[0][0] for x in get.call_args_list]
+
+        # not even once if you're not signed in
+        ok_(not [
+            x for x in get_cache_keys(urls[0])
+            if x.startswith('is-contributor-')
+        ])
+
+        assert self.client.login(username='nigel', password='secret')
+        for url in urls:
+            keys = get_cache_keys(url)
+            eq_(keys.count('is-contributor-%s' % contributor.id), 1)
+
     def test_event(self):
         """Event view page loads correctly if the event is public and
            scheduled and approved; request a login otherwise."""
@@ -494,7 +571,9 @@ class TestPages(DjangoTestCase):
             test_channel2_url in response.content
         )
 
-    def test_view_event_with_autoplay(self):
+    @mock.patch('requests.head')
+    def test_view_event_with_autoplay(self, rhead):
+        rhead.return_value = Response('', 200)
         event = Event.objects.get(title='Test event')
         vidly = Template.objects.create(
             name="Vid.ly HD",
@@ -729,6 +808,83 @@ class TestPages(DjangoTestCase):
         eq_(response_public.status_code, 200)
         eq_(response_public['Access-Control-Allow-Origin'], '*')
 
+    def test_calendar_ical_conditional_get(self):
+        url = self._calendar_url('public')
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        eq_(response.status_code, 304)
+        eq_(response.content, '')
+        eq_(response['ETag'], etag)
+        eq_(response['Access-Control-Allow-Origin'], '*')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"different"')
+        eq_(response.status_code, 200)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        eq_(response.status_code, 304)
+
+        # the other calendars aren't the same
+        response = self.client.get(
+            self._calendar_url('company'),
+            HTTP_IF_NONE_MATCH=etag
+        )
+        eq_(response.status_code, 200)
+
+        event = Event.objects.get(title='Test event')
+        event.title = 'Different'
+        event.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        eq_(response.status_code, 200)
+        ok_('Different' in response.content)
+        ok_(response['ETag'] != etag)
+
+    @mock.patch('airmozilla.main.views.calendar._serialize_vevent')
+    def test_calendar_ical_vevents_cached(self, serialize_vevent):
+        serialize_vevent.side_effect = (
+            lambda event, base_url: 'BEGIN:VEVENT\r\n{}\r\n'
+            'END:VEVENT\r\n'.format(event.title)
+        )
+        event = Event.objects.get(title='Test event')
+        response = self.client.get(self._calendar_url('public'))
+        eq_(response.status_code, 200)
+        ok_('Test event' in response.content)
+        eq_(serialize_vevent.call_count, 1)
+
+        # a different calendar with the same event
+        response = self.client.get(
+            self._calendar_url('company', location=event.location.id)
+        )
+        eq_(response.status_code, 200)
+        ok_('Test event' in response.content)
+        eq_(serialize_vevent.call_count, 1)
+
+        # a change to something else only changes the calendars
+        Event.objects.create(
+            title='Other',
+            slug='other',
+            start_time=event.start_time,
+            status=Event.STATUS_SCHEDULED,
+        )
+        response = self.client.get(self._calendar_url('company'))
+        ok_('Other' in response.content)
+        eq_(serialize_vevent.call_count, 2)
+
+        event.location.name = 'Paris'
+        event.location.save()
+        response = self.client.get(self._calendar_url('company'))
+        eq_(serialize_vevent.call_count, 3)
+
+        # the duration is changed without changing `modified`
+        event = Event.objects.get(id=event.id)
+        _get_vevents([event], 'http://testserver')
+        eq_(serialize_vevent.call_count, 3)
+        Event.objects.filter(id=event.id).update(duration=1234)
+        event = Event.objects.get(id=event.id)
+        _get_vevents([event], 'http://testserver')
+        eq_(serialize_vevent.call_count, 4)
+
     def test_calendar_with_location(self):
         london = Location.objects.create(
             name='London',
@@ -817,7 +973,6 @@ class TestPages(DjangoTestCase):
         ok_('Second test event' not in response.content)
 
         event2.channels.add(sub_channel)
-        cache.clear()
         url = self._calendar_url('public', channel_slug='parent')
         response = self.client.get(url)
         eq_(response.status_code, 200)
@@ -3138,6 +3293,9 @@ class TestPages(DjangoTestCase):
         # post to it it once
         response = self.client.post(url)
         eq_(get_hits(response), 1)
+        # not stored until the counter is flushed
+        ok_(not EventLiveHits.objects.filter(event=event))
+        livehits.flush()
         eq_(EventLiveHits.objects.get(event=event).total_hits, 1)
 
         # another get
@@ -3147,22 +3305,26 @@ class TestPages(DjangoTestCase):
         # another push
         response = self.client.post(url)
         eq_(get_hits(response), 1)
+        livehits.flush()
         eq_(EventLiveHits.objects.get(event=event).total_hits, 1)
 
         # change something about our request
         response = self.client.post(url, HTTP_USER_AGENT='Mozilla/Django')
         eq_(get_hits(response), 2)
+        livehits.flush()
         eq_(EventLiveHits.objects.get(event=event).total_hits, 2)
 
         # be signed in
         self._login()
         response = self.client.post(url)
         eq_(get_hits(response), 3)
+        livehits.flush()
         eq_(EventLiveHits.objects.get(event=event).total_hits, 3)
 
         # and a second time as signed in
         response = self.client.post(url)
         eq_(get_hits(response), 3)
+        livehits.flush()
         eq_(EventLiveHits.objects.get(event=event).total_hits, 3)
 
     def test_event_status(self):
@@ -2,6 +2,7 @@ from nose.tools import eq_, ok_
 
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 
 from airmozilla.manage import related
 
@@ -22,6 +23,11 @@ class RelatedTestCase(DjangoTestCase):
         super(RelatedTestCase, self).setUp()
         related.flush()
 
+    def tearDown(self):
+        super(RelatedTestCase, self).tearDown()
+        if related.is_local():
+            related.delete()
+
     def test_related_public(self):
         event = Event.objects.get(title='Test event')
         self._attach_file(event, self.main_image)
@@ -284,3 +290,8 @@ class RelatedTestCase(DjangoTestCase):
         response = self.client.get(url)
         eq_(response.status_code, 200)
         ok_('Mozilla Festival' not in response.content)
+
+
+@override_settings(RELATED_CONTENT_BACKEND='elasticsearch')
+class ElasticsearchRelatedTestCase(RelatedTestCase):
+    """The same tests but with Elasticsearch running."""
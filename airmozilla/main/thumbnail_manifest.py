@@ -0,0 +1,173 @@
+"""Knowing the URLs of thumbnails without making them.
+
+Making a thumbnail with sorl (through optisorl) can mean downloading
+the original from S3, resizing it, optimizing it and uploading the
+result, and even when it's already been made, sorl has to look it up
+in its key-value store. That's too much to do while rendering a page
+full of thumbnails.
+
+Instead, the thumbnails in the sizes we know we're going to need
+(`PICTURE_GEOMETRIES` and `COVER_ART_GEOMETRIES`) are made by a Celery
+task whenever a `Picture` or a channel's cover art is saved and their
+URL, width and height are remembered in this manifest. The manifest
+is in the cache and every process keeps what it's looked up in memory
+so, most of the time, a thumbnail is just a dict lookup.
+
+Anything that isn't in the manifest (a miss) is made there and then,
+like before, and then remembered.
+"""
+import hashlib
+import logging
+import threading
+
+from django.core.cache import cache
+
+
+# (geometry, options) of the thumbnails of pictures we know we'll need
+PICTURE_GEOMETRIES = (
+    # the event lists, the timenails and the chapters
+    ('160x90', {'crop': 'center'}),
+    # the event page, the Open Graph image and tweets
+    ('385x218', {'crop': 'center'}),
+    # the featured events
+    ('896x504', {'crop': 'center'}),
+)
+
+# ...and of the cover art of channels, for the iTunes feeds
+COVER_ART_GEOMETRIES = (
+    ('1400x1400', {}),
+    ('144x144', {}),
+)
+
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Don't let the in-memory copy grow forever.
+MAX_MEMORY_SIZE = 10000
+
+# How many lookups to count in memory before adding them to the
+# counters in the cache.
+STATS_BATCH_SIZE = 100
+
+_memory = {}
+_pending_stats = {'hits': 0, 'misses': 0}
+_lock = threading.Lock()
+
+
+class Thumbnail(object):
+
+    def __init__(self, url, width, height):
+        self.url = url
+        self.width = width
+        self.height = height
+
+
+def _get_name(imagefile):
+    return getattr(imagefile, 'name', imagefile)
+
+
+def _get_key(imagefile, geometry, options):
+    return 'thumbnail:' + hashlib.md5(repr((
+        _get_name(imagefile),
+        geometry,
+        sorted(options.items()),
+    ))).hexdigest()
+
+
+def _remember(key, thumb):
+    with _lock:
+        if len(_memory) >= MAX_MEMORY_SIZE:
+            _memory.clear()
+        _memory[key] = thumb
+
+
+def _count(kind):
+    with _lock:
+        _pending_stats[kind] += 1
+        if sum(_pending_stats.values()) < STATS_BATCH_SIZE:
+            return
+        pending = dict(_pending_stats)
+        _pending_stats.update(hits=0, misses=0)
+    _add_stats(pending)
+
+
+def _add_stats(stats):
+    for kind, count in stats.items():
+        if not count:
+            continue
+        key = 'thumbnail:stats:' + kind
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.set(key, count, None)
+
+
+def _render(imagefile, geometry, options):
+    # Imported here because the template helpers use this module.
+    from airmozilla.main.templatetags.jinja_helpers import thumbnail
+    thumb = thumbnail(imagefile, geometry, **options)
+    return Thumbnail(thumb.url, thumb.width, thumb.height)
+
+
+def get(imagefile, geometry, **options):
+    """Return something with the `url`, `width` and `height` of this
+    thumbnail. Like `thumbnail()` but from the manifest, if it's
+    there."""
+    key = _get_key(imagefile, geometry, options)
+    thumb = _memory.get(key)
+    if thumb is None:
+        thumb = cache.get(key)
+        if thumb is not None:
+            _remember(key, thumb)
+    if thumb is not None:
+        _count('hits')
+        return thumb
+    _count('misses')
+    thumb = _render(imagefile, geometry, options)
+    cache.set(key, thumb, CACHE_TIMEOUT)
+    _remember(key, thumb)
+    return thumb
+
+
+def create(imagefile, geometries):
+    """Make the thumbnails of this image in all these (geometry, options)
+    and put them in the manifest. Returns how many were made."""
+    made = {}
+    for geometry, options in geometries:
+        try:
+            thumb = _render(imagefile, geometry, options)
+        except Exception:
+            logging.error(
+                'Unable to make a %s thumbnail of %r',
+                geometry,
+                _get_name(imagefile),
+                exc_info=True
+            )
+            continue
+        made[_get_key(imagefile, geometry, options)] = thumb
+    if made:
+        cache.set_many(made, CACHE_TIMEOUT)
+        for key, thumb in made.items():
+            _remember(key, thumb)
+    return len(made)
+
+
+def get_stats():
+    """Return the number of thumbnails looked up that were (hits) and
+    weren't (misses) in the manifest."""
+    with _lock:
+        pending = dict(_pending_stats)
+        _pending_stats.update(hits=0, misses=0)
+    _add_stats(pending)
+    return dict(
+        (kind, cache.get('thumbnail:stats:' + kind) or 0)
+        for kind in ('hits', 'misses')
+    )
+
+
+def clear():
+    """Forget the thumbnails, and the counts not yet added to the
+    cache, this process has in memory."""
+    with _lock:
+        _memory.clear()
+        _pending_stats.update(hits=0, misses=0)
@@ -1,6 +1,5 @@
 from django.conf.urls import patterns, url
 from django.views.generic.base import RedirectView
-from django.views.decorators.cache import cache_page
 
 from .views import (
     pages,
@@ -42,41 +41,39 @@ urlpatterns = patterns(
         r'/(?P<channel_slug>[-\w]+).ics$',
         calendar.events_calendar_ical, name='calendar_channel_ical'),
     url(r'^feed/itunes/$',
-        # cache_page(60 * 60)(feeds.ITunesFeed()),
-        feeds.ITunesFeed(),
+        feeds.cached_feed(feeds.ITunesFeed()),
         name='itunes_feed'),
     url(r'^feed/itunes/(?P<channel_slug>[-\w]+)$',
-        # cache_page(60 * 60)(feeds.ITunesFeed()),
-        feeds.ITunesFeed(),
+        feeds.cached_feed(feeds.ITunesFeed()),
         name='itunes_feed'),
     url(r'^feed/(?P<private_or_public>'
         'company|public|private|contributors)?/?$',
-        cache_page(60 * 60)(feeds.EventsFeed()),
+        feeds.cached_feed(feeds.EventsFeed()),
         name='feed'),
     url(r'^feed/(?P<private_or_public>'
         r'company|public|private|contributors)?/not/'
         r'(?P<not_channel_slug>[-\w]+)$',
-        cache_page(60 * 60)(feeds.EventsFeed()),
+        feeds.cached_feed(feeds.EventsFeed()),
         name='not_feed'),
     url(r'^feed/not/'
         r'(?P<not_channel_slug>[-\w]+)$',
-        cache_page(60 * 60)(feeds.EventsFeed()),
+        feeds.cached_feed(feeds.EventsFeed()),
         name='not_feed'),
     url(r'^feed/(?P<private_or_public>company|public|private|contributors)'
         r'/(?P<format_type>webm)/?$',
-        cache_page(60 * 60)(feeds.EventsFeed()),
+        feeds.cached_feed(feeds.EventsFeed()),
         name='feed_format_type'),
     url(r'^feed/(?P<channel_slug>[-\w]+)/$',
-        cache_page(60 * 60)(feeds.EventsFeed()),
+        feeds.cached_feed(feeds.EventsFeed()),
         name='channel_feed_default'),
     url(r'^feed/(?P<channel_slug>[-\w]+)/'
         r'(?P<private_or_public>company|public|private|contributors)/?$',
-        cache_page(60 * 60)(feeds.EventsFeed()),
+        feeds.cached_feed(feeds.EventsFeed()),
         name='channel_feed'),
     url(r'^feed/(?P<channel_slug>[-\w]+)/'
         r'(?P<private_or_public>company|public|private|contributors)/'
         r'(?P<format_type>webm|mp4)/?$',
-        cache_page(60 * 60)(feeds.EventsFeed()),
+        feeds.cached_feed(feeds.EventsFeed()),
         name='channel_feed_format_type'),
     url(r'^tagcloud/$', pages.tag_cloud, name='tag_cloud'),
     url(r'^livehits/(?P<id>\d+)/$',
@@ -1,6 +1,7 @@
 import math
 from collections import defaultdict
 
+import numpy
 from PIL import Image
 import Levenshtein
 
@@ -76,29 +77,25 @@ class BWImageCompare(object):
         self.x, self.y = newx, newy
 
     def _img_int(self, img):
-        """Convert an image to a list of pixels."""
+        """Convert an image to an array of pixels, column by column."""
 
-        x, y = img.size
-
-        for i in xrange(x):
-            for j in xrange(y):
-                yield img.getpixel((i, j))
+        return numpy.asarray(img, dtype=numpy.int64).T.ravel()
 
     @property
     def imga_int(self):
-        """Return a tuple representing the first image."""
+        """Return an array representing the first image."""
 
         if not hasattr(self, '_imga_int'):
-            self._imga_int = tuple(self._img_int(self._imga))
+            self._imga_int = self._img_int(self._imga)
 
         return self._imga_int
 
     @property
     def imgb_int(self):
-        """Return a tuple representing the second image."""
+        """Return an array representing the second image."""
 
         if not hasattr(self, '_imgb_int'):
-            self._imgb_int = tuple(self._img_int(self._imgb))
+            self._imgb_int = self._img_int(self._imgb)
 
         return self._imgb_int
 
@@ -107,7 +104,10 @@ class BWImageCompare(object):
         """Return the mean square error between the two images."""
 
         if not hasattr(self, '_mse'):
-            tmp = sum((a-b)**2 for a, b in zip(self.imga_int, self.imgb_int))
+            # Packed colour pixels squared can add up to more than
+            # fits in an int64, so sum them as Python integers.
+            diff = self.imga_int - self.imgb_int
+            tmp = numpy.square(diff).astype(object).sum()
             self._mse = float(tmp) / self.x / self.y
 
         return self._mse
@@ -130,13 +130,19 @@ class BWImageCompare(object):
 
         return self._nrmsd
 
+    @staticmethod
+    def _to_string(pixels):
+        """Turn an array of 0-255 values into a string of as many bytes."""
+
+        return pixels.astype(numpy.uint8).tostring()
+
     @property
     def levenshtein(self):
         """Calculate the Levenshtein distance."""
 
         if not hasattr(self, '_lv'):
-            stra = ''.join((chr(x) for x in self.imga_int))
-            strb = ''.join((chr(x) for x in self.imgb_int))
+            stra = self._to_string(self.imga_int)
+            strb = self._to_string(self.imgb_int)
 
             lv = Levenshtein.distance(stra, strb)
 
@@ -152,37 +158,60 @@ class ImageCompare(BWImageCompare):
     _colour = True
 
     def _img_int(self, img):
-        """Convert an image to a list of pixels."""
+        """Convert an image to an array of pixels, column by column.
+        Each pixel is packed into one integer as R | G << 8 | B << 16."""
 
-        x, y = img.size
-
-        for i in xrange(x):
-            for j in xrange(y):
-                pixel = img.getpixel((i, j))
-                yield pixel[0] | (pixel[1] << 8) | (pixel[2] << 16)
+        pixels = numpy.asarray(img.convert('RGB'), dtype=numpy.int64)
+        packed = (
+            pixels[:, :, 0] |
+            (pixels[:, :, 1] << 8) |
+            (pixels[:, :, 2] << 16)
+        )
+        return packed.T.ravel()
 
     @property
     def levenshtein(self):
         """Calculate the Levenshtein distance."""
 
         if not hasattr(self, '_lv'):
-            stra_r = ''.join((chr(x >> 16) for x in self.imga_int))
-            strb_r = ''.join((chr(x >> 16) for x in self.imgb_int))
-            lv_r = Levenshtein.distance(stra_r, strb_r)
-
-            stra_g = ''.join((chr((x >> 8) & 0xff) for x in self.imga_int))
-            strb_g = ''.join((chr((x >> 8) & 0xff) for x in self.imgb_int))
-            lv_g = Levenshtein.distance(stra_g, strb_g)
-
-            stra_b = ''.join((chr(x & 0xff) for x in self.imga_int))
-            strb_b = ''.join((chr(x & 0xff) for x in self.imgb_int))
-            lv_b = Levenshtein.distance(stra_b, strb_b)
+            imga_int, imgb_int = self.imga_int, self.imgb_int
+            lv_r = Levenshtein.distance(
+                self._to_string(imga_int >> 16),
+                self._to_string(imgb_int >> 16),
+            )
+            lv_g = Levenshtein.distance(
+                self._to_string((imga_int >> 8) & 0xff),
+                self._to_string((imgb_int >> 8) & 0xff),
+            )
+            lv_b = Levenshtein.distance(
+                self._to_string(imga_int & 0xff),
+                self._to_string(imgb_int & 0xff),
+            )
 
             self._lv = (lv_r + lv_g + lv_b) / 3. / self.x / self.y
 
         return self._lv
 
 
+def perceptual_hash(img, size=8):
+    """Return a difference hash of the image as an integer of
+    `size * size` bits. Images that look the same, even if they are
+    scaled or compressed differently, get hashes that differ in only
+    a few bits (see `hash_distance()`)."""
+
+    img = img.convert('L').resize((size + 1, size), Image.BICUBIC)
+    pixels = numpy.asarray(img, dtype=numpy.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int(numpy.packbits(bits).tostring().encode('hex'), 16)
+
+
+def hash_distance(hasha, hashb):
+    """Return the number of bits that differ between two hashes from
+    `perceptual_hash()`. 0 means the images are near-identical."""
+
+    return bin(hasha ^ hashb).count('1')
+
+
 class FuzzyImageCompare(object):
     """Compares two images based on the previous comparison values."""
 
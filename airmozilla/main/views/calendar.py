@@ -1,4 +1,6 @@
 import datetime
+import hashlib
+import time
 
 import vobject
 
@@ -10,20 +12,21 @@ from django.core.cache import cache
 from django.conf import settings
 from django.db.models import Q
 from django.core.urlresolvers import reverse
+from django.utils.http import http_date, quote_etag
 
 from slugify import slugify
 from jsonview.decorators import json_view
 
-from airmozilla.base.utils import get_base_url
+from airmozilla.base.utils import get_base_url, is_not_modified
 from airmozilla.main.templatetags.jinja_helpers import short_desc
 from airmozilla.main.models import (
     Event,
     get_profile_safely,
     Location,
     Channel,
+    get_event_list_version,
 )
 from airmozilla.search.models import SavedSearch
-from airmozilla.main.views import is_contributor
 from airmozilla.main import forms
 
 
@@ -48,7 +51,7 @@ def calendar_data(request):
     privacy_exclude = {}
     events = Event.objects.scheduled_or_processing()
     if request.user.is_active:
-        if is_contributor(request.user):
+        if request.roles.contributor:
             privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
     else:
         privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
@@ -105,16 +108,90 @@ def calendars(request):
     return render(request, 'main/calendars.html', data)
 
 
+# Calendars are rebuilt at least this often because what's past and
+# what's upcoming changes as time goes by.
+CALENDAR_CACHE_TIMEOUT = 60 * 10
+VEVENT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _serialize_vevent(event, base_url):
+    cal = vobject.iCalendar()
+    vevent = cal.add('vevent')
+    vevent.add('summary').value = event.title
+    vevent.add('dtstart').value = event.start_time
+    vevent.add('dtend').value = (
+        event.start_time +
+        datetime.timedelta(
+            seconds=event.duration or event.estimated_duration
+        )
+    )
+    vevent.add('description').value = short_desc(event, strip_html=True)
+    if event.location:
+        vevent.add('location').value = event.location.name
+    vevent.add('url').value = (
+        base_url + reverse('main:event', args=(event.slug,))
+    )
+    return vevent.serialize()
+
+
+def _get_vevents(events, base_url):
+    """Return the serialized VEVENT of each event. They're cached by
+    everything that goes into them so they only need to be serialized
+    again when the event (or its location) changes.
+
+    Not just by `modified` because some fields, like the duration,
+    are changed with `.update()` which doesn't touch that."""
+    cache_keys = {}
+    for event in events:
+        cache_keys[event.id] = 'vevent:' + hashlib.md5(u'|'.join([
+            unicode(event.id),
+            event.modified.isoformat(),
+            event.title,
+            event.slug,
+            event.start_time.isoformat(),
+            unicode(event.duration),
+            unicode(event.estimated_duration),
+            event.short_description or u'',
+            event.description or u'',
+            event.location and event.location.name or u'',
+            base_url,
+        ]).encode('utf-8')).hexdigest()
+    cached = cache.get_many(cache_keys.values())
+    missing = {}
+    vevents = []
+    for event in events:
+        cache_key = cache_keys[event.id]
+        vevent = cached.get(cache_key)
+        if vevent is None:
+            vevent = missing[cache_key] = _serialize_vevent(event, base_url)
+        vevents.append(vevent)
+    if missing:
+        cache.set_many(missing, VEVENT_CACHE_TIMEOUT)
+    return vevents
+
+
+def _get_calendar(request, title, base_qs):
+    cal = vobject.iCalendar()
+    cal.add('X-WR-CALNAME').value = title
+    head, tail = cal.serialize().split('END:VCALENDAR')
+
+    now = timezone.now()
+    base_qs = base_qs.select_related('location')
+    events = list(base_qs
+                  .filter(start_time__lt=now)
+                  .order_by('-start_time')[:settings.CALENDAR_SIZE])
+    events += list(base_qs
+                   .filter(start_time__gte=now)
+                   .order_by('start_time'))
+    vevents = _get_vevents(events, get_base_url(request))
+    return ''.join([head] + vevents + ['END:VCALENDAR', tail])
+
+
 def events_calendar_ical(request, privacy=None, channel_slug=None):
-    cache_key = 'calendar'
     savedsearch = None
-    if privacy:
-        cache_key += '_%s' % privacy
-    if channel_slug:
-        cache_key += '_%s' % channel_slug
+    location = None
     if request.GET.get('ss'):
         savedsearch = get_object_or_404(SavedSearch, id=request.GET['ss'])
-        cache_key += '_%s' % savedsearch.pk
     if request.GET.get('location'):
         if request.GET.get('location').isdigit():
             location = get_object_or_404(
@@ -126,97 +203,78 @@ def events_calendar_ical(request, privacy=None, channel_slug=None):
                 Location,
                 name=request.GET.get('location')
             )
-        cache_key += str(location.pk)
-        cached = None
-    else:
-        location = None
-        cached = cache.get(cache_key)
-
-    if cached:
-        # additional response headers aren't remembered so add them again
-        cached['Access-Control-Allow-Origin'] = '*'
-        return cached
-    cal = vobject.iCalendar()
 
-    now = timezone.now()
-    if savedsearch:
-        base_qs = savedsearch.get_events()
-    else:
-        base_qs = Event.objects.scheduled_or_processing()
-    if channel_slug:
-        channel = get_object_or_404(
-            Channel,
-            slug__iexact=channel_slug
-        )
-        channels = Channel.objects.filter(
-            Q(id=channel.id) |
-            Q(parent=channel.id)
-        )
-        base_qs = base_qs.filter(channels__in=channels)
-
-    if privacy == 'public':
-        base_qs = base_qs.approved().filter(
-            privacy=Event.PRIVACY_PUBLIC
-        )
-        title = 'Air Mozilla Public Events'
-    elif privacy == 'private':
-        base_qs = base_qs.exclude(
-            privacy=Event.PRIVACY_PUBLIC
-        )
-        title = 'Air Mozilla Private Events'
-    else:
-        title = 'Air Mozilla Events'
-    if savedsearch:
-        if savedsearch.name:
-            title += ' (from saved search "{}")'.format(savedsearch.name)
+    # Anything that might change what's in any calendar changes the
+    # version so we never have to know all the variants there are.
+    cache_key = 'calendar:{}:{}:{}:{}:{}'.format(
+        get_event_list_version(),
+        privacy,
+        channel_slug and slugify(channel_slug),
+        savedsearch and savedsearch.pk,
+        location and location.pk,
+    )
+    cached = cache.get(cache_key)
+    if cached is None:
+        if savedsearch:
+            base_qs = savedsearch.get_events()
         else:
-            title += ' (from saved search)'
-    if location:
-        base_qs = base_qs.filter(location=location)
+            base_qs = Event.objects.scheduled_or_processing()
+        if channel_slug:
+            channel = get_object_or_404(
+                Channel,
+                slug__iexact=channel_slug
+            )
+            channels = Channel.objects.filter(
+                Q(id=channel.id) |
+                Q(parent=channel.id)
+            )
+            base_qs = base_qs.filter(channels__in=channels)
 
-    cal.add('X-WR-CALNAME').value = title
-    events = list(base_qs
-                  .filter(start_time__lt=now)
-                  .order_by('-start_time')[:settings.CALENDAR_SIZE])
-    events += list(base_qs
-                   .filter(start_time__gte=now)
-                   .order_by('start_time'))
-    base_url = get_base_url(request)
-    for event in events:
-        vevent = cal.add('vevent')
-        vevent.add('summary').value = event.title
-        vevent.add('dtstart').value = event.start_time
-        vevent.add('dtend').value = (
-            event.start_time +
-            datetime.timedelta(
-                seconds=event.duration or event.estimated_duration
+        if privacy == 'public':
+            base_qs = base_qs.approved().filter(
+                privacy=Event.PRIVACY_PUBLIC
             )
+            title = 'Air Mozilla Public Events'
+        elif privacy == 'private':
+            base_qs = base_qs.exclude(
+                privacy=Event.PRIVACY_PUBLIC
+            )
+            title = 'Air Mozilla Private Events'
+        else:
+            title = 'Air Mozilla Events'
+        if savedsearch:
+            if savedsearch.name:
+                title += ' (from saved search "{}")'.format(savedsearch.name)
+            else:
+                title += ' (from saved search)'
+        if location:
+            base_qs = base_qs.filter(location=location)
+
+        icalstream = _get_calendar(request, title, base_qs)
+        cached = {
+            'icalstream': icalstream,
+            'etag': hashlib.md5(icalstream).hexdigest(),
+            'last_modified': int(time.time()),
+        }
+        cache.set(cache_key, cached, CALENDAR_CACHE_TIMEOUT)
+
+    if is_not_modified(request, cached['etag'], cached['last_modified']):
+        response = http.HttpResponseNotModified()
+    else:
+        response = http.HttpResponse(
+            cached['icalstream'],
+            content_type='text/calendar; charset=utf-8'
         )
-        vevent.add('description').value = short_desc(event, strip_html=True)
-        if event.location:
-            vevent.add('location').value = event.location.name
-        vevent.add('url').value = (
-            base_url + reverse('main:event', args=(event.slug,))
-        )
-    icalstream = cal.serialize()
-    # response = http.HttpResponse(
-    #     icalstream,
-    #     content_type='text/plain; charset=utf-8'
-    # )
-    response = http.HttpResponse(
-        icalstream,
-        content_type='text/calendar; charset=utf-8'
-    )
-    filename = 'AirMozillaEvents%s' % (privacy and privacy or '')
-    if location:
-        filename += '_%s' % slugify(location.name)
-    if savedsearch:
-        filename += '_ss%s' % savedsearch.id
-    filename += '.ics'
-    response['Content-Disposition'] = (
-        'inline; filename=%s' % filename)
-    if not location:
-        cache.set(cache_key, response, 60 * 10)  # 10 minutes
+        filename = 'AirMozillaEvents%s' % (privacy and privacy or '')
+        if location:
+            filename += '_%s' % slugify(location.name)
+        if savedsearch:
+            filename += '_ss%s' % savedsearch.id
+        filename += '.ics'
+        response['Content-Disposition'] = (
+            'inline; filename=%s' % filename)
+    response['ETag'] = quote_etag(cached['etag'])
+    response['Last-Modified'] = http_date(cached['last_modified'])
 
     # https://bugzilla.mozilla.org/show_bug.cgi?id=909516
     response['Access-Control-Allow-Origin'] = '*'
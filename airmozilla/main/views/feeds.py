@@ -1,18 +1,80 @@
+import hashlib
+import time
 from collections import defaultdict
 
+from django import http
 from django.conf import settings
+from django.core.cache import cache
 from django.contrib.syndication.views import Feed
 from django.utils.feedgenerator import Rss201rev2Feed
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db.models import Q
 from django.core.urlresolvers import reverse
-
-from airmozilla.main.models import Event, Channel, Tag, VidlyMedia
+from django.utils.http import http_date, quote_etag
+
+from airmozilla.main.models import (
+    Event,
+    Channel,
+    Tag,
+    VidlyMedia,
+    get_event_list_version,
+    get_unique_titles,
+)
+from airmozilla.main import tasks
+from airmozilla.main import thumbnail_manifest
 from airmozilla.search.models import SavedSearch
-from airmozilla.base.utils import get_base_url, get_abs_static
-from airmozilla.main.templatetags.jinja_helpers import short_desc, thumbnail
-from airmozilla.manage import vidly
+from airmozilla.base.utils import (
+    get_base_url,
+    get_abs_static,
+    is_not_modified,
+)
+from airmozilla.main.templatetags.jinja_helpers import short_desc
+
+
+FEED_CACHE_TIMEOUT = 60 * 60
+
+
+def cached_feed(feed):
+    """Return a view that serves the feed from the cache until any
+    event (or anything else that could be in a feed) changes and
+    answers conditional requests with a 304."""
+
+    def view(request, *args, **kwargs):
+        # The channel, privacy and format are all in the path.
+        cache_key = 'feed:{}:{}'.format(
+            get_event_list_version(),
+            hashlib.md5(u'|'.join([
+                get_base_url(request),
+                request.path,
+                request.GET.get('ss', ''),
+            ]).encode('utf-8')).hexdigest()
+        )
+        cached = cache.get(cache_key)
+        if cached is None:
+            response = feed(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': hashlib.md5(response.content).hexdigest(),
+                'last_modified': int(time.time()),
+            }
+            cache.set(cache_key, cached, FEED_CACHE_TIMEOUT)
+
+        if is_not_modified(request, cached['etag'], cached['last_modified']):
+            response = http.HttpResponseNotModified()
+        else:
+            response = http.HttpResponse(
+                cached['content'],
+                content_type=cached['content_type']
+            )
+        response['ETag'] = quote_etag(cached['etag'])
+        response['Last-Modified'] = http_date(cached['last_modified'])
+        return response
+
+    return view
 
 
 def format_duration(duration):
@@ -92,10 +154,12 @@ class EventsFeed(Feed):
             qs = qs.filter(privacy=Event.PRIVACY_PUBLIC)
         elif self.private_or_public == 'contributors':
             qs = qs.exclude(privacy=Event.PRIVACY_COMPANY)
-        return qs[:self._channel.feed_size]
+        items = list(qs[:self._channel.feed_size])
+        self._unique_titles = get_unique_titles(items)
+        return items
 
     def item_title(self, event):
-        return event.get_unique_title()
+        return self._unique_titles[event.id]
 
     def item_link(self, event):
         if self.format_type in ('webm', 'mp4'):
@@ -227,10 +291,10 @@ class ITunesFeed(EventsFeed):
                 slug=settings.DEFAULT_CHANNEL_SLUG
             )
         if self.channel.cover_art:
-            self.itunes_lg_url = thumbnail(
+            self.itunes_lg_url = thumbnail_manifest.get(
                 self.channel.cover_art, '1400x1400'
             ).url
-            self.itunes_sm_url = thumbnail(
+            self.itunes_sm_url = thumbnail_manifest.get(
                 self.channel.cover_art, '144x144'
             ).url
             if self.itunes_lg_url.startswith('//'):
@@ -290,19 +354,37 @@ class ITunesFeed(EventsFeed):
             self.all_tags[event_id] = [
                 all_tag_names[x] for x in tag_ids
             ]
+        events = list(qs)
+        tags = set(x.template_environment['tag'] for x in events)
+        vidly_media = {}
+        for obj in VidlyMedia.objects.filter(
+            tag__in=tags,
+            video_format='mp4',
+            hd=True,
+        ).order_by('modified'):
+            vidly_media[obj.tag] = obj
+        missing = tags - set(vidly_media)
+        if missing:
+            # Looking them up means HEAD requests to vid.ly so that's
+            # done in the background and these events are left out
+            # until then. Once they're saved the feed is rebuilt.
+            tasks.create_vidly_media.delay(sorted(missing), 'mp4', True)
+            # ...unless the task has already run (e.g. CELERY_ALWAYS_EAGER).
+            for obj in VidlyMedia.objects.filter(
+                tag__in=missing,
+                video_format='mp4',
+                hd=True,
+            ).order_by('modified'):
+                vidly_media[obj.tag] = obj
+
         items = []
-        for event in qs:
-            try:
-                vidly_media = VidlyMedia.get_or_create(
-                    event.template_environment['tag'],
-                    'mp4',
-                    hd=True,
-                )
-            except vidly.VidlyNotFoundError:
-                print "vidlynotfounderror :(", repr(event)
+        for event in events:
+            tag = event.template_environment['tag']
+            if tag not in vidly_media:
                 continue
-            event._vidly_media = vidly_media
+            event._vidly_media = vidly_media[tag]
             items.append(event)
+        self._unique_titles = get_unique_titles(items)
         return items
 
     def feed_extra_kwargs(self, obj):
@@ -320,9 +402,6 @@ class ITunesFeed(EventsFeed):
     def item_description(self, event):
         return event.description
 
-    def item_title(self, event):
-        return event.get_unique_title()
-
     def item_author_name(self, event):  # override the super
         return None
 
@@ -14,7 +14,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.core.cache import cache
 from django.views.decorators.cache import never_cache
 from django.views.generic.base import View
-from django.db.models import Count, Q, F
+from django.db.models import Count
 from django.db import transaction
 from django.core.urlresolvers import reverse
 from django.template import engines
@@ -24,24 +24,23 @@ from jsonview.decorators import json_view
 
 from airmozilla.main.models import (
     Event,
-    EventOldSlug,
     Tag,
     Channel,
     EventHitStats,
     CuratedGroup,
     Picture,
     VidlySubmission,
-    EventLiveHits,
     Chapter,
     VidlyTagDomain,
+    EventCount,
+    get_event_version,
 )
 from airmozilla.base.utils import (
     paginate,
     edgecast_tokenize,
     akamai_tokenize,
 )
-from airmozilla.main.templatetags.jinja_helpers import thumbnail
-from airmozilla.search.models import LoggedSearch
+from airmozilla.search import searchlog
 from airmozilla.comments.models import Discussion
 from airmozilla.surveys.models import Survey
 # from airmozilla.subtitles.models import AmaraVideo
@@ -51,8 +50,12 @@ from airmozilla.manage import related
 from airmozilla.base import mozillians
 from airmozilla.staticpages.views import staticpage
 from airmozilla.main import cloud
-from airmozilla.main.views import is_contributor, is_employee
+from airmozilla.main.views import is_contributor
+from airmozilla.main.roles import get_roles
 from airmozilla.main import forms
+from airmozilla.main import livehits
+from airmozilla.main import slug_resolution
+from airmozilla.main import thumbnail_manifest
 
 
 def page(request, template):
@@ -80,7 +83,7 @@ def home(request, page=1, channel_slug=settings.DEFAULT_CHANNEL_SLUG):
     privacy_exclude = {}
     archived_events = Event.objects.archived()
     if request.user.is_active:
-        if is_contributor(request.user):
+        if request.roles.contributor:
             privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
     else:
         # privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
@@ -165,22 +168,30 @@ def home(request, page=1, channel_slug=settings.DEFAULT_CHANNEL_SLUG):
                       archived_paged.previous_page_number())
             )
 
-    events_qs = Event.objects.archived().all()
+    counts_privacy_filter = {}
+    counts_privacy_exclude = {}
     if request.user.is_active:
-        if is_contributor(request.user):
+        if request.roles.contributor:
             feed_privacy = 'contributors'
-            events_qs = events_qs.exclude(privacy=Event.PRIVACY_COMPANY)
+            counts_privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
         else:
             feed_privacy = 'company'
     else:
-        events_qs = events_qs.filter(privacy=Event.PRIVACY_PUBLIC)
+        counts_privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
         feed_privacy = 'public'
 
+    event_counts = EventCount.objects.get_counts(
+        'channel',
+        privacy_filter=counts_privacy_filter,
+        privacy_exclude=counts_privacy_exclude,
+        status__in=(Event.STATUS_SCHEDULED, Event.STATUS_PROCESSING),
+        archived=True,
+    )
     channel_children = []
     for child in channel.get_children().order_by('name'):
         channel_children.append((
             child,
-            events_qs.filter(channels=child).count()
+            event_counts.get(child.id, 0)
         ))
 
     curated_groups_map = collections.defaultdict(list)
@@ -219,12 +230,13 @@ def can_view_event(event, user):
         return False
 
     # you're logged in
+    roles = get_roles(user)
     if event.privacy == Event.PRIVACY_COMPANY:
         # but then it's not good enough to be contributor
-        if is_contributor(user):
+        if roles.contributor:
             return False
     else:
-        if not is_contributor(user):
+        if not roles.contributor:
             # staff can always see it
             return True
 
@@ -233,9 +245,7 @@ def can_view_event(event, user):
             CuratedGroup.objects.filter(event=event).values_list('name')
         ]
         if curated_groups:
-            return any(
-                [mozillians.in_group(user.email, x) for x in curated_groups]
-            )
+            return any(roles.in_curated_group(x) for x in curated_groups)
 
     return True
 
@@ -256,6 +266,8 @@ class EventView(View):
 
     def cant_find_event(self, request, slug):
         """return an appropriate response if no event can be found"""
+        if slug_resolution.resolve(slug)[0] == slug_resolution.MISSING:
+            raise http.Http404(slug)
         return staticpage(request, slug)
 
     def can_view_event(self, event, request):
@@ -282,26 +294,29 @@ class EventView(View):
         )
         return context
 
-    def get_event(self, slug, request):
-        try:
-            return Event.objects.get(slug=slug)
-        except Event.DoesNotExist:
-            try:
-                return Event.objects.get(slug__iexact=slug)
-            except Event.DoesNotExist:
-                try:
-                    old_slug = EventOldSlug.objects.get(slug=slug)
-                    return redirect('main:event', slug=old_slug.event.slug)
-                except EventOldSlug.DoesNotExist:
-                    # does it exist as a static page
-                    if slug.isdigit():
-                        # it might be the ID of the event
-                        try:
-                            return Event.objects.get(id=slug)
-                        except Event.DoesNotExist:
-                            # not that either
-                            pass
-                    return self.cant_find_event(request, slug)
+    def get_event(self, slug, request, retry=True):
+        kind, event_id = slug_resolution.resolve(slug)
+        if kind == slug_resolution.EVENT:
+            for event in Event.objects.filter(id=event_id):
+                if (
+                    event.slug.lower() == slug.lower() or
+                    slug == str(event.id)
+                ):
+                    return event
+        elif kind == slug_resolution.OLD_SLUG:
+            for event_slug in (
+                Event.objects.filter(id=event_id)
+                .values_list('slug', flat=True)
+            ):
+                if event_slug != slug:
+                    return redirect('main:event', slug=event_slug)
+        else:
+            return self.cant_find_event(request, slug)
+        # What was cached is no longer true.
+        slug_resolution.forget(slug)
+        if retry:
+            return self.get_event(slug, request, retry=False)
+        return self.cant_find_event(request, slug)
 
     @staticmethod
     def get_vidly_information(event, tag):
@@ -331,10 +346,116 @@ class EventView(View):
         cache.set(cache_key, (vidly_tag, hd), 60 * 60)
         return vidly_tag, hd
 
-    def get(self, request, slug):
+    @staticmethod
+    def _get_bundle_cache_key(slug):
+        return 'event_page_bundle:{}'.format(
+            hashlib.md5(slug.encode('utf-8')).hexdigest()
+        )
+
+    def get_bundle(self, slug, request):
+        """Return a dict of everything on the event page that doesn't
+        depend on who is looking at it, including the event itself.
+        It's cached against the version of the event so any signal
+        that bumps that version invalidates it.
+        If the slug doesn't lead to an event an HttpResponse is returned
+        instead (and that's not cached).
+        """
+        cache_key = self._get_bundle_cache_key(slug)
+        bundle = cache.get(cache_key)
+        if bundle is not None:
+            if bundle['version'] == get_event_version(bundle['event'].id):
+                return bundle
+
         event = self.get_event(slug, request)
         if isinstance(event, http.HttpResponse):
             return event
+        # Read the version before the data so that a change that
+        # happens whilst we build it makes the bundle stale.
+        version = get_event_version(event.id)
+        bundle = self.build_bundle(event)
+        bundle['version'] = version
+        cache.set(cache_key, bundle, 60 * 60)
+        return bundle
+
+    def build_bundle(self, event):
+        # Prime the foreign keys the templates use so they're
+        # pickled with the event.
+        event.template
+        event.picture
+        event.location
+
+        bundle = {
+            'event': event,
+            'unapproved': (
+                event.approval_set.filter(approved=False).exists()
+            ),
+            'needs_approval': event.needs_approval(),
+            'hits': None,
+            'tags': [t.name for t in event.tags.all()],
+            'channels': list(event.channels.all()),
+            'curated_groups': CuratedGroup.get_names(event),
+            'chapters': list(Chapter.objects.filter(
+                event=event,
+                is_active=True,
+            )),
+            'vidly_information': self.get_vidly_information(event, None),
+            'vidly_submission': None,
+            'discussion': None,
+            'closedcaptions': None,
+            'survey_id': None,
+            'csp_update': self._get_csp_update(event),
+        }
+
+        if event.template and not event.is_upcoming():
+            stats_query = (
+                EventHitStats.objects.filter(event=event)
+                .values_list('total_hits', flat=True)
+            )
+            for total_hits in stats_query:
+                bundle['hits'] = total_hits
+
+        if (
+            (event.is_processing() or event.is_pending()) and
+            event.duration and
+            event.template_environment.get('tag')
+        ):
+            vidly_submissions = (
+                VidlySubmission.objects
+                .filter(event=event, tag=event.template_environment.get('tag'))
+                .order_by('-submission_time')
+            )
+            for vidly_submission in vidly_submissions[:1]:
+                bundle['vidly_submission'] = vidly_submission
+
+        for discussion in Discussion.objects.filter(event=event):
+            bundle['discussion'] = discussion
+
+        # amara_videos = AmaraVideo.objects.filter(
+        #     event=event,
+        #     transcript__isnull=False,
+        # )
+        # context['amara_video'] = None
+        # for amara_video in amara_videos.order_by('-modified')[:1]:
+        #     context['amara_video'] = amara_video
+
+        connections = (
+            ClosedCaptionsTranscript.objects.filter(event=event)
+            .select_related('closedcaptions')
+        )
+        for connection in connections:
+            assert connection.closedcaptions.transcript
+            bundle['closedcaptions'] = connection.closedcaptions
+
+        for survey in Survey.objects.filter(events=event, active=True)[:1]:
+            bundle['survey_id'] = survey.id
+
+        return bundle
+
+    def get(self, request, slug):
+        bundle = self.get_bundle(slug, request)
+        if isinstance(bundle, http.HttpResponse):
+            return bundle
+        event = bundle['event']
 
         if not self.can_view_event(event, request):
             return self.cant_view_event(event, request)
@@ -353,14 +474,12 @@ class EventView(View):
             else:
                 warning = "Event is not publicly visible - not scheduled."
 
-        if event.approval_set.filter(approved=False).exists():
+        if bundle['unapproved']:
             if not request.user.is_active:
                 return http.HttpResponse('Event not approved')
             else:
                 warning = "Event is not publicly visible - not yet approved."
 
-        hits = None
-
         # assume this to false to start with
         can_edit_chapters = False
 
@@ -381,12 +500,6 @@ class EventView(View):
                 return http.HttpResponseBadRequest(
                     'Tag %s does not exist for this event' % (tag,)
                 )
-            stats_query = (
-                EventHitStats.objects.filter(event=event)
-                .values_list('total_hits', flat=True)
-            )
-            for total_hits in stats_query:
-                hits = total_hits
 
             # if the event has a template is not upcoming
             if not event.is_live() and event.is_scheduled():
@@ -408,10 +521,10 @@ class EventView(View):
             # So doing this comparison instead avoids causing a
             # select query on the auth_user table.
             request.user.pk == event.creator_id and
-            Discussion.objects.filter(event=event).exists()
+            bundle['discussion'] is not None
         )
 
-        request.channels = event.channels.all()
+        request.channels = bundle['channels']
 
         # needed for the open graph stuff
         event.url = reverse('main:event', args=(event.slug,))
@@ -426,23 +539,23 @@ class EventView(View):
             'can_edit_discussion': can_edit_discussion,
             'can_edit_chapters': can_edit_chapters,
             'Event': Event,
-            'hits': hits,
-            'tags': [t.name for t in event.tags.all()],
+            'hits': bundle['hits'],
+            'tags': bundle['tags'],
             'channels': request.channels,
             # needed for the _event_privacy.html template
-            'curated_groups': CuratedGroup.get_names(event),
+            'curated_groups': bundle['curated_groups'],
+            'chapters': bundle['chapters'],
+            'needs_approval': bundle['needs_approval'],
         })
 
-        context['chapters'] = Chapter.objects.filter(
-            event=event,
-            is_active=True,
-        )
-
         # By default, we want to hint in the DOM that this is an HD
         # video.
         context['hd'] = event.is_scheduled() and not event.is_upcoming()
 
-        vidly_tag, vidly_hd = self.get_vidly_information(event, tag)
+        if tag:
+            vidly_tag, vidly_hd = self.get_vidly_information(event, tag)
+        else:
+            vidly_tag, vidly_hd = bundle['vidly_information']
         if vidly_tag:
             context['vidly_tag'] = vidly_tag
             context['vidly_hd'] = vidly_hd
@@ -455,107 +568,73 @@ class EventView(View):
         # it will take until it's ready to be viewed.
         context['estimated_time_left'] = None
         context['time_run'] = None
-        if (
-            (event.is_processing() or event.is_pending()) and
-            event.duration and
-            event.template_environment.get('tag')
-        ):
-            vidly_submissions = (
-                VidlySubmission.objects
-                .filter(event=event, tag=event.template_environment.get('tag'))
-                .order_by('-submission_time')
+        vidly_submission = bundle['vidly_submission']
+        if vidly_submission:
+            context['estimated_time_left'] = (
+                vidly_submission.get_estimated_time_left()
+            )
+            context['time_run'] = (
+                (
+                    timezone.now() - vidly_submission.submission_time
+                ).seconds
             )
-            for vidly_submission in vidly_submissions[:1]:
-                context['estimated_time_left'] = (
-                    vidly_submission.get_estimated_time_left()
-                )
-                context['time_run'] = (
-                    (
-                        timezone.now() - vidly_submission.submission_time
-                    ).seconds
-                )
 
         if event.pin:
             if (
                 not request.user.is_authenticated() or
-                not is_employee(request.user)
+                not request.roles.employee
             ):
                 entered_pins = request.session.get('entered_pins', [])
                 if event.pin not in entered_pins:
                     self.template_name = 'main/event_requires_pin.html'
                     context['pin_form'] = forms.PinForm()
-        try:
-            context['discussion'] = Discussion.objects.get(event=event)
+        if bundle['discussion'] is not None:
+            context['discussion'] = bundle['discussion']
             # The name of the channel we publish to fanout on when there's
             # changes to this events comments.
             context['subscription_channel_comments'] = 'comments-{}'.format(
                 event.id
             )
-        except Discussion.DoesNotExist:
+        else:
             context['discussion'] = {'enabled': False}
 
         context['subscription_channel_status'] = 'event-{}'.format(event.id)
 
-        # amara_videos = AmaraVideo.objects.filter(
-        #     event=event,
-        #     transcript__isnull=False,
-        # )
-        # context['amara_video'] = None
-        # for amara_video in amara_videos.order_by('-modified')[:1]:
-        #     context['amara_video'] = amara_video
-
-        context['closedcaptions'] = None
-        for connection in ClosedCaptionsTranscript.objects.filter(event=event):
-            assert connection.closedcaptions.transcript
-            context['closedcaptions'] = connection.closedcaptions
-
-        cache_key = 'event_survey_id_%s' % event.id
-        context['survey_id'] = cache.get(cache_key, -1)
-        if context['survey_id'] == -1:  # not known in cache
-            try:
-                survey = Survey.objects.get(
-                    events=event,
-                    active=True
-                )
-                cache.set(cache_key, survey.id, 60 * 60 * 24)
-                context['survey_id'] = survey.id
-            except Survey.DoesNotExist:
-                cache.set(cache_key, None, 60 * 60 * 24)
-                context['survey_id'] = None
+        context['closedcaptions'] = bundle['closedcaptions']
+        context['survey_id'] = bundle['survey_id']
 
         if settings.LOG_SEARCHES:
             if request.session.get('logged_search'):
-                pk, time_ago = request.session.get('logged_search')
+                search_key, time_ago = request.session.pop('logged_search')
                 age = time.time() - time_ago
                 if age <= 5:
                     # the search was made less than 5 seconds ago
-                    try:
-                        logged_search = LoggedSearch.objects.get(pk=pk)
-                        logged_search.event_clicked = event
-                        logged_search.save()
-                    except LoggedSearch.DoesNotExist:
-                        pass
+                    searchlog.log_click(str(search_key), event)
 
         response = render(request, self.template_name, context)
-        self._set_csp_update(response, event)
+        if bundle['csp_update']:
+            response._csp_update = bundle['csp_update']
         return response
 
     def _set_csp_update(self, response, event):
+        update = self._get_csp_update(event)
+        if update:
+            response._csp_update = update
+
+    def _get_csp_update(self, event):
         """Hack alert!
         We need to, potentially, update the CSP at run time if the
         video you're trying to watch is a Vid.ly video.
         Vid.ly is embedded by simply using `https://vid.ly/:shortcode`
         but internally they will redirect to a AWS CloudFront domain
         which we might not have prepared in our CSP settings.
-        So let's update that on the fly.
+        So let's figure out what that update is, if any.
         """
         cache_key = 'custom_csp_update:{}'.format(event.id)
         update = cache.get(cache_key)
         if update is not None:
             # it was set, use that and exit early
-            if update:
-                response._csp_update = update
-            return
+            return update
 
         if not event.template:
             return
@@ -569,9 +648,7 @@ class EventView(View):
         tag = event.template_environment['tag']
         update = get_vidly_csp_headers(tag, private=not event.is_public())
         cache.set(cache_key, update, 60 * 60)
-        # Now we've figured out what headers to update, set it on the response
-        if update:
-            response._csp_update = update
+        return update
 
     def post(self, request, slug):
         event = get_object_or_404(Event, slug=slug)
@@ -697,7 +774,7 @@ def get_video_tagged(event, request, autoplay=False, tag=None):
 
     def poster_url(geometry='896x504', crop='center'):
         image = event.picture and event.picture.file or event.placeholder_img
-        return thumbnail(image, geometry, crop=crop).url
+        return thumbnail_manifest.get(image, geometry, crop=crop).url
 
     context = {
         'md5': lambda s: hashlib.md5(s).hexdigest(),
@@ -896,107 +973,26 @@ def find_related_events(
         boost_tags = settings.RELATED_CONTENT_BOOST_TAGS
     if size is None:
         size = settings.RELATED_CONTENT_SIZE
-    index = related.get_index()
-    doc_type = 'event'
-
-    es = related.get_connection()
-
-    fields = ['title']
-    if list(event.channels.all()) != [
-            Channel.objects.get(slug=settings.DEFAULT_CHANNEL_SLUG)]:
-        fields.append('channel')
-
-    mlt_queries = []
-    if use_title:
-        mlt_queries.append({
-            'more_like_this': {
-                'fields': ['title'],
-                # 'analyzer': 'snowball',
-                'docs': [
-                    {
-                        '_index': index,
-                        '_type': doc_type,
-                        '_id': event.id
-                    }],
-                'min_term_freq': 1,
-                'max_query_terms': 20,
-                'min_doc_freq': 1,
-                # 'max_doc_freq': 2,
-                # 'stop_words': ['your', 'about'],
-                'boost': boost_title,
-            }
-        })
-    if use_tags and event.tags.all().exists():
-        fields.append('tags')
-        mlt_queries.append({
-            'more_like_this': {
-                'fields': ['tags'],
-                'docs': [
-                    {
-                        '_index': index,
-                        '_type': doc_type,
-                        '_id': event.id
-                    }],
-                'min_term_freq': 1,
-                'max_query_terms': 20,
-                'min_doc_freq': 1,
-                'boost': boost_tags,
-            }
-        })
-
-    query_ = {
-        'bool': {
-            'should': mlt_queries,
-        }
-    }
 
     if user.is_active:
         if is_contributor(user):
-            query = {
-                'fields': fields,
-                'query': query_,
-                'filter': {
-                    'bool': {
-                        'must_not': {
-                            'term': {
-                                'privacy': Event.PRIVACY_COMPANY
-                            }
-                        }
-                    }
-                }
-            }
+            audience = Event.PRIVACY_CONTRIBUTORS
         else:
-            query = {
-                'fields': fields,
-                'query': query_
-            }
+            audience = Event.PRIVACY_COMPANY
     else:
-        query = {
-            'fields': fields,
-            'query': query_,
-            "filter": {
-                "bool": {
-                    "must": {
-                        "term": {"privacy": Event.PRIVACY_PUBLIC}
-                    }
-                }
-            }
-        }
-
-    ids = []
-    query['from'] = 0
-    query['size'] = size
-    query['explain'] = explain
-    hits = es.search(query, index=index)['hits']
-
-    scores = {}
-    explanations = []
-    for doc in hits['hits']:
-        _id = int(doc['_id'])
-        scores[_id] = doc['_score']
-        ids.append(_id)
-        if explain:
-            explanations.append(doc['_explanation'])
+        audience = Event.PRIVACY_PUBLIC
+
+    ids, scores, explanations = related.find(
+        event,
+        audience,
+        boost_title=boost_title,
+        boost_tags=boost_tags,
+        boost_channels=settings.RELATED_CONTENT_BOOST_CHANNELS,
+        size=size,
+        use_title=use_title,
+        use_tags=use_tags,
+        explain=explain,
+    )
 
     events = Event.objects.scheduled_or_processing().filter(id__in=ids)
 
@@ -1006,7 +1002,8 @@ def find_related_events(
     else:
         events = events.filter(privacy=Event.PRIVACY_PUBLIC)
 
-    events = sorted(events, key=lambda e: ids.index(e.id))
+    positions = dict((id, i) for i, id in enumerate(ids))
+    events = sorted(events, key=lambda e: positions[e.id])
 
     return (events, scores, explanations)
 
@@ -1017,7 +1014,7 @@ def channels(request):
     privacy_filter = {}
     privacy_exclude = {}
     if request.user.is_active:
-        if is_contributor(request.user):
+        if request.roles.contributor:
             feed_privacy = 'contributors'
             privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
         else:
@@ -1025,12 +1022,6 @@ def channels(request):
     else:
         privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
         feed_privacy = 'public'
-    events = Event.objects.filter(status=Event.STATUS_SCHEDULED)
-    if privacy_filter:
-        events = events.filter(**privacy_filter)
-    elif privacy_exclude:
-        events = events.exclude(**privacy_exclude)
-
     children_channels = Channel.objects.filter(
         parent__parent__isnull=True,
         parent__isnull=False,
@@ -1058,14 +1049,12 @@ def channels(request):
         subchannel_counts[each['parent_id']] = each['parent__count']
 
     # make a dict of events counts by channel
-    event_counts = {}
-    qs = (
-        Event.channels.through.objects.filter(event__in=events)
-        .values('channel_id')
-        .annotate(Count('channel'))
+    event_counts = EventCount.objects.get_counts(
+        'channel',
+        privacy_filter=privacy_filter,
+        privacy_exclude=privacy_exclude,
+        status=Event.STATUS_SCHEDULED,
     )
-    for each in qs:
-        event_counts[each['channel_id']] = each['channel__count']
 
     for channel in channels_qs:
         event_count = event_counts.get(channel.id, 0)
@@ -1093,20 +1082,18 @@ class _Tag(object):
 
 def tag_cloud(request, THRESHOLD=1):
     context = {}
-    qs = (
-        Event.tags.through.objects
-        .values('tag_id')
-        .annotate(Count('tag__id'))
-    )
+    privacy_filter = {}
+    privacy_exclude = {}
     if request.user.is_active:
-        if is_contributor(request.user):
-            # because of a bug in Django we can't use qs.exclude()
-            qs = qs.filter(
-                Q(event__privacy=Event.PRIVACY_CONTRIBUTORS) |
-                Q(event__privacy=Event.PRIVACY_PUBLIC)
-            )
+        if request.roles.contributor:
+            privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
     else:
-        qs = qs.filter(event__privacy=Event.PRIVACY_PUBLIC)
+        privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
+    counts = EventCount.objects.get_counts(
+        'tag',
+        privacy_filter=privacy_filter,
+        privacy_exclude=privacy_exclude,
+    )
     tags_map = dict(
         (x['id'], x['name'])
         for x in
@@ -1114,10 +1101,9 @@ def tag_cloud(request, THRESHOLD=1):
         .values('id', 'name')
     )
     tags = []
-    for each in qs.values('tag__id__count', 'tag_id'):
-        count = each['tag__id__count']
+    for tag_id, count in counts.items():
         if count > THRESHOLD:
-            tags.append(_Tag(tags_map[each['tag_id']], count))
+            tags.append(_Tag(tags_map[tag_id], count))
 
     context['tags'] = cloud.calculate_cloud(
         tags,
@@ -1130,7 +1116,7 @@ def permission_denied(request, slug):
     context = {}
     event = get_object_or_404(Event, slug=slug)
     context['event'] = event
-    context['is_contributor'] = is_contributor(request.user)
+    context['is_contributor'] = request.roles.contributor
     context['is_company_only'] = event.privacy == Event.PRIVACY_COMPANY
 
     curated_groups = CuratedGroup.objects.filter(event=event).order_by('name')
@@ -1162,8 +1148,6 @@ def contributors(request):
 def event_livehits(request, id):
     event = get_object_or_404(Event, id=id)
     if request.method == 'POST' and event.is_live():
-        live_hits, _ = EventLiveHits.objects.get_or_create(event=event)
-
         if request.user.is_authenticated():
             cache_key = 'event_livehits-%d' % request.user.id
         else:
@@ -1178,22 +1162,11 @@ def event_livehits(request, id):
                     cache_key += value
             cache_key = 'event_livehits' + hashlib.md5(cache_key).hexdigest()
             cache_key = cache_key[:30]
-        counted = cache.get(cache_key)
-        total_hits = live_hits.total_hits
-        if not counted:
-            # let's assume the longest possible time it's live is 12 hours
-            cache.set(cache_key, True, 60 * 60 * 12)
+        # let's assume the longest possible time it's live is 12 hours
+        if cache.add(cache_key, True, 60 * 60 * 12):
             # we need to increment!
-            (
-                EventLiveHits.objects.filter(event=event)
-                .update(total_hits=F('total_hits') + 1)
-            )
-            total_hits += 1
-    else:
-        try:
-            total_hits = EventLiveHits.objects.get(event=event).total_hits
-        except EventLiveHits.DoesNotExist:
-            total_hits = 0
+            livehits.count_hit(event.id)
+    total_hits = livehits.get_hits(event.id)
 
     return {'hits': total_hits}
 
@@ -1218,7 +1191,7 @@ def event_processing_timenails(request, slug):
     for picture in pictures.order_by('-timestamp')[:max_]:
         # NOTE! This code is the same as used
         # in then EventChaptersThumbnailsView.get view.
-        thumb = thumbnail(
+        thumb = thumbnail_manifest.get(
             picture.file, '160x90', crop='center'
         )
         pictures_.append({
@@ -1254,7 +1227,7 @@ def thumbnails(request):
     event = get_object_or_404(Event, id=id)
     thumbnails = []
     for picture in Picture.objects.filter(event=event).order_by('created'):
-        thumb = thumbnail(picture.file, geometry, crop='center')
+        thumb = thumbnail_manifest.get(picture.file, geometry, crop='center')
         thumbnails.append(thumb.url)
 
     return {'thumbnails': thumbnails}
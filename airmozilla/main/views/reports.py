@@ -10,12 +10,11 @@ from django.contrib.auth.decorators import login_required
 
 from airmozilla.main.models import (
     Event,
-    EventHitStats,
+    EventTrending,
     Tag,
     EventRevision,
     Picture
 )
-from airmozilla.main.views import is_contributor
 from airmozilla.main import forms
 
 
@@ -86,20 +85,11 @@ def executive_summary(request):
 
     # Now for stats on views, which is done by their archive date
     week_from_today = timezone.now() - datetime.timedelta(days=7)
-    stats = (
-        EventHitStats.objects
-        .exclude(event__archive_time__isnull=True)
-        .filter(
-            event__archive_time__lt=week_from_today,
-        )
-        .exclude(event__channels__exclude_from_trending=True)
-        .order_by('-score')
-        .extra(select={
-            'score': '(featured::int + 1) * total_hits'
-                     '/ extract(days from (now() - archive_time)) ^ 1.8',
-        })
-        .select_related('event')
-    )
+    stats = EventTrending.objects.filter(
+        channel__isnull=True,
+        audience=Event.PRIVACY_COMPANY,
+        archive_time__lt=week_from_today,
+    ).select_related('event').order_by('-score')
 
     prev_start = start_date - datetime.timedelta(days=7)
     now = timezone.now()
@@ -125,7 +115,7 @@ def unpicked_pictures(request):
     pictures = Picture.objects.filter(event__isnull=False)
     events = Event.objects.archived()
     assert request.user.is_active
-    if is_contributor(request.user):
+    if request.roles.contributor:
         events = events.exclude(privacy=Event.PRIVACY_COMPANY)
 
     events = events.filter(id__in=pictures.values('event'))
@@ -159,7 +149,7 @@ def too_few_tags(request):
         if form.is_valid():
             event = get_object_or_404(Event, id=form.cleaned_data['event_id'])
             assert request.user.is_active
-            if is_contributor(request.user):
+            if request.roles.contributor:
                 assert event.privacy != Event.PRIVACY_COMPANY
 
             if not EventRevision.objects.filter(event=event).count():
@@ -207,7 +197,7 @@ def too_few_tags(request):
     )
 
     assert request.user.is_active
-    if is_contributor(request.user):
+    if request.roles.contributor:
         few_tags = few_tags.exclude(event__privacy=Event.PRIVACY_COMPANY)
         zero_tags = zero_tags.exclude(privacy=Event.PRIVACY_COMPANY)
 
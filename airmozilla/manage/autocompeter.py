@@ -14,6 +14,7 @@ from django.core.exceptions import ImproperlyConfigured
 from django.core.urlresolvers import reverse
 
 from airmozilla.main.models import Event, EventHitStats, Approval, Channel
+from airmozilla.manage import export
 
 
 def _get_url():
@@ -26,9 +27,13 @@ def _get_url():
 
 def update(
     verbose=False, all=False, flush_first=False, max_=1000,
-    since=datetime.timedelta(minutes=60),
+    since=None,
     out=sys.stdout,
 ):
+    """Send the titles of the events, and the channels, to
+    autocompeter.com. If not `all`, only those modified after the ones
+    sent last time (or, the first time, in the last `since`) and at
+    most `max_` events."""
     if not getattr(settings, 'AUTOCOMPETER_KEY', None):
         if verbose:  # pragma: no cover
             print >>out, "Unable to submit titles to autocompeter.com"
@@ -52,135 +57,159 @@ def update(
         assert response.status_code == 204, response.status_code
 
     now = timezone.now()
-
+    since = since or datetime.timedelta(minutes=60)
     if all:
-        hits_map = dict(
-            EventHitStats.objects.all().values_list('event', 'total_hits')
-        )
-        values = hits_map.values()
-        if values:
-            median_hits = sorted(values)[len(values) / 2]
-        else:
-            median_hits = 0
-        events = Event.objects.scheduled_or_processing()
+        position = channels_position = None
+        limit = None
     else:
-        events = (
-            Event.objects.scheduled_or_processing()
-            .filter(modified__gte=now-since)[:max_]
-        )
-        if events:
-            # there are events, we'll need a hits_map and a median
+        position = export.get_start('autocompeter', since)
+        channels_position = export.get_start('autocompeter-channels', since)
+        limit = int(max_)
+
+    events = Event.objects.scheduled_or_processing()
+    if limit is not None:
+        previous = export.get_position('autocompeter')
+        if previous is not None:
+            # those sent again don't count
+            limit += export.count_between(events, position, previous)
+    # Where the events and the channels exported got to.
+    last = {}
+    popularities = []
+
+    def get_median_hits():
+        hits = EventHitStats.objects.all().order_by('total_hits')
+        count = hits.count()
+        if not count:
+            return 0
+        return hits.values_list('total_hits', flat=True)[count / 2]
+
+    def event_documents():
+        median_hits = None
+        for chunk in export.iter_chunks(events, after=position, limit=limit):
+            ids = [x.id for x in chunk]
             hits_map = dict(
-                EventHitStats.objects.filter(event__in=events)
-                .values_list('event', 'total_hits')
+                EventHitStats.objects.filter(event_id__in=ids)
+                .values_list('event_id', 'total_hits')
+            )
+            not_approved = set(
+                Approval.objects.filter(
+                    event_id__in=ids,
+                    approved=False,
+                ).values_list('event_id', flat=True)
             )
-            values = (
-                EventHitStats.objects.all()
-                .values_list('total_hits', flat=True)
+            title_counts = dict(
+                Event.objects.filter(title__in=set(x.title for x in chunk))
+                .values('title').annotate(count=Count('id'))
+                .values_list('title', 'count')
             )
-            if values:
-                median_hits = sorted(values)[len(values) / 2]
-            else:
-                median_hits = 0
-
-    title_counts = {}
-    # Only bother to set this up if there are events to loop over.
-    # Oftentimes the cronjob will trigger here with no new recently changed
-    # events and then the loop below ('for event in events:') will do nothing.
-    if events:
-        grouped_by_title = (
-            Event.objects.all().values('title').annotate(Count('title'))
+            for event in chunk:
+                url = reverse('main:event', args=(event.slug,))
+                title = event.title
+                if event.start_time > now:
+                    # future events can be important too
+                    if median_hits is None:
+                        median_hits = get_median_hits()
+                    popularity = median_hits
+                else:
+                    popularity = hits_map.get(event.id, 0)
+                if event.privacy == Event.PRIVACY_PUBLIC:
+                    group = ''
+                    if event.id in not_approved:
+                        group = Event.PRIVACY_CONTRIBUTORS
+                else:
+                    group = event.privacy
+
+                popularities.append(popularity)
+
+                if title_counts[title] > 1:
+                    title = '%s %s' % (
+                        title,
+                        event.start_time.strftime('%d %b %Y')
+                    )
+                yield {
+                    'title': title,
+                    'url': url,
+                    'popularity': popularity,
+                    'group': group,
+                }
+            last['events'] = (chunk[-1].modified, chunk[-1].id)
+
+    def channel_documents():
+        # Let's now also send all channels, that have a sub-channel or >=1
+        # events within.
+        channels_sub_count = defaultdict(int)
+        for channel_id, count in (
+            Event.channels.through.objects.values_list('channel_id')
+            .annotate(count=Count('id')).order_by()
+        ):
+            channels_sub_count[channel_id] += count
+        for parent_id in Channel.objects.filter(
+            never_show=False,
+            parent__isnull=False,
+        ).values_list('parent_id', flat=True):
+            channels_sub_count[parent_id] += 1
+
+        channels = Channel.objects.exclude(
+            Q(never_show=True) | Q(slug=settings.DEFAULT_CHANNEL_SLUG)
+        ).filter(
+            id__in=channels_sub_count
         )
-        for each in grouped_by_title:
-            title_counts[each['title']] = each['title__count']
 
-    not_approved = Approval.objects.filter(
-        event__in=events,
-        approved=False,
-    ).values_list('event_id', flat=True)
-
-    documents = []
-    popularities = []
-    for event in events:
-        url = reverse('main:event', args=(event.slug,))
-        title = event.title
-        if event.start_time > now:
-            # future events can be important too
-            popularity = median_hits
+        if popularities:
+            average_popularity = 1.0 * sum(popularities) / len(popularities)
         else:
-            hits = hits_map.get(event.id, 0)
-            popularity = hits
-        if event.privacy == Event.PRIVACY_PUBLIC:
-            group = ''
-            if event.id in not_approved:
-                group = Event.PRIVACY_CONTRIBUTORS
-        else:
-            group = event.privacy
-
-        popularities.append(popularity)
-
-        if title_counts[title] > 1:
-            title = '%s %s' % (title, event.start_time.strftime('%d %b %Y'))
-        documents.append({
-            'title': title,
-            'url': url,
-            'popularity': popularity,
-            'group': group,
-        })
-
-    # Let's now also send all channels, that have a sub-channel or >=1
-    # events within.
-    channels_sub_count = defaultdict(int)
-    for each in Event.channels.through.objects.all():
-        channels_sub_count[each.channel_id] += 1
-    for channel in Channel.objects.filter(never_show=False):
-        if channel.parent_id:
-            channels_sub_count[channel.parent_id] += 1
-
-    channels = Channel.objects.exclude(
-        Q(never_show=True) | Q(slug=settings.DEFAULT_CHANNEL_SLUG)
-    ).filter(
-        id__in=channels_sub_count
-    )
-    if not all:
-        # The autocompeter_update cron job runs every 10 minutes
-        then = timezone.now() - datetime.timedelta(minutes=10)
-        channels = channels.filter(modified__gt=then)
-
-    if popularities:
-        average_popularity = 1.0 * sum(popularities) / len(popularities)
-    else:
-        average_popularity = 1
-    for channel in channels:
-        average_popularity
-        documents.append({
-            'title': u'{} (Channel)'.format(channel.name),
-            'url': reverse('main:home_channels', args=(channel.slug,)),
-            'popularity': average_popularity,
-            'group': '',
-        })
-
-    if verbose:  # pragma: no cover
-        pprint(documents, stream=out)
-
-    if not documents:
+            average_popularity = 1
+        for chunk in export.iter_chunks(channels, after=channels_position):
+            for channel in chunk:
+                yield {
+                    'title': u'{} (Channel)'.format(channel.name),
+                    'url': reverse(
+                        'main:home_channels',
+                        args=(channel.slug,)
+                    ),
+                    'popularity': average_popularity,
+                    'group': '',
+                }
+            last['channels'] = (chunk[-1].modified, chunk[-1].id)
+
+    def serialized():
+        for documents in (event_documents(), channel_documents()):
+            for document in documents:
+                if verbose:  # pragma: no cover
+                    pprint(document, stream=out)
+                yield json.dumps(document)
+
+    count = 0
+    t0 = time.time()
+    for payload in export.iter_payloads(serialized()):
+        response = requests.post(
+            autocompeter_url + '/bulk',
+            data='{"documents": [%s]}' % ', '.join(payload),
+            headers={
+                'Auth-Key': settings.AUTOCOMPETER_KEY,
+            },
+        )
+        assert response.status_code == 201, response.status_code
+        count += len(payload)
         if verbose:  # pragma: no cover
-            print >>out, "No documents."
-        return
+            print >>out, response
+    t1 = time.time()
 
-    t0 = time.time()
-    response = requests.post(
-        autocompeter_url + '/bulk',
-        data=json.dumps({'documents': documents}),
-        headers={
-            'Auth-Key': settings.AUTOCOMPETER_KEY,
-        },
+    # Only now that they've all been sent do we remember how far we got.
+    export.set_position(
+        'autocompeter',
+        last.get('events', position or (now, 0))
     )
-    t1 = time.time()
-    assert response.status_code == 201, response.status_code
+    export.set_position(
+        'autocompeter-channels',
+        last.get('channels', channels_position or (now, 0))
+    )
+
     if verbose:  # pragma: no cover
-        print >>out, response
-        print >>out, "Took", t1 - t0, "seconds to bulk submit"
+        if count:
+            print >>out, "Took", t1 - t0, "seconds to bulk submit", count
+        else:
+            print >>out, "No documents."
 
 
 def stats():
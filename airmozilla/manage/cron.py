@@ -5,6 +5,7 @@ from django.core.cache import cache
 import cronjobs
 
 from airmozilla.cronlogger.decorators import capture
+from airmozilla.main.models import EventTrending
 from . import tweeter
 from . import pestering
 from . import event_hit_stats
@@ -14,6 +15,7 @@ from . import vidly_synchronization
 from . import autocompeter
 from . import related
 from . import vidly_submissions
+from . import dashboard
 
 
 @cronjobs.register
@@ -44,10 +46,13 @@ def auto_archive():
 @cronjobs.register
 @capture
 def update_event_hit_stats():
-    event_hit_stats.update(
-        cap=25,
-        swallow_errors=True,
-    )
+    with EventTrending.objects.paused():
+        event_hit_stats.update(
+            cap=100,
+            swallow_errors=True,
+        )
+    # the scores go down every day even if the hits don't change
+    EventTrending.objects.refresh()
 
 
 @cronjobs.register
@@ -103,10 +108,7 @@ def autocompeter_reset():
 @cronjobs.register
 @capture
 def autocompeter_update():
-    autocompeter.update(
-        # this number is supposed to match that of the cronjob itself
-        since=datetime.timedelta(minutes=10)
-    )
+    autocompeter.update()
 
 
 @cronjobs.register
@@ -125,3 +127,9 @@ def related_content_index():
 @capture
 def failed_vidly_submissions():
     vidly_submissions.resubmit_failures(verbose=True)
+
+
+@cronjobs.register
+@capture
+def dashboard_rollup():
+    dashboard.rollup(verbose=True)
@@ -0,0 +1,243 @@
+"""The numbers on the manage dashboard.
+
+Each metric is something counted (or summed) per day by a date field.
+Counting over short periods is done on the fly but for the long ones
+(this year, last year and ever) it would mean going through most of
+the rows every time. So, every night, `rollup()` stores a value per
+day and metric in `DailyRollup` and the dashboard adds up those for
+the days that have been rolled up and only counts on the fly what's
+happened since.
+"""
+import datetime
+from collections import namedtuple
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Case, Count, F, Max, Sum
+from django.db.models import Value, When
+from django.utils import timezone
+
+from airmozilla.main.models import (
+    Event,
+    SuggestedEvent,
+    Picture,
+    EventRevision,
+    Chapter,
+    DailyRollup,
+)
+from airmozilla.starred.models import StarredEvent
+from airmozilla.comments.models import Comment
+from airmozilla.uploads.models import Upload
+
+
+Metric = namedtuple('Metric', 'name get_queryset key value')
+
+METRICS = (
+    Metric(
+        'events',
+        lambda: Event.objects.exclude(status=Event.STATUS_REMOVED),
+        'start_time',
+        None,
+    ),
+    Metric('suggested_events', SuggestedEvent.objects.all, 'created', None),
+    Metric('users', User.objects.all, 'date_joined', None),
+    Metric('comments', Comment.objects.all, 'created', None),
+    Metric('event_revisions', EventRevision.objects.all, 'created', None),
+    Metric('pictures', Picture.objects.all, 'created', None),
+    Metric('chapters', Chapter.objects.all, 'created', None),
+    Metric('starred_events', StarredEvent.objects.all, 'created', None),
+    Metric(
+        'event_durations',
+        lambda: Event.objects.exclude(duration__isnull=True),
+        'start_time',
+        'duration',
+    ),
+    Metric('upload_sizes', Upload.objects.all, 'created', 'size'),
+    # Only used for the graphs
+    Metric(
+        'archived_events',
+        lambda: Event.objects.filter(archive_time__lt=timezone.now()),
+        'created',
+        None,
+    ),
+)
+
+# The periods that are added up from the rollups
+ROLLUP_PERIODS = ('this_year', 'last_year', 'ever')
+
+
+def get_today():
+    return timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _to_datetime(date):
+    return datetime.datetime.combine(
+        date,
+        datetime.time(0, 0)
+    ).replace(tzinfo=timezone.utc)
+
+
+def _aggregate(metric):
+    if metric.value:
+        return Sum(metric.value)
+    return Count('id')
+
+
+def aggregate_periods(metric, periods):
+    """Return the count (or sum) for every period in one query.
+    `periods` is a dict of name -> (gte, lt) where either can be None.
+    """
+    aggregates = {}
+    for name, (gte, lt) in periods.items():
+        if gte is not None and lt is not None and gte >= lt:
+            continue
+        conditions = {}
+        if gte is not None:
+            conditions[metric.key + '__gte'] = gte
+        if lt is not None:
+            conditions[metric.key + '__lt'] = lt
+        if not conditions:
+            aggregates[name] = _aggregate(metric)
+            continue
+        aggregates[name] = Sum(Case(
+            When(
+                then=F(metric.value) if metric.value else Value(1),
+                **conditions
+            ),
+            default=Value(0),
+            output_field=BigIntegerField(),
+        ))
+    if aggregates:
+        values = metric.get_queryset().aggregate(**aggregates)
+    else:
+        values = {}
+    return dict((name, values.get(name) or 0) for name in periods)
+
+
+def get_rolled_up_until():
+    """Return a dict of metric name -> the datetime up to which there
+    are rollups for it."""
+    return dict(
+        (name, _to_datetime(date + datetime.timedelta(days=1)))
+        for name, date in (
+            DailyRollup.objects
+            .values_list('metric')
+            .annotate(Max('date'))
+            .order_by()
+        )
+    )
+
+
+def sum_rollups(periods):
+    """Return the sum of the rollups for each metric and period in one
+    query. `periods` is a dict of (metric name, period name) ->
+    (gte, lt) where `gte` can be None."""
+    aggregates = {}
+    keys = {}
+    for i, ((name, period), (gte, lt)) in enumerate(periods.items()):
+        conditions = {'metric': name, 'date__lt': lt.date()}
+        if gte is not None:
+            conditions['date__gte'] = gte.date()
+        alias = 'sum_%d' % i
+        keys[alias] = (name, period)
+        aggregates[alias] = Sum(Case(
+            When(then=F('value'), **conditions),
+            default=Value(0),
+            output_field=BigIntegerField(),
+        ))
+    if not aggregates:
+        return {}
+    values = DailyRollup.objects.aggregate(**aggregates)
+    return dict(
+        (keys[alias], value or 0) for alias, value in values.items()
+    )
+
+
+def get_counts(periods):
+    """Return a dict of metric name -> dict of period name -> value.
+
+    The ROLLUP_PERIODS are split in what's been rolled up already and
+    what hasn't.
+    """
+    rolled_up_until = get_rolled_up_until()
+    counts = {}
+    rollup_periods = {}
+    for metric in METRICS:
+        live_periods = {}
+        until = rolled_up_until.get(metric.name)
+        for period, (gte, lt) in periods.items():
+            if until and period in ROLLUP_PERIODS and (
+                gte is None or gte < until
+            ):
+                rollup_periods[(metric.name, period)] = (
+                    gte,
+                    min(lt, until) if lt else until
+                )
+                gte = until if gte is None else max(gte, until)
+            live_periods[period] = (gte, lt)
+        counts[metric.name] = aggregate_periods(metric, live_periods)
+
+    for (name, period), value in sum_rollups(rollup_periods).items():
+        counts[name][period] += value
+    return counts
+
+
+def daily_values(metric, since=None, until=None):
+    """Return a dict of date -> value for every day with something."""
+    qs = metric.get_queryset()
+    if since is not None:
+        qs = qs.filter(**{metric.key + '__gte': since})
+    if until is not None:
+        qs = qs.filter(**{metric.key + '__lt': until})
+    column = '{}.{}'.format(
+        connection.ops.quote_name(qs.model._meta.db_table),
+        connection.ops.quote_name(
+            qs.model._meta.get_field(metric.key).column
+        ),
+    )
+    qs = (
+        qs.extra(select={'day': 'DATE({})'.format(column)})
+        .values('day')
+        .annotate(total=_aggregate(metric))
+        .order_by()
+    )
+    return dict(
+        (row['day'], row['total'] or 0) for row in qs
+    )
+
+
+def rollup(since=None, verbose=False):
+    """Calculate the daily rollups for every metric for all the days
+    before today. Every day gets a row, even if the value is 0.
+    By default it starts from the very first day. If `since` is a
+    date it only recalculates from that day."""
+    today = get_today()
+    for metric in METRICS:
+        values = daily_values(
+            metric,
+            since=since and _to_datetime(since),
+            until=today,
+        )
+        if not values and not since:
+            continue
+        day = since or min(values)
+        rows = []
+        while day < today.date():
+            rows.append(DailyRollup(
+                metric=metric.name,
+                date=day,
+                value=values.get(day, 0),
+            ))
+            day += datetime.timedelta(days=1)
+        with transaction.atomic():
+            existing = DailyRollup.objects.filter(metric=metric.name)
+            if since:
+                existing = existing.filter(date__gte=since)
+            existing.delete()
+            DailyRollup.objects.bulk_create(rows)
+        if verbose:  # pragma: no cover
+            print "{:<20} {:>6} days {:>12}".format(
+                metric.name,
+                len(rows),
+                sum(row.value for row in rows),
+            )
@@ -1,16 +1,127 @@
-import logging
+"""Keeping the EventHitStats (total number of hits on Vid.ly) up to date.
+
+Every EventHitStats has a `next_refresh`. When it's refreshed, the
+number of new hits is recorded as an EventHitStatsSample and from the
+recent samples we work out its `velocity` (hits per hour). The faster
+the hits are coming in, the sooner it's due again. If it's not getting
+any hits it's refreshed less and less often the older it gets.
+
+Each run only asks Vid.ly about so many (the budget). Of those that are
+due, the ones that we think have the most hits we don't know about yet
+go first.
+"""
 import datetime
+import heapq
+import logging
 
+from django.db.models import Sum
 from django.utils import timezone
 
-from airmozilla.main.models import Event, EventHitStats
+from airmozilla.main.models import Event, EventHitStats, EventHitStatsSample
 from . import vidly
 
 
+# no point refreshing more often than the cron job runs
+MIN_INTERVAL = datetime.timedelta(minutes=30)
+MAX_INTERVAL = datetime.timedelta(days=7)
+# when no hits are coming in, how often depending on how long ago it
+# was archived
+AGE_INTERVALS = (
+    (datetime.timedelta(days=1), datetime.timedelta(hours=1)),
+    (datetime.timedelta(days=7), datetime.timedelta(days=1)),
+)
+# roughly how many hits we're prepared to not know about
+HITS_PER_REFRESH = 100
+# the samples in this period are used to work out the velocity
+VELOCITY_WINDOW = datetime.timedelta(days=3)
+# the samples are kept this long
+SAMPLES_MAX_AGE = datetime.timedelta(days=30)
+# so that, among those with no hits, the stalest goes first
+MIN_VELOCITY = 0.01
+
+
+def get_interval(velocity, age):
+    """Return how long to wait before refreshing the stats of an
+    event that gets `velocity` hits per hour and was archived `age`
+    (a timedelta) ago."""
+    interval = MAX_INTERVAL
+    for max_age, age_interval in AGE_INTERVALS:
+        if age < max_age:
+            interval = age_interval
+            break
+    if velocity > 0:
+        interval = min(
+            interval,
+            datetime.timedelta(hours=HITS_PER_REFRESH / velocity)
+        )
+    return max(interval, MIN_INTERVAL)
+
+
+def get_priority(velocity, modified, now):
+    """Roughly how many hits have happened since it was last refreshed
+    that we don't know about."""
+    hours = (now - modified).total_seconds() / 3600
+    return max(velocity, MIN_VELOCITY) * hours
+
+
+def get_velocities(event_ids, now):
+    """Return a dict of event ID -> hits per hour according to the
+    samples in the last VELOCITY_WINDOW."""
+    samples = (
+        EventHitStatsSample.objects
+        .filter(
+            event_id__in=event_ids,
+            created__gt=now - VELOCITY_WINDOW
+        )
+        .values('event_id')
+        .annotate(hits=Sum('hits'), seconds=Sum('seconds'))
+    )
+    velocities = {}
+    for sample in samples:
+        if sample['seconds']:
+            velocities[sample['event_id']] = (
+                3600.0 * sample['hits'] / sample['seconds']
+            )
+    return velocities
+
+
+def get_staleness(now=None):
+    """Return the number of stats, how many of them are overdue, the
+    average number of seconds since they were refreshed and that same
+    average weighted by how many hits each event gets."""
+    now = now or timezone.now()
+    count = overdue = 0
+    total = weighted_total = weights = 0.0
+    for velocity, modified, next_refresh in (
+        EventHitStats.objects
+        .values_list('velocity', 'modified', 'next_refresh')
+        .iterator()
+    ):
+        seconds = (now - modified).total_seconds()
+        count += 1
+        if next_refresh < now:
+            overdue += 1
+        total += seconds
+        weight = max(velocity, MIN_VELOCITY)
+        weighted_total += weight * seconds
+        weights += weight
+    return {
+        'count': count,
+        'overdue': overdue,
+        'average': count and total / count,
+        'weighted_average': weights and weighted_total / weights,
+    }
+
+
+def _get_age(event, now):
+    return now - (event.archive_time or event.modified)
+
+
 # this is what the cron job fires every X minutes
 def update(cap=10, swallow_errors=False):
-    count = 0
-
+    """Download the stats of at most `cap` events. Those that have
+    never been downloaded go first."""
+    now = timezone.now()
     # first do those that have never been updated
     _stats_ids_qs = (
         EventHitStats.objects.all()
@@ -24,98 +135,124 @@ def update(cap=10, swallow_errors=False):
         .exclude(id__in=_stats_ids_qs)
     )
 
+    new_events = []
     for event in qs.order_by('created')[:cap]:  # oldest first
         environment = event.template_environment or {}
         tag = environment.get('tag')
         if not tag or tag == 'None':
             logging.warn("Event %r does not have a Vid.ly tag", event.title)
             continue
+        new_events.append((event, tag))
 
-        try:
-            hits = vidly.statistics(tag)['total_hits']
-            count += 1
-        except:
-            if not swallow_errors:
-                raise
-            logging.error(
-                "Unable to download statistics for %r (tag: %s)",
-                event.title, tag
-            )
-            hits = 0
-
-        EventHitStats.objects.create(
-            event=event,
-            total_hits=hits,
-            shortcode=tag
+    # then, with what's left of the budget, those that are due
+    due = (
+        EventHitStats.objects
+        .filter(next_refresh__lte=now)
+        .values_list('id', 'velocity', 'modified')
+    )
+    ids = [
+        id for id, velocity, modified in heapq.nlargest(
+            max(cap - len(new_events), 0),
+            due,
+            key=lambda x: get_priority(x[1], x[2], now)
         )
-
-    def update_qs(qs):
-        count = 0
-        # oldest first
-        for stat in qs.order_by('modified')[:cap]:
-            total_hits_before = stat.total_hits
-            # if the event more recently modified than the EventHitStats
-            # the re-read the tag in case it has changed
-            if stat.event.modified > stat.modified:
-                environment = stat.event.template_environment or {}
-                tag = environment.get('tag')
-                if not tag:
-                    logging.warn(
-                        "Event %r does not have a Vid.ly tag",
-                        stat.event.title
-                    )
-                    stat.delete()
-                    continue
-                stat.shortcode = tag
-            shortcode = stat.shortcode
-            try:
-                hits = vidly.statistics(shortcode)['total_hits']
-                count += 1
-            except:
-                if not swallow_errors:
-                    raise
-                logging.error(
-                    "Unable to download statistics for %r (tag: %s)",
-                    stat.event.title, shortcode
+    ]
+    stats = []
+    unordered = EventHitStats.objects.select_related('event').in_bulk(ids)
+    for stat in (unordered[id] for id in ids):
+        # if the event more recently modified than the EventHitStats
+        # the re-read the tag in case it has changed
+        if stat.event.modified > stat.modified:
+            environment = stat.event.template_environment or {}
+            tag = environment.get('tag')
+            if not tag:
+                logging.warn(
+                    "Event %r does not have a Vid.ly tag",
+                    stat.event.title
                 )
-                # we'll come back some other time
-                hits = total_hits_before
+                stat.delete()
+                continue
+            stat.shortcode = tag
+        stats.append(stat)
 
-            if hits >= total_hits_before:
-                stat.total_hits = hits
+    shortcodes = [shortcode for __, shortcode in new_events]
+    shortcodes.extend(stat.shortcode for stat in stats)
+    if not shortcodes:
+        return 0
+    # Download all the statistics in parallel.
+    results, errors = vidly.VidlyClient().statistics_many(shortcodes)
+    if errors and not swallow_errors:
+        raise errors.values()[0]
 
-            stat.save()
-        return count
+    def get_hits(event, shortcode):
+        if results.get(shortcode):
+            return results[shortcode]['total_hits']
+        logging.error(
+            "Unable to download statistics for %r (tag: %s)",
+            event.title, shortcode
+        )
 
-    # Old one only get updated once a week
-    now = timezone.now()
-    week_ago = now - datetime.timedelta(days=7)
-    qs = (
-        EventHitStats.objects
-        .filter(event__modified__lt=week_ago)
-        .filter(modified__lt=week_ago)
-    )
-    count += update_qs(qs)
+    count = 0
+    samples = []
+    refreshed = []
+    for event, tag in new_events:
+        hits = get_hits(event, tag)
+        stat = EventHitStats(event=event, total_hits=0, shortcode=tag)
+        if hits is None:
+            # it's due again straight away
+            stat.save()
+            continue
+        count += 1
+        stat.total_hits = hits
+        samples.append(EventHitStatsSample(
+            event=event,
+            hits=hits,
+            seconds=_get_age(event, now).total_seconds(),
+            created=now,
+        ))
+        refreshed.append(stat)
 
-    # Less old ones only get update once a day
-    day_ago = now - datetime.timedelta(days=1)
-    qs = (
-        EventHitStats.objects
-        .filter(event__modified__lt=day_ago,
-                event__modified__gt=week_ago)
-        .filter(modified__lt=day_ago)
-    )
+    for stat in stats:
+        hits = get_hits(stat.event, stat.shortcode)
+        if hits is None:
+            # we'll come back some other time
+            EventHitStats.objects.filter(id=stat.id).update(
+                next_refresh=now + get_interval(
+                    stat.velocity,
+                    _get_age(stat.event, now)
+                )
+            )
+            continue
+        count += 1
+        if stat.total_hits:
+            seconds = (now - stat.modified).total_seconds()
+        else:
+            # Either it's never had any hits or the first download
+            # failed. Either way, these hits could have come in any
+            # time since it was archived.
+            seconds = _get_age(stat.event, now).total_seconds()
+        samples.append(EventHitStatsSample(
+            event=stat.event,
+            hits=max(hits - stat.total_hits, 0),
+            seconds=seconds,
+            created=now,
+        ))
+        if hits >= stat.total_hits:
+            stat.total_hits = hits
+        refreshed.append(stat)
 
-    count += update_qs(qs)
+    EventHitStatsSample.objects.bulk_create(samples)
+    velocities = get_velocities([x.event_id for x in refreshed], now)
+    for stat in refreshed:
+        stat.velocity = velocities.get(stat.event_id, 0.0)
+        stat.next_refresh = now + get_interval(
+            stat.velocity,
+            _get_age(stat.event, now)
+        )
+        stat.save()
 
-    # Recent ones get updated every hour
-    hour_ago = now - datetime.timedelta(hours=1)
-    qs = (
-        EventHitStats.objects
-        .filter(event__modified__lt=hour_ago,
-                event__modified__gt=day_ago)
-        .filter(modified__lt=hour_ago)
-    )
-    count += update_qs(qs)
+    EventHitStatsSample.objects.filter(
+        created__lt=now - SAMPLES_MAX_AGE
+    ).delete()
 
     return count
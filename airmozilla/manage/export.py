@@ -0,0 +1,116 @@
+"""Streaming lots of things (usually events) out to the services that
+index them, like Elasticsearch and autocompeter.com.
+
+Rather than loading everything at once, querysets are read in chunks
+ordered by (`modified`, `id`), each chunk starting right after the last
+one, and the serialized documents are grouped into payloads of a
+bounded size. That same (`modified`, `id`) position is what incremental
+exports remember (in `ExportPosition`) so the next one carries on
+where the previous one stopped.
+
+`modified` is set before the transaction saving it is committed, so a
+row can become visible after an export has already gone past its
+`modified`. That's why the next export starts `OVERLAP` before where
+the previous one stopped, sending some things again.
+"""
+import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+from airmozilla.main.models import ExportPosition
+
+
+CHUNK_SIZE = 500
+
+# Longer than any transaction that saves what's exported.
+OVERLAP = datetime.timedelta(minutes=5)
+
+
+def get_position(name):
+    """Return the (modified, id) of the last thing exported or None."""
+    for modified, last_id in ExportPosition.objects.filter(
+        name=name
+    ).values_list('modified', 'last_id'):
+        return modified, last_id
+
+
+def get_start(name, default):
+    """Return where an incremental export called `name` should start.
+    That's `OVERLAP` before what was exported last time or, the very
+    first time, whatever was modified in the last `default`
+    (a timedelta)."""
+    position = get_position(name)
+    if position is None:
+        return (timezone.now() - default, 0)
+    modified, __ = position
+    return (modified - OVERLAP, 0)
+
+
+def set_position(name, position):
+    """Remember how far an export got. It never goes back."""
+    modified, last_id = position
+    previous = get_position(name)
+    if previous is not None and previous >= (modified, last_id):
+        return
+    ExportPosition.objects.update_or_create(
+        name=name,
+        defaults={'modified': modified, 'last_id': last_id}
+    )
+
+
+def _after(position):
+    modified, last_id = position
+    return Q(modified__gt=modified) | Q(modified=modified, id__gt=last_id)
+
+
+def count_between(queryset, after, until):
+    """Return how many objects come after the `after` position up to
+    and including the `until` one. Like those sent again because of
+    the `OVERLAP`."""
+    return queryset.filter(_after(after)).exclude(_after(until)).count()
+
+
+def iter_chunks(queryset, after=None, limit=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of at most `chunk_size` objects, ordered by
+    (`modified`, `id`), that come after the `after` position.
+    Anything like `prefetch_related()` on the queryset is done per
+    chunk. If `limit` is set, stop after that many in total.
+    """
+    queryset = queryset.order_by('modified', 'id')
+    count = 0
+    while limit is None or count < limit:
+        qs = queryset
+        if after is not None:
+            qs = qs.filter(_after(after))
+        size = chunk_size
+        if limit is not None:
+            size = min(size, limit - count)
+        chunk = list(qs[:size])
+        if not chunk:
+            return
+        yield chunk
+        count += len(chunk)
+        after = (chunk[-1].modified, chunk[-1].id)
+        if len(chunk) < size:
+            return
+
+
+def iter_payloads(documents, max_documents=500, max_bytes=1024 * 1024):
+    """Group an iterable of serialized documents (strings) into lists
+    that have at most `max_documents` and, unless a single document is
+    bigger than that, at most `max_bytes` in total."""
+    payload = []
+    size = 0
+    for document in documents:
+        if payload and (
+            len(payload) >= max_documents or
+            size + len(document) > max_bytes
+        ):
+            yield payload
+            payload = []
+            size = 0
+        payload.append(document)
+        size += len(document)
+    if payload:
+        yield payload
@@ -1043,6 +1043,56 @@ class ISODateTimeField(forms.DateTimeField):
 class EventsDataForm(BaseForm):
 
     since = ISODateTimeField(required=False)
+    sort = forms.ChoiceField(
+        required=False,
+        choices=(
+            ('modified', 'Modified'),
+            ('start_time', 'Start time'),
+            ('title', 'Title'),
+        )
+    )
+    reverse = forms.BooleanField(required=False)
+    # keyset pagination cursors as returned in the previous response
+    after = forms.CharField(required=False)
+    before = forms.CharField(required=False)
+    title = forms.CharField(required=False)
+    location = forms.CharField(required=False)
+    channel = forms.CharField(required=False)
+    status = forms.ChoiceField(
+        required=False,
+        choices=(('', ''),) + Event.STATUS_CHOICES
+    )
+    privacy = forms.ChoiceField(
+        required=False,
+        choices=(('', ''),) + Event.PRIVACY_CHOICES
+    )
+    archived = forms.ChoiceField(
+        required=False,
+        choices=(
+            ('', ''),
+            ('archived', 'Archived'),
+            ('not-archived', 'Not archived'),
+        )
+    )
+    start_time = forms.DateField(required=False)
+    only = forms.ChoiceField(
+        required=False,
+        choices=(
+            ('', ''),
+            ('live', 'Live'),
+            ('upcoming', 'Upcoming'),
+            ('needs_approval', 'Needs approval'),
+            ('pictureless', 'Pictureless'),
+        )
+    )
+
+    def clean(self):
+        cleaned_data = super(EventsDataForm, self).clean()
+        if cleaned_data.get('after') and cleaned_data.get('before'):
+            raise forms.ValidationError(
+                "Can't paginate both after and before"
+            )
+        return cleaned_data
 
 
 class TriggerErrorForm(BaseForm):
@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from airmozilla.manage import vidly
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Compare fetching Vid.ly statistics one at a time against '
+        'doing it with the pooled and parallel VidlyClient. '
+        'Point it at the mock server in vidlyserver/ with, for example, '
+        '`python app.py --port=9999 --delay=0.1` '
+        'and `--url=http://localhost:9999/`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            action='store',
+            dest='url',
+            default='http://localhost:9999/',
+            help='Vid.ly API URL (default http://localhost:9999/)'
+        )
+        parser.add_argument(
+            '--tags',
+            action='store',
+            dest='tags',
+            default=100,
+            help='Number of different tags to fetch (default 100)'
+        )
+        parser.add_argument(
+            '--workers',
+            action='store',
+            dest='workers',
+            default=settings.VIDLY_API_WORKERS,
+            help='Number of threads for the VidlyClient (default %s)' % (
+                settings.VIDLY_API_WORKERS,
+            )
+        )
+
+    def handle(self, **options):
+        settings.VIDLY_API_URL = options['url']
+        tags = ['bench{}'.format(i) for i in range(int(options['tags']))]
+
+        def serial():
+            for tag in tags:
+                vidly.statistics(tag)
+
+        def parallel():
+            client = vidly.VidlyClient(workers=int(options['workers']))
+            results, errors = client.statistics_many(tags)
+            assert not errors, errors
+
+        for label, function in (
+            ('One by one', serial),
+            ('VidlyClient', parallel),
+        ):
+            t0 = time.time()
+            function()
+            t1 = time.time()
+            print "{:<12} {:>8.1f}s {:>8.1f} calls per second".format(
+                label,
+                t1 - t0,
+                len(tags) / (t1 - t0),
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from airmozilla.main.models import EventCount
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Re-calculate all the materialized event counts per channel '
+        'and per tag.'
+    )
+
+    def handle(self, **options):
+        verbosity = int(options['verbosity'])
+        EventCount.objects.rebuild(verbose=verbosity > 1)
+        if verbosity:
+            print "{} event count rows".format(EventCount.objects.count())
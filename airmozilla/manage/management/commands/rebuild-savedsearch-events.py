@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from airmozilla.search.models import SavedSearch, SavedSearchEvent
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Re-calculate which events match every saved search. '
+        'Normally this is kept up to date as events change.'
+    )
+
+    def handle(self, **options):
+        verbosity = int(options['verbosity'])
+        for savedsearch in SavedSearch.objects.all().order_by('id'):
+            savedsearch.refresh_events()
+            if verbosity > 1:
+                print "Saved search {:<6} {:>6} events".format(
+                    savedsearch.id,
+                    savedsearch.get_events().count(),
+                )
+        if verbosity:
+            print "{} saved search event rows".format(
+                SavedSearchEvent.objects.count()
+            )
@@ -0,0 +1,31 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from airmozilla.manage.dashboard import rollup
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Re-calculate the daily rollups for the manage dashboard. '
+        'The dashboard_rollup cron job does this every night.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            action='store',
+            dest='days',
+            default=None,
+            help='Only recalculate the last N days (default is all)'
+        )
+
+    def handle(self, **options):
+        since = None
+        if options['days']:
+            since = (
+                datetime.datetime.utcnow().date() -
+                datetime.timedelta(days=int(options['days']))
+            )
+        rollup(since=since, verbose=int(options['verbosity']) > 1)
@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from airmozilla.search.searchlog import rollup
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Re-calculate the daily rollups of the logged searches. '
+        'The logged_searches_rollup cron job does this every night.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            action='store',
+            dest='days',
+            default=None,
+            help='Only recalculate the last N days (default is all)'
+        )
+
+    def handle(self, **options):
+        if options['days']:
+            since = (
+                datetime.datetime.utcnow().date() -
+                datetime.timedelta(days=int(options['days']))
+            )
+        else:
+            since = datetime.date.min
+        rollup(since=since, verbose=int(options['verbosity']) > 1)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from airmozilla.main.search_vectors import update_search_vectors
+
+
+class Command(BaseCommand):  # pragma: no cover
+
+    help = (
+        'Backfill the pre-computed full-text search vectors of events. '
+        'Needs to be run once after the column has been added.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Re-compute all, not just those missing'
+        )
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            default=500,
+            help='Number of events per UPDATE (default 500)'
+        )
+
+    def handle(self, **options):
+        verbosity = int(options['verbosity'])
+        count = update_search_vectors(
+            all=options['all'],
+            batch_size=int(options['batch_size']),
+            verbose=verbosity > 1,
+        )
+        if verbosity:
+            print "Updated the search vector of {} events".format(count)
@@ -1,11 +1,45 @@
+from django.conf import settings
 from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.dispatch import receiver
 from django.db import models
 
+from airmozilla.main.models import Event
+from airmozilla.manage import related_local
+
 
 @receiver(models.signals.post_save, sender=User)
 @receiver(models.signals.m2m_changed, sender=User.groups.through)
 def invalidate_user_cache(sender, instance, **kwargs):
     cache_key = '_get_all_users'
     cache.delete(cache_key)
+
+
+@receiver(models.signals.post_save, sender=Event)
+def event_update_related_index(sender, instance, raw=False, **kwargs):
+    if raw or settings.RELATED_CONTENT_BACKEND != 'local':
+        return
+    related_local.update(instance)
+
+
+@receiver(models.signals.post_delete, sender=Event)
+def event_remove_related_index(sender, instance, **kwargs):
+    if settings.RELATED_CONTENT_BACKEND != 'local':
+        return
+    related_local.remove(instance.id)
+
+
+@receiver(models.signals.m2m_changed, sender=Event.channels.through)
+@receiver(models.signals.m2m_changed, sender=Event.tags.through)
+def event_m2m_update_related_index(sender, instance, action, reverse,
+                                   pk_set, **kwargs):
+    if (
+        settings.RELATED_CONTENT_BACKEND != 'local' or
+        not action.startswith('post_')
+    ):
+        return
+    if reverse:
+        for event in Event.objects.filter(id__in=pk_set or []):
+            related_local.update(event)
+    else:
+        related_local.update(instance)
@@ -7,18 +7,26 @@ from django.utils import timezone
 from django.contrib.sites.models import Site
 from django.core.cache import cache
 
-from airmozilla.main.models import Event
+from airmozilla.main.models import Event, Channel
 from airmozilla.base.utils import STOPWORDS
+from airmozilla.manage import export
+from airmozilla.manage import related_local
 
 
 doc_type = 'event'
 
 
+def is_local():
+    return settings.RELATED_CONTENT_BACKEND == 'local'
+
+
 def get_connection():
     return pyelasticsearch.ElasticSearch(settings.ELASTICSEARCH_URL)
 
 
 def get_index():
+    if is_local():
+        return related_local.get_path()
     cache_key = 'related_index'
     value = cache.get(cache_key)
     if value is None:
@@ -39,35 +47,67 @@ def documents(events, es):
             id=event.id)
 
 
-def index(all=False, flush_first=False, since=datetime.timedelta(minutes=10)):
+def index(all=False, flush_first=False, since=None):
+    """Send the events to Elasticsearch. If not `all`, only those
+    modified after the last one sent last time, or in the last `since`
+    (a timedelta) if that's set."""
+    if is_local():
+        # Saving an event updates the local index as it happens so this
+        # only rebuilds it, which makes up for the IDF changing
+        # and stops the log of updates from growing.
+        related_local.rebuild()
+        return
+
     es = get_connection()
 
     if flush_first:
         flush(es)
         create(es)
 
+    now = timezone.now()
     if all:
-        events = Event.objects.scheduled_or_processing()
+        position = None
+    elif since is not None:
+        position = (now - since, 0)
     else:
-        now = timezone.now()
-        events = (
-            Event.objects.scheduled_or_processing()
-            .filter(modified__gte=now-since)
+        position = export.get_start(
+            'related',
+            datetime.timedelta(minutes=10)
         )
 
-    # bulk_chunks() breaks our documents into smaller requests for speed
+    events = (
+        Event.objects.scheduled_or_processing()
+        .prefetch_related('tags', 'channels')
+    )
+    last = []
+
+    def chunks():
+        for chunk in export.iter_chunks(events, after=position):
+            last[:] = chunk[-1:]
+            for document in documents(chunk, es):
+                yield document
+
     index = get_index()
-    for chunk in pyelasticsearch.bulk_chunks(
-        documents(events, es),
-        docs_per_chunk=500,
-        bytes_per_chunk=10000
+    for payload in export.iter_payloads(
+        chunks(),
+        max_documents=500,
+        max_bytes=100000
     ):
-        es.bulk(chunk, doc_type=doc_type, index=index)
+        es.bulk(payload, doc_type=doc_type, index=index)
 
     es.refresh(index)
 
+    if last:
+        export.set_position('related', (last[0].modified, last[0].id))
+    else:
+        # Nothing new so next time start from no earlier than this.
+        export.set_position('related', position or (now, 0))
+
 
 def flush(es=None):
+    if is_local() and es is None:
+        # it's always on disk
+        return
     es = es or get_connection()
     index = get_index()
     try:
@@ -78,6 +118,9 @@ def flush(es=None):
 
 
 def create(es=None):
+    if is_local() and es is None:
+        related_local.rebuild()
+        return
     es = es or get_connection()
     index = get_index()
     try:
@@ -123,5 +166,151 @@ def create(es=None):
 
 
 def delete(es=None):
+    if is_local() and es is None:
+        related_local.delete()
+        return
     es = es or get_connection()
     es.delete_index(get_index())
+
+
+def count():
+    """Return the number of documents indexed."""
+    if is_local():
+        return related_local.count()
+    query = {
+        'query': {
+            'match_all': {}
+        }
+    }
+    es = get_connection()
+    return es.count(query, index=get_index())['count']
+
+
+def find(event, audience, boost_title, boost_tags, boost_channels, size,
+         use_title=True, use_tags=True, explain=False):
+    """Return the IDs of the events most related to this one that
+    the audience (an `Event.PRIVACY_*`) can see, a dict of their scores
+    and a list of explanations if `explain`."""
+    if is_local():
+        boosts = {'channels': boost_channels}
+        if use_title:
+            boosts['title'] = _local_boost(boost_title)
+        if use_tags:
+            boosts['tags'] = _local_boost(boost_tags)
+        return related_local.find(
+            event.id,
+            audience,
+            boosts,
+            size,
+            explain=explain
+        )
+    return _find_elasticsearch(
+        event, audience, boost_title, boost_tags, size,
+        use_title=use_title, use_tags=use_tags, explain=explain
+    )
+
+
+def _local_boost(boost):
+    """Return what the title or tags boost, which is set for
+    Elasticsearch, should count for in the local backend.
+
+    In Elasticsearch a negative boost only makes a field count for less
+    than the others. The local score adds up every field's similarity
+    times its boost, so a negative boost would make having something in
+    common count against being related. Instead, those count for less
+    the more negative they are (-0.5 counts for 2/3, -1 for 1/2)."""
+    if boost < 0:
+        return 1.0 / (1 - boost)
+    return boost
+
+
+def _find_elasticsearch(event, audience, boost_title, boost_tags, size,
+                        use_title=True, use_tags=True, explain=False):
+    index = get_index()
+    es = get_connection()
+
+    fields = ['title']
+    if list(event.channels.all()) != [
+            Channel.objects.get(slug=settings.DEFAULT_CHANNEL_SLUG)]:
+        fields.append('channel')
+
+    mlt_queries = []
+    if use_title:
+        mlt_queries.append({
+            'more_like_this': {
+                'fields': ['title'],
+                # 'analyzer': 'snowball',
+                'docs': [
+                    {
+                        '_index': index,
+                        '_type': doc_type,
+                        '_id': event.id
+                    }],
+                'min_term_freq': 1,
+                'max_query_terms': 20,
+                'min_doc_freq': 1,
+                # 'max_doc_freq': 2,
+                # 'stop_words': ['your', 'about'],
+                'boost': boost_title,
+            }
+        })
+    if use_tags and event.tags.all().exists():
+        fields.append('tags')
+        mlt_queries.append({
+            'more_like_this': {
+                'fields': ['tags'],
+                'docs': [
+                    {
+                        '_index': index,
+                        '_type': doc_type,
+                        '_id': event.id
+                    }],
+                'min_term_freq': 1,
+                'max_query_terms': 20,
+                'min_doc_freq': 1,
+                'boost': boost_tags,
+            }
+        })
+
+    query = {
+        'fields': fields,
+        'query': {
+            'bool': {
+                'should': mlt_queries,
+            }
+        },
+    }
+    if audience == Event.PRIVACY_CONTRIBUTORS:
+        query['filter'] = {
+            'bool': {
+                'must_not': {
+                    'term': {
+                        'privacy': Event.PRIVACY_COMPANY
+                    }
+                }
+            }
+        }
+    elif audience == Event.PRIVACY_PUBLIC:
+        query['filter'] = {
+            'bool': {
+                'must': {
+                    'term': {'privacy': Event.PRIVACY_PUBLIC}
+                }
+            }
+        }
+
+    query['from'] = 0
+    query['size'] = size
+    query['explain'] = explain
+    hits = es.search(query, index=index)['hits']
+
+    ids = []
+    scores = {}
+    explanations = []
+    for doc in hits['hits']:
+        _id = int(doc['_id'])
+        scores[_id] = doc['_score']
+        ids.append(_id)
+        if explain:
+            explanations.append(doc['_explanation'])
+    return ids, scores, explanations
@@ -0,0 +1,484 @@
+"""Related content without Elasticsearch.
+
+Every event that is scheduled or processing is a sparse vector with
+one part per field: the TF-IDF weighted words of the title, its tags
+and its channels (except the default one). Each part is normalized so
+the dot product of two parts is their cosine similarity.
+
+The index is a directory of NumPy arrays that are memory-mapped when
+read. The vectors are stored both by term (to find every event that
+shares a term with the one we're looking at) and by event (to get the
+vector of the event we're looking at).
+
+Rebuilding it means reading every event from the database so, in
+between rebuilds, whenever an event (or its tags or channels) is
+saved its new vector is appended to a log file in the index directory.
+Every process reads whatever's been appended to that log since it
+last looked and keeps those events in memory, taking precedence over
+what's in the arrays. The IDF of the terms is the one from when the
+index was last rebuilt.
+"""
+import contextlib
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import defaultdict
+
+import numpy
+
+from django.conf import settings
+
+from airmozilla.main.models import Event
+from airmozilla.base.utils import STOPWORDS
+
+
+FIELDS = ('title', 'tags', 'channels')
+
+# Who can see what. An audience can see events with a level lower
+# than or equal to its own.
+PRIVACY_LEVELS = {
+    Event.PRIVACY_PUBLIC: 0,
+    Event.PRIVACY_CONTRIBUTORS: 1,
+    Event.PRIVACY_COMPANY: 2,
+}
+
+ARRAYS = (
+    'event_ids',
+    'privacy',
+    'idf',
+    'indptr',
+    'postings',
+    'weights',
+    'doc_indptr',
+    'doc_terms',
+    'doc_weights',
+)
+
+_stopwords = set(STOPWORDS)
+_word_regex = re.compile(r'\w+', re.UNICODE)
+
+
+def get_path():
+    return settings.RELATED_CONTENT_INDEX_PATH
+
+
+def _current_path():
+    link = os.path.join(get_path(), 'current')
+    if not os.path.islink(link):
+        return None
+    return os.path.join(get_path(), os.readlink(link))
+
+
+@contextlib.contextmanager
+def _locked():
+    with open(os.path.join(get_path(), 'lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def get_terms(title, tags, channels):
+    """Return a dict of field -> dict of term -> term frequency."""
+    words = defaultdict(int)
+    for word in _word_regex.findall(title.lower()):
+        if len(word) > 1 and word not in _stopwords:
+            words[word] += 1
+    return {
+        'title': dict(words),
+        'tags': dict((x.lower(), 1) for x in tags),
+        'channels': dict(
+            (x, 1) for x in channels
+            if x != settings.DEFAULT_CHANNEL_SLUG
+        ),
+    }
+
+
+def _keys(terms):
+    """Yield (field, key, term frequency) for every term."""
+    for field in FIELDS:
+        for term, frequency in terms.get(field, {}).items():
+            yield field, u'{}:{}'.format(field, term), frequency
+
+
+def _vector(terms, get_idf):
+    """Return a dict of field -> dict of key -> weight, where every
+    field is normalized to a length of 1."""
+    vector = defaultdict(dict)
+    for field, key, frequency in _keys(terms):
+        weight = (1 + math.log(frequency)) * get_idf(key)
+        vector[field][key] = weight
+    for field, weights in vector.items():
+        norm = math.sqrt(sum(x * x for x in weights.values()))
+        for key in weights:
+            weights[key] /= norm
+    return dict(vector)
+
+
+def _get_documents():
+    """Yield (event id, privacy, terms) for every event that should be
+    in the index."""
+    events = Event.objects.scheduled_or_processing()
+    tags = defaultdict(list)
+    for event_id, name in Event.tags.through.objects.filter(
+        event__in=events
+    ).values_list('event_id', 'tag__name'):
+        tags[event_id].append(name)
+    channels = defaultdict(list)
+    for event_id, slug in Event.channels.through.objects.filter(
+        event__in=events
+    ).values_list('event_id', 'channel__slug'):
+        channels[event_id].append(slug)
+    for event_id, title, privacy in events.values_list(
+        'id', 'title', 'privacy'
+    ).order_by('id'):
+        yield (
+            event_id,
+            privacy,
+            get_terms(title, tags[event_id], channels[event_id]),
+        )
+
+
+def _write(directory, documents):
+    documents = list(documents)
+    n = len(documents)
+    frequencies = defaultdict(int)
+    for __, __, terms in documents:
+        for __, key, __ in _keys(terms):
+            frequencies[key] += 1
+    keys = sorted(frequencies)
+    columns = dict((key, i) for i, key in enumerate(keys))
+    # Smoothed so that a term that's in every document still counts.
+    idf = dict(
+        (key, 1 + math.log((1.0 + n) / (1 + frequencies[key])))
+        for key in keys
+    )
+
+    doc_indptr = [0]
+    doc_terms = []
+    doc_weights = []
+    for __, __, terms in documents:
+        for weights in _vector(terms, idf.get).values():
+            for key, weight in weights.items():
+                doc_terms.append(columns[key])
+                doc_weights.append(weight)
+        doc_indptr.append(len(doc_terms))
+
+    doc_terms = numpy.array(doc_terms, dtype=numpy.int32)
+    doc_weights = numpy.array(doc_weights, dtype=numpy.float32)
+    doc_indptr = numpy.array(doc_indptr, dtype=numpy.int32)
+    # the same vectors, but by term
+    doc_index = numpy.repeat(
+        numpy.arange(n, dtype=numpy.int32),
+        numpy.diff(doc_indptr)
+    )
+    order = numpy.argsort(doc_terms, kind='mergesort')
+    indptr = numpy.zeros(len(keys) + 1, dtype=numpy.int32)
+    indptr[1:] = numpy.cumsum(
+        numpy.bincount(doc_terms, minlength=len(keys))
+    )
+
+    arrays = {
+        'event_ids': numpy.array(
+            [x[0] for x in documents],
+            dtype=numpy.int32
+        ),
+        'privacy': numpy.array(
+            [PRIVACY_LEVELS.get(x[1], max(PRIVACY_LEVELS.values()))
+             for x in documents],
+            dtype=numpy.int8
+        ),
+        'idf': numpy.array([idf[x] for x in keys], dtype=numpy.float32),
+        'indptr': indptr,
+        'postings': doc_index[order],
+        'weights': doc_weights[order],
+        'doc_indptr': doc_indptr,
+        'doc_terms': doc_terms,
+        'doc_weights': doc_weights,
+    }
+    for name, array in arrays.items():
+        numpy.save(os.path.join(directory, name + '.npy'), array)
+    with open(os.path.join(directory, 'terms.json'), 'w') as f:
+        json.dump(keys, f)
+    open(os.path.join(directory, 'updates.log'), 'w').close()
+    return n
+
+
+def rebuild(verbose=False):
+    """Create a new index from the database and make it the current
+    one. Returns the number of events indexed."""
+    root = get_path()
+    if not os.path.isdir(root):
+        os.makedirs(root)
+    old = _current_path()
+    offset = 0
+    if old:
+        with _locked():
+            offset = os.path.getsize(os.path.join(old, 'updates.log'))
+
+    directory = tempfile.mkdtemp(dir=root, prefix='index-')
+    count = _write(directory, _get_documents())
+
+    with _locked():
+        if old:
+            # Anything appended while we were reading the database
+            # needs to be applied on top of the new index too.
+            with open(os.path.join(old, 'updates.log')) as f:
+                f.seek(offset)
+                updates = f.read()
+            with open(os.path.join(directory, 'updates.log'), 'a') as f:
+                f.write(updates)
+        link = os.path.join(root, 'current-' + os.path.basename(directory))
+        os.symlink(os.path.basename(directory), link)
+        os.rename(link, os.path.join(root, 'current'))
+    if old:
+        # Processes that have it open still can read it.
+        shutil.rmtree(old)
+    if verbose:  # pragma: no cover
+        print "Indexed {} events in {}".format(count, directory)
+    return count
+
+
+def delete():
+    if os.path.isdir(get_path()):
+        shutil.rmtree(get_path())
+    _indexes.clear()
+
+
+def _append(entry):
+    if not _current_path():
+        # there's no index to update until it's built
+        return
+    line = json.dumps(entry) + '\n'
+    with _locked():
+        # it might have been replaced since we checked
+        with open(os.path.join(_current_path(), 'updates.log'), 'a') as f:
+            f.write(line)
+
+
+def update(event):
+    """Make the index reflect how this event is now."""
+    if event.status not in (Event.STATUS_SCHEDULED, Event.STATUS_PROCESSING):
+        remove(event.id)
+        return
+    _append({
+        'id': event.id,
+        'privacy': event.privacy,
+        'terms': get_terms(
+            event.title,
+            event.tags.all().values_list('name', flat=True),
+            event.channels.all().values_list('slug', flat=True),
+        ),
+    })
+
+
+def remove(event_id):
+    _append({'id': event_id, 'terms': None})
+
+
+class Index(object):
+
+    def __init__(self, directory):
+        self.directory = directory
+        for name in ARRAYS:
+            setattr(self, name, numpy.load(
+                os.path.join(directory, name + '.npy'),
+                mmap_mode='r'
+            ))
+        with open(os.path.join(directory, 'terms.json')) as f:
+            self.terms = json.load(f)
+        self.columns = dict((key, i) for i, key in enumerate(self.terms))
+        self.positions = dict(
+            (event_id, i) for i, event_id in enumerate(self.event_ids)
+        )
+        self.missing_idf = 1 + math.log((1.0 + len(self.event_ids)) / 2)
+        # event ID -> (privacy level, vector) or None if removed
+        self.updated = {}
+        # positions in the arrays that have been updated since
+        self.replaced = numpy.zeros(len(self.event_ids), dtype=bool)
+        self.offset = 0
+        self.lock = threading.Lock()
+
+    def get_idf(self, key):
+        column = self.columns.get(key)
+        if column is None:
+            return self.missing_idf
+        return float(self.idf[column])
+
+    def read_updates(self):
+        filename = os.path.join(self.directory, 'updates.log')
+        with self.lock:
+            try:
+                if os.path.getsize(filename) <= self.offset:
+                    return
+                with open(filename) as f:
+                    f.seek(self.offset)
+                    lines = f.read()
+            except (IOError, OSError):
+                # replaced by a new index
+                return
+            # only whole lines
+            lines = lines[:lines.rfind('\n') + 1]
+            self.offset += len(lines)
+            for line in lines.splitlines():
+                entry = json.loads(line)
+                event_id = entry['id']
+                if entry['terms'] is None:
+                    self.updated[event_id] = None
+                else:
+                    self.updated[event_id] = (
+                        PRIVACY_LEVELS.get(entry['privacy'], 2),
+                        _vector(entry['terms'], self.get_idf),
+                    )
+                position = self.positions.get(event_id)
+                if position is not None:
+                    self.replaced[position] = True
+
+    def count(self):
+        ids = set(self.positions)
+        for event_id, document in self.updated.items():
+            if document is None:
+                ids.discard(event_id)
+            else:
+                ids.add(event_id)
+        return len(ids)
+
+    def get_vector(self, event_id):
+        if event_id in self.updated:
+            document = self.updated[event_id]
+            return document and document[1]
+        position = self.positions.get(event_id)
+        if position is None:
+            return None
+        vector = defaultdict(dict)
+        start, end = self.doc_indptr[position:position + 2]
+        for column, weight in zip(
+            self.doc_terms[start:end],
+            self.doc_weights[start:end]
+        ):
+            key = self.terms[column]
+            vector[key.split(':', 1)[0]][key] = float(weight)
+        return vector
+
+    def find(self, event_id, level, boosts, size, explain=False):
+        """Return the IDs of the most similar events that the audience
+        of `level` can see, a dict of their scores and, if `explain`,
+        the score of each field for every one of them.
+        `boosts` is a dict of field -> how much it counts.
+        """
+        vector = self.get_vector(event_id)
+        if not vector:
+            return [], {}, []
+        boosts = dict((k, v) for k, v in boosts.items() if v)
+
+        n = len(self.event_ids)
+        similarities = {}
+        for field in boosts:
+            similarity = numpy.zeros(n, dtype=numpy.float32)
+            for key, weight in vector.get(field, {}).items():
+                column = self.columns.get(key)
+                if column is None:
+                    continue
+                start, end = self.indptr[column:column + 2]
+                # a term is only ever once per event so there are no
+                # repeated indexes
+                similarity[self.postings[start:end]] += (
+                    weight * self.weights[start:end]
+                )
+            similarities[field] = similarity
+
+        scores = numpy.zeros(n, dtype=numpy.float32)
+        matched = numpy.zeros(n, dtype=bool)
+        for field, similarity in similarities.items():
+            scores += boosts[field] * similarity
+            matched |= similarity > 0
+        matched &= self.privacy <= level
+        matched &= ~self.replaced
+        position = self.positions.get(event_id)
+        if position is not None:
+            matched[position] = False
+
+        candidates = numpy.flatnonzero(matched)
+        if len(candidates) > size:
+            best = numpy.argpartition(-scores[candidates], size - 1)[:size]
+            candidates = candidates[best]
+        results = [
+            (
+                float(scores[i]),
+                int(self.event_ids[i]),
+                dict((f, float(s[i])) for f, s in similarities.items()),
+            )
+            for i in candidates
+        ]
+
+        # Those updated since the index was built are few enough to
+        # compare one at a time.
+        for other_id, document in self.updated.items():
+            if document is None or other_id == event_id:
+                continue
+            other_level, other_vector = document
+            if other_level > level:
+                continue
+            fields = {}
+            for field in boosts:
+                other = other_vector.get(field, {})
+                fields[field] = sum(
+                    weight * other.get(key, 0)
+                    for key, weight in vector.get(field, {}).items()
+                )
+            if any(x > 0 for x in fields.values()):
+                score = sum(boosts[f] * s for f, s in fields.items())
+                results.append((score, other_id, fields))
+
+        results.sort(key=lambda x: (-x[0], x[1]))
+        results = results[:size]
+        ids = [x[1] for x in results]
+        scores = dict((x[1], x[0]) for x in results)
+        explanations = []
+        if explain:
+            explanations = [
+                dict(x[2], id=x[1], score=x[0]) for x in results
+            ]
+        return ids, scores, explanations
+
+
+# directory -> Index, for every process
+_indexes = {}
+
+
+def get_index():
+    """Return the current `Index` with the latest updates applied, or
+    None if there isn't one yet."""
+    directory = _current_path()
+    if not directory:
+        return None
+    index = _indexes.get(directory)
+    if index is None:
+        _indexes.clear()
+        index = _indexes[directory] = Index(directory)
+    index.read_updates()
+    return index
+
+
+def count():
+    index = get_index()
+    return index.count() if index else 0
+
+
+def find(event_id, audience, boosts, size, explain=False):
+    index = get_index()
+    if index is None:
+        return [], {}, []
+    return index.find(
+        event_id,
+        PRIVACY_LEVELS[audience],
+        boosts,
+        size,
+        explain=explain
+    )
@@ -0,0 +1,82 @@
+angular.module('app', [])
+
+.controller('CronLoggerStatsController',
+['$scope', '$http',
+function($scope, $http) {
+    'use strict';
+
+    var GRAPHS = [
+        {target: '#duration', metric: 'duration', title: 'Duration',
+         description: 'Seconds per run'},
+        {target: '#queries', metric: 'queries', title: 'Queries',
+         description: 'Database queries per run'},
+        {target: '#http', metric: 'http_requests', title: 'HTTP requests',
+         description: 'External HTTP requests per run'},
+        {target: '#max_rss', metric: 'max_rss', title: 'Peak RSS',
+         description: 'Peak memory in kilobytes'}
+    ];
+    var PERCENTILES = ['p50', 'p95', 'p99'];
+
+    function displayJob(job) {
+        GRAPHS.forEach(function(graph) {
+            var data = PERCENTILES.map(function(percentile) {
+                return job.days.filter(function(day) {
+                    return day[graph.metric][percentile] !== null;
+                }).map(function(day) {
+                    return MG.convert.date({
+                        date: day.date,
+                        value: day[graph.metric][percentile]
+                    }, 'date');
+                });
+            });
+            if (!data[0].length) {
+                // nothing recorded for this metric yet
+                d3.select(graph.target).html('');
+                return;
+            }
+            MG.data_graphic({
+                title: graph.title,
+                description: graph.description,
+                data: data,
+                full_width: true,
+                height: 250,
+                right: 40,
+                target: graph.target,
+                legend: PERCENTILES
+            });
+        });
+    }
+
+    $scope.showJob = function(job) {
+        $scope.job = job;
+        displayJob(job);
+    };
+
+    function load() {
+        $scope.loading = true;
+        $http.get(location.pathname + 'data/', {params: {days: $scope.days}})
+        .success(function(response) {
+            $scope.jobs = response.jobs;
+            var name = document.location.hash.substring(1);
+            $scope.jobs.forEach(function(job) {
+                if (job.job === name) {
+                    $scope.showJob(job);
+                }
+            });
+        }).error(function(response, status) {
+            console.warn('Failed to fetch cron stats', status);
+        }).finally(function() {
+            $scope.loading = false;
+        });
+    }
+
+    $scope.days = 30;
+    $scope.$watch('days', function(new_value, old_value) {
+        if (new_value !== old_value) {
+            load();
+        }
+    });
+    load();
+}])
+
+;
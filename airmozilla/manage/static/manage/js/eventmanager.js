@@ -10,19 +10,20 @@ var serializeObject = function(obj) {
     return str.join("&");
 };
 
-function escapeRegExp(string){
-    return string.replace(/([.*+?^=!:${}()|\[\]\/\\])/g, "\\$1");
-}
-
 
-// We already have a limitTo filter built-in to angular,
-// let's make a startFrom filter
-app.filter('startFrom', function() {
-    return function(input, start) {
-        start = +start; //parse to int
-        return input.slice(start);
-    };
-});
+function decodeEvents(events) {
+    // The server sends the events as a list of columns and a list of
+    // rows to avoid repeating the same keys for every event.
+    return events.rows.map(function(row) {
+        var event = {};
+        events.columns.forEach(function(column, i) {
+            if (row[i] !== null) {
+                event[column] = row[i];
+            }
+        });
+        return event;
+    });
+}
 
 
 app.controller('EventManagerController',
@@ -31,24 +32,24 @@ function EventManagerController($scope, $http, $interval, $timeout) {
     'use strict';
 
     $scope.first_loading = true;
-    $scope.second_loading = true;
+    $scope.loading = true;
     function fetchEvents(params) {
         var url = location.pathname + 'data/';
         url += '?' + serializeObject(params);
         return $http.get(url);
     }
     $scope.events = [];
+    $scope.count = 0;
+    $scope.statuses = {};
+    $scope.privacies = {};
     $scope.currentPage = 0;
     $scope.sorting = 'modified';
     $scope.sorting_reverse = true;
-
-    $scope.$watch('sorting', function(value) {
-        if (value === 'modified') {
-            $scope.sorting_reverse = true;
-        } else {
-            $scope.sorting_reverse = false;
-        }
-    });
+    // the cursors to the next and previous window of events
+    var next = null;
+    var previous = null;
+    // the cursor that got us to the current window
+    var cursor = {};
 
     $scope.toggleSortingReverse = function() {
         $scope.sorting_reverse = !$scope.sorting_reverse;
@@ -78,9 +79,22 @@ function EventManagerController($scope, $http, $interval, $timeout) {
         }
     });
 
-    $scope.numberOfPages = function(items){
-        if (typeof items === 'undefined') return 0;
-        return Math.ceil(items.length / $scope.pageSize);
+    $scope.numberOfPages = function() {
+        return Math.ceil($scope.count / $scope.pageSize);
+    };
+    $scope.hasNextPage = function() {
+        return next !== null;
+    };
+    $scope.hasPreviousPage = function() {
+        return previous !== null;
+    };
+    $scope.nextPage = function() {
+        $scope.currentPage++;
+        load({after: next});
+    };
+    $scope.previousPage = function() {
+        $scope.currentPage--;
+        load({before: previous});
     };
     $scope.formatDate = function(date) {
         return moment(date).format('ddd, MMM D, YYYY, h:mma UTCZZ');
@@ -88,6 +102,7 @@ function EventManagerController($scope, $http, $interval, $timeout) {
 
     $scope.resetCurrentPage = function() {
         $scope.currentPage = 0;
+        load();
     };
     $scope.resetFilter = function(key) {
         $scope[key] = '';
@@ -116,144 +131,82 @@ function EventManagerController($scope, $http, $interval, $timeout) {
     };
 
     $scope.search_title = '';
-    var search_title_regexes = [];
-    var search_slug_regex = null;
-    $scope.$watch('search_title', function(value) {
-        search_title_regexes = [];
-        angular.forEach(value.trim().split(' '), function(part) {
-            search_title_regexes.push(new RegExp('\\b' + escapeRegExp(part), 'i'));
-        });
-        if (value.trim()) {
-            search_slug_regex = new RegExp('^' + escapeRegExp(value.trim()), 'i');
-        }
-        $scope.currentPage = 0;
-    });
-
     $scope.search_location = '';
-    var search_location_regex = null;
-    $scope.$watch('search_location', function(value) {
-        search_location_regex = new RegExp(escapeRegExp(value), 'i');
-        $scope.currentPage = 0;
-    });
-
     $scope.search_cat_chan = '';
-    var search_cat_chan_regex = null;
-    $scope.$watch('search_cat_chan', function(value) {
-        search_cat_chan_regex = new RegExp(escapeRegExp(value), 'i');
-        $scope.currentPage = 0;
-    });
-
     $scope.search_status = '';
     $scope.search_privacy = '';
     $scope.search_start_time = '';
     $scope.search_archived = '';
     $scope.search_only = '';
 
-    $scope.$watch('search_status', function() {
-        $scope.currentPage = 0;
-    });
-    $scope.$watch('search_privacy', function() {
-        $scope.currentPage = 0;
-    });
-    $scope.$watch('search_start_time', function() {
-        $scope.currentPage = 0;
-    });
-    $scope.$watch('search_archived', function() {
-        $scope.currentPage = 0;
-    });
-    $scope.$watch('search_only', function() {
-        $scope.currentPage = 0;
-    });
-
-    $scope.filterBySearch = function(event) {
-        if (!$scope.hasFilter()) return true;
-
-        // gimme a reason NOT to include this
-        if ($scope.search_title) {
-            var unmatched = false;
-            angular.forEach(search_title_regexes, function(regex) {
-                if (!unmatched && !regex.test(event.title)) {
-                    unmatched = true;
-                }
-            });
-            if (unmatched && search_slug_regex && search_slug_regex.test(event.slug)) {
-                unmatched = false;
-            }
-            // at least one regex said no
-            if (unmatched) return false;
+    function getParams() {
+        var params = {
+            limit: $scope.pageSize,
+            sort: $scope.sorting
+        };
+        if ($scope.sorting_reverse) {
+            params.reverse = true;
         }
-        if ($scope.search_location) {
-            if (['blank', 'empty', 'pre-recorded'].indexOf($scope.search_location) > -1) {
-                // then strangely match those with no location
-                if (event.location) {
-                    return false;
-                }
-            } else if (!search_location_regex.test(event.location)) {
-                return false;
+        var filters = {
+            title: $scope.search_title,
+            location: $scope.search_location,
+            channel: $scope.search_cat_chan,
+            status: $scope.search_status,
+            privacy: $scope.search_privacy,
+            start_time: $scope.search_start_time,
+            archived: $scope.search_archived,
+            only: $scope.search_only
+        };
+        for (var key in filters) {
+            if (filters[key]) {
+                params[key] = filters[key];
             }
         }
-        if ($scope.search_cat_chan) {
-            // it must match either the category or one of the channels
-            var something = false;
-            if (search_cat_chan_regex.test(event.category)) {
-                something = true;
-            } else {
-                angular.forEach(event.channels, function(channel) {
-                    if (!something && search_cat_chan_regex.test(channel)) {
-                        something = true;
-                    }
-                });
-            }
-            //if (!something) return false;
-            return something;
-        }
-        if ($scope.search_status && $scope.search_status !== event.status) {
-            return false;
-        }
-        if ($scope.search_privacy && $scope.search_privacy !== event.privacy) {
-            return false;
-        }
-        if ($scope.search_start_time && !in_search_start_time_range(moment(event.start_time_iso))) {
-            return false;
+        return params;
+    }
+
+    // Typing in the search fields shouldn't fire off a request per key.
+    var reloadPromise = null;
+    function reloadFirstPage(delay) {
+        if (reloadPromise) {
+            $timeout.cancel(reloadPromise);
         }
-        if ($scope.search_archived) {
-            if ($scope.search_archived === 'archived') {
-                if (!event.archive_time) {
-                    return false;
-                }
-            } else {
-                if (event.archive_time) {
-                    return false;
-                }
+        reloadPromise = $timeout(function() {
+            $scope.currentPage = 0;
+            load();
+        }, delay || 0);
+    }
+
+    ['search_title', 'search_location', 'search_cat_chan'].forEach(function(key) {
+        $scope.$watch(key, function(new_value, old_value) {
+            if (new_value !== old_value) {
+                reloadFirstPage(300);
             }
-        }
-        if ($scope.search_only) {
-            if ($scope.search_only === 'upcoming') {
-                return !!event.is_upcoming;
-            } else if ($scope.search_only === 'needs_approval') {
-                return !!event.needs_approval;
-            } else if ($scope.search_only === 'live') {
-                return !!event.is_live;
-            } else if ($scope.search_only === 'pictureless') {
-                return !!event.pictureless;
-            } else {
-                console.warn('Unrecognized option', $scope.search_only);
+        });
+    });
+    ['search_status', 'search_privacy', 'search_archived', 'search_only',
+     'sorting', 'sorting_reverse', 'pageSize'].forEach(function(key) {
+        $scope.$watch(key, function(new_value, old_value) {
+            if (new_value !== old_value) {
+                reloadFirstPage();
             }
+        });
+    });
+    $scope.$watch('sorting', function(value, old_value) {
+        if (value !== old_value) {
+            $scope.sorting_reverse = value === 'modified';
+        }
+    });
+    $scope.$watch('search_start_time', function(value, old_value) {
+        if (value === old_value) {
+            return;
         }
-        return true;
-    };
-    var search_start_times = [];
-    $scope.$watch('search_start_time', function(value) {
         if (value) {
-            value = moment.utc(value);
-            search_start_times = [value, value.clone().add('days', 1)];
-            $scope.sorting = 'start_time_iso';
+            $scope.sorting = 'start_time';
             $scope.sorting_reverse = true;
         }
+        reloadFirstPage();
     });
-    function in_search_start_time_range(date) {
-        return date > search_start_times[0];
-    }
 
     $scope.selectSearchStatus = function(status) {
         $scope.search_status = status;
@@ -279,34 +232,21 @@ function EventManagerController($scope, $http, $interval, $timeout) {
     };
 
 
-    $scope.modified_events = [];
+    $scope.modified_events = 0;
 
     $scope.replaceModifiedEvents = function() {
-        var modified = {};
-        $scope.modified_events.forEach(function(event) {
-            modified[event.id] = event;
-        });
-        $scope.events.forEach(function(event, i) {
-            if (modified[event.id]) {
-                $scope.events[i] = modified[event.id];
-                delete modified[event.id];
-            }
-        });
-        // add what's left
-        for (var id in modified) {
-            $scope.events.push(modified[id]);
-        }
-        $scope.max_modified = $scope.next_max_modified;
-        $scope.modified_events = [];
+        load(cursor);
     };
 
     function lookForModifiedEvents() {
         /* This function is repeatedly called in an interval timer */
-        fetchEvents({since: $scope.max_modified})
+        var params = getParams();
+        params.since = $scope.max_modified;
+        params.limit = 1;
+        fetchEvents(params)
         .success(function(response) {
             if (response.max_modified) {
-                $scope.modified_events = response.events;
-                $scope.next_max_modified = response.max_modified;
+                $scope.modified_events = response.count;
             }
         })
         .error(function() {
@@ -316,51 +256,51 @@ function EventManagerController($scope, $http, $interval, $timeout) {
 
     $scope.load_error = null;
 
-    function loadAll() {
-        fetchEvents({})
+    function load(params) {
+        cursor = params || {};
+        params = angular.extend(getParams(), cursor);
+        $scope.loading = true;
+        fetchEvents(params)
           .success(function(data) {
               $scope.load_error = null;
-              localStorage.setItem('eventmanager', JSON.stringify(data));
-              $scope.events = data.events;
-              $scope.max_modified = data.max_modified;
-
-              // This update looking for modified events doesn't need
-              // to be initialized immediately. It can wait a little bit.
-              $timeout(function() {
-                  var reloadInterval = 10; // seconds
-                  if (typeof window.Fanout !== 'undefined') {
-                      window.Fanout.subscribe('/events', function(data) {
-                          $scope.$apply(lookForModifiedEvents);
-                      });
-                      reloadInterval = 60;
-                  }
-                  // every 10 seconds, look for for changed events
-                  $interval(lookForModifiedEvents, reloadInterval * 1000);
-              }, 2 * 1000);
-
-          }).error(function(data, status) {
-              console.log(data, status);
-              $scope.load_error = 'Failed to fetch ALL events (' + status + ')';
-          }).finally(function() {
-              $scope.second_loading = false;
-          });
-    }
-
-    $scope.retryLoadAll = loadAll;
-
-    function loadSome() {
-        fetchEvents({limit: $scope.pageSize})
-          .success(function(data) {
               $scope.urls = data.urls;
-              $scope.events = data.events;
-              loadAll();
+              $scope.statuses = data.statuses;
+              $scope.privacies = data.privacies;
+              $scope.events = decodeEvents(data.events);
+              $scope.count = data.count;
+              next = data.next;
+              previous = data.previous;
+              $scope.modified_events = 0;
+              if (!$scope.max_modified || data.max_modified > $scope.max_modified) {
+                  $scope.max_modified = data.max_modified;
+              }
           }).error(function(data, status) {
-              console.warn('Failed to fetch events', status);
+              console.log(data, status);
+              $scope.load_error = 'Failed to fetch events (' + status + ')';
           }).finally(function() {
+              $scope.loading = false;
               $scope.first_loading = false;
           });
     }
-    loadSome();
+
+    $scope.retryLoad = function() {
+        load(cursor);
+    };
+    load();
+
+    // This update looking for modified events doesn't need
+    // to be initialized immediately. It can wait a little bit.
+    $timeout(function() {
+        var reloadInterval = 10; // seconds
+        if (typeof window.Fanout !== 'undefined') {
+            window.Fanout.subscribe('/events', function(data) {
+                $scope.$apply(lookForModifiedEvents);
+            });
+            reloadInterval = 60;
+        }
+        // every 10 seconds, look for for changed events
+        $interval(lookForModifiedEvents, reloadInterval * 1000);
+    }, 2 * 1000);
 
     // A legacy fix. We used to store ALL cached events in localStorage
     // under the key `eventmanager`. This is often a HUGE JSON string.
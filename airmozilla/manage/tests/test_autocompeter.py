@@ -12,6 +12,7 @@ from django.core.urlresolvers import reverse
 from airmozilla.base.tests.testbase import Response
 from airmozilla.main.models import Event, EventHitStats, Approval, Channel
 from airmozilla.manage import autocompeter
+from airmozilla.manage import export
 from airmozilla.base.tests.testbase import DjangoTestCase
 
 
@@ -316,6 +317,106 @@ class TestAutocompeter(DjangoTestCase):
         ok_(deletes)
         ok_(posts)
 
+    @mock.patch('requests.post')
+    def test_update_continues_where_it_stopped(self, rpost):
+
+        posts = []
+
+        def mocked_post(url, **options):
+            data = json.loads(options['data'])
+            posts.append(data)
+            return Response(
+                'OK',
+                201
+            )
+
+        rpost.side_effect = mocked_post
+
+        event = Event.objects.get(title='Test event')
+        event.save()
+        other = Event.objects.create(
+            slug='other',
+            title='Other',
+            start_time=event.start_time,
+            status=event.status,
+        )
+        autocompeter.update(max_=1)
+        eq_([x['title'] for x in posts[0]['documents']], ['Test event'])
+        autocompeter.update(max_=1)
+        # the first one is sent again, and doesn't count, in case
+        # something saved at the same time wasn't committed yet
+        eq_(
+            [x['title'] for x in posts[1]['documents']],
+            ['Test event', 'Other']
+        )
+
+        # even if it was modified long ago
+        Event.objects.filter(id__in=(event.id, other.id)).update(
+            modified=timezone.now() - datetime.timedelta(days=1)
+        )
+        autocompeter.update()
+        eq_(len(posts), 2)
+        other.save()
+        autocompeter.update()
+        eq_([x['title'] for x in posts[2]['documents']], ['Other'])
+
+    @mock.patch('requests.post')
+    def test_update_failing(self, rpost):
+        rpost.return_value = Response('Error', 500)
+        event = Event.objects.get(title='Test event')
+        event.save()
+        assert_raises(AssertionError, autocompeter.update)
+
+        posts = []
+
+        def mocked_post(url, **options):
+            data = json.loads(options['data'])
+            posts.append(data)
+            return Response(
+                'OK',
+                201
+            )
+
+        rpost.side_effect = mocked_post
+        # it's sent again the next time
+        autocompeter.update()
+        eq_([x['title'] for x in posts[0]['documents']], ['Test event'])
+
+    @mock.patch('requests.post')
+    def test_update_all_in_payloads(self, rpost):
+
+        posts = []
+
+        def mocked_post(url, **options):
+            data = json.loads(options['data'])
+            posts.append(data)
+            return Response(
+                'OK',
+                201
+            )
+
+        rpost.side_effect = mocked_post
+
+        event = Event.objects.get(title='Test event')
+        Event.objects.create(
+            slug='other',
+            title='Other',
+            start_time=event.start_time,
+            status=event.status,
+        )
+        iter_payloads = export.iter_payloads
+
+        def small_payloads(documents):
+            return iter_payloads(documents, max_documents=1)
+
+        with mock.patch.object(export, 'iter_payloads', small_payloads):
+            autocompeter.update(all=True)
+        eq_(len(posts), 2)
+        eq_(
+            sorted(x['documents'][0]['title'] for x in posts),
+            ['Other', 'Test event']
+        )
+
     @mock.patch('requests.get')
     def test_stats(self, rget):
 
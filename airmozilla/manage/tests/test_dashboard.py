@@ -0,0 +1,120 @@
+import datetime
+
+from nose.tools import eq_
+
+from django.contrib.auth.models import User
+
+from airmozilla.base.tests.testbase import DjangoTestCase
+from airmozilla.main.models import DailyRollup
+from airmozilla.uploads.models import Upload
+from airmozilla.manage import dashboard
+
+
+class TestDashboard(DjangoTestCase):
+
+    def setUp(self):
+        super(TestDashboard, self).setUp()
+        User.objects.all().delete()
+        self.today = dashboard.get_today()
+
+    def _create_user(self, username, days_ago):
+        return User.objects.create(
+            username=username,
+            date_joined=(
+                self.today -
+                datetime.timedelta(days=days_ago) +
+                datetime.timedelta(hours=1)
+            )
+        )
+
+    def _get_periods(self):
+        return {
+            'today': (self.today, self.today + datetime.timedelta(days=1)),
+            'ever': (None, None),
+            'last_days': (
+                self.today - datetime.timedelta(days=10),
+                self.today,
+            ),
+        }
+
+    def test_aggregate_periods(self):
+        self._create_user('a', 0)
+        self._create_user('b', 3)
+        self._create_user('c', 30)
+        metric, = [x for x in dashboard.METRICS if x.name == 'users']
+        with self.assertNumQueries(1):
+            counts = dashboard.aggregate_periods(metric, self._get_periods())
+        eq_(counts, {'today': 1, 'ever': 3, 'last_days': 1})
+
+    def test_rollup(self):
+        self._create_user('a', 0)
+        self._create_user('b', 3)
+        self._create_user('c', 5)
+        dashboard.rollup()
+
+        def get_values():
+            return list(
+                DailyRollup.objects
+                .filter(metric='users')
+                .order_by('date')
+                .values_list('date', 'value')
+            )
+
+        # one for every day from the first one until yesterday
+        values = get_values()
+        eq_([x[1] for x in values], [1, 0, 1, 0, 0])
+        eq_(values[0][0], (self.today - datetime.timedelta(days=5)).date())
+
+        # doing it again doesn't duplicate anything
+        dashboard.rollup()
+        eq_(get_values(), values)
+
+        # recalculate only the last couple of days
+        self._create_user('d', 1)
+        since = self.today - datetime.timedelta(days=2)
+        dashboard.rollup(since=since.date())
+        eq_([x[1] for x in get_values()], [1, 0, 1, 0, 1])
+
+    def test_get_counts_with_rollups(self):
+        self._create_user('a', 0)
+        self._create_user('b', 3)
+        self._create_user('c', 5)
+        periods = self._get_periods()
+        before = dashboard.get_counts(periods)['users']
+        eq_(before, {'today': 1, 'ever': 3, 'last_days': 2})
+
+        dashboard.rollup()
+        eq_(dashboard.get_counts(periods)['users'], before)
+
+        # what's new since the rollup is counted too
+        self._create_user('d', 0)
+        counts = dashboard.get_counts(periods)['users']
+        eq_(counts, {'today': 2, 'ever': 4, 'last_days': 2})
+
+        # 'ever' comes from the rollups so it doesn't notice until the
+        # next rollup that this user is gone
+        User.objects.get(username='c').delete()
+        counts = dashboard.get_counts(periods)['users']
+        eq_(counts['ever'], 4)
+        eq_(counts['last_days'], 1)
+        dashboard.rollup()
+        eq_(dashboard.get_counts(periods)['users']['ever'], 3)
+
+    def test_get_counts_queries(self):
+        dashboard.rollup()
+        # one to know how far the rollups go, one for each metric and
+        # one for all the rollups
+        with self.assertNumQueries(1 + len(dashboard.METRICS) + 1):
+            dashboard.get_counts(self._get_periods())
+
+    def test_sums(self):
+        user = self._create_user('a', 0)
+        upload = Upload.objects.create(user=user, url='x', size=100)
+        Upload.objects.create(user=user, url='y', size=50)
+        periods = self._get_periods()
+        eq_(dashboard.get_counts(periods)['upload_sizes']['ever'], 150)
+        upload.created -= datetime.timedelta(days=2)
+        upload.save()
+        dashboard.rollup()
+        counts = dashboard.get_counts(periods)['upload_sizes']
+        eq_(counts, {'today': 50, 'ever': 150, 'last_days': 100})
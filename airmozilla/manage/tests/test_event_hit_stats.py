@@ -1,13 +1,17 @@
 import datetime
-from cStringIO import StringIO
 from nose.tools import eq_, ok_
 import mock
 
 from django.utils import timezone
 
-from airmozilla.base.tests.testbase import DjangoTestCase
+from airmozilla.base.tests.testbase import DjangoTestCase, Response
 from airmozilla.manage import event_hit_stats
-from airmozilla.main.models import Event, EventHitStats, Template
+from airmozilla.main.models import (
+    Event,
+    EventHitStats,
+    EventHitStatsSample,
+    Template,
+)
 
 
 SAMPLE_STATISTICS_XML = (
@@ -30,17 +34,17 @@ def non_signal_save(obj, **kwargs):
 
 class EventHitStatsTestCase(DjangoTestCase):
 
-    @mock.patch('urllib2.urlopen')
-    def test_update(self, p_urlopen):
+    @mock.patch('requests.Session.post')
+    def test_update(self, rpost):
 
         calls = []
 
-        def mocked_urlopen(request):
+        def mocked_post(url, data, timeout):
             calls.append(1)
-            assert 'abc123' in request.data
-            return StringIO((SAMPLE_STATISTICS_XML % (10,)).strip())
+            assert 'abc123' in data['xml']
+            return Response(SAMPLE_STATISTICS_XML % (10,))
 
-        p_urlopen.side_effect = mocked_urlopen
+        rpost.side_effect = mocked_post
 
         assert not EventHitStats.objects.count()
         assert Event.objects.all()
@@ -63,67 +67,153 @@ class EventHitStatsTestCase(DjangoTestCase):
         eq_(stat.shortcode, 'abc123')
         eq_(len(calls), 1)
 
+        # the first sample is all the hits since it was archived
+        sample, = EventHitStatsSample.objects.all()
+        eq_(sample.event, event)
+        eq_(sample.hits, 10)
+        ok_(stat.velocity > 0)
+        # it was archived years ago and has hardly any hits
+        ok_(stat.next_refresh > stat.modified + datetime.timedelta(days=6))
+
         # do it again and nothing should happen
         eq_(event_hit_stats.update(), 0)
         eq_(len(calls), 1)
 
-        # let's pretend the event is half an hour old
+        # until it's due
         now = timezone.now()
-        half_hour_ago = now - datetime.timedelta(minutes=30)
-
-        # event.update(modified=event.modified - half_hour_ago)
-        # non_signal_save(event, modified=half_hour_ago)
-
-        eq_(event_hit_stats.update(), 0)
-        eq_(len(calls), 1)
-        # ...because the EventHitStats was modified too recently
-        non_signal_save(stat, modified=half_hour_ago)
-        non_signal_save(event, modified=half_hour_ago)
-        eq_(event_hit_stats.update(), 0)
-        eq_(len(calls), 1)
-
-        # it needs to be at least one hour old
-        hour_ago = now - datetime.timedelta(minutes=60, seconds=1)
-        non_signal_save(stat, modified=hour_ago)
-        non_signal_save(event, modified=hour_ago)
-
+        hour_ago = now - datetime.timedelta(hours=1)
+        non_signal_save(stat, modified=hour_ago, next_refresh=now)
         eq_(event_hit_stats.update(), 1)
         eq_(len(calls), 2)
+        stat = EventHitStats.objects.get(pk=stat.pk)
+        eq_(stat.total_hits, 10)
+        eq_(EventHitStatsSample.objects.filter(hits=0).count(), 1)
 
         # a second time, nothing should happen
         eq_(event_hit_stats.update(), 0)
         eq_(len(calls), 2)
 
-        # let's pretend it's even older
-        day_ago = now - datetime.timedelta(hours=24, seconds=1)
-        non_signal_save(stat, modified=day_ago)
-        non_signal_save(event, modified=day_ago)
-        eq_(event_hit_stats.update(), 1)
-        eq_(len(calls), 3)
-
-        # second time, nothing should happen
-        eq_(event_hit_stats.update(), 0)
-        eq_(len(calls), 3)
-
-        # even older still
-        week_ago = now - datetime.timedelta(days=7, seconds=1)
-        non_signal_save(stat, modified=week_ago)
-        non_signal_save(event, modified=week_ago)
-        eq_(event_hit_stats.update(), 1)
-        eq_(len(calls), 4)
+    @mock.patch('requests.Session.post')
+    def test_update_popular_first(self, rpost):
+        hits = {'abc123': 5000, 'xyz987': 1000}
+
+        def mocked_post(url, data, timeout):
+            for shortcode, total_hits in hits.items():
+                if shortcode in data['xml']:
+                    return Response(SAMPLE_STATISTICS_XML % (total_hits,))
+            raise NotImplementedError(data['xml'])
+
+        rpost.side_effect = mocked_post
+
+        event = Event.objects.get(title='Test event')
+        other = Event.objects.create(
+            title='Other event',
+            slug='other',
+            start_time=event.start_time,
+            archive_time=event.archive_time,
+            template_environment={'tag': 'xyz987'},
+        )
+        now = timezone.now()
+        day_ago = now - datetime.timedelta(days=1)
+        popular = EventHitStats.objects.create(
+            event=event,
+            shortcode='abc123',
+            total_hits=4000,
+        )
+        unpopular = EventHitStats.objects.create(
+            event=other,
+            shortcode='xyz987',
+            total_hits=1000,
+        )
+        # the unpopular one is more overdue
+        non_signal_save(popular, modified=day_ago, velocity=40.0)
+        non_signal_save(
+            unpopular,
+            modified=day_ago - datetime.timedelta(days=1),
+            velocity=0.0
+        )
 
-        # second time, nothing should happen
-        eq_(event_hit_stats.update(), 0)
-        eq_(len(calls), 4)
+        eq_(event_hit_stats.update(cap=1), 1)
+        popular = EventHitStats.objects.get(pk=popular.pk)
+        eq_(popular.total_hits, 5000)
+        # 1000 new hits in the last day
+        eq_(round(popular.velocity), 42)
+        ok_(popular.next_refresh < now + datetime.timedelta(hours=3))
+        ok_(
+            popular.next_refresh >
+            now + event_hit_stats.MIN_INTERVAL - datetime.timedelta(seconds=1)
+        )
+        ok_(EventHitStats.objects.get(pk=unpopular.pk).modified < day_ago)
+
+        # next time it's the other one's turn
+        eq_(event_hit_stats.update(cap=1), 1)
+        unpopular = EventHitStats.objects.get(pk=unpopular.pk)
+        eq_(unpopular.velocity, 0.0)
+        ok_(unpopular.next_refresh > now + datetime.timedelta(days=6))
+        eq_(event_hit_stats.update(cap=1), 0)
+
+    def test_get_interval(self):
+        get_interval = event_hit_stats.get_interval
+        day = datetime.timedelta(days=1)
+        hour = datetime.timedelta(hours=1)
+        eq_(get_interval(0, hour), hour)
+        eq_(get_interval(0, day * 2), day)
+        eq_(get_interval(0, day * 400), day * 7)
+        # the more hits, the sooner
+        eq_(get_interval(10, day * 400), hour * 10)
+        eq_(get_interval(1000, day * 400), event_hit_stats.MIN_INTERVAL)
+        # but never later than it would be without any
+        eq_(get_interval(1, hour), hour)
+
+    def test_get_staleness(self):
+        eq_(event_hit_stats.get_staleness(), {
+            'count': 0,
+            'overdue': 0,
+            'average': 0,
+            'weighted_average': 0,
+        })
+        event = Event.objects.get(title='Test event')
+        other = Event.objects.create(
+            title='Other event',
+            slug='other',
+            start_time=event.start_time,
+        )
+        now = timezone.now()
+        stat = EventHitStats.objects.create(
+            event=event,
+            shortcode='abc123',
+            total_hits=4000,
+        )
+        non_signal_save(
+            stat,
+            modified=now - datetime.timedelta(hours=1),
+            next_refresh=now + datetime.timedelta(hours=1),
+            velocity=100.0,
+        )
+        stat = EventHitStats.objects.create(
+            event=other,
+            shortcode='xyz987',
+            total_hits=10,
+        )
+        non_signal_save(
+            stat,
+            modified=now - datetime.timedelta(hours=10),
+            next_refresh=now - datetime.timedelta(hours=1),
+        )
+        staleness = event_hit_stats.get_staleness(now)
+        eq_(staleness['count'], 2)
+        eq_(staleness['overdue'], 1)
+        eq_(round(staleness['average'] / 3600, 1), 5.5)
+        eq_(round(staleness['weighted_average'] / 3600, 1), 1.0)
 
     @mock.patch('airmozilla.manage.event_hit_stats.logging')
-    @mock.patch('urllib2.urlopen')
-    def test_first_update_with_errors(self, p_urlopen, mock_logging):
+    @mock.patch('requests.Session.post')
+    def test_first_update_with_errors(self, rpost, mock_logging):
 
-        def mocked_urlopen(request):
+        def mocked_post(url, data, timeout):
             raise IOError('foo')
 
-        p_urlopen.side_effect = mocked_urlopen
+        rpost.side_effect = mocked_post
 
         vidly_template = Template.objects.create(name='Vid.ly Template')
         event, = Event.objects.archived().all()
@@ -151,15 +241,37 @@ class EventHitStatsTestCase(DjangoTestCase):
             event.title,
             'abc123'
         )
+        stat, = EventHitStats.objects.all()
+        eq_(stat.total_hits, 0)
+
+        # when it works next time, the hits came in since it was
+        # archived, not since the failed download
+        rpost.side_effect = lambda url, data, timeout: Response(
+            SAMPLE_STATISTICS_XML % (240,)
+        )
+        non_signal_save(
+            event,
+            archive_time=timezone.now() - datetime.timedelta(days=10)
+        )
+        eq_(event_hit_stats.update(), 1)
+        sample, = EventHitStatsSample.objects.all()
+        eq_(sample.hits, 240)
+        eq_(round(sample.seconds / 3600 / 24), 10)
+        stat = EventHitStats.objects.get(id=stat.id)
+        eq_(round(stat.velocity), 1)
+        ok_(
+            stat.next_refresh - timezone.now() >
+            event_hit_stats.MIN_INTERVAL
+        )
 
-    @mock.patch('urllib2.urlopen')
-    def test_update_new_tag(self, p_urlopen):
+    @mock.patch('requests.Session.post')
+    def test_update_new_tag(self, rpost):
 
-        def mocked_urlopen(request):
-            assert 'xyz987' in request.data
-            return StringIO((SAMPLE_STATISTICS_XML % (10,)).strip())
+        def mocked_post(url, data, timeout):
+            assert 'xyz987' in data['xml']
+            return Response(SAMPLE_STATISTICS_XML % (10,))
 
-        p_urlopen.side_effect = mocked_urlopen
+        rpost.side_effect = mocked_post
 
         vidly_template = Template.objects.create(name='Vid.ly Template')
         event, = Event.objects.archived().all()
@@ -189,14 +301,14 @@ class EventHitStatsTestCase(DjangoTestCase):
         eq_(stat.total_hits, 10)
         eq_(stat.shortcode, 'xyz987')
 
-    @mock.patch('urllib2.urlopen')
-    def test_update_removed_tag(self, p_urlopen):
+    @mock.patch('requests.Session.post')
+    def test_update_removed_tag(self, rpost):
 
-        def mocked_urlopen(request):
-            assert 'xyz987' in request.data
-            return StringIO((SAMPLE_STATISTICS_XML % (10,)).strip())
+        def mocked_post(url, data, timeout):
+            assert 'xyz987' in data['xml']
+            return Response(SAMPLE_STATISTICS_XML % (10,))
 
-        p_urlopen.side_effect = mocked_urlopen
+        rpost.side_effect = mocked_post
 
         vidly_template = Template.objects.create(name='Vid.ly Template')
         event, = Event.objects.archived().all()
@@ -225,13 +337,13 @@ class EventHitStatsTestCase(DjangoTestCase):
         ok_(not EventHitStats.objects.all().count())
 
     @mock.patch('airmozilla.manage.event_hit_stats.logging')
-    @mock.patch('urllib2.urlopen')
-    def test_update_with_errors(self, p_urlopen, mock_logging):
+    @mock.patch('requests.Session.post')
+    def test_update_with_errors(self, rpost, mock_logging):
 
-        def mocked_urlopen(request):
+        def mocked_post(url, data, timeout):
             raise IOError('boo!')
 
-        p_urlopen.side_effect = mocked_urlopen
+        rpost.side_effect = mocked_post
 
         vidly_template = Template.objects.create(name='Vid.ly Template')
         event, = Event.objects.archived().all()
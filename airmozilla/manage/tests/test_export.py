@@ -0,0 +1,151 @@
+import datetime
+
+import mock
+from nose.tools import eq_, ok_
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from airmozilla.main.models import Event, Tag, Channel
+from airmozilla.manage import export
+from airmozilla.manage import related
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class TestExport(DjangoTestCase):
+
+    def setUp(self):
+        super(TestExport, self).setUp()
+        self.event = Event.objects.get(title='Test event')
+
+    def _create_events(self, count):
+        for i in range(count):
+            Event.objects.create(
+                title='Event %d' % i,
+                slug='event-%d' % i,
+                status=Event.STATUS_SCHEDULED,
+                start_time=self.event.start_time,
+            )
+
+    def test_iter_chunks(self):
+        self._create_events(6)
+        events = Event.objects.all()
+        chunks = list(export.iter_chunks(events, chunk_size=3))
+        eq_([len(x) for x in chunks], [3, 3, 1])
+        ordered = sum(chunks, [])
+        eq_(
+            [x.id for x in ordered],
+            [x.id for x in events.order_by('modified', 'id')]
+        )
+
+        # starting after one of them
+        after = (ordered[2].modified, ordered[2].id)
+        chunks = list(export.iter_chunks(events, after=after, chunk_size=3))
+        eq_(sum(chunks, []), ordered[3:])
+
+        # several modified at the same time
+        Event.objects.all().update(modified=self.event.modified)
+        ordered = list(events.order_by('id'))
+        after = (self.event.modified, ordered[1].id)
+        chunks = list(export.iter_chunks(events, after=after, chunk_size=2))
+        eq_(sum(chunks, []), ordered[2:])
+
+        chunks = list(export.iter_chunks(events, limit=4, chunk_size=3))
+        eq_([len(x) for x in chunks], [3, 1])
+
+    def test_iter_chunks_prefetch(self):
+        self._create_events(6)
+        tag = Tag.objects.create(name='Tag')
+        for event in Event.objects.all():
+            event.tags.add(tag)
+        events = Event.objects.all().prefetch_related('tags', 'channels')
+        with CaptureQueriesContext(connection) as queries:
+            names = [
+                [x.name for x in event.tags.all()] +
+                [x.slug for x in event.channels.all()]
+                for chunk in export.iter_chunks(events, chunk_size=4)
+                for event in chunk
+            ]
+        eq_(len(names), 7)
+        ok_(all('Tag' in x for x in names))
+        # one query for the events, one for the tags and one for the
+        # channels per chunk
+        eq_(len(queries), 2 * 3)
+
+    def test_iter_payloads(self):
+        documents = ['a' * 10, 'b' * 10, 'c' * 30, 'd' * 5]
+        eq_(
+            list(export.iter_payloads(documents, max_documents=3)),
+            [documents[:3], documents[3:]]
+        )
+        eq_(
+            list(export.iter_payloads(documents, max_bytes=25)),
+            [documents[:2], documents[2:3], documents[3:]]
+        )
+        eq_(list(export.iter_payloads([])), [])
+
+    def test_positions(self):
+        eq_(export.get_position('test'), None)
+        now = timezone.now()
+        start = export.get_start('test', datetime.timedelta(minutes=10))
+        ok_(start[0] < now - datetime.timedelta(minutes=9))
+        eq_(start[1], 0)
+
+        export.set_position('test', (now, 123))
+        eq_(export.get_position('test'), (now, 123))
+        # it starts again a little before that
+        eq_(export.get_start('test', datetime.timedelta(minutes=10)),
+            (now - export.OVERLAP, 0))
+        export.set_position('test', (now, 124))
+        eq_(export.get_position('test'), (now, 124))
+        # but it never goes back
+        export.set_position('test', (now - export.OVERLAP, 0))
+        eq_(export.get_position('test'), (now, 124))
+
+    @override_settings(RELATED_CONTENT_BACKEND='elasticsearch')
+    @mock.patch('airmozilla.manage.related.get_connection')
+    def test_related_index(self, get_connection):
+        bulks = []
+
+        def bulk(actions, **kwargs):
+            bulks.append(list(actions))
+
+        es = get_connection.return_value
+        es.index_op.side_effect = lambda doc, id: str(id)
+        es.bulk.side_effect = bulk
+
+        self._create_events(2)
+        channel = Channel.objects.create(name='Labs', slug='labs')
+        self.event.channels.add(channel)
+        self.event.save()
+        ids = list(
+            Event.objects.scheduled_or_processing()
+            .order_by('modified', 'id').values_list('id', flat=True)
+        )
+        # an hour apart from each other
+        first = timezone.now() - datetime.timedelta(days=1)
+        for i, id in enumerate(ids):
+            Event.objects.filter(id=id).update(
+                modified=first + datetime.timedelta(hours=i)
+            )
+        related.index(all=True)
+        eq_(bulks, [[str(x) for x in ids]])
+
+        # nothing has changed since but the last one could have been
+        # saved at the same time as something not committed yet
+        related.index()
+        eq_(bulks[1], [str(ids[-1])])
+
+        event = Event.objects.get(slug='event-0')
+        event.save()
+        related.index()
+        eq_(bulks[2], [str(ids[-1]), str(event.id)])
+
+        # saved a minute before that but only committed now
+        late, = [x for x in ids if x not in (event.id, ids[-1])][:1]
+        Event.objects.filter(id=late).update(
+            modified=event.modified - datetime.timedelta(minutes=1)
+        )
+        related.index()
+        eq_(bulks[3], [str(late), str(event.id)])
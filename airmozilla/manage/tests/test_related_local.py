@@ -0,0 +1,160 @@
+from nose.tools import eq_, ok_
+
+from airmozilla.main.models import Event, Tag, Channel
+from airmozilla.manage import related, related_local
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class TestRelatedLocal(DjangoTestCase):
+
+    def setUp(self):
+        super(TestRelatedLocal, self).setUp()
+        related_local.delete()
+        self.event = Event.objects.get(title='Test event')
+
+    def tearDown(self):
+        super(TestRelatedLocal, self).tearDown()
+        related_local.delete()
+
+    def _create_event(self, title, **kwargs):
+        kwargs.setdefault('privacy', Event.PRIVACY_PUBLIC)
+        return Event.objects.create(
+            title=title,
+            status=Event.STATUS_SCHEDULED,
+            start_time=self.event.start_time,
+            archive_time=self.event.archive_time,
+            description='Something',
+            **kwargs
+        )
+
+    def _find(self, event, audience=Event.PRIVACY_PUBLIC, **boosts):
+        boosts = boosts or {'title': 1.0, 'tags': 1.0, 'channels': 1.0}
+        ids, __, __ = related_local.find(event.id, audience, boosts, 10)
+        return ids
+
+    def test_get_terms(self):
+        terms = related_local.get_terms(
+            u'The Firefox and the firefox of Mozilla',
+            ['Web'],
+            ['main', 'labs'],
+        )
+        eq_(terms['title'], {'firefox': 2, 'mozilla': 1})
+        eq_(terms['tags'], {'web': 1})
+        # the default channel is in everything so it doesn't count
+        eq_(terms['channels'], {'labs': 1})
+
+    def test_find(self):
+        eq_(self._find(self.event), [])
+        very = self._create_event('Test event again')
+        somewhat = self._create_event('An event')
+        unrelated = self._create_event('Something different')
+        private = self._create_event(
+            'Secret test event',
+            privacy=Event.PRIVACY_COMPANY
+        )
+        eq_(related_local.rebuild(), 5)
+        eq_(related_local.count(), 5)
+
+        eq_(self._find(self.event), [very.id, somewhat.id])
+        eq_(
+            self._find(self.event, Event.PRIVACY_CONTRIBUTORS),
+            [very.id, somewhat.id]
+        )
+        ids = self._find(self.event, Event.PRIVACY_COMPANY)
+        eq_(set(ids), set([very.id, somewhat.id, private.id]))
+        ok_(unrelated.id not in ids)
+
+        # tags
+        tag = Tag.objects.create(name='Swimming')
+        unrelated.tags.add(tag)
+        self.event.tags.add(tag)
+        eq_(self._find(self.event, tags=1.0), [unrelated.id])
+        eq_(self._find(self.event, title=1.0), [very.id, somewhat.id])
+
+        # channels
+        channel = Channel.objects.create(name='Labs', slug='labs')
+        unrelated.tags.remove(tag)
+        eq_(self._find(self.event, channels=1.0), [])
+        channel.event_set.add(self.event, unrelated)
+        eq_(self._find(self.event, channels=1.0), [unrelated.id])
+
+    def test_updates(self):
+        other = self._create_event('Different')
+        related_local.rebuild()
+        eq_(self._find(self.event), [])
+
+        # the updates are applied without rebuilding
+        other.title = 'Different test'
+        other.save()
+        eq_(self._find(self.event), [other.id])
+        eq_(self._find(other), [self.event.id])
+
+        new = self._create_event('New test event')
+        eq_(self._find(self.event), [new.id, other.id])
+        eq_(related_local.count(), 3)
+
+        new.privacy = Event.PRIVACY_COMPANY
+        new.save()
+        eq_(self._find(self.event), [other.id])
+
+        other.status = Event.STATUS_REMOVED
+        other.save()
+        eq_(self._find(self.event), [])
+        eq_(related_local.count(), 2)
+
+        new.delete()
+        eq_(related_local.count(), 1)
+        eq_(self._find(self.event, Event.PRIVACY_COMPANY), [])
+
+        # a new index is the same
+        other.status = Event.STATUS_SCHEDULED
+        other.save()
+        eq_(self._find(self.event), [other.id])
+        related_local.rebuild()
+        eq_(self._find(self.event), [other.id])
+        eq_(related_local.count(), 2)
+
+    def test_updates_during_rebuild(self):
+        other = self._create_event('Different')
+        related_local.rebuild()
+        original = related_local._get_documents
+
+        def _get_documents():
+            # saved after the rebuild started reading the database
+            for document in original():
+                yield document
+            other.title = 'Test again'
+            other.save()
+
+        related_local._get_documents = _get_documents
+        try:
+            related_local.rebuild()
+        finally:
+            related_local._get_documents = original
+        eq_(self._find(self.event), [other.id])
+
+    def test_no_index(self):
+        eq_(related_local.count(), 0)
+        eq_(self._find(self.event), [])
+        # saving doesn't fail either
+        self.event.save()
+
+    def test_find_with_negative_boost(self):
+        # -0.5 is the default tags boost, meant for Elasticsearch
+        other = self._create_event('Test event again')
+        tagged = self._create_event('Test event later')
+        tag = Tag.objects.create(name='Swimming')
+        self.event.tags.add(tag)
+        tagged.tags.add(tag)
+        related_local.rebuild()
+        ids, scores, __ = related.find(
+            self.event,
+            Event.PRIVACY_PUBLIC,
+            boost_title=1.0,
+            boost_tags=-0.5,
+            boost_channels=0,
+            size=10,
+        )
+        # having a tag in common makes it more related, not less
+        eq_(ids, [tagged.id, other.id])
+        ok_(scores[tagged.id] > scores[other.id])
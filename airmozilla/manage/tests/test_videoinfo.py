@@ -9,6 +9,7 @@ import mock
 
 from django.conf import settings
 from django.core.cache import cache
+from django.test.utils import override_settings
 
 from airmozilla.main.models import Event, Template, VidlySubmission, Picture
 from airmozilla.manage import videoinfo
@@ -1226,6 +1227,170 @@ class TestVideoinfo(DjangoTestCase):
         eq_(created, 0)
         eq_(len(ffmpeged_urls), 2)
 
+    @override_settings(SCREENCAPTURES_SINGLE_PASS=True)
+    @mock.patch('requests.head')
+    @mock.patch('subprocess.Popen')
+    def test_fetch_screencapture_single_pass(self, mock_popen, rhead):
+
+        def mocked_head(url, **options):
+            return Response('', 200)
+
+        rhead.side_effect = mocked_head
+
+        commands = []
+        sample_jpg = self.sample_jpg
+
+        def mocked_popen(command, **kwargs):
+            commands.append(command)
+            url = command[2]
+            destination = command[-1]
+            assert os.path.isdir(os.path.dirname(destination))
+
+            class Inner:
+                def communicate(self):
+                    if 'xyz123' not in url:
+                        raise NotImplementedError(url)
+                    # pretend the select filter found 2 frames
+                    for i in (1, 2):
+                        shutil.copyfile(sample_jpg, destination % i)
+                    return '', ''
+
+            return Inner()
+
+        mock_popen.side_effect = mocked_popen
+
+        event = Event.objects.get(title='Test event')
+        template = Template.objects.create(
+            name='Vid.ly Something',
+            content="{{ tag }}"
+        )
+        event.duration = 1157
+        event.template = template
+        event.template_environment = {'tag': 'xyz123'}
+        event.save()
+
+        created = videoinfo.fetch_screencapture(
+            event,
+            timestamps=[3, 70],
+            import_immediately=True,
+        )
+        eq_(created, 2)
+        # one ffmpeg for both of them
+        command, = commands
+        select, = [x for x in command if x.startswith('select=')]
+        ok_('gte(t\\,3.000)' in select)
+        ok_('gte(t\\,70.000)' in select)
+        pic1, pic2 = Picture.objects.filter(event=event).order_by('timestamp')
+        eq_(pic1.timestamp, 3)
+        eq_(pic2.timestamp, 70)
+
+    @override_settings(SCREENCAPTURES_SINGLE_PASS=True)
+    @mock.patch('requests.head')
+    @mock.patch('subprocess.Popen')
+    def test_fetch_screencapture_single_pass_same_frame(
+        self,
+        mock_popen,
+        rhead
+    ):
+
+        def mocked_head(url, **options):
+            return Response('', 200)
+
+        rhead.side_effect = mocked_head
+
+        commands = []
+        sample_jpg = self.sample_jpg
+
+        def mocked_popen(command, **kwargs):
+            commands.append(command)
+            destination = command[-1]
+
+            class Inner:
+                def communicate(self):
+                    if '-vframes' in command:
+                        shutil.copyfile(sample_jpg, destination)
+                    else:
+                        # pretend both timestamps picked the same frame
+                        shutil.copyfile(sample_jpg, destination % 1)
+                    return '', ''
+
+            return Inner()
+
+        mock_popen.side_effect = mocked_popen
+
+        event = Event.objects.get(title='Test event')
+        template = Template.objects.create(
+            name='Vid.ly Something',
+            content="{{ tag }}"
+        )
+        event.duration = 1157
+        event.template = template
+        event.template_environment = {'tag': 'xyz123'}
+        event.save()
+
+        created = videoinfo.fetch_screencapture(
+            event,
+            timestamps=[3, 4],
+            import_immediately=True,
+        )
+        eq_(created, 2)
+        # one attempt at doing both, then one for each
+        eq_(len(commands), 3)
+        ok_(not [x for x in commands[0] if x == '-vframes'])
+        ok_('-vframes' in commands[1])
+        ok_('-vframes' in commands[2])
+
+    @override_settings(SCREENCAPTURES_DUPLICATE_DISTANCE=2)
+    @mock.patch('requests.head')
+    @mock.patch('subprocess.Popen')
+    def test_fetch_screencapture_duplicates(self, mock_popen, rhead):
+
+        def mocked_head(url, **options):
+            return Response('', 200)
+
+        rhead.side_effect = mocked_head
+
+        sample_jpg = self.sample_jpg
+        sample_jpg2 = self.sample_jpg2
+
+        def mocked_popen(command, **kwargs):
+            destination = command[-1]
+
+            class Inner:
+                def communicate(self):
+                    # the same picture all along except in the third one
+                    if '03.jpg' in destination:
+                        shutil.copyfile(sample_jpg, destination)
+                    else:
+                        shutil.copyfile(sample_jpg2, destination)
+                    return '', ''
+
+            return Inner()
+
+        mock_popen.side_effect = mocked_popen
+
+        event = Event.objects.get(title='Test event')
+        template = Template.objects.create(
+            name='Vid.ly Something',
+            content="{{ tag }}"
+        )
+        event.duration = 1157
+        event.template = template
+        event.template_environment = {'tag': 'xyz123'}
+        event.save()
+
+        created = videoinfo.fetch_screencapture(event)
+        assert settings.SCREENCAPTURES_NO_PICTURES > 4
+        # the first, the third and the one after the third
+        eq_(created, 3)
+        eq_(
+            sorted(
+                Picture.objects.filter(event=event)
+                .values_list('notes', flat=True)
+            ),
+            ['Screencap 1', 'Screencap 2', 'Screencap 3']
+        )
+
     def test_import_screencaptures_empty(self):
         """it should be possible to run this at any time, even if
         the dedicated temp directory does not exist yet. """
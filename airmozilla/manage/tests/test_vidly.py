@@ -1,3 +1,4 @@
+import re
 import urllib
 from cStringIO import StringIO
 
@@ -587,3 +588,97 @@ class VidlyTestCase(DjangoTestCase):
             'https://air.example.com/subs.dfxp',
             hd=True,
         )
+
+
+class VidlyClientTestCase(DjangoTestCase):
+
+    @mock.patch('requests.Session.post')
+    def test_query_batched(self, rpost):
+        posted = []
+
+        def mocked_post(url, data, timeout):
+            posted.append(data['xml'])
+            tags = re.findall(
+                '<MediaShortLink>(\w+)</MediaShortLink>',
+                data['xml']
+            )
+            tasks = [
+                '<Task><MediaShortLink>%s</MediaShortLink>'
+                '<Status>Finished</Status></Task>' % tag
+                for tag in tags
+            ]
+            return Response(
+                '<?xml version="1.0"?><Response><Success>%s'
+                '</Success></Response>' % ''.join(tasks)
+            )
+
+        rpost.side_effect = mocked_post
+        client = vidly.VidlyClient(batch_size=2)
+        results = client.query(['abc1', 'abc2', 'abc3'])
+        eq_(sorted(results), ['abc1', 'abc2', 'abc3'])
+        eq_(results['abc3']['Status'], 'Finished')
+        # two per request
+        eq_(len(posted), 2)
+        ok_('<Action>GetStatus</Action>' in posted[0])
+
+    @mock.patch('requests.Session.post')
+    def test_statistics_many(self, rpost):
+
+        def mocked_post(url, data, timeout):
+            if 'broken' in data['xml']:
+                return Response('Not Found', 500)
+            ok_('<Action>GetStatistics</Action>' in data['xml'])
+            return Response(SAMPLE_STATISTICS_XML)
+
+        rpost.side_effect = mocked_post
+        client = vidly.VidlyClient()
+        results, errors = client.statistics_many(
+            ['abc1', 'abc2', 'abc1', 'broken']
+        )
+        eq_(results, {
+            'abc1': {'total_hits': 10},
+            'abc2': {'total_hits': 10},
+        })
+        eq_(errors.keys(), ['broken'])
+        ok_(isinstance(errors['broken'], vidly.VidlyAPIError))
+        eq_(rpost.call_count, 3)
+
+    @mock.patch('requests.Session.post')
+    def test_tokenize_many(self, rpost):
+
+        def mocked_post(url, data, timeout):
+            tag, = re.findall(
+                '<MediaShortLink>(\w+)</MediaShortLink>',
+                data['xml']
+            )
+            return Response("""
+            <?xml version="1.0"?>
+            <Response>
+              <Message>OK</Message>
+              <MessageCode>7.4</MessageCode>
+              <Success>
+                <MediaShortLink>%s</MediaShortLink>
+                <Token>TOKEN-%s</Token>
+              </Success>
+            </Response>
+            """ % (tag, tag))
+
+        rpost.side_effect = mocked_post
+        client = vidly.VidlyClient()
+        eq_(
+            client.tokenize_many(['abc1', 'abc2'], 60),
+            {'abc1': 'TOKEN-abc1', 'abc2': 'TOKEN-abc2'}
+        )
+        eq_(rpost.call_count, 2)
+        # the second time they come from the cache
+        eq_(
+            client.tokenize_many(['abc1', 'abc2', 'abc3'], 60),
+            {
+                'abc1': 'TOKEN-abc1',
+                'abc2': 'TOKEN-abc2',
+                'abc3': 'TOKEN-abc3',
+            }
+        )
+        eq_(rpost.call_count, 3)
+        # and it's the same cache as vidly.tokenize() uses
+        eq_(vidly.tokenize('abc3', 60), 'TOKEN-abc3')
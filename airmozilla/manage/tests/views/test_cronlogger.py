@@ -64,3 +64,45 @@ class TestCronLogger(ManageTestCase):
         eq_(response.status_code, 200)
         data = json.loads(response.content)
         eq_(data['count'], 1)
+
+    def test_stats_page(self):
+        url = reverse('manage:cronlogger_stats')
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+
+    def test_stats_data(self):
+        url = reverse('manage:cronlogger_stats_data')
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        data = json.loads(response.content)
+        eq_(data['days'], 30)
+        eq_(data['jobs'], [])
+
+        CronLog.objects.create(
+            job='foo',
+            duration=Decimal('0.1'),
+            queries=10,
+            query_time=Decimal('0.01'),
+        )
+        CronLog.objects.create(
+            job='bar',
+            duration=Decimal('1.1'),
+        )
+        response = self.client.get(url, {'days': 7})
+        eq_(response.status_code, 200)
+        data = json.loads(response.content)
+        eq_(data['days'], 7)
+        # slowest first
+        eq_([x['job'] for x in data['jobs']], ['bar', 'foo'])
+        foo = data['jobs'][1]
+        eq_(foo['count'], 1)
+        eq_(foo['current']['duration']['p95'], 0.1)
+        eq_(foo['current']['queries']['p95'], 10.0)
+        # nothing to compare with
+        eq_(foo['change'], None)
+        eq_(len(foo['days']), 1)
+
+        response = self.client.get(url, {'days': 'x'})
+        eq_(response.status_code, 400)
+        response = self.client.get(url, {'days': '0'})
+        eq_(response.status_code, 400)
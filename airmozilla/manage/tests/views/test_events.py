@@ -58,6 +58,18 @@ from airmozilla.manage.views.events import is_privacy_vidly_mismatch
 from .base import ManageTestCase
 
 
+def decode_events_data(content):
+    """The events in events_data come as columns and rows. Turn them back
+    into a list of dicts without the columns that are null."""
+    data = json.loads(content)
+    columns = data['events']['columns']
+    data['events'] = [
+        dict((k, v) for k, v in zip(columns, row) if v is not None)
+        for row in data['events']['rows']
+    ]
+    return data
+
+
 class _Response(object):
     def __init__(self, content, status_code=200):
         self.content = self.text = content
@@ -194,14 +206,14 @@ class TestEvents(ManageTestCase):
         event = Event.objects.get(title='Test event')
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         eq_(results['events'][0]['id'], event.id)
 
         event.status = Event.STATUS_PENDING
         event.save()
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         # still there
         eq_(results['events'][0]['id'], event.id)
 
@@ -209,14 +221,14 @@ class TestEvents(ManageTestCase):
         event.save()
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         ok_(not results['events'])
 
     def test_events_with_event_without_location(self):
         event = Event.objects.get(title='Test event')
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         # the "local" time this event starts is 12:30
         ok_('12:30PM' in result['start_time'])
@@ -227,7 +239,7 @@ class TestEvents(ManageTestCase):
         event.save()
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         ok_('7:30PM' in result['start_time'])
         ok_('21 Jun 2012' in result['start_time'])
@@ -240,7 +252,7 @@ class TestEvents(ManageTestCase):
         event.save()
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         eq_(result['popcorn_url'], event.popcorn_url)
 
@@ -248,7 +260,7 @@ class TestEvents(ManageTestCase):
         event = Event.objects.get(title='Test event')
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         ok_(results['events'])
         eq_(results['max_modified'], event.modified.isoformat())
         first, = results['events']
@@ -258,7 +270,7 @@ class TestEvents(ManageTestCase):
         url = reverse('manage:events_data')
         response = self.client.get(url)
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         ok_(results['events'])
 
         response = self.client.get(url, {
@@ -270,7 +282,7 @@ class TestEvents(ManageTestCase):
             'since': results['max_modified']
         })
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         ok_(not results['events'])
         ok_(not results['max_modified'])
 
@@ -281,7 +293,7 @@ class TestEvents(ManageTestCase):
             'since': max_modified,
         })
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         ok_(results['events'])
         eq_(results['max_modified'], event.modified.isoformat())
 
@@ -289,7 +301,7 @@ class TestEvents(ManageTestCase):
         event = Event.objects.get(title='Test event')
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         ok_('pictures' not in result)
         with open(self.placeholder) as fp:
@@ -299,7 +311,7 @@ class TestEvents(ManageTestCase):
             )
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         eq_(result['pictures'], 1)
 
@@ -307,7 +319,7 @@ class TestEvents(ManageTestCase):
         event = Event.objects.get(title='Test event')
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         ok_('picture' not in result)
         with open(self.placeholder) as fp:
@@ -318,7 +330,7 @@ class TestEvents(ManageTestCase):
             event.save()
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         eq_(result['picture'], picture.id)
 
@@ -327,7 +339,7 @@ class TestEvents(ManageTestCase):
         assert event.status == Event.STATUS_SCHEDULED
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        results = json.loads(response.content)
+        results = decode_events_data(response.content)
         result = results['events'][0]
         ok_(result['is_scheduled'])
 
@@ -356,19 +368,134 @@ class TestEvents(ManageTestCase):
         url = reverse('manage:events_data')
         response = self.client.get(url)
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         eq_(len(result['events']), 3)
 
         response = self.client.get(url, {'limit': 2})
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         eq_(len(result['events']), 2)
 
         response = self.client.get(url, {'limit': -2})
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         eq_(len(result['events']), 3)
 
+    def test_events_data_columns(self):
+        url = reverse('manage:events_data')
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        data = json.loads(response.content)
+        columns = data['events']['columns']
+        row, = data['events']['rows']
+        eq_(len(row), len(columns))
+        eq_(row[columns.index('title')], 'Test event')
+        eq_(data['statuses']['scheduled'], 'Scheduled')
+        eq_(data['privacies']['public'], 'Public')
+        eq_(data['count'], 1)
+
+    def test_events_data_pagination(self):
+        event = Event.objects.get(title='Test event')
+        for i in range(1, 5):
+            Event.objects.create(
+                title='Event %d' % i,
+                slug='event%d' % i,
+                description=event.description,
+                start_time=event.start_time + datetime.timedelta(days=i),
+                privacy=Event.PRIVACY_PUBLIC,
+                placeholder_img=event.placeholder_img,
+                location=event.location,
+                status=Event.STATUS_SCHEDULED,
+            )
+        url = reverse('manage:events_data')
+
+        def get_titles(**params):
+            response = self.client.get(url, params)
+            eq_(response.status_code, 200)
+            data = decode_events_data(response.content)
+            eq_(data['count'], 5)
+            return [x['title'] for x in data['events']], data
+
+        # default is by modified, most recent first
+        titles, data = get_titles(limit=2)
+        eq_(titles, ['Event 4', 'Event 3'])
+        eq_(data['previous'], None)
+        titles, data = get_titles(limit=2, after=data['next'])
+        eq_(titles, ['Event 2', 'Event 1'])
+        titles, data = get_titles(limit=2, after=data['next'])
+        eq_(titles, ['Test event'])
+        eq_(data['next'], None)
+        # and back again
+        titles, data = get_titles(limit=2, before=data['previous'])
+        eq_(titles, ['Event 2', 'Event 1'])
+        titles, data = get_titles(limit=2, before=data['previous'])
+        eq_(titles, ['Event 4', 'Event 3'])
+        eq_(data['previous'], None)
+        ok_(data['next'])
+
+        titles, data = get_titles(limit=3, sort='start_time')
+        eq_(titles, ['Test event', 'Event 1', 'Event 2'])
+        titles, data = get_titles(limit=3, sort='start_time',
+                                  after=data['next'])
+        eq_(titles, ['Event 3', 'Event 4'])
+        titles, data = get_titles(limit=3, sort='title', reverse=True)
+        eq_(titles, ['Test event', 'Event 4', 'Event 3'])
+        titles, data = get_titles(limit=3, sort='title', reverse=True,
+                                  after=data['next'])
+        eq_(titles, ['Event 2', 'Event 1'])
+
+        response = self.client.get(url, {'after': 'junk'})
+        eq_(response.status_code, 400)
+        response = self.client.get(url, {'after': 'x,1', 'before': 'y,2'})
+        eq_(response.status_code, 400)
+        response = self.client.get(url, {'sort': 'junk'})
+        eq_(response.status_code, 400)
+
+    def test_events_data_filtering(self):
+        event = Event.objects.get(title='Test event')
+        channel = Channel.objects.create(name='Ding Dong', slug='ding')
+        other = Event.objects.create(
+            title='Other Things',
+            slug='other',
+            description=event.description,
+            start_time=event.start_time + datetime.timedelta(days=10),
+            privacy=Event.PRIVACY_COMPANY,
+            placeholder_img=event.placeholder_img,
+            status=Event.STATUS_PENDING,
+        )
+        other.channels.add(channel)
+        url = reverse('manage:events_data')
+
+        def get_titles(**params):
+            response = self.client.get(url, params)
+            eq_(response.status_code, 200)
+            data = decode_events_data(response.content)
+            titles = [x['title'] for x in data['events']]
+            eq_(data['count'], len(titles))
+            return titles
+
+        eq_(get_titles(), ['Other Things', 'Test event'])
+        eq_(get_titles(title='test'), ['Test event'])
+        eq_(get_titles(title='THINGS oth'), ['Other Things'])
+        eq_(get_titles(title='test-ev'), ['Test event'])
+        eq_(get_titles(title='nothing'), [])
+        eq_(get_titles(location='mountain'), ['Test event'])
+        eq_(get_titles(location='blank'), ['Other Things'])
+        eq_(get_titles(channel='dong'), ['Other Things'])
+        eq_(get_titles(status=Event.STATUS_PENDING), ['Other Things'])
+        eq_(get_titles(privacy=Event.PRIVACY_PUBLIC), ['Test event'])
+        eq_(get_titles(archived='archived'), ['Test event'])
+        eq_(get_titles(archived='not-archived'), ['Other Things'])
+        eq_(
+            get_titles(start_time=other.start_time.strftime('%Y-%m-%d')),
+            ['Other Things']
+        )
+        eq_(get_titles(only='pictureless'), [])
+        eq_(get_titles(only='live'), [])
+
+        response = self.client.get(url, {'status': 'junk'})
+        eq_(response.status_code, 400)
+
     def test_events_data_with_live_and_upcoming(self):
         # some events will be annotated with is_live and is_upcoming
         event = Event.objects.get(title='Test event')
@@ -405,7 +532,7 @@ class TestEvents(ManageTestCase):
         url = reverse('manage:events_data')
         response = self.client.get(url)
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         titles = [x['title'] for x in result['events']]
         eq_(titles, ['Event 3', 'Event 2', 'Test event'])
 
@@ -433,7 +560,7 @@ class TestEvents(ManageTestCase):
         url = reverse('manage:events_data')
         response = self.client.get(url)
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         assert result['events'][0]['title'] == event.title
 
     def test_events_data_without_any_picture(self):
@@ -443,7 +570,7 @@ class TestEvents(ManageTestCase):
         url = reverse('manage:events_data')
         response = self.client.get(url)
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         ok_(result['events'][0]['nopicture'])
 
     def test_events_data_pending_with_has_vidly_template(self):
@@ -454,7 +581,7 @@ class TestEvents(ManageTestCase):
         url = reverse('manage:events_data')
         response = self.client.get(url)
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         row = result['events'][0]
         assert row['title'] == event.title
         ok_(row['is_pending'])
@@ -466,7 +593,7 @@ class TestEvents(ManageTestCase):
         assert event.has_vidly_template()
         response = self.client.get(url)
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         row = result['events'][0]
         ok_(row['is_pending'])
         ok_(row.get('has_vidly_template'))
@@ -497,7 +624,7 @@ class TestEvents(ManageTestCase):
         )
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         titles = [x['title'] for x in result['events']]
         ok_(event.title in titles)
         ok_(event2.title in titles)
@@ -528,7 +655,7 @@ class TestEvents(ManageTestCase):
         assert self.client.login(username='nigel', password='secret')
         response = self.client.get(reverse('manage:events_data'))
         eq_(response.status_code, 200)
-        result = json.loads(response.content)
+        result = decode_events_data(response.content)
         titles = [x['title'] for x in result['events']]
 
         ok_(event.title in titles)
@@ -1895,6 +2022,7 @@ class TestEvents(ManageTestCase):
         ok_(u'1\xa0year' in unicode(response.content, 'utf-8'))
         ok_('101' in response.content)
         ok_('0.3' in response.content)
+        ok_('weighted by how many hits' in response.content)
 
     def test_event_hit_stats_include_excluded(self):
         event = Event.objects.get(title='Test event')
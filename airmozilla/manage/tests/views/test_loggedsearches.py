@@ -2,9 +2,10 @@ from nose.tools import eq_, ok_
 
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.utils import timezone
 
 from airmozilla.main.models import Event
-from airmozilla.search.models import LoggedSearch
+from airmozilla.search.models import LoggedSearch, LoggedSearchClick
 from .base import ManageTestCase
 
 
@@ -27,10 +28,24 @@ class TestLoggedSearches(ManageTestCase):
             event_clicked=None
         )
 
+        LoggedSearch.objects.create(
+            term='clicked',
+            key='abc123',
+        )
+        LoggedSearchClick.objects.create(
+            search_key='abc123',
+            event=Event.objects.create(
+                title='Clicked event',
+                slug='clicked-event',
+                start_time=timezone.now(),
+            )
+        )
+
         response = self.client.get(reverse('manage:loggedsearches'))
         eq_(response.status_code, 200)
 
         ok_('Test event' in response.content)
+        ok_('Clicked event' in response.content)
         url = reverse('search:home') + '?q=some+thing&amp;_nolog'
         ok_(url in response.content)
 
@@ -39,3 +54,12 @@ class TestLoggedSearches(ManageTestCase):
         # and its use is very minimal.
         response = self.client.get(reverse('manage:loggedsearches_stats'))
         eq_(response.status_code, 200)
+
+        event = Event.objects.get(title='Test event')
+        for i in range(4):
+            LoggedSearch.objects.create(term='Firefox', key=str(i))
+        LoggedSearchClick.objects.create(search_key='0', event=event)
+        response = self.client.get(reverse('manage:loggedsearches_stats'))
+        eq_(response.status_code, 200)
+        ok_('>firefox</a>' in response.content)
+        ok_('(25%)' in response.content)
@@ -2,6 +2,7 @@ from nose.tools import eq_, ok_
 
 from django.conf import settings
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 
 from airmozilla.main.models import Event, Tag
 from airmozilla.manage import related
@@ -12,6 +13,9 @@ class TestRelatedContent(ManageTestCase):
 
     def setUp(self):
         super(TestRelatedContent, self).setUp()
+        if related.is_local():
+            related.delete()
+            return
 
         es = related.get_connection()
         related.delete(es)
@@ -124,3 +128,8 @@ class TestRelatedContent(ManageTestCase):
         })
         eq_(response.status_code, 200)
         ok_('<h4>Matches</h4>' not in response.content)
+
+
+@override_settings(RELATED_CONTENT_BACKEND='elasticsearch')
+class TestElasticsearchRelatedContent(TestRelatedContent):
+    """The same tests but with Elasticsearch running."""
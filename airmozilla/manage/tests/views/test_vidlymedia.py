@@ -708,6 +708,21 @@ class TestVidlyMedia(ManageTestCase):
         # Not much is happening on this page server side.
         # It just loads some javascript that loads some JSON
         eq_(response.status_code, 200)
+        ok_('How good were the estimates?' not in response.content)
+
+        event = Event.objects.get(title='Test event')
+        event.duration = 60
+        event.save()
+        VidlySubmission.objects.create(
+            event=event,
+            submission_time=timezone.now(),
+            finished=timezone.now() + datetime.timedelta(seconds=150),
+            estimated_duration=120,
+        )
+        response = self.client.get(url)
+        eq_(response.status_code, 200)
+        ok_('How good were the estimates?' in response.content)
+        ok_('20.0%' in response.content)
 
     def test_vidly_media_timings_data(self):
         url = reverse('manage:vidly_media_timings_data')
@@ -309,6 +309,12 @@ urlpatterns = patterns(
     url(r'^cronlogger/data/$',
         cronlogger.cronlogger_data,
         name='cronlogger_data'),
+    url(r'^cronlogger/stats/$',
+        cronlogger.cronlogger_stats,
+        name='cronlogger_stats'),
+    url(r'^cronlogger/stats/data/$',
+        cronlogger.cronlogger_stats_data,
+        name='cronlogger_stats_data'),
     url(r'^autocompeter/$',
         autocompeter.autocompeter_home,
         name='autocompeter'),
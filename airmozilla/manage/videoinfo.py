@@ -11,6 +11,8 @@ import glob
 import stat
 
 import requests
+from PIL import Image
+from concurrent import futures
 
 from django.core.cache import cache
 from django.conf import settings
@@ -19,6 +21,7 @@ from django.db.models import Q
 from django.core.files import File
 
 from airmozilla.main.models import Event, VidlySubmission, Picture
+from airmozilla.main.utils import perceptual_hash, hash_distance
 from airmozilla.base.templatetags.jinja_helpers import show_duration
 from airmozilla.manage import vidly
 
@@ -229,7 +232,6 @@ def fetch_screencapture(
         seconds = 0
         created = 0
         t0 = time.time()
-        number = 0
         output_template = os.path.join(save_dir, 'screencap-%02d.jpg')
         all_out = []
         all_err = []
@@ -245,19 +247,79 @@ def fetch_screencapture(
                 '1',
                 save_name,
             ]
+            if verbose:  # pragma: no cover
+                print ' '.join(command)
+            return wrap_subprocess(command)
+
+        def extract_frames(all_seconds, save_names):
+            # Read the video once and let a select filter pick out the
+            # first frame at, or after, each of the timestamps.
+            # The frames come out numbered in order so they're
+            # renamed to the names they'd have had otherwise.
+            # Timestamps that land on the same frame only produce one
+            # file between them, so then the numbers don't line up and
+            # it returns False having deleted what it got.
+            expression = '+'.join(
+                'gte(t\\,{0:.3f})*not(gte(prev_pts*TB\\,{0:.3f}))'.format(
+                    seconds
+                )
+                for seconds in all_seconds
+            )
+            frames_template = os.path.join(save_dir, 'frame-%04d.jpg')
+            command = [
+                ffmpeg_location,
+                '-i',
+                video_url,
+                '-vf',
+                "select='{}'".format(expression),
+                '-vsync',
+                'vfr',
+                frames_template,
+            ]
             if verbose:  # pragma: no cover
                 print ' '.join(command)
             out, err = wrap_subprocess(command)
             all_out.append(out)
             all_err.append(err)
+            frames = sorted(
+                glob.glob(os.path.join(save_dir, 'frame-*.jpg'))
+            )
+            if len(frames) < len(save_names):
+                for frame in frames:
+                    os.remove(frame)
+                return False
+            for i, save_name in enumerate(save_names):
+                frame = frames_template % (i + 1)
+                if os.path.isfile(frame):
+                    os.rename(frame, save_name)
+            return True
+
+        def extract(all_seconds, save_names):
+            if settings.SCREENCAPTURES_SINGLE_PASS and len(all_seconds) > 1:
+                if extract_frames(all_seconds, save_names):
+                    return
+            with futures.ThreadPoolExecutor(
+                max_workers=settings.SCREENCAPTURES_CONCURRENCY
+            ) as pool:
+                for out, err in pool.map(
+                    extract_frame,
+                    all_seconds,
+                    save_names
+                ):
+                    all_out.append(out)
+                    all_err.append(err)
+
+        def get_files(save_name):
+            return [x for x in _get_files(save_dir) if x == save_name]
 
         if timestamps is not None:
-            for timestamp in timestamps:
-                extract_frame(timestamp, output_template % timestamp)
+            save_names = [output_template % x for x in timestamps]
+            extract(timestamps, save_names)
+            for timestamp, save_name in zip(timestamps, save_names):
                 if callback:
-                    created = _callback_files(
+                    created += _callback_files(
                         callback,
-                        _get_files(save_dir),
+                        get_files(save_name),
                         delete_opened_files=True,
                     )
                 # else:
@@ -265,19 +327,26 @@ def fetch_screencapture(
                 if import_immediately:
                     created += _import_files(
                         event,
-                        _get_files(save_dir),
+                        get_files(save_name),
                         delete_opened_files=True,
                         timestamp=timestamp,
                     )
         else:
+            all_seconds = []
             while seconds < event.duration:
-                number += 1
-                extract_frame(seconds, output_template % number)
+                all_seconds.append(seconds)
                 seconds += incr
-                if import_immediately:
+            save_names = [
+                output_template % (number + 1)
+                for number in range(len(all_seconds))
+            ]
+            extract(all_seconds, save_names)
+            _delete_duplicate_files(save_names)
+            if import_immediately:
+                for save_name in save_names:
                     created += _import_files(
                         event,
-                        _get_files(save_dir),
+                        get_files(save_name),
                         set_first_available=set_first_available,
                         delete_opened_files=True,
                     )
@@ -338,6 +407,29 @@ def fetch_screencapture(
             shutil.rmtree(save_dir)
 
 
+def _delete_duplicate_files(filepaths):
+    """Delete the screen captures that look the same as the one kept
+    before them."""
+    max_distance = settings.SCREENCAPTURES_DUPLICATE_DISTANCE
+    if max_distance is None:
+        return
+    previous = None
+    for filepath in filepaths:
+        if not os.path.isfile(filepath):
+            continue
+        try:
+            hash_ = perceptual_hash(Image.open(filepath))
+        except IOError:
+            continue
+        if (
+            previous is not None and
+            hash_distance(previous, hash_) <= max_distance
+        ):
+            os.remove(filepath)
+        else:
+            previous = hash_
+
+
 def _get_files(directory):
     filenames = []
     for filename in glob.glob(os.path.join(directory, 'screencap*.jpg')):
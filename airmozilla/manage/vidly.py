@@ -6,6 +6,9 @@ import xml.dom.minidom
 import xml.etree.ElementTree as ET
 
 import requests
+from concurrent import futures
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 
 from django.core.cache import cache
 from django.conf import settings
@@ -31,6 +34,10 @@ class VideoError(Exception):
     pass
 
 
+class VidlyAPIError(Exception):
+    pass
+
+
 def tokenize(tag, seconds):
     cache_key = 'vidly_tokenize:%s' % tag
     token = cache.get(cache_key)
@@ -66,6 +73,11 @@ def tokenize(tag, seconds):
             'Temporary network error when trying to fetch Vid.ly token'
         )
     response_content = response.read().strip()
+    return _parse_token(tag, response_content)
+
+
+def _parse_token(tag, response_content):
+    cache_key = 'vidly_tokenize:%s' % tag
     root = ET.fromstring(response_content)
 
     success = root.find('Success')
@@ -225,6 +237,10 @@ def statistics(shortcode):
     ET.SubElement(filter, 'MediaShortLink').text = shortcode
     xml_string = ET.tostring(root)
     response_content = _download(xml_string)
+    return _parse_statistics(response_content)
+
+
+def _parse_statistics(response_content):
     root = ET.fromstring(response_content)
     success = root.find('Success')
     if success is None:
@@ -443,3 +459,146 @@ def update_media_closed_captions(
                 error_name,
             )
         )
+
+
+class VidlyClient(object):
+    """For when there are many Vid.ly API calls to make in one go.
+
+    All requests go over one `requests.Session` so the connections
+    are kept alive and re-used. Calls time out and are retried on
+    connection errors and on 5xx responses. `GetStatus` queries are
+    sent for many shortcodes at a time and the actions that can only
+    be about one shortcode at a time (statistics and tokens) can be
+    run in parallel with a pool of threads.
+
+    Only read-only actions are done by this client, so it's safe to
+    retry the POST requests.
+    """
+
+    def __init__(
+        self,
+        timeout=None,
+        retries=None,
+        workers=None,
+        batch_size=None,
+    ):
+        self.timeout = timeout or settings.VIDLY_API_TIMEOUT
+        if retries is None:
+            retries = settings.VIDLY_API_RETRIES
+        self.workers = workers or settings.VIDLY_API_WORKERS
+        self.batch_size = batch_size or settings.VIDLY_API_BATCH_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.workers,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                method_whitelist=frozenset(['POST']),
+            ),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _new_query(self, action):
+        root = ET.Element('Query')
+        ET.SubElement(root, 'Action').text = action
+        ET.SubElement(root, 'UserID').text = settings.VIDLY_USER_ID
+        ET.SubElement(root, 'UserKey').text = settings.VIDLY_USER_KEY
+        return root
+
+    def _post(self, root):
+        response = self.session.post(
+            settings.VIDLY_API_URL,
+            data={'xml': ET.tostring(root)},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise VidlyAPIError(
+                '{} from {}'.format(
+                    response.status_code,
+                    settings.VIDLY_API_URL,
+                )
+            )
+        return response.content.strip()
+
+    def _map(self, function, items):
+        """Return two dicts. One of item->result for every item that
+        worked and one of item->exception for every item that didn't."""
+        results = {}
+        errors = {}
+        with futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            jobs = dict(
+                (pool.submit(function, item), item) for item in items
+            )
+            for job in futures.as_completed(jobs):
+                item = jobs[job]
+                try:
+                    results[item] = job.result()
+                except Exception as exception:
+                    errors[item] = exception
+        return results, errors
+
+    def query(self, shortcodes):
+        """Like `vidly.query()` but with one `GetStatus` request per
+        `self.batch_size` shortcodes."""
+        if isinstance(shortcodes, basestring):
+            shortcodes = [shortcodes]
+        shortcodes = list(shortcodes)
+        results = {}
+        for i in range(0, len(shortcodes), self.batch_size):
+            root = self._new_query('GetStatus')
+            for shortcode in shortcodes[i:i + self.batch_size]:
+                ET.SubElement(root, 'MediaShortLink').text = shortcode
+            dom = xml.dom.minidom.parseString(self._post(root))
+            results.update(_unpack_dom(dom, 'Task'))
+        return results
+
+    def statistics(self, shortcode):
+        assert shortcode
+        root = self._new_query('GetStatistics')
+        filter = ET.SubElement(root, 'Filter')
+        ET.SubElement(filter, 'MediaShortLink').text = shortcode
+        return _parse_statistics(self._post(root))
+
+    def statistics_many(self, shortcodes):
+        """Return a dict of shortcode->statistics and a dict of
+        shortcode->exception for those that failed.
+        The statistics for a shortcode have to be asked for one at a
+        time so these are fetched in parallel."""
+        return self._map(self.statistics, set(shortcodes))
+
+    def tokenize(self, tag, seconds):
+        cache_key = 'vidly_tokenize:%s' % tag
+        token = cache.get(cache_key)
+        if token is not None:
+            return token
+        root = self._new_query('GetSecurityToken')
+        ET.SubElement(root, 'MediaShortLink').text = tag
+        ET.SubElement(root, 'ExpirationTimeSeconds').text = str(seconds)
+        return _parse_token(tag, self._post(root))
+
+    def tokenize_many(self, tags, seconds):
+        """Return a dict of tag->token. Tokens that are already cached
+        are not fetched again and the others are fetched in parallel.
+        Tags that we failed to get a token for are left out."""
+        tags = set(tags)
+        cache_keys = dict(('vidly_tokenize:%s' % tag, tag) for tag in tags)
+        tokens = dict(
+            (cache_keys[key], token)
+            for key, token in cache.get_many(cache_keys.keys()).items()
+        )
+        missing = tags - set(tokens)
+        results, errors = self._map(
+            lambda tag: self.tokenize(tag, seconds),
+            missing,
+        )
+        for tag, exception in errors.items():
+            logging.error(
+                'Unable fetch token for tag %r (%s)', tag, exception
+            )
+        for tag, token in results.items():
+            if token is not None:
+                tokens[tag] = token
+        return tokens
@@ -6,6 +6,7 @@ from django.db.models import Q
 from airmozilla.base.utils import paginate
 from airmozilla.manage import forms
 from airmozilla.comments.models import Comment
+from airmozilla.comments import thread
 
 from .decorators import staff_required, permission_required
 
@@ -55,6 +56,7 @@ def all_comments(request):
 
 @staff_required
 @permission_required('comments.change_comment')
+@thread.changes_after_commit
 @transaction.atomic
 def comment_edit(request, id):
     context = {}
@@ -8,6 +8,7 @@ from django.db.models import Count
 from jsonview.decorators import json_view
 
 from airmozilla.cronlogger.models import CronLog
+from airmozilla.cronlogger.stats import job_stats
 
 from .decorators import superuser_required
 
@@ -30,6 +31,11 @@ def cronlogger_data(request):
         'exc_value',
         'exc_traceback',
         'duration',
+        'queries',
+        'query_time',
+        'http_requests',
+        'http_time',
+        'max_rss',
     )
     qs = CronLog.objects.all()
     jobs = []
@@ -50,13 +56,49 @@ def cronlogger_data(request):
         for v in values:
             item[v] = getattr(log, v)
         item['created'] = item['created'].isoformat()
-        item['duration'] = float(item['duration'])
+        for v in ('duration', 'query_time', 'http_time'):
+            if item[v] is not None:
+                item[v] = float(item[v])
         logs.append(item)
     context['logs'] = logs
 
     return context
 
 
+@superuser_required
+def cronlogger_stats(request):
+    return render(request, 'manage/cronlogger_stats.html')
+
+
+@superuser_required
+@json_view
+def cronlogger_stats_data(request):
+    try:
+        days = int(request.GET.get('days', 30))
+        if days < 1:
+            raise ValueError(days)
+    except ValueError:
+        return http.HttpResponseBadRequest('Invalid days')
+    stats = job_stats(days=days, job=request.GET.get('job'))
+    jobs = []
+    for name, job in stats.items():
+        current = job['current']['duration']['p95']
+        previous = job['previous']['duration']['p95']
+        jobs.append({
+            'job': name,
+            'count': job['current']['count'],
+            'current': job['current'],
+            'previous': job['previous'],
+            'days': job['days'],
+            # how much slower (or faster) the 95th percentile is
+            # compared to the period before
+            'change': current / previous if previous else None,
+        })
+    # slowest first
+    jobs.sort(key=lambda x: x['current']['duration']['p95'], reverse=True)
+    return {'days': days, 'jobs': jobs}
+
+
 def cron_pings(request):  # pragma: no cover
     """reveals if the cron_ping management command has recently been fired
     by the cron jobs."""
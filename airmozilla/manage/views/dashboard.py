@@ -1,24 +1,14 @@
 import datetime
 from collections import defaultdict
 
-from django.contrib.auth.models import User
 from django.shortcuts import render
 from django.utils import timezone
-from django.db.models import Sum
 from django.template.defaultfilters import filesizeformat
 
 from jsonview.decorators import json_view
 
-from airmozilla.main.models import (
-    Event,
-    SuggestedEvent,
-    Picture,
-    EventRevision,
-    Chapter,
-)
-from airmozilla.starred.models import StarredEvent
-from airmozilla.comments.models import Comment
-from airmozilla.uploads.models import Upload
+from airmozilla.main.models import DailyRollup
+from airmozilla.manage.dashboard import get_counts, get_today
 
 from .decorators import staff_required
 
@@ -29,12 +19,35 @@ def dashboard(request):
     return render(request, 'manage/dashboard.html')
 
 
+# The groups on the dashboard, in order, and the metric for each.
+# See airmozilla/manage/dashboard.py for the metrics.
+DASHBOARD_GROUPS = (
+    ('events', 'New Events'),
+    ('suggested_events', 'Requested Events'),
+    ('users', 'New Users'),
+    ('comments', 'Comments'),
+    ('event_revisions', 'Event Revisions'),
+    ('pictures', 'Pictures'),
+    ('chapters', 'Chapters'),
+    ('starred_events', 'Starred events'),
+)
+
+
+def _format_duration(seconds):
+    minutes = seconds / 60
+    hours = minutes / 60
+    if hours > 1:
+        return "%dh" % hours
+    elif minutes > 1:
+        return "%dm" % minutes
+    return "%ds" % seconds
+
+
 @staff_required
 @json_view
 def dashboard_data(request):
     context = {}
-    now = timezone.now()
-    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today = get_today()
     tomorrow = today + datetime.timedelta(days=1)
     yesterday = today - datetime.timedelta(days=1)
     this_week = today - datetime.timedelta(days=today.weekday())
@@ -50,186 +63,40 @@ def dashboard_data(request):
     last_year = this_year.replace(year=this_year.year - 1)
     context['groups'] = []
 
-    def make_filter(key, gte=None, lt=None):
-        filter = {}
-        if gte is not None:
-            filter['%s__gte' % key] = gte
-        if lt is not None:
-            filter['%s__lt' % key] = lt
-        return filter
-
-    def get_counts(qs, key):
-        counts = {}
-
-        counts['today'] = qs.filter(
-            **make_filter(key, gte=today, lt=tomorrow)
-        ).count()
-        counts['yesterday'] = qs.filter(
-            **make_filter(key, gte=yesterday, lt=today)).count()
-
-        counts['this_week'] = qs.filter(
-            **make_filter(key, gte=this_week, lt=next_week)).count()
-        counts['last_week'] = qs.filter(
-            **make_filter(key, gte=last_week, lt=this_week)).count()
-
-        counts['this_month'] = qs.filter(
-            **make_filter(key, gte=this_month, lt=next_month)).count()
-        counts['last_month'] = qs.filter(
-            **make_filter(key, gte=last_month, lt=this_month)).count()
-
-        counts['this_year'] = qs.filter(
-            **make_filter(key, gte=this_year, lt=next_year)).count()
-        counts['last_year'] = qs.filter(
-            **make_filter(key, gte=last_year, lt=this_year)).count()
-
-        counts['ever'] = qs.count()
-        return counts
-
-    # Events
-    events = Event.objects.exclude(status=Event.STATUS_REMOVED)
-    counts = get_counts(events, 'start_time')
-    context['groups'].append({
-        'name': 'New Events',
-        'counts': counts
-    })
-
-    # Suggested Events
-    counts = get_counts(SuggestedEvent.objects.all(), 'created')
-    context['groups'].append({
-        'name': 'Requested Events',
-        'counts': counts
-    })
-
-    # Users
-    counts = get_counts(User.objects.all(), 'date_joined')
-    context['groups'].append({
-        'name': 'New Users',
-        'counts': counts
-    })
-
-    # Comments
-    counts = get_counts(Comment.objects.all(), 'created')
-    context['groups'].append({
-        'name': 'Comments',
-        'counts': counts
-    })
-
-    # Event revisions
-    counts = get_counts(EventRevision.objects.all(), 'created')
-    context['groups'].append({
-        'name': 'Event Revisions',
-        'counts': counts
+    # All counts, for every metric and period, in one query per metric
+    all_counts = get_counts({
+        'today': (today, tomorrow),
+        'yesterday': (yesterday, today),
+        'this_week': (this_week, next_week),
+        'last_week': (last_week, this_week),
+        'this_month': (this_month, next_month),
+        'last_month': (last_month, this_month),
+        'this_year': (this_year, next_year),
+        'last_year': (last_year, this_year),
+        'ever': (None, None),
     })
 
-    # Pictures
-    counts = get_counts(Picture.objects.all(), 'created')
-    context['groups'].append({
-        'name': 'Pictures',
-        'counts': counts
-    })
-
-    # Chapters
-    counts = get_counts(Chapter.objects.all(), 'created')
-    context['groups'].append({
-        'name': 'Chapters',
-        'counts': counts
-    })
-
-    # Starred events
-    counts = get_counts(StarredEvent.objects.all(), 'created')
-    context['groups'].append({
-        'name': 'Starred events',
-        'counts': counts
-    })
-
-    def get_duration_totals(qs, key='start_time'):
-
-        # def make_filter(gte=None, lt=None):
-        #     filter = {}
-        #     if gte is not None:
-        #         filter['%s__gte' % key] = gte
-        #     if lt is not None:
-        #         filter['%s__lt' % key] = lt
-        #     return filter
-
-        counts = {}
-
-        def sum(elements):
-            seconds = elements.aggregate(Sum('duration'))['duration__sum']
-            seconds = seconds or 0  # in case it's None
-            minutes = seconds / 60
-            hours = minutes / 60
-            if hours > 1:
-                return "%dh" % hours
-            elif minutes > 1:
-                return "%dm" % minutes
-            return "%ds" % seconds
-
-        counts['today'] = sum(qs.filter(
-            **make_filter(key, gte=today)))
-        counts['yesterday'] = sum(qs.filter(
-            **make_filter(key, gte=yesterday, lt=today)))
-
-        counts['this_week'] = sum(qs.filter(
-            **make_filter(key, gte=this_week)))
-        counts['last_week'] = sum(qs.filter(
-            **make_filter(key, gte=last_week, lt=this_week)))
-
-        counts['this_month'] = sum(qs.filter(
-            **make_filter(key, gte=this_month)))
-        counts['last_month'] = sum(qs.filter(
-            **make_filter(key, gte=last_month, lt=this_month)))
-
-        counts['this_year'] = sum(qs.filter(
-            **make_filter(key, gte=this_year)))
-        counts['last_year'] = sum(qs.filter(
-            **make_filter(key, gte=last_year, lt=this_year)))
-
-        counts['ever'] = sum(qs)
-        return counts
-
-    def get_size_totals(qs, key='created'):
-
-        counts = {}
-
-        def sum(elements):
-            bytes = elements.aggregate(Sum('size'))['size__sum']
-            return filesizeformat(bytes)
-
-        counts['today'] = sum(qs.filter(
-            **make_filter(key, gte=today)))
-        counts['yesterday'] = sum(qs.filter(
-            **make_filter(key, gte=yesterday, lt=today)))
-
-        counts['this_week'] = sum(qs.filter(
-            **make_filter(key, gte=this_week)))
-        counts['last_week'] = sum(qs.filter(
-            **make_filter(key, gte=last_week, lt=this_week)))
-
-        counts['this_month'] = sum(qs.filter(
-            **make_filter(key, gte=this_month)))
-        counts['last_month'] = sum(qs.filter(
-            **make_filter(key, gte=last_month, lt=this_month)))
-
-        counts['this_year'] = sum(qs.filter(
-            **make_filter(key, gte=this_year)))
-        counts['last_year'] = sum(qs.filter(
-            **make_filter(key, gte=last_year, lt=this_year)))
-
-        counts['ever'] = sum(qs)
-        return counts
+    for metric, name in DASHBOARD_GROUPS:
+        context['groups'].append({
+            'name': name,
+            'counts': all_counts[metric],
+        })
 
     # Exceptional
-    counts = get_duration_totals(Event.objects.exclude(duration__isnull=True))
     context['groups'].append({
         'name': 'Total Event Durations',
-        'counts': counts
+        'counts': dict(
+            (k, _format_duration(v))
+            for k, v in all_counts['event_durations'].items()
+        )
     })
 
-    counts = get_size_totals(Upload.objects.all())
     context['groups'].append({
         'name': 'Uploads',
-        'counts': counts,
+        'counts': dict(
+            (k, filesizeformat(v))
+            for k, v in all_counts['upload_sizes'].items()
+        ),
         'small': True
     })
 
@@ -249,59 +116,17 @@ def dashboard_data_graphs(request):  # pragma: no cover
     YEARS = 3
     now = timezone.now()
 
-    def get_events(years_back):
-        first_date = datetime.datetime(now.year - years_back + 1, 1, 1)
-
-        objects = (
-            Event.objects
-            .filter(archive_time__lt=now)
-            .filter(created__gt=first_date.replace(tzinfo=timezone.utc))
-            .order_by('created')
-        )
-        buckets = {}
-        for each in objects.values_list('created'):
-            created, = each
-            year = created.year
-            if year not in buckets:
-                buckets[year] = defaultdict(int)
-            next_monday = created + datetime.timedelta(
-                days=7 - created.weekday()
-            )
-            key = next_monday.strftime('%Y-%m-%d')
-            buckets[year][key] += 1
-        legends = sorted(buckets.keys())
-
-        last_year = legends[-1]
-
-        def fake_year(date_str, year):
-            return date_str.replace(str(year), str(last_year))
-
-        data = []
-        for year in legends:
-            group = sorted(
-                {'date': fake_year(k, year), 'value': v}
-                for k, v in buckets[year].items()
-            )
-            data.append(group)
-        return {
-            'type': 'events',
-            'title': 'New Events',
-            'data': data,
-            'description': 'Number of added events per year',
-            'legends': legends,
-        }
-
-    def get_revisions(years_back):
-        first_date = datetime.datetime(now.year - years_back + 1, 1, 1)
+    def get_graph(metric, years_back, type_, title, description):
+        first_date = datetime.date(now.year - years_back + 1, 1, 1)
 
+        # Read the nightly rollups rather than going through the rows
         objects = (
-            EventRevision.objects
-            .filter(created__gt=first_date.replace(tzinfo=timezone.utc))
-            .order_by('created')
+            DailyRollup.objects
+            .filter(metric=metric, date__gte=first_date, value__gt=0)
+            .order_by('date')
         )
         buckets = {}
-        for each in objects.values_list('created'):
-            created, = each
+        for created, value in objects.values_list('date', 'value'):
             year = created.year
             if year not in buckets:
                 buckets[year] = defaultdict(int)
@@ -309,72 +134,50 @@ def dashboard_data_graphs(request):  # pragma: no cover
                 days=7 - created.weekday()
             )
             key = next_monday.strftime('%Y-%m-%d')
-            buckets[year][key] += 1
+            buckets[year][key] += value
         legends = sorted(buckets.keys())
 
-        last_year = legends[-1]
-
-        def fake_year(date_str, year):
-            return date_str.replace(str(year), str(last_year))
-
         data = []
-        for year in legends:
-            group = sorted(
-                {'date': fake_year(k, year), 'value': v}
-                for k, v in buckets[year].items()
-            )
-            data.append(group)
-        return {
-            'type': 'revisions',
-            'title': 'Event Revisions',
-            'data': data,
-            'description': 'Number of event edits per year',
-            'legends': legends,
-        }
-
-    def get_users(years_back):
-        first_date = datetime.datetime(now.year - years_back + 1, 1, 1)
-
-        objects = (
-            User.objects
-            .filter(date_joined__gt=first_date.replace(tzinfo=timezone.utc))
-            .order_by('date_joined')
-        )
-        buckets = {}
-        for each in objects.values_list('date_joined'):
-            created, = each
-            year = created.year
-            if year not in buckets:
-                buckets[year] = defaultdict(int)
-            next_monday = created + datetime.timedelta(
-                days=7 - created.weekday()
-            )
-            key = next_monday.strftime('%Y-%m-%d')
-            buckets[year][key] += 1
-        legends = sorted(buckets.keys())
-
-        last_year = legends[-1]
-
-        def fake_year(date_str, year):
-            return date_str.replace(str(year), str(last_year))
-
-        data = []
-        for year in legends:
-            group = sorted(
-                {'date': fake_year(k, year), 'value': v}
-                for k, v in buckets[year].items()
-            )
-            data.append(group)
+        if legends:
+            last_year = legends[-1]
+
+            def fake_year(date_str, year):
+                return date_str.replace(str(year), str(last_year))
+
+            for year in legends:
+                group = sorted(
+                    {'date': fake_year(k, year), 'value': v}
+                    for k, v in buckets[year].items()
+                )
+                data.append(group)
         return {
-            'type': 'users',
-            'title': 'New Users',
+            'type': type_,
+            'title': title,
             'data': data,
-            'description': 'Number of first joining users per year',
+            'description': description,
             'legends': legends,
         }
 
     groups = []
-    groups.append(get_events(YEARS))
-    groups.append(get_users(YEARS))
-    groups.append(get_revisions(2))
+    groups.append(get_graph(
+        'archived_events',
+        YEARS,
+        'events',
+        'New Events',
+        'Number of added events per year',
+    ))
+    groups.append(get_graph(
+        'users',
+        YEARS,
+        'users',
+        'New Users',
+        'Number of first joining users per year',
+    ))
+    groups.append(get_graph(
+        'event_revisions',
+        2,
+        'revisions',
+        'Event Revisions',
+        'Number of event edits per year',
+    ))
     return {'groups': groups}
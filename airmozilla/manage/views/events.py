@@ -5,6 +5,7 @@ import re
 import urlparse
 import os
 
+import dateutil.parser
 import pytz
 import vobject
 
@@ -44,26 +45,24 @@ from airmozilla.main.models import (
     Event,
     EventMetadata,
     EventTweet,
-    Location,
     Template,
-    Channel,
     SuggestedEvent,
     SuggestedEventComment,
     VidlySubmission,
     EventHitStats,
-    EventLiveHits,
     CuratedGroup,
     EventAssignment,
     Picture,
     Chapter,
     LocationDefaultEnvironment,
     VidlyTagDomain,
+    bump_event_version,
 )
 from airmozilla.closedcaptions.models import (
     ClosedCaptions,
     ClosedCaptionsTranscript,
 )
-from airmozilla.main.views import is_contributor
+from airmozilla.main import livehits
 from airmozilla.main.tasks import (
     create_all_timestamp_pictures,
     create_all_event_pictures,
@@ -74,6 +73,7 @@ from airmozilla.manage import vidly
 from airmozilla.manage import archiver
 from airmozilla.manage import sending
 from airmozilla.manage import videoinfo
+from airmozilla.manage.event_hit_stats import get_staleness
 from airmozilla.manage.templatetags.jinja_helpers import full_tweet_url
 from airmozilla.comments.models import Discussion, Comment
 from airmozilla.surveys.models import Survey
@@ -232,16 +232,77 @@ def events(request):
     return render(request, 'manage/events.html', {})
 
 
+# The columns of each row in the events_data response. Rather than
+# repeating the same keys for every event, the rows are lists in this
+# order. Columns that don't apply to an event are null.
+EVENTS_DATA_COLUMNS = (
+    'id',
+    'title',
+    'slug',
+    'modified',
+    'status',
+    'privacy',
+    'location',
+    'start_time',
+    'start_time_iso',
+    'archive_time',
+    'channels',
+    'can',
+    'is_pending',
+    'is_scheduled',
+    'is_live',
+    'is_upcoming',
+    'needs_approval',
+    'pictures',
+    'picture',
+    'pictureless',
+    'has_vidly_template',
+    'popcorn_url',
+    'nopicture',
+)
+
+EVENTS_DATA_DEFAULT_LIMIT = 50
+EVENTS_DATA_MAX_LIMIT = 500
+
+
+def _events_data_cursor(event, sort):
+    value = getattr(event, sort)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    return u'{},{}'.format(value, event.id)
+
+
+def _events_data_keyset(qs, sort, descending, cursor, forwards):
+    """Return the queryset filtered to what comes after (or before if
+    not `forwards`) the cursor and in the order it should be read."""
+    value, id_ = cursor.rsplit(',', 1)
+    id_ = int(id_)
+    if sort != 'title':
+        value = dateutil.parser.parse(value)
+    # going backwards is like going forwards in the opposite order
+    if descending == forwards:
+        lookup = '__lt'
+    else:
+        lookup = '__gt'
+    qs = qs.filter(
+        Q(**{sort + lookup: value}) |
+        Q(**{sort: value, 'id' + lookup: id_})
+    )
+    return qs
+
+
 @staff_required
 @permission_required('main.change_event')
 @json_view
 def events_data(request):
-    events = []
-    qs = (
-        Event.objects
-        .exclude(status=Event.STATUS_INITIATED)
-        .order_by('-modified')
-    )
+    """Return a window of events for the manage events grid.
+
+    The events are filtered and sorted here and paginated with a keyset
+    cursor (the sort value and the ID of the last, or first, event of
+    the previous response) so that it doesn't matter how far
+    into the list you are.
+    """
+    qs = Event.objects.exclude(status=Event.STATUS_INITIATED)
     form = forms.EventsDataForm(request.GET)
     if not form.is_valid():
         return http.HttpResponseBadRequest(str(form.errors))
@@ -262,34 +323,135 @@ def events_data(request):
     base_exclude = {}
     if not request.user.has_perm('main.change_event_others'):
         base_filter['creator'] = request.user
-    if is_contributor(request.user):
+    if request.roles.contributor:
         base_exclude['privacy'] = Event.PRIVACY_COMPANY
     qs = qs.filter(**base_filter)
     qs = qs.exclude(**base_exclude)
 
-    event_channel_names = collections.defaultdict(list)
-    _channel_names = dict(
-        (x['id'], x['name'])
-        for x in Channel.objects.all().values('id', 'name')
+    now = timezone.now()
+    live_time = now + datetime.timedelta(minutes=settings.LIVE_MARGIN)
+    unprocessed_approvals = (
+        Approval.objects
+        .filter(processed=False)
+        .values('event_id')
     )
-    for each in Event.channels.through.objects.all().values():
-        event_channel_names[each['event_id']].append(
-            _channel_names[each['channel_id']]
+
+    title = form.cleaned_data['title'].strip()
+    if title:
+        title_filter = Q()
+        for word in title.split():
+            title_filter &= Q(title__icontains=word)
+        qs = qs.filter(title_filter | Q(slug__istartswith=title))
+    location = form.cleaned_data['location'].strip()
+    if location in ('blank', 'empty', 'pre-recorded'):
+        # then strangely match those with no location
+        qs = qs.filter(location__isnull=True)
+    elif location:
+        qs = qs.filter(location__name__icontains=location)
+    channel = form.cleaned_data['channel'].strip()
+    if channel:
+        qs = qs.filter(
+            id__in=Event.channels.through.objects.filter(
+                channel__name__icontains=channel
+            ).values('event_id')
+        )
+    if form.cleaned_data['status']:
+        qs = qs.filter(status=form.cleaned_data['status'])
+    if form.cleaned_data['privacy']:
+        qs = qs.filter(privacy=form.cleaned_data['privacy'])
+    if form.cleaned_data['archived'] == 'archived':
+        qs = qs.filter(archive_time__isnull=False)
+    elif form.cleaned_data['archived'] == 'not-archived':
+        qs = qs.filter(archive_time__isnull=True)
+    if form.cleaned_data['start_time']:
+        qs = qs.filter(
+            start_time__gt=datetime.datetime.combine(
+                form.cleaned_data['start_time'],
+                datetime.time(0, 0),
+            ).replace(tzinfo=timezone.utc)
+        )
+    only = form.cleaned_data['only']
+    if only == 'needs_approval':
+        qs = qs.filter(id__in=unprocessed_approvals)
+    elif only in ('live', 'upcoming'):
+        qs = qs.filter(
+            status=Event.STATUS_SCHEDULED,
+            archive_time__isnull=True,
+        ).exclude(id__in=unprocessed_approvals)
+        if only == 'live':
+            qs = qs.filter(start_time__lt=live_time)
+        else:
+            qs = qs.filter(start_time__gt=live_time)
+    elif only == 'pictureless':
+        qs = qs.filter(picture__isnull=True).filter(
+            Q(placeholder_img__isnull=True) | Q(placeholder_img='')
         )
 
-    now = timezone.now()
-    live_time = now + datetime.timedelta(minutes=settings.LIVE_MARGIN)
+    count = qs.count()
+
+    limit = EVENTS_DATA_DEFAULT_LIMIT
+    if request.GET.get('limit'):
+        try:
+            limit = int(request.GET['limit'])
+            assert limit > 0
+            limit = min(limit, EVENTS_DATA_MAX_LIMIT)
+        except (ValueError, AssertionError):
+            limit = EVENTS_DATA_DEFAULT_LIMIT
+
+    sort = form.cleaned_data['sort'] or 'modified'
+    if form.cleaned_data['sort']:
+        descending = form.cleaned_data['reverse']
+    else:
+        descending = True
+    after = form.cleaned_data['after']
+    before = form.cleaned_data['before']
+    try:
+        if after:
+            qs = _events_data_keyset(qs, sort, descending, after, True)
+        elif before:
+            qs = _events_data_keyset(qs, sort, descending, before, False)
+    except ValueError:
+        return http.HttpResponseBadRequest('Invalid pagination cursor')
+    if descending == bool(before):
+        qs = qs.order_by(sort, 'id')
+    else:
+        qs = qs.order_by('-' + sort, '-id')
+
+    # one more than we need to know if there is more
+    window = list(qs.select_related('location')[:limit + 1])
+    more = len(window) > limit
+    window = window[:limit]
+    if before:
+        window.reverse()
+
+    next_cursor = previous_cursor = None
+    if window:
+        if more or before:
+            next_cursor = _events_data_cursor(window[-1], sort)
+        if after or (before and more):
+            previous_cursor = _events_data_cursor(window[0], sort)
+
+    # Everything else is only looked up for the events in the window
+    event_ids = [event.id for event in window]
+    event_channel_names = collections.defaultdict(list)
+    channels = (
+        Event.channels.through.objects
+        .filter(event_id__in=event_ids)
+        .values_list('event_id', 'channel__name')
+    )
+    for event_id, name in channels:
+        event_channel_names[event_id].append(name)
 
-    all_needs_approval = (
+    needs_approval_ids = set(
         Approval.objects
-        .filter(processed=False)
+        .filter(processed=False, event_id__in=event_ids)
         .values_list('event_id', flat=True)
     )
 
     pictures_counts = {}
     grouped_pictures = (
         Picture.objects
-        .filter(event__in=qs)
+        .filter(event_id__in=event_ids)
         .filter(timestamp__isnull=True)
         .values('event')
         .annotate(Count('event'))
@@ -297,23 +459,19 @@ def events_data(request):
     for each in grouped_pictures:
         pictures_counts[each['event']] = each['event__count']
 
-    if request.GET.get('limit'):
-        try:
-            limit = int(request.GET['limit'])
-            assert limit > 0
-            qs = qs[:limit]
-        except (ValueError, AssertionError):
-            pass
-
-    locations = dict(
-        (x.pk, x) for x in Location.objects.all()
-    )
     template_names = dict(
-        (x['id'], x['name'])
-        for x in Template.objects.all().values('id', 'name')
+        Template.objects
+        .filter(
+            id__in=[
+                event.template_id for event in window
+                if event.status == Event.STATUS_PENDING
+            ]
+        )
+        .values_list('id', 'name')
     )
-    for event in qs:
-        event.location = locations.get(event.location_id)
+
+    rows = []
+    for event in window:
         if event.location:
             start_time = event.location_time.strftime('%d %b %Y %I:%M%p')
             start_time_iso = event.location_time.isoformat()
@@ -321,7 +479,7 @@ def events_data(request):
             start_time = event.start_time.strftime('%d %b %Y %I:%M%p %Z')
             start_time_iso = event.start_time.isoformat()
 
-        needs_approval = event.pk in all_needs_approval
+        needs_approval = event.pk in needs_approval_ids
         is_live = False
         is_upcoming = False
         if event.status == Event.STATUS_SCHEDULED and not needs_approval:
@@ -333,9 +491,7 @@ def events_data(request):
         row = {
             'modified': event.modified.isoformat(),
             'status': event.status,
-            'status_display': event.get_status_display(),
             'privacy': event.privacy,
-            'privacy_display': event.get_privacy_display(),
             'title': event.title,
             'slug': event.slug,
             'location': event.location and event.location.name or '',
@@ -351,8 +507,7 @@ def events_data(request):
             'can': [],  # actions you can take on the event
         }
 
-        # to make the size of the JSON file as small as possible,
-        # only include certain fields if they're true
+        # only set certain fields if they're true
         if event.status == Event.STATUS_PENDING:
             row['is_pending'] = True
         elif event.status == Event.STATUS_SCHEDULED:
@@ -385,12 +540,8 @@ def events_data(request):
         if _can_change_event_others:
             row['can'].append('duplicate')
             row['can'].append('archive')
-            # row['archive_url'] = reverse(
-            #     'manage:event_archive',
-            #     args=(event.pk,)
-            # )
 
-        events.append(row)
+        rows.append([row.get(column) for column in EVENTS_DATA_COLUMNS])
 
     urls = {
         'manage:event_edit': reverse('manage:event_edit', args=('0',)),
@@ -406,7 +557,19 @@ def events_data(request):
         'manage:picturegallery': reverse('manage:picturegallery'),
     }
 
-    return {'events': events, 'urls': urls, 'max_modified': max_modified}
+    return {
+        'events': {
+            'columns': EVENTS_DATA_COLUMNS,
+            'rows': rows,
+        },
+        'count': count,
+        'next': next_cursor,
+        'previous': previous_cursor,
+        'statuses': dict(Event.STATUS_CHOICES),
+        'privacies': dict(Event.PRIVACY_CHOICES),
+        'urls': urls,
+        'max_modified': max_modified,
+    }
 
 
 def _event_process(request, form, event):
@@ -624,12 +787,10 @@ def event_edit(request, id):
         context['survey'] = None
 
     context['archived_hits'] = 0
-    context['live_hits'] = 0
+    context['live_hits'] = livehits.get_hits(event.id)
 
     for each in EventHitStats.objects.filter(event=event).values('total_hits'):
         context['archived_hits'] += each['total_hits']
-    for each in EventLiveHits.objects.filter(event=event).values('total_hits'):
-        context['live_hits'] += each['total_hits']
 
     context['count_event_uploads'] = Upload.objects.filter(event=event).count()
 
@@ -1556,6 +1717,7 @@ def event_hit_stats(request):
         'events_total': events_total,
         'include_excluded': include_excluded,
         'title': title,
+        'staleness': get_staleness(),
     }
     return render(request, 'manage/event_hit_stats.html', data)
 
@@ -1998,6 +2160,7 @@ def reset_vidly_tag_domains(request, id):
     event = get_object_or_404(Event, id=id)
     cache_key = 'custom_csp_update:{}'.format(event.id)
     cache.delete(cache_key)
+    bump_event_version(event.id)
     qs = VidlyTagDomain.objects.filter(tag=event.template_environment['tag'])
     count = qs.count()
     qs.delete()
@@ -2,10 +2,10 @@ import datetime
 
 from django.shortcuts import render
 from django.utils import timezone
-from django.db.models import Count
 
 from airmozilla.base.utils import paginate
-from airmozilla.search.models import LoggedSearch
+from airmozilla.search.models import LoggedSearch, LoggedSearchClick
+from airmozilla.search import searchlog
 
 from .decorators import superuser_required
 
@@ -18,6 +18,15 @@ def loggedsearches(request):
         .order_by('-date')
     )
     paged = paginate(searches, request.GET.get('page'), 20)
+    paged.object_list = list(paged.object_list)
+    clicks = (
+        LoggedSearchClick.objects
+        .filter(search_key__in=[x.key for x in paged.object_list if x.key])
+        .select_related('event')
+    )
+    clicked = dict((x.search_key, x.event) for x in clicks)
+    for search in paged.object_list:
+        search.clicked = clicked.get(search.key, search.event_clicked)
     context = {
         'paginate': paged,
         'hash_user_id': lambda x: str(hash(str(x)))[-4:],
@@ -35,43 +44,47 @@ def loggedsearches_stats(request):
     this_week = today - datetime.timedelta(days=today.weekday())
     this_month = today.replace(day=1)
     this_year = this_month.replace(month=1)
+    periods = (
+        ('today', today),
+        ('this_week', this_week),
+        ('this_month', this_month),
+        ('this_year', this_year),
+        ('ever', None),
+    )
+
+    # From the daily rollups plus what's been logged since.
+    totals = dict(
+        (name, searchlog.get_totals(since))
+        for name, since in periods
+    )
 
     groups = (
-        ('All searches', {}),
-        ('Successful searches', {'results__gt': 0}),
-        ('Failed searches', {'results': 0}),
+        ('All searches', lambda x: x['searches']),
+        ('Successful searches', lambda x: x['successful']),
+        ('Failed searches', lambda x: x['searches'] - x['successful']),
+        ('Searches followed by a click', lambda x: x['clicks']),
     )
     context['groups'] = []
-    qs_base = LoggedSearch.objects.all()
-    for group_name, filters in groups:
-        qs = qs_base.filter(**filters)
+    for group_name, function in groups:
+        context['groups'].append((
+            group_name,
+            dict((name, function(totals[name])) for name, __ in periods),
+            False
+        ))
 
-        counts = {}
-        counts['today'] = qs.filter(date__gte=today).count()
-        counts['this_week'] = qs.filter(date__gte=this_week).count()
-        counts['this_month'] = qs.filter(date__gte=this_month).count()
-        counts['this_year'] = qs.filter(date__gte=this_year).count()
-        counts['ever'] = qs.count()
-        context['groups'].append((group_name, counts, False))
+    def top_terms(since):
+        return [
+            dict(
+                values,
+                ctr=100.0 * values['clicks'] / values['searches'],
+            )
+            for values in searchlog.get_top_terms(since)
+        ]
 
-    qs = (
-        qs_base.extra(
-            select={'term_lower': 'LOWER(term)'}
-        )
-        .values('term_lower')
-        .annotate(count=Count('term'))
-        .order_by('-count')
-    )
-    terms = {}
-    terms['today'] = qs.filter(date__gte=today)[:5]
-    terms['this_week'] = qs.filter(date__gte=this_week)[:5]
-    terms['this_month'] = qs.filter(date__gte=this_month)[:5]
-    terms['this_year'] = qs.filter(date__gte=this_year)[:5]
-    terms['ever'] = qs[:5]
     context['groups'].append(
         (
-            'Most common terms (case insensitive, top 5)',
-            terms,
+            'Most common terms (case insensitive, top 5, click-through rate)',
+            dict((name, top_terms(since)) for name, since in periods),
             True
         )
     )
@@ -14,7 +14,6 @@ from .decorators import superuser_required
 
 @superuser_required
 def related_content(request):
-    es = related.get_connection()
     index = related.get_index()
 
     if request.method == 'POST':
@@ -22,10 +21,10 @@ def related_content(request):
         if form.is_valid():
             if form.cleaned_data['delete_and_recreate']:
                 try:
-                    related.delete(es)
+                    related.delete()
                 except pyelasticsearch.ElasticHttpNotFoundError:
                     pass
-                related.create(es)
+                related.create()
                 form.cleaned_data['all'] = True
 
             since = None
@@ -49,13 +48,8 @@ def related_content(request):
         }
         form = forms.ReindexRelatedContentForm(initial=initial)
 
-    query = {
-        'query': {
-            'match_all': {}
-        }
-    }
     try:
-        count = es.count(query, index=index)['count']
+        count = related.count()
     except pyelasticsearch.ElasticHttpNotFoundError:
         count = 'no'
     context = {
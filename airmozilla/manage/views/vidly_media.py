@@ -1,3 +1,4 @@
+import datetime
 import hashlib
 import logging
 from collections import defaultdict
@@ -14,6 +15,7 @@ from django.views.decorators.http import require_POST
 from django.db.models import Q, Count
 from django.views.decorators.csrf import csrf_exempt
 from django.core.urlresolvers import reverse
+from django.utils import timezone
 
 from jsonview.decorators import json_view
 import xmltodict
@@ -340,6 +342,9 @@ def vidly_media_webhook(request):
 @superuser_required
 def vidly_media_timings(request):
     context = {
+        'accuracy': VidlySubmission.get_accuracy(
+            since=timezone.now() - datetime.timedelta(days=90)
+        ),
     }
     return render(request, 'manage/vidly_media_timings.html', context)
 
@@ -4,8 +4,7 @@ from django.conf import settings
 from django.db.models import Q
 from django.core.urlresolvers import reverse
 
-from airmozilla.main.models import Channel, Event
-from airmozilla.main.views import is_contributor
+from airmozilla.main.models import Channel, Event, EventCount
 from airmozilla.base.utils import (
     paginate
 )
@@ -18,7 +17,7 @@ def categories_feed(request):
     privacy_filter = {}
     privacy_exclude = {}
     if request.user.is_active:
-        if is_contributor(request.user):
+        if request.roles.contributor:
             # feed_privacy = 'contributors'
             privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
         # else:
@@ -26,16 +25,16 @@ def categories_feed(request):
     else:
         privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
         # feed_privacy = 'public'
-    events = Event.objects.scheduled().approved()
     live_events = Event.objects.live().approved()
     if privacy_filter:
-        events = events.filter(**privacy_filter)
         live_events = live_events.filter(**privacy_filter)
     elif privacy_exclude:
-        events = events.exclude(**privacy_exclude)
         live_events = live_events.exclude(**privacy_exclude)
 
-    channels = get_channels(events)
+    channels = get_channels(
+        privacy_filter=privacy_filter,
+        privacy_exclude=privacy_exclude,
+    )
     context['channels'] = channels
 
     context['live_events'] = live_events
@@ -54,16 +53,27 @@ def categories_feed(request):
     return response
 
 
-def get_channels(events, parent=None):
+def get_channels(privacy_filter=None, privacy_exclude=None, parent=None):
     channels = []
     channels_qs = Channel.objects.all()
     if parent is None:
         channels_qs = channels_qs.filter(parent__isnull=True)
     else:
         channels_qs = channels_qs.filter(parent=parent)
+    event_counts = EventCount.objects.get_counts(
+        'channel',
+        privacy_filter=privacy_filter,
+        privacy_exclude=privacy_exclude,
+        status=Event.STATUS_SCHEDULED,
+        approved=True,
+    )
+    parent_ids = set(
+        Channel.objects.filter(parent__isnull=False)
+        .values_list('parent_id', flat=True)
+    )
     for channel in channels_qs:
-        event_count = events.filter(channels=channel).count()
-        subchannel_count = Channel.objects.filter(parent=channel).count()
+        event_count = event_counts.get(channel.id, 0)
+        subchannel_count = channel.id in parent_ids
         if event_count or subchannel_count:
             # channel.subchannels = get_channels(events, parent=channel)
             channels.append(channel)
@@ -126,7 +136,7 @@ def channel_feed(request, slug):
     privacy_filter = {}
     privacy_exclude = {}
     if request.user.is_active:
-        if is_contributor(request.user):
+        if request.roles.contributor:
             privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
     else:
         privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
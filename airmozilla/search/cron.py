@@ -0,0 +1,18 @@
+import cronjobs
+
+from airmozilla.cronlogger.decorators import capture
+from airmozilla.search import searchlog
+
+
+@cronjobs.register
+@capture
+def flush_logged_searches():
+    print "Flushed {} searches and {} clicks".format(
+        *searchlog.flush(verbose=True)
+    )
+
+
+@cronjobs.register
+@capture
+def logged_searches_rollup():
+    searchlog.rollup(verbose=True)
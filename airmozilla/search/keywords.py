@@ -0,0 +1,167 @@
+"""Finding the names of tags and channels in a search query.
+
+This used to be done by compiling a regular expression of every tag
+name (and another of every channel name) on every search. Instead, an
+Aho-Corasick automaton of all the names (lowercased) is built once per
+process and finds every name in the query in one pass over it. Saving
+or deleting a Tag or a Channel changes the version in the cache which
+makes every process build it again the next time it's needed.
+"""
+import uuid
+from collections import defaultdict, deque
+
+from django.core.cache import cache
+
+from airmozilla.main.models import Tag, Channel
+
+
+VERSION_CACHE_KEY = 'search_keywords_version'
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+# what `\w` means in a (non-unicode) regular expression
+WORD_CHARACTERS = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_'
+)
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+def _is_boundary(before, after):
+    """Like a word boundary in a regular expression, true if one of
+    the two characters (either can be empty) is a word character and
+    the other isn't."""
+    return (before in WORD_CHARACTERS) != (after in WORD_CHARACTERS)
+
+
+class Automaton(object):
+    """An Aho-Corasick automaton. Add all the keywords, each with a
+    value, then `build()` it and `find()` them in any text."""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        # for each state, the (length, value) of the keywords ending there
+        self.outputs = [[]]
+        self.built = False
+
+    def add(self, keyword, value):
+        assert not self.built
+        state = 0
+        for character in keyword:
+            next_state = self.goto[state].get(character)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][character] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+        self.outputs[state].append((len(keyword), value))
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and character not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(character, 0)
+                # whatever ends where it falls back to ends here too
+                self.outputs[next_state].extend(
+                    self.outputs[self.fail[next_state]]
+                )
+        self.built = True
+
+    def find(self, text):
+        """Yield (start, end, value) for every keyword in the text,
+        overlapping ones included, in the order they end."""
+        assert self.built
+        state = 0
+        for i, character in enumerate(text):
+            while state and character not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(character, 0)
+            for length, value in self.outputs[state]:
+                yield i + 1 - length, i + 1, value
+
+
+class KeywordMatcher(object):
+    """All the tag and channel names and what they map to."""
+
+    def __init__(self, tags, channels):
+        """`tags` is a sequence of (id, name) and `channels` of
+        (id, name, parent_id)."""
+        ids = defaultdict(lambda: {'tag': [], 'channel': []})
+        for id, name in tags:
+            ids[normalize(name)]['tag'].append(id)
+        subchannel_counts = defaultdict(int)
+        for id, name, parent_id in channels:
+            ids[normalize(name)]['channel'].append(id)
+            if parent_id:
+                subchannel_counts[parent_id] += 1
+        self.subchannel_counts = dict(subchannel_counts)
+        self.automaton = Automaton()
+        for keyword, value in ids.items():
+            if keyword:
+                self.automaton.add(keyword, value)
+        self.automaton.build()
+
+    def _find(self, text, kind):
+        text = normalize(text)
+        found = []
+        for start, end, value in self.automaton.find(text):
+            if not value[kind]:
+                continue
+            if not _is_boundary(text[start - 1:start], text[start]):
+                continue
+            if not _is_boundary(text[end - 1], text[end:end + 1]):
+                continue
+            for id in value[kind]:
+                if id not in found:
+                    found.append(id)
+        return found
+
+    def find_tags(self, text):
+        """Return the IDs of the tags whose names are words in the text.
+        """
+        return self._find(text, 'tag')
+
+    def find_channels(self, text):
+        """Return the IDs of the channels whose names are words in the
+        text."""
+        return self._find(text, 'channel')
+
+
+def build_matcher():
+    return KeywordMatcher(
+        Tag.objects.all().values_list('id', 'name'),
+        Channel.objects.all().values_list('id', 'name', 'parent_id'),
+    )
+
+
+def get_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(VERSION_CACHE_KEY, version, VERSION_TIMEOUT)
+    return version
+
+
+def bump_version():
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, VERSION_TIMEOUT)
+
+
+# the (version, KeywordMatcher) this process has built
+_matcher = (None, None)
+
+
+def get_matcher():
+    global _matcher
+    version = get_version()
+    if _matcher[0] != version:
+        _matcher = (version, build_matcher())
+    return _matcher[1]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import airmozilla.search.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0042_vidlysubmissionfit'),
+        ('search', '0003_remove_savedsearch_is_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoggedSearchClick',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('search_key', models.CharField(max_length=32, db_index=True)),
+                ('date', models.DateTimeField(default=airmozilla.search.models._get_now)),
+                ('event', models.ForeignKey(to='main.Event')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoggedSearchRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('date', models.DateField()),
+                ('term', models.CharField(max_length=200)),
+                ('searches', models.IntegerField(default=0)),
+                ('successful', models.IntegerField(default=0)),
+                ('results', models.BigIntegerField(default=0)),
+                ('clicks', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='loggedsearch',
+            name='key',
+            field=models.CharField(max_length=32, null=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='loggedsearch',
+            name='date',
+            field=models.DateTimeField(default=airmozilla.search.models._get_now, db_index=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='loggedsearchrollup',
+            unique_together=set([('date', 'term')]),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0042_vidlysubmissionfit'),
+        ('search', '0004_loggedsearch_clicks_and_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearchEvent',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('event', models.ForeignKey(to='main.Event')),
+                ('savedsearch', models.ForeignKey(to='search.SavedSearch')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='savedsearchevent',
+            unique_together=set([('savedsearch', 'event')]),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    # the same filtering as SavedSearch.get_matching_events()
+    from airmozilla.search.models import filter_matching
+
+    Event = apps.get_model('main', 'Event')
+    SavedSearch = apps.get_model('search', 'SavedSearch')
+    SavedSearchEvent = apps.get_model('search', 'SavedSearchEvent')
+    # like Event.objects.scheduled_or_processing().approved()
+    events = (
+        Event.objects.filter(status__in=('scheduled', 'processing'))
+        .exclude(approval__approved=False)
+        .exclude(approval__processed=False)
+    )
+    for savedsearch in SavedSearch.objects.all():
+        SavedSearchEvent.objects.filter(savedsearch=savedsearch).delete()
+        SavedSearchEvent.objects.bulk_create([
+            SavedSearchEvent(savedsearch=savedsearch, event_id=x)
+            for x in filter_matching(events, savedsearch.filters)
+            .values_list('id', flat=True).distinct()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0005_savedsearchevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
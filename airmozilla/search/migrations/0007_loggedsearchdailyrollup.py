@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    LoggedSearchRollup = apps.get_model('search', 'LoggedSearchRollup')
+    LoggedSearchDailyRollup = apps.get_model(
+        'search',
+        'LoggedSearchDailyRollup'
+    )
+    counts = ('searches', 'successful', 'results', 'clicks')
+    LoggedSearchDailyRollup.objects.bulk_create([
+        LoggedSearchDailyRollup(
+            date=each['date'],
+            **dict((x, each[x + '__sum']) for x in counts)
+        )
+        for each in (
+            LoggedSearchRollup.objects
+            .values('date')
+            .order_by('date')
+            .annotate(*[models.Sum(x) for x in counts])
+        )
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0006_fill_savedsearchevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoggedSearchDailyRollup',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('date', models.DateField(unique=True)),
+                ('searches', models.IntegerField(default=0)),
+                ('successful', models.IntegerField(default=0)),
+                ('results', models.BigIntegerField(default=0)),
+                ('clicks', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
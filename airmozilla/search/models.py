@@ -2,11 +2,17 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.dispatch import receiver
-from django.core.cache import cache
 
 from jsonfield.fields import JSONField
 
-from airmozilla.main.models import Event, Channel, Tag
+from airmozilla.main.models import (
+    Event,
+    Approval,
+    Channel,
+    Tag,
+    bump_event_list_version,
+)
+from . import keywords
 
 
 def _get_now():
@@ -18,10 +24,92 @@ class LoggedSearch(models.Model):
     results = models.IntegerField(default=0)
     page = models.IntegerField(default=1)
     user = models.ForeignKey(User, null=True)
+    # Clicks are LoggedSearchClicks now. This is only set on searches
+    # logged before those.
     event_clicked = models.ForeignKey(Event, null=True)
+    # what LoggedSearchClicks refer to it by
+    key = models.CharField(max_length=32, null=True, db_index=True)
+    date = models.DateTimeField(default=_get_now, db_index=True)
+
+
+class LoggedSearchClick(models.Model):
+    """An event that was clicked on right after a search. These are
+    only ever inserted."""
+    search_key = models.CharField(max_length=32, db_index=True)
+    event = models.ForeignKey(Event)
     date = models.DateTimeField(default=_get_now)
 
 
+class LoggedSearchRollup(models.Model):
+    """The logged searches, and clicks after them, per day and
+    (lowercased) term. See `airmozilla.search.searchlog`."""
+    date = models.DateField()
+    term = models.CharField(max_length=200)
+    searches = models.IntegerField(default=0)
+    # the searches that found something
+    successful = models.IntegerField(default=0)
+    results = models.BigIntegerField(default=0)
+    clicks = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'term')
+
+
+class LoggedSearchDailyRollup(models.Model):
+    """The same as LoggedSearchRollup but of all the terms."""
+    date = models.DateField(unique=True)
+    searches = models.IntegerField(default=0)
+    successful = models.IntegerField(default=0)
+    results = models.BigIntegerField(default=0)
+    clicks = models.IntegerField(default=0)
+
+
+def filter_matching(qs, filters):
+    """Return the events of `qs` that match the filters of a saved
+    search."""
+    # this is just the text search
+    title = filters.get('title', {})
+    if title.get('include'):
+        sql = (
+            "to_tsvector('english', title) @@ "
+            "plainto_tsquery('english', %s)"
+        )
+        qs = qs.extra(
+            where=[sql],
+            params=[title['include']]
+        )
+
+    if title.get('exclude'):
+        # any of the words
+        sql = (
+            "NOT "
+            "to_tsvector('english', title) @@ "
+            "plainto_tsquery('english', %s)"
+        )
+        for word in title['exclude'].split():
+            qs = qs.extra(where=[sql], params=[word])
+
+    for key in ('channels', 'tags'):
+        if filters.get(key, {}).get('include'):
+            qs = qs.filter(
+                **{
+                    '{}__in'.format(key): filters[key].get('include')
+                }
+            )
+
+        if filters.get(key, {}).get('exclude'):
+            qs = qs.exclude(
+                **{
+                    '{}__in'.format(key): filters[key].get('exclude')
+                }
+            )
+
+    if filters.get('privacy'):
+        qs = qs.filter(privacy__in=filters['privacy'])
+
+    return qs
+
+
 class SavedSearch(models.Model):
     name = models.CharField(max_length=200, null=True)
     slug = models.SlugField(max_length=200, null=True)
@@ -32,49 +120,37 @@ class SavedSearch(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
-    def get_events(self):
-        qs = Event.objects.scheduled_or_processing().approved()
-
-        # this is just the text search
-        if self.filters['title'].get('include'):
-            sql = (
-                "to_tsvector('english', title) @@ "
-                "plainto_tsquery('english', %s)"
-            )
-            qs = qs.extra(
-                where=[sql],
-                params=[self.filters['title']['include']]
-            )
-
-        if self.filters['title'].get('exclude'):
-            sql = (
-                "NOT "
-                "to_tsvector('english', title) @@ to_tsquery('english', %s)"
-            )
-            qs = qs.extra(
-                where=[sql],
-                params=[self.filters['title']['exclude']]
-            )
-
-        for key in ('channels', 'tags'):
-            if self.filters.get(key, {}).get('include'):
-                qs = qs.filter(
-                    **{
-                        '{}__in'.format(key): self.filters[key].get('include')
-                    }
-                )
-
-            if self.filters.get(key, {}).get('exclude'):
-                qs = qs.exclude(
-                    **{
-                        '{}__in'.format(key): self.filters[key].get('exclude')
-                    }
-                )
+    def get_matching_events(self):
+        """Return the events that match the filters. This searches all
+        the events so, unless you need to know for sure, use
+        `get_events()`."""
+        return filter_matching(
+            Event.objects.scheduled_or_processing().approved(),
+            self.filters
+        )
 
-        if self.filters.get('privacy'):
-            qs = qs.filter(privacy__in=self.filters['privacy'])
+    def get_events(self):
+        """Return the events that match according to SavedSearchEvent."""
+        return Event.objects.filter(savedsearchevent__savedsearch=self)
 
-        return qs
+    def refresh_events(self):
+        """Bring all the SavedSearchEvents of this up to date."""
+        matching = set(
+            self.get_matching_events().values_list('id', flat=True)
+        )
+        existing = set(
+            SavedSearchEvent.objects.filter(savedsearch=self)
+            .values_list('event_id', flat=True)
+        )
+        if existing - matching:
+            SavedSearchEvent.objects.filter(
+                savedsearch=self,
+                event_id__in=existing - matching
+            ).delete()
+        SavedSearchEvent.objects.bulk_create([
+            SavedSearchEvent(savedsearch=self, event_id=x)
+            for x in matching - existing
+        ])
 
     @property
     def summary(self):
@@ -116,12 +192,126 @@ class SavedSearch(models.Model):
         return '; '.join(parts)
 
 
+class SavedSearchEvent(models.Model):
+    """An event that matches a saved search. These are kept up to date
+    as events, and saved searches, change. Run
+    `./manage.py rebuild-savedsearch-events` to recreate them all."""
+    savedsearch = models.ForeignKey(SavedSearch)
+    event = models.ForeignKey(Event)
+
+    class Meta:
+        unique_together = ('savedsearch', 'event')
+
+
+def refresh_savedsearch_events(event_ids):
+    """Bring the SavedSearchEvents of these events, for every saved
+    search, up to date."""
+    savedsearches = list(SavedSearch.objects.all())
+    if not savedsearches or not event_ids:
+        return
+    existing = set(
+        SavedSearchEvent.objects.filter(event_id__in=event_ids)
+        .values_list('savedsearch_id', 'event_id')
+    )
+    matching = set()
+    for savedsearch in savedsearches:
+        matching.update(
+            (savedsearch.id, event_id) for event_id in
+            savedsearch.get_matching_events()
+            .filter(id__in=event_ids)
+            .values_list('id', flat=True)
+        )
+    removed = models.Q(id__in=[])
+    for savedsearch_id, event_id in existing - matching:
+        removed |= models.Q(savedsearch_id=savedsearch_id, event_id=event_id)
+    if existing - matching:
+        SavedSearchEvent.objects.filter(removed).delete()
+    SavedSearchEvent.objects.bulk_create([
+        SavedSearchEvent(savedsearch_id=savedsearch_id, event_id=event_id)
+        for savedsearch_id, event_id in matching - existing
+    ])
+
+
 @receiver(models.signals.post_save, sender=SavedSearch)
 def invalidate_savedsearch_caches(sender, instance, **kwargs):
-    # invalidate the calendars
-    for privacy in ('public', 'contributors', 'company'):
-        assert instance.id
-        cache_key = 'calendar_{}_{}'.format(privacy, instance.id)
-        # Remember, you get no error if you try to delete a key that
-        # doesn't exist.
-        cache.delete(cache_key)
+    # invalidate the calendars and feeds
+    bump_event_list_version()
+
+
+@receiver(models.signals.post_save, sender=SavedSearch)
+def savedsearch_refresh_events(sender, instance, raw, **kwargs):
+    if not raw:
+        instance.refresh_events()
+
+
+# The fields of an event the filters of saved searches look at. When
+# the channels, tags or approvals change that's taken care of below.
+MATCHING_FIELDS = ('title', 'status', 'privacy')
+
+
+def _matching_values(instance):
+    return tuple(getattr(instance, x) for x in MATCHING_FIELDS)
+
+
+@receiver(models.signals.pre_save, sender=Event)
+def event_remember_matching_values(sender, instance, raw, **kwargs):
+    instance._matching_values = None
+    if raw or not instance.id:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not set(update_fields) & set(MATCHING_FIELDS):
+        instance._matching_values = _matching_values(instance)
+        return
+    instance._matching_values = (
+        Event.objects.filter(id=instance.id)
+        .values_list(*MATCHING_FIELDS)
+        .first()
+    )
+
+
+@receiver(models.signals.post_save, sender=Event)
+def event_refresh_savedsearch_events(sender, instance, raw, created,
+                                     **kwargs):
+    if raw:
+        return
+    if (
+        not created and
+        getattr(instance, '_matching_values', None) ==
+        _matching_values(instance)
+    ):
+        # Every saved search is a full text search of all the events
+        # so don't unless it could make a difference.
+        return
+    refresh_savedsearch_events([instance.id])
+
+
+@receiver(models.signals.post_save, sender=Approval)
+@receiver(models.signals.post_delete, sender=Approval)
+def approval_refresh_savedsearch_events(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        refresh_savedsearch_events([instance.event_id])
+
+
+@receiver(models.signals.m2m_changed, sender=Event.channels.through)
+@receiver(models.signals.m2m_changed, sender=Event.tags.through)
+def event_m2m_refresh_savedsearch_events(sender, instance, action, reverse,
+                                         pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_savedsearch_events([instance.id])
+    elif pk_set is not None:
+        refresh_savedsearch_events(list(pk_set))
+    else:
+        # a tag or channel was cleared of all its events
+        for savedsearch in SavedSearch.objects.all():
+            savedsearch.refresh_events()
+
+
+@receiver(models.signals.post_save, sender=Tag)
+@receiver(models.signals.post_delete, sender=Tag)
+@receiver(models.signals.post_save, sender=Channel)
+@receiver(models.signals.post_delete, sender=Channel)
+def invalidate_keywords(sender, instance, **kwargs):
+    # the names of tags and channels searches look for
+    keywords.bump_version()
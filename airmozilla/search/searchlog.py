@@ -0,0 +1,345 @@
+"""Logging searches, and the events clicked on after them.
+
+Inserting a LoggedSearch row for every search (and then updating it if
+an event is clicked on) used to happen during the request. Instead,
+each search and each click is put in the cache under a sequence number
+and, once a minute, the `flush_logged_searches` cron job inserts all
+of them with one bulk insert each. A click is its own
+LoggedSearchClick row that refers to the search by its `key`.
+
+Every night `rollup()` counts the searches, results and clicks per day
+into LoggedSearchDailyRollup and per day and (lowercased) term into
+LoggedSearchRollup. The stats add those up, in the database, and only
+count what's been logged since the last rollup.
+"""
+import datetime
+import uuid
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, Count, Max, Min, Sum, When
+from django.utils import timezone
+
+from airmozilla.main.models import Event
+from .models import (
+    LoggedSearch,
+    LoggedSearchClick,
+    LoggedSearchRollup,
+    LoggedSearchDailyRollup,
+)
+
+
+SEQUENCE_CACHE_KEY = 'searchlog:sequence'
+FLUSHED_CACHE_KEY = 'searchlog:flushed'
+# Much longer than it takes for the cron job to come around.
+PENDING_TIMEOUT = 60 * 60 * 24
+FLUSH_CHUNK_SIZE = 1000
+
+COUNTS = ('searches', 'successful', 'results', 'clicks')
+
+
+def _pending_key(number):
+    return 'searchlog:pending:%d' % number
+
+
+def _append(kind, values):
+    cache.add(SEQUENCE_CACHE_KEY, 0, None)
+    try:
+        number = cache.incr(SEQUENCE_CACHE_KEY)
+    except ValueError:
+        # it was evicted since the add()
+        number = 1
+        cache.set(SEQUENCE_CACHE_KEY, number, None)
+    cache.set(_pending_key(number), (kind, values), PENDING_TIMEOUT)
+
+
+def log_search(term, results, page, user=None):
+    """Log a search and return the key to log a click on an event
+    found with."""
+    key = uuid.uuid4().hex
+    _append('search', {
+        'term': term[:200],
+        'results': results,
+        'page': page,
+        'user_id': user and user.id or None,
+        'key': key,
+        'date': timezone.now(),
+    })
+    return key
+
+
+def log_click(search_key, event):
+    _append('click', {
+        'search_key': search_key,
+        'event_id': event.id,
+        'date': timezone.now(),
+    })
+
+
+def flush(verbose=False):
+    """Insert all the searches and clicks logged since the last flush.
+    Returns the number of searches and the number of clicks.
+
+    Something that's logged while this is running, in between getting
+    its sequence number and being put in the cache, can be lost."""
+    last = cache.get(SEQUENCE_CACHE_KEY) or 0
+    flushed = cache.get(FLUSHED_CACHE_KEY) or 0
+    if flushed > last:
+        # the sequence was lost, and started over, since the last flush
+        flushed = 0
+
+    searches_count = clicks_count = 0
+    for start in range(flushed + 1, last + 1, FLUSH_CHUNK_SIZE):
+        keys = [
+            _pending_key(x)
+            for x in range(start, min(start + FLUSH_CHUNK_SIZE, last + 1))
+        ]
+        pending = cache.get_many(keys)
+        items = [pending[x] for x in keys if x in pending]
+        searches = [values for kind, values in items if kind == 'search']
+        clicks = [values for kind, values in items if kind == 'click']
+
+        # don't let what's been deleted since break the whole insert
+        user_ids = set(
+            User.objects.filter(
+                id__in=[x['user_id'] for x in searches if x['user_id']]
+            ).values_list('id', flat=True)
+        )
+        for values in searches:
+            if values['user_id'] not in user_ids:
+                values['user_id'] = None
+        event_ids = set(
+            Event.objects.filter(
+                id__in=[x['event_id'] for x in clicks]
+            ).values_list('id', flat=True)
+        )
+        clicks = [x for x in clicks if x['event_id'] in event_ids]
+
+        with transaction.atomic():
+            LoggedSearch.objects.bulk_create([
+                LoggedSearch(**values) for values in searches
+            ])
+            LoggedSearchClick.objects.bulk_create([
+                LoggedSearchClick(**values) for values in clicks
+            ])
+        cache.set(FLUSHED_CACHE_KEY, start + len(keys) - 1, None)
+        cache.delete_many(keys)
+        searches_count += len(searches)
+        clicks_count += len(clicks)
+        if verbose:  # pragma: no cover
+            print "Flushed {} searches and {} clicks".format(
+                len(searches),
+                len(clicks),
+            )
+
+    return searches_count, clicks_count
+
+
+def get_today():
+    return timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _to_datetime(date):
+    return datetime.datetime.combine(
+        date,
+        datetime.time(0, 0)
+    ).replace(tzinfo=timezone.utc)
+
+
+def _logged(since=None, until=None):
+    """Return the searches and the clicks logged between these two
+    datetimes."""
+    searches = LoggedSearch.objects.all()
+    clicks = LoggedSearchClick.objects.all()
+    if since:
+        searches = searches.filter(date__gte=since)
+        clicks = clicks.filter(date__gte=since)
+    if until:
+        searches = searches.filter(date__lt=until)
+        clicks = clicks.filter(date__lt=until)
+    return searches, clicks
+
+
+def _count(since=None, until=None):
+    """Return a dict of lowercased term -> dict of COUNTS of what's
+    been logged between these two datetimes."""
+    counts = defaultdict(lambda: dict.fromkeys(COUNTS, 0))
+    searches, clicks = _logged(since, until)
+
+    per_term = (
+        searches
+        .extra(select={'term_lower': 'LOWER(term)'})
+        .values('term_lower')
+        .order_by()
+    )
+    for each in per_term.annotate(
+        searches=Count('id'),
+        successful=Count(Case(When(results__gt=0, then=1))),
+        results_sum=Sum('results'),
+        # from before there were LoggedSearchClicks
+        clicks=Count('event_clicked'),
+    ):
+        row = counts[each['term_lower']]
+        row['searches'] += each['searches']
+        row['successful'] += each['successful']
+        row['results'] += each['results_sum'] or 0
+        row['clicks'] += each['clicks']
+
+    # the clicks count for the term of the search they're clicks after
+    clicked = (
+        LoggedSearch.objects
+        .filter(key__in=clicks.values('search_key'))
+        .extra(select={'term_lower': 'LOWER(term)'})
+        .values('term_lower')
+        .order_by()
+    )
+    for each in clicked.annotate(count=Count('id')):
+        counts[each['term_lower']]['clicks'] += each['count']
+    return counts
+
+
+def _total(since=None):
+    """Return a dict of COUNTS of all that's been logged since this
+    datetime."""
+    searches, clicks = _logged(since)
+    total = searches.aggregate(
+        searches=Count('id'),
+        successful=Count(Case(When(results__gt=0, then=1))),
+        results=Sum('results'),
+        # from before there were LoggedSearchClicks
+        clicks=Count('event_clicked'),
+    )
+    total['results'] = total['results'] or 0
+    total['clicks'] += LoggedSearch.objects.filter(
+        key__in=clicks.values('search_key')
+    ).count()
+    return total
+
+
+def rollup(since=None, verbose=False):
+    """(Re)calculate the rollups of every day from `since` (a date)
+    until yesterday. By default, from the last day rolled up, in case
+    more was flushed for it after."""
+    first = LoggedSearch.objects.aggregate(Min('date'))['date__min']
+    if first is None:
+        return
+    if since is None:
+        since = _get_last_rollup()
+    since = max(since or first.date(), first.date())
+    today = get_today().date()
+    date = since
+    while date < today:
+        counts = _count(
+            _to_datetime(date),
+            _to_datetime(date + datetime.timedelta(days=1))
+        )
+        with transaction.atomic():
+            LoggedSearchRollup.objects.filter(date=date).delete()
+            LoggedSearchRollup.objects.bulk_create([
+                LoggedSearchRollup(date=date, term=term[:200], **values)
+                for term, values in counts.items()
+            ])
+            LoggedSearchDailyRollup.objects.update_or_create(
+                date=date,
+                defaults=dict(
+                    (key, sum(x[key] for x in counts.values()))
+                    for key in COUNTS
+                )
+            )
+        if verbose:  # pragma: no cover
+            print "{}: {} terms {} searches".format(
+                date,
+                len(counts),
+                sum(x['searches'] for x in counts.values()),
+            )
+        date += datetime.timedelta(days=1)
+
+
+def _get_last_rollup():
+    return (
+        LoggedSearchDailyRollup.objects.aggregate(Max('date'))['date__max']
+    )
+
+
+def _get_unrolled_since(since):
+    """Return the last date rolled up and from when, at or after
+    `since`, what's logged has to be counted on the fly."""
+    last = _get_last_rollup()
+    if last is None:
+        return None, since
+    rolled_up_until = _to_datetime(last + datetime.timedelta(days=1))
+    return last, max(since, rolled_up_until) if since else rolled_up_until
+
+
+def get_totals(since=None):
+    """Return a dict of COUNTS since this datetime (midnight UTC) or
+    ever."""
+    last, unrolled_since = _get_unrolled_since(since)
+    totals = dict.fromkeys(COUNTS, 0)
+    if last is not None:
+        rollups = LoggedSearchDailyRollup.objects.all()
+        if since:
+            rollups = rollups.filter(date__gte=since.date())
+        summed = rollups.aggregate(*[Sum(x) for x in COUNTS])
+        for key in COUNTS:
+            totals[key] += summed[key + '__sum'] or 0
+    for key, value in _total(unrolled_since).items():
+        totals[key] += value
+    return totals
+
+
+def get_top_terms(since=None, size=5):
+    """Return the `size` most common (lowercased) terms, since this
+    datetime (midnight UTC) or ever, as dicts of their term, number of
+    searches and clicks. Counted by the database from the rollups plus
+    what's been logged since."""
+    last, unrolled_since = _get_unrolled_since(since)
+    tables = {
+        'rollup': LoggedSearchRollup._meta.db_table,
+        'search': LoggedSearch._meta.db_table,
+        'click': LoggedSearchClick._meta.db_table,
+    }
+    parts = []
+    params = []
+
+    def where(column, value):
+        if value is None:
+            return ''
+        params.append(value)
+        return ' WHERE {} >= %s'.format(column)
+
+    if last is not None:
+        parts.append(
+            'SELECT term, searches, clicks FROM {rollup}'.format(**tables) +
+            where('date', since and since.date())
+        )
+    # from before there were LoggedSearchClicks
+    parts.append(
+        'SELECT LOWER(term) AS term, COUNT(*) AS searches, '
+        'COUNT(event_clicked_id) AS clicks FROM {search}'.format(**tables) +
+        where('date', unrolled_since) +
+        ' GROUP BY LOWER(term)'
+    )
+    # the clicks count for the term of the search they're clicks after
+    parts.append(
+        'SELECT LOWER(term) AS term, 0 AS searches, COUNT(*) AS clicks '
+        'FROM {search} WHERE key IN ('
+        'SELECT search_key FROM {click}'.format(**tables) +
+        where('date', unrolled_since) +
+        ') GROUP BY LOWER(term)'
+    )
+    sql = (
+        'SELECT term, SUM(searches), SUM(clicks) FROM ({}) AS counts '
+        'GROUP BY term HAVING SUM(searches) > 0 '
+        'ORDER BY SUM(searches) DESC, term LIMIT %s'
+    ).format(' UNION ALL '.join(parts))
+    params.append(size)
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    return [
+        # the sums of counts are numeric
+        {'term': term, 'searches': int(searches), 'clicks': int(clicks)}
+        for term, searches, clicks in cursor.fetchall()
+    ]
@@ -13,13 +13,11 @@ angular.module('savedsearches', [])
 }])
 
 .controller('SavedSearchesController',
-    ['$scope', '$http', '$timeout',
-    function($scope, $http, $timeout) {
+    ['$scope', '$http',
+    function($scope, $http) {
         var $appContainer = angular.element('#content');
         var dataURL = $appContainer.data('data-url');
         var deleteURL = $appContainer.data('delete-url');
-        var editURL = $appContainer.data('edit-url');
-        var sampleURL = editURL + '?sample=true';
         if (!dataURL) {
             throw new Error('no data-url');
         }
@@ -27,19 +25,6 @@ angular.module('savedsearches', [])
         $scope.loading = true;
         $scope.failed = false;
 
-        var key = 'savedsearchescounts';
-        var rememberedCounts = JSON.parse(sessionStorage.getItem(key) || '{}');
-        var rememberCounts = function(savedsearch) {
-            rememberedCounts[rememberCountsId(savedsearch)] = savedsearch._count;
-            sessionStorage.setItem(key, JSON.stringify(rememberedCounts));
-        };
-        var rememberCountsId = function(savedsearch) {
-            var modified = savedsearch.modified.match(
-                /\d\d:\d\d:\d\d/
-            )[0];
-            return savedsearch.id + modified;
-        };
-
         $scope.deleteSavedSearch = function(savedsearch) {
             $http.post(deleteURL.replace('0', savedsearch.id))
             .success(function() {
@@ -51,27 +36,6 @@ angular.module('savedsearches', [])
             .error(console.error.bind(console));
         };
 
-        var fetchCounts = function() {
-            var working = false;
-            $scope.savedsearches.forEach(function(savedsearch) {
-                if (!working && savedsearch._count === undefined) {
-                    working = true;
-                    $http.get(sampleURL.replace('0', savedsearch.id))
-                    .success(function(result) {
-                        savedsearch._count = result.events;
-                        rememberCounts(savedsearch);
-                        fetchCounts();
-                    })
-                    .error(function() {
-                        console.error.apply(console, arguments);
-                        $timeout(function() {
-                            fetchCounts();
-                        }, 2000);
-                    });
-                }
-            });
-        };
-
         $scope.urls = {};
         $scope.url = function(viewname, item) {
             if (!$scope.urls[viewname]) {
@@ -86,12 +50,8 @@ angular.module('savedsearches', [])
             $scope.savedsearches = response.savedsearches;
             $scope.urls = response.urls;
             $scope.savedsearches.forEach(function(savedsearch) {
-                var count = rememberedCounts[rememberCountsId(savedsearch)];
-                if (count !== undefined) {
-                    savedsearch._count = count;
-                }
+                savedsearch._count = savedsearch.events;
             });
-            fetchCounts();
         })
         .error(function() {
             $scope.failed = true;
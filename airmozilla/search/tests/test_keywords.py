@@ -0,0 +1,54 @@
+from nose.tools import eq_, ok_
+
+from airmozilla.main.models import Tag, Channel
+from airmozilla.search import keywords
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class TestKeywords(DjangoTestCase):
+
+    def test_automaton(self):
+        automaton = keywords.Automaton()
+        for keyword in ('he', 'she', 'his', 'hers'):
+            automaton.add(keyword, keyword)
+        automaton.build()
+        eq_(
+            list(automaton.find('ushers')),
+            [(1, 4, 'she'), (2, 4, 'he'), (2, 6, 'hers')]
+        )
+        eq_(list(automaton.find('nothing')), [])
+
+    def test_matcher(self):
+        matcher = keywords.KeywordMatcher(
+            [(1, 'Rust'), (2, 'other tag'), (3, 'rust')],
+            [(10, 'Grow Mozilla', None), (11, 'Rust', 10)],
+        )
+        eq_(matcher.find_tags('Learning RUST'), [1, 3])
+        eq_(matcher.find_tags('rusty'), [])
+        eq_(matcher.find_tags('trust'), [])
+        eq_(matcher.find_tags('some other tag and rust'), [2, 1, 3])
+        eq_(matcher.find_channels('grow mozilla and rust'), [10, 11])
+        eq_(matcher.find_channels('growing mozilla'), [])
+        eq_(matcher.subchannel_counts, {10: 1})
+
+    def test_get_matcher(self):
+        matcher = keywords.get_matcher()
+        eq_(matcher.find_tags('mytag'), [])
+        # it's built once
+        with self.assertNumQueries(0):
+            ok_(keywords.get_matcher() is matcher)
+
+        tag = Tag.objects.create(name='MyTag')
+        eq_(keywords.get_matcher().find_tags('mytag'), [tag.id])
+        tag.delete()
+        eq_(keywords.get_matcher().find_tags('mytag'), [])
+
+        parent = Channel.objects.create(name='Parent', slug='parent')
+        channel = Channel.objects.create(
+            name='Child',
+            slug='child',
+            parent=parent,
+        )
+        matcher = keywords.get_matcher()
+        eq_(matcher.find_channels('the child'), [channel.id])
+        eq_(matcher.subchannel_counts, {parent.id: 1})
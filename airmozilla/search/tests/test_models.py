@@ -1,10 +1,18 @@
+import importlib
+
+from django.apps import apps
 from django.contrib.auth.models import User
 
+import mock
 from nose.tools import ok_, eq_
 
 from airmozilla.base.tests.testbase import DjangoTestCase
-from airmozilla.search.models import SavedSearch
-from airmozilla.main.models import Event, Tag, Channel
+from airmozilla.search.models import (
+    SavedSearch,
+    SavedSearchEvent,
+    refresh_savedsearch_events,
+)
+from airmozilla.main.models import Event, Tag, Channel, Approval
 
 
 class SavedSearchTestCase(DjangoTestCase):
@@ -69,3 +77,85 @@ class SavedSearchTestCase(DjangoTestCase):
         savedsearch.filters['privacy'] = [Event.PRIVACY_COMPANY]
         savedsearch.save()
         ok_(event not in savedsearch.get_events())
+
+    def test_events_kept_up_to_date(self):
+        user = User.objects.create(username='bob')
+        savedsearch = SavedSearch.objects.create(
+            user=user,
+            filters={
+                'title': {'include': 'firefox', 'exclude': 'Curse word'},
+                'tags': {'include': [], 'exclude': []},
+                'channels': {'include': [], 'exclude': []},
+            }
+        )
+        other = SavedSearch.objects.create(
+            user=user,
+            filters={
+                'title': {},
+                'tags': {'include': [], 'exclude': []},
+                'channels': {'include': [], 'exclude': []},
+            }
+        )
+        event = Event.objects.get(title='Test event')
+        eq_(list(other.get_events()), [event])
+        eq_(list(savedsearch.get_events()), [])
+
+        event.title = 'Firefox event'
+        event.save()
+        eq_(list(savedsearch.get_events()), [event])
+        event.title = 'Firefox curse'
+        event.save()
+        eq_(list(savedsearch.get_events()), [])
+        eq_(list(other.get_events()), [event])
+
+        event.title = 'Firefox event'
+        event.save()
+        tag = Tag.objects.create(name='tag')
+        savedsearch.filters['tags']['exclude'] = [tag.id]
+        savedsearch.save()
+        eq_(list(savedsearch.get_events()), [event])
+        event.tags.add(tag)
+        eq_(list(savedsearch.get_events()), [])
+        tag.event_set.remove(event)
+        eq_(list(savedsearch.get_events()), [event])
+
+        # unapproved events don't match
+        approval = Approval.objects.create(event=event)
+        eq_(list(savedsearch.get_events()), [])
+        approval.delete()
+        eq_(list(savedsearch.get_events()), [event])
+
+        # only the changed events are searched, once per saved search
+        with self.assertNumQueries(4):
+            refresh_savedsearch_events([event.id])
+
+        # not at all if nothing the filters look at has changed
+        event.description = 'Different'
+        with mock.patch(
+            'airmozilla.search.models.refresh_savedsearch_events'
+        ) as refresh:
+            event.save()
+            ok_(not refresh.called)
+            event.privacy = Event.PRIVACY_COMPANY
+            event.save()
+            refresh.assert_called_once_with([event.id])
+
+        event.delete()
+        eq_(SavedSearchEvent.objects.count(), 0)
+
+    def test_fill_migration(self):
+        migration = importlib.import_module(
+            'airmozilla.search.migrations.0006_fill_savedsearchevent'
+        )
+        user = User.objects.create(username='bob')
+        savedsearch = SavedSearch.objects.create(
+            user=user,
+            filters={'title': {'include': 'test'}}
+        )
+        event = Event.objects.get(title='Test event')
+        SavedSearchEvent.objects.all().delete()
+        migration.forwards(apps, None)
+        eq_(list(savedsearch.get_events()), [event])
+        # it can be run again
+        migration.forwards(apps, None)
+        eq_(list(savedsearch.get_events()), [event])
@@ -0,0 +1,133 @@
+import datetime
+
+from nose.tools import eq_
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from airmozilla.main.models import Event
+from airmozilla.search import searchlog
+from airmozilla.search.models import (
+    LoggedSearch,
+    LoggedSearchClick,
+    LoggedSearchRollup,
+    LoggedSearchDailyRollup,
+)
+from airmozilla.base.tests.testbase import DjangoTestCase
+
+
+class TestSearchLog(DjangoTestCase):
+
+    def test_flush(self):
+        eq_(searchlog.flush(), (0, 0))
+        event = Event.objects.get(title='Test event')
+        user = User.objects.create(username='bob')
+        key = searchlog.log_search('Firefox', 10, 1, user=user)
+        searchlog.log_click(key, event)
+        searchlog.log_search('Rust', 0, 2)
+        eq_(LoggedSearch.objects.count(), 0)
+
+        # (two of them are the SAVEPOINT and RELEASE of the transaction)
+        with self.assertNumQueries(6):
+            eq_(searchlog.flush(), (2, 1))
+        firefox, rust = LoggedSearch.objects.order_by('term')
+        eq_(firefox.key, key)
+        eq_(firefox.user, user)
+        eq_(rust.results, 0)
+        eq_(rust.page, 2)
+        eq_(rust.user, None)
+        click, = LoggedSearchClick.objects.all()
+        eq_(click.search_key, key)
+        eq_(click.event, event)
+        # nothing is flushed twice
+        eq_(searchlog.flush(), (0, 0))
+
+        # what's been deleted since isn't a problem
+        key = searchlog.log_search('Gone', 1, 1, user=user)
+        searchlog.log_click(key, event)
+        user.delete()
+        event.delete()
+        eq_(searchlog.flush(), (1, 0))
+        eq_(LoggedSearch.objects.get(term='Gone').user, None)
+
+    def test_rollup_and_counts(self):
+        event = Event.objects.get(title='Test event')
+        now = timezone.now()
+        yesterday = now - datetime.timedelta(days=1)
+        long_ago = now - datetime.timedelta(days=3)
+
+        def log(term, results, date, clicked=False):
+            search = LoggedSearch.objects.create(
+                term=term,
+                results=results,
+                date=date,
+                key=searchlog.uuid.uuid4().hex,
+            )
+            if clicked:
+                LoggedSearchClick.objects.create(
+                    search_key=search.key,
+                    event=event,
+                    date=date,
+                )
+
+        log('Firefox', 10, long_ago, clicked=True)
+        log('firefox', 0, long_ago)
+        # from before LoggedSearchClicks
+        LoggedSearch.objects.create(
+            term='Rust',
+            results=1,
+            date=yesterday,
+            event_clicked=event,
+        )
+        log('firefox', 5, now)
+
+        expected_totals = {
+            'searches': 4, 'successful': 3, 'results': 16, 'clicks': 2,
+        }
+        expected_terms = [
+            {'term': 'firefox', 'searches': 3, 'clicks': 1},
+            {'term': 'rust', 'searches': 1, 'clicks': 1},
+        ]
+
+        def check():
+            eq_(searchlog.get_totals(), expected_totals)
+            eq_(searchlog.get_top_terms(), expected_terms)
+            eq_(searchlog.get_top_terms(size=1), expected_terms[:1])
+
+        # without any rollups it's all counted from the logged searches
+        check()
+
+        searchlog.rollup()
+        rollups = LoggedSearchRollup.objects.order_by('date', 'term')
+        eq_(
+            [(x.date, x.term, x.searches, x.clicks) for x in rollups],
+            [
+                (long_ago.date(), 'firefox', 2, 1),
+                (yesterday.date(), 'rust', 1, 1),
+            ]
+        )
+        daily = LoggedSearchDailyRollup.objects.order_by('date')
+        eq_(
+            [(x.date, x.searches, x.results) for x in daily],
+            [
+                (long_ago.date(), 2, 10),
+                ((long_ago + datetime.timedelta(days=1)).date(), 0, 0),
+                (yesterday.date(), 1, 1),
+            ]
+        )
+        # it's the same from the rollups
+        check()
+        today = searchlog.get_today()
+        eq_(searchlog.get_totals(today), {
+            'searches': 1, 'successful': 1, 'results': 5, 'clicks': 0,
+        })
+        eq_(searchlog.get_top_terms(today), [
+            {'term': 'firefox', 'searches': 1, 'clicks': 0},
+        ])
+        # and the rollups are used instead of the logged searches
+        LoggedSearch.objects.filter(date__lt=today).delete()
+        check()
+        # days that aren't logged any more aren't rolled up again
+        searchlog.rollup()
+        eq_(LoggedSearchRollup.objects.count(), 2)
+        check()
@@ -7,11 +7,18 @@ from django.utils import timezone
 from django.utils.timezone import utc
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.encoding import smart_text
 
 from nose.tools import eq_, ok_
 
-from airmozilla.search.models import LoggedSearch, SavedSearch
+from airmozilla.search.models import (
+    LoggedSearch,
+    LoggedSearchClick,
+    SavedSearch,
+)
+from airmozilla.search import searchlog
 from airmozilla.main.models import Event, UserProfile, Tag, Channel, Approval
 from airmozilla.base.tests.testbase import DjangoTestCase
 
@@ -630,6 +637,54 @@ class TestSearch(DjangoTestCase):
         eq_(response.status_code, 200)
         ok_(channel_search_url not in response.content)
 
+    def test_search_ids_cached(self):
+        url = reverse('search:home')
+        event = Event.objects.get(title='Test event')
+        response = self.client.get(url, {'q': 'test', '_nolog': 1})
+        eq_(response.status_code, 200)
+        ok_(event.title in response.content)
+
+        def searches(queries):
+            # the query for the IDs, not the one for the events
+            return [
+                x for x in queries
+                if x['sql'].startswith('SELECT "main_event"."id" FROM') and
+                'search_vector @@' in x['sql']
+            ]
+
+        # the IDs of the events found are cached, only the events of
+        # the page are looked up
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'q': ' TEST ', '_nolog': 1})
+        eq_(response.status_code, 200)
+        ok_(event.title in response.content)
+        ok_('<strong>1</strong>' in response.content)
+        eq_(searches(queries), [])
+
+        # ...until any event changes
+        Event.objects.create(
+            title='Test event too',
+            slug='test-event-too',
+            start_time=event.start_time,
+            status=event.status,
+            privacy=event.privacy,
+            placeholder_img=event.placeholder_img,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'q': 'test', '_nolog': 1})
+        eq_(response.status_code, 200)
+        ok_('Test event too' in response.content)
+        ok_('<strong>2</strong>' in response.content)
+        eq_(len(searches(queries)), 1)
+
+        # not shared between those who can see different things
+        User.objects.create_user('mary', 'mary@mozilla.com', 'secret')
+        assert self.client.login(username='mary', password='secret')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'q': 'test', '_nolog': 1})
+        eq_(response.status_code, 200)
+        eq_(len(searches(queries)), 1)
+
     def test_search_and_find_channels(self):
         url = reverse('search:home')
         event = Event.objects.get(title='Test event')
@@ -653,12 +708,8 @@ class TestSearch(DjangoTestCase):
         response = self.client.get(url, {'q': 'TesT'})
         eq_(response.status_code, 200)
         ok_('Nothing found' not in response.content)
-
-        logged_search = LoggedSearch.objects.get(
-            term='TesT',
-            results=1,
-            page=1,
-        )
+        # it's only written when the logged searches are flushed
+        ok_(not LoggedSearch.objects.all())
 
         # now after that, click on the found event
         event = Event.objects.get(title='Test event')
@@ -666,34 +717,48 @@ class TestSearch(DjangoTestCase):
         ok_(event_url in response.content)
         response = self.client.get(event_url)
         eq_(response.status_code, 200)
+        # but only the first time
+        response = self.client.get(event_url)
+        eq_(response.status_code, 200)
 
+        eq_(searchlog.flush(), (1, 1))
+        logged_search = LoggedSearch.objects.get(
+            term='TesT',
+            results=1,
+            page=1,
+        )
         # using a session it should now record that that search
         # lead to clicking this event
-        logged_search = LoggedSearch.objects.get(pk=logged_search.pk)
-        eq_(logged_search.event_clicked, event)
+        click, = LoggedSearchClick.objects.all()
+        eq_(click.search_key, logged_search.key)
+        eq_(click.event, event)
 
     def test_logged_search_not_empty_searches(self):
         url = reverse('search:home')
         response = self.client.get(url, {'q': ''})
         eq_(response.status_code, 200)
         ok_('Nothing found' not in response.content)
+        searchlog.flush()
         ok_(not LoggedSearch.objects.all())
 
         # or something too short
         response = self.client.get(url, {'q': '1'})
         eq_(response.status_code, 200)
         ok_('Too short' in response.content)
+        searchlog.flush()
         ok_(not LoggedSearch.objects.all())
 
         response = self.client.get(url, {'q': ' ' * 10})
         eq_(response.status_code, 200)
         ok_('Nothing found' not in response.content)
+        searchlog.flush()
         ok_(not LoggedSearch.objects.all())
 
         # but search by channel or tag without a wildcard should log
         response = self.client.get(url, {'q': 'channel: Foo'})
         eq_(response.status_code, 200)
         ok_('Nothing found' in response.content)
+        searchlog.flush()
         ok_(LoggedSearch.objects.all())
 
     def test_unicode_next_page_links(self):
@@ -957,6 +1022,7 @@ class TestSearch(DjangoTestCase):
         eq_(first['name'], savedsearch.name)
         eq_(first['id'], savedsearch.id)
         eq_(first['summary'], savedsearch.summary)
+        eq_(first['events'], savedsearch.get_events().count())
 
         # We should also have a list of URLs.
         urls = json.loads(response.content)['urls']
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import re
 import urllib
 import time
@@ -9,23 +11,36 @@ from django.db import transaction
 from django.db.models import Count
 from django.conf import settings
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 
 from jsonview.decorators import json_view
 
-from airmozilla.main.models import Event, Tag, Channel, get_profile_safely
-from airmozilla.main.views import is_contributor
+from airmozilla.main.models import (
+    Event,
+    Tag,
+    Channel,
+    EventCount,
+    get_profile_safely,
+    get_event_list_version,
+)
 from airmozilla.base.utils import paginator
 from airmozilla.main.utils import get_event_channels
+from airmozilla.main import search_vectors
 
 from . import forms
+from . import keywords
+from . import searchlog
 from . import utils
-from .models import LoggedSearch, SavedSearch
+from .models import SavedSearch, SavedSearchEvent
 from .split_search import split_search
 
 
+SEARCH_IDS_CACHE_TIMEOUT = 60 * 60
+
+
 @transaction.atomic
 def home(request):
     context = {
@@ -45,18 +60,25 @@ def home(request):
     else:
         form = forms.SearchForm()
 
+    # the options _search() was called with, if it was
+    search_options = None
+    _database_error_happened = False
     if request.GET.get('q') and form.is_valid():
         context['q'] = form.cleaned_data['q']
         privacy_filter = {}
         privacy_exclude = {}
         qs = Event.objects.scheduled_or_processing()
         if request.user.is_active:
-            if is_contributor(request.user):
+            if request.roles.contributor:
                 privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
+                privacy_bucket = 'contributors'
+            else:
+                privacy_bucket = 'company'
         else:
             # privacy_filter = {'privacy': Event.PRIVACY_PUBLIC}
             privacy_exclude = {'privacy': Event.PRIVACY_COMPANY}
             qs = qs.approved()
+            privacy_bucket = 'public'
 
         extra = {}
         rest, params = split_search(context['q'], ('tag', 'channel'))
@@ -67,23 +89,8 @@ def home(request):
                 context['tags'] = extra['tags'] = tags
         else:
             # is the search term possibly a tag?
-            all_tag_names = Tag.objects.all().values_list('name', flat=True)
-            tags_regex = re.compile(
-                r'\b(%s)\b' %
-                ('|'.join(re.escape(x) for x in all_tag_names),),
-                re.I
-            )
-            # next we need to turn all of these into a Tag QuerySet
-            # because we can't do `filter(name__in=tags_regex.findall(...))`
-            # because that case sensitive.
-            tag_ids = []
-            for match in tags_regex.findall(rest):
-                tag_ids.extend(
-                    Tag.objects.filter(name__iexact=match)
-                    .values_list('id', flat=True)
-                )
             possible_tags = Tag.objects.filter(
-                id__in=tag_ids
+                id__in=keywords.get_matcher().find_tags(rest)
             )
             for tag in possible_tags:
                 regex = re.compile(re.escape(tag.name), re.I)
@@ -108,22 +115,8 @@ def home(request):
                 context['channels'] = extra['channels'] = channels
         else:
             # is the search term possibly a channel?
-            all_channel_names = (
-                Channel.objects.all().values_list('name', flat=True)
-            )
-            channels_regex = re.compile(
-                r'\b(%s)\b' %
-                ('|'.join(re.escape(x) for x in all_channel_names),),
-                re.I
-            )
-            channel_ids = []
-            for match in channels_regex.findall(rest):
-                channel_ids.extend(
-                    Channel.objects
-                    .filter(name__iexact=match).values_list('id', flat=True)
-                )
             possible_channels = Channel.objects.filter(
-                id__in=channel_ids
+                id__in=keywords.get_matcher().find_channels(rest)
             )
             for channel in possible_channels:
                 regex = re.compile(re.escape(channel.name), re.I)
@@ -141,23 +134,43 @@ def home(request):
                 channel._query_string = channel._query_string.strip()
             context['possible_channels'] = possible_channels
 
-        events = _search(
-            qs,
-            context['q'],
+        # Only the IDs of the events found are looked up (or taken
+        # from the cache). The events of the page being rendered are
+        # fetched afterwards.
+        search_options = dict(
             privacy_filter=privacy_filter,
             privacy_exclude=privacy_exclude,
             sort=request.GET.get('sort'),
             **extra
         )
-        if not events.count() and utils.possible_to_or_query(context['q']):
-            events = _search(
-                qs,
-                context['q'],
-                privacy_filter=privacy_filter,
-                privacy_exclude=privacy_exclude,
-                sort=request.GET.get('sort'),
-                fuzzy=True
-            )
+        try:
+            with transaction.atomic():
+                events = _search_ids(
+                    qs,
+                    context['q'],
+                    privacy_bucket,
+                    **search_options
+                )
+                if (
+                    not events and
+                    utils.possible_to_or_query(context['q'])
+                ):
+                    search_options = dict(
+                        privacy_filter=privacy_filter,
+                        privacy_exclude=privacy_exclude,
+                        sort=request.GET.get('sort'),
+                        fuzzy=True
+                    )
+                    events = _search_ids(
+                        qs,
+                        context['q'],
+                        privacy_bucket,
+                        **search_options
+                    )
+        except DatabaseError:
+            _database_error_happened = True
+            # don't feed the trolls, just return nothing found
+            events = []
 
         found_channels = _find_channels(context['q'])
         context['found_channels'] = found_channels  # it's a list
@@ -173,7 +186,7 @@ def home(request):
         # But if you're just browsing we want to make sure you don't
         # see anything you're not supposed to see.
         if request.user.is_active:
-            if is_contributor(request.user):
+            if request.roles.contributor:
                 events = events.exclude(privacy=Event.PRIVACY_COMPANY)
         else:
             events = events.filter(privacy=Event.PRIVACY_PUBLIC)
@@ -200,7 +213,6 @@ def home(request):
         try:
             with transaction.atomic():
                 pager, events_paged = paginator(events, page, 10)
-            _database_error_happened = False
         except DatabaseError:
             _database_error_happened = True
             # don't feed the trolls, just return nothing found
@@ -222,6 +234,18 @@ def home(request):
         if events_paged.has_previous():
             prev_page_url = url_maker(events_paged.previous_page_number())
 
+        if search_options is not None:
+            events_paged.object_list = _get_events(
+                events_paged.object_list,
+                context['q'],
+                **search_options
+            )
+        if context['q']:
+            # only now, that we know which events are going to be
+            # displayed, do we bother highlighting the search terms
+            events_paged.object_list = list(events_paged.object_list)
+            _highlight(events_paged.object_list, context['q'])
+
         context['events_paged'] = events_paged
         context['next_page_url'] = next_page_url
         context['prev_page_url'] = prev_page_url
@@ -234,14 +258,14 @@ def home(request):
             not _database_error_happened and
             request.GET.get('q', '').strip()
         ):
-            logged_search = LoggedSearch.objects.create(
-                term=request.GET['q'][:200],
-                results=events.count(),
-                page=page,
+            search_key = searchlog.log_search(
+                request.GET['q'],
+                pager.count,
+                page,
                 user=request.user.is_authenticated() and request.user or None
             )
             request.session['logged_search'] = (
-                logged_search.pk,
+                search_key,
                 time.time()
             )
     elif request.GET.get('q'):
@@ -281,27 +305,14 @@ def _find_channels(q):
             search_escaped,
         ]
     )
-    # make a dict of parental counts
-    subchannel_counts = {}
-    qs = (
-        Channel.objects
-        .filter(parent__isnull=False)
-        .values('parent_id')
-        .order_by()  # necessary because the model has a default ordering
-        .annotate(Count('parent'))
-    )
-    for each in qs:
-        subchannel_counts[each['parent_id']] = each['parent__count']
+    # the keyword matcher already knows how many subchannels each has
+    subchannel_counts = keywords.get_matcher().subchannel_counts
 
     # make a dict of events counts by channel
-    event_counts = {}
-    qs = (
-        Event.channels.through.objects.filter(channel__in=channels_qs)
-        .values('channel_id')
-        .annotate(Count('channel'))
+    event_counts = EventCount.objects.get_counts(
+        'channel',
+        channel__in=channels_qs,
     )
-    for each in qs:
-        event_counts[each['channel_id']] = each['channel__count']
 
     channels = []
     for channel in channels_qs[:5]:
@@ -327,69 +338,35 @@ def _search(qs, q, **options):
         qs = qs.exclude(**options['privacy_exclude'])
 
     if q and options.get('fuzzy'):
-        sql = """
-        (
-          to_tsvector('english', title) @@ to_tsquery('english', %s)
-          OR
-          to_tsvector('english', description || ' ' || short_description)
-           @@ to_tsquery('english', %s)
-          OR
-          to_tsvector('english', transcript) @@ to_tsquery('english', %s)
-        )
-        """
+        tsquery = "to_tsquery('english', %s)"
         search_escaped = utils.make_or_query(q)
     elif q:
-        sql = """
-        (
-          to_tsvector('english', title) @@ plainto_tsquery('english', %s)
-          OR
-          to_tsvector('english', description || ' ' || short_description)
-           @@ plainto_tsquery('english', %s)
-          OR
-          to_tsvector('english', transcript) @@ plainto_tsquery('english', %s)
-        )
-        """
+        tsquery = "plainto_tsquery('english', %s)"
         search_escaped = q
 
     if q:
+        # See airmozilla.main.search_vectors for how the search vector
+        # column is weighted.
+        def rank(weights):
+            return "ts_rank_cd('%s', main_event.search_vector, %s)" % (
+                weights,
+                tsquery,
+            )
+
         qs = qs.extra(
-            where=[sql],
-            params=[search_escaped, search_escaped, search_escaped],
+            where=['main_event.search_vector @@ %s' % tsquery],
+            params=[search_escaped],
             select={
-                'title_highlit': (
-                    "ts_headline('english', title, "
-                    "plainto_tsquery('english', %s))"
-                ),
-                'desc_highlit': (
-                    "ts_headline('english', short_description, "
-                    "plainto_tsquery('english', %s))"
-                ),
-                'transcript_highlit': (
-                    "ts_headline('english', transcript, "
-                    "plainto_tsquery('english', %s))"
-                ),
-                'rank_title': (
-                    "ts_rank_cd(to_tsvector('english', title), "
-                    "plainto_tsquery('english', %s))"
+                'rank_title': rank(search_vectors.RANK_WEIGHTS_TITLE),
+                'rank_desc': rank(search_vectors.RANK_WEIGHTS_DESCRIPTION),
+                'rank_transcript': rank(
+                    search_vectors.RANK_WEIGHTS_TRANSCRIPT
                 ),
-                'rank_desc': (
-                    "ts_rank_cd(to_tsvector('english', description "
-                    "|| ' ' || short_description), "
-                    "plainto_tsquery('english', %s))"
-                ),
-                'rank_transcript': (
-                    "ts_rank_cd(to_tsvector('english', transcript), "
-                    "plainto_tsquery('english', %s))"
-                ),
-
             },
             select_params=[
                 search_escaped,
                 search_escaped,
                 search_escaped,
-                search_escaped,
-                search_escaped,
-                search_escaped
             ],
         )
         qs = qs.order_by('-rank_title', '-start_time', '-rank_desc')
@@ -398,6 +375,62 @@ def _search(qs, q, **options):
     return qs
 
 
+def _search_ids(qs, q, privacy_bucket, **options):
+    """Return the IDs of the events _search() finds, in order.
+
+    These are cached until any event changes. `privacy_bucket` says
+    which of the events `qs` and the privacy options allow."""
+    cache_key = 'search_ids:{}'.format(hashlib.md5(json.dumps([
+        get_event_list_version(),
+        privacy_bucket,
+        ' '.join(q.lower().split()),
+        sorted(x.id for x in options.get('tags', [])),
+        sorted(x.id for x in options.get('channels', [])),
+        bool(options.get('fuzzy')),
+    ])).hexdigest())
+    ids = cache.get(cache_key)
+    if ids is None:
+        ids = list(_search(qs, q, **options).values_list('id', flat=True))
+        cache.set(cache_key, ids, SEARCH_IDS_CACHE_TIMEOUT)
+    return ids
+
+
+def _get_events(ids, q, **options):
+    """Return the events with these IDs, in that order, with the ranks
+    the template needs."""
+    events = _search(Event.objects.filter(id__in=ids), q, **options)
+    events = dict((x.id, x) for x in events)
+    return [events[x] for x in ids if x in events]
+
+
+def _highlight(events, q):
+    """Set `title_highlit` and `desc_highlit` on each event.
+    ts_headline() is expensive so this is meant to only be used on
+    the events of the page that is being rendered."""
+    if not events:
+        return
+    qs = Event.objects.filter(id__in=[x.id for x in events]).extra(
+        select={
+            'title_highlit': (
+                "ts_headline('english', title, "
+                "plainto_tsquery('english', %s))"
+            ),
+            'desc_highlit': (
+                "ts_headline('english', short_description, "
+                "plainto_tsquery('english', %s))"
+            ),
+        },
+        select_params=[q, q],
+    )
+    highlights = {}
+    for id, title_highlit, desc_highlit in qs.values_list(
+        'id', 'title_highlit', 'desc_highlit'
+    ):
+        highlights[id] = (title_highlit, desc_highlit)
+    for event in events:
+        event.title_highlit, event.desc_highlit = highlights[event.id]
+
+
 @require_POST
 @login_required
 @transaction.atomic()
@@ -545,6 +578,12 @@ def savedsearches_data(request):
     qs = SavedSearch.objects.filter(
         user=request.user
     ).order_by('-created')
+    counts = dict(
+        SavedSearchEvent.objects
+        .filter(savedsearch__user=request.user)
+        .values_list('savedsearch_id')
+        .annotate(Count('savedsearch'))
+    )
     searches = []
     for savedsearch in qs:
         item = {
@@ -552,6 +591,7 @@ def savedsearches_data(request):
             'name': savedsearch.name,
             'summary': savedsearch.summary,
             'modified': savedsearch.modified.isoformat(),
+            'events': counts.get(savedsearch.id, 0),
         }
         searches.append(item)
 
@@ -208,6 +208,7 @@ MIDDLEWARE_CLASSES = (
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'airmozilla.authentication.middleware.PatchRefreshIDToken',
     'mozilla_django_oidc.middleware.RefreshIDToken',
+    'airmozilla.main.middleware.RolesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'session_csrf.CsrfMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -264,6 +265,17 @@ RELATED_CONTENT_SIZE = 4
 # Boosting of title and tags, makes them matter more.
 RELATED_CONTENT_BOOST_TITLE = 1.0
 RELATED_CONTENT_BOOST_TAGS = -0.5
+# Only used by the 'local' backend.
+RELATED_CONTENT_BOOST_CHANNELS = 0.25
+
+# Either 'elasticsearch' or 'local'.
+# The 'local' index is files on the disk of each host, only rebuilt
+# where the related_content_index cron job runs, and only updated on
+# saves made on that same host. Only use it if there's one web host
+# or if RELATED_CONTENT_INDEX_PATH is on storage they all share.
+RELATED_CONTENT_BACKEND = 'elasticsearch'
+# Where the 'local' backend keeps its index.
+RELATED_CONTENT_INDEX_PATH = path('related-index')
 
 # Defaults for Mozillians
 MOZILLIANS_API_BASE = 'https://mozillians.org'
@@ -272,6 +284,15 @@ MOZILLIANS_API_BASE = 'https://mozillians.org'
 VIDLY_BASE_URL = 'https://vid.ly'
 VIDLY_API_URL = 'https://m.vid.ly/api/'
 
+# Used by vidly.VidlyClient for when many API calls are made at once.
+# Seconds before a request times out, times a failed request is retried,
+# threads making requests in parallel, and how many shortcodes go in
+# one GetStatus query.
+VIDLY_API_TIMEOUT = 10
+VIDLY_API_RETRIES = 2
+VIDLY_API_WORKERS = 8
+VIDLY_API_BATCH_SIZE = 50
+
 # Name of the default Channel
 DEFAULT_CHANNEL_SLUG = 'main'
 DEFAULT_CHANNEL_NAME = 'Main'
@@ -342,6 +363,22 @@ SCREENCAPTURES_NO_PICTURES = 12
 # by another job that imports the JPEGs created there.
 SCREENCAPTURES_TEMP_DIRECTORY_NAME = 'airmozilla-screencaps'
 
+# How many ffmpeg processes may run at the same time when extracting
+# screen captures one timestamp at a time.
+SCREENCAPTURES_CONCURRENCY = 4
+
+# If true, all screen captures of a video are extracted with one ffmpeg
+# process that reads the whole video once, instead of one process that
+# seeks to each timestamp. This is faster when there are many pictures
+# to extract from a video that isn't very long.
+SCREENCAPTURES_SINGLE_PASS = False
+
+# Screen captures that are no more than this many bits (out of 64)
+# different, by perceptual hash, from the one before them are deleted
+# instead of imported. E.g. when the same slide is shown for minutes.
+# Set to None to keep them all.
+SCREENCAPTURES_DUPLICATE_DISTANCE = 2
+
 
 # Usernames of people who have contributed to Air Mozilla (as a contributor).
 # This list is ordered! Ordered by the first contributor first, and the most
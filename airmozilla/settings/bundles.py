@@ -360,9 +360,20 @@ PIPELINE_JS = {
         ),
         'output_filename': 'js/cronlogger.min.js',
     },
-    'dashboard_graphs': {
+    'cronlogger_stats': {
+        'source_filenames': (
+            'manage/js/cronlogger-stats.js',
+        ),
+        'output_filename': 'js/cronlogger-stats.min.js',
+    },
+    'metricsgraphics': {
         'source_filenames': (
             'manage/metricsgraphics/metricsgraphics.min.js',
+        ),
+        'output_filename': 'js/metricsgraphics.min.js',
+    },
+    'dashboard_graphs': {
+        'source_filenames': (
             'manage/js/dashboard_graphs.js',
         ),
         'output_filename': 'js/dashboard-graphs.min.js',
@@ -49,6 +49,10 @@ BROWSERID_AUDIENCES = ['http://testserver']
 
 MEDIA_ROOT = tempfile.mkdtemp(prefix='testmedia')
 
+# The Elasticsearch tests need a running server.
+RELATED_CONTENT_BACKEND = 'local'
+RELATED_CONTENT_INDEX_PATH = tempfile.mkdtemp(prefix='relatedindex')
+
 SCRAPE_CREDENTIALS = {}
 
 LOG_SEARCHES = True
@@ -85,6 +89,10 @@ CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
 
 SCREENCAPTURES_NO_PICTURES = 5  # faster
 
+# The tests pretend to extract every screen capture by copying the same
+# picture.
+SCREENCAPTURES_DUPLICATE_DISTANCE = None
+
 # Deliberately disabled since reducing the size of PNGs
 # slows down the tests significantly and we have deliberate
 # tests that re-enables it.
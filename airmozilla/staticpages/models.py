@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import receiver
 
 from jsonfield.fields import JSONField
 
@@ -24,3 +25,11 @@ class StaticPage(models.Model):
 
     class Meta:
         ordering = ('url',)
+
+
+@receiver(models.signals.post_save, sender=StaticPage)
+@receiver(models.signals.post_delete, sender=StaticPage)
+def staticpage_forget_slug_resolution(sender, instance, **kwargs):
+    # avoid circular import
+    from airmozilla.main import slug_resolution
+    slug_resolution.forget(instance.url.strip('/'))
@@ -1,12 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.db.models import Max
-from django.core.cache import cache
 from django.dispatch import receiver
 
 from jsonfield.fields import JSONField
 
-from airmozilla.main.models import Event
+from airmozilla.main.models import Event, bump_event_version
 
 
 class Survey(models.Model):
@@ -19,10 +18,9 @@ class Survey(models.Model):
 
 @receiver(models.signals.m2m_changed, sender=Survey.events.through)
 @receiver(models.signals.post_save, sender=Survey)
-def invalidate_event_survey_cache_key(sender, instance, **kwargs):
+def survey_bump_event_versions(sender, instance, **kwargs):
     for event in instance.events.all():
-        cache_key = 'event_survey_id_%s' % event.id
-        cache.delete(cache_key)
+        bump_event_version(event.id)
 
 
 def next_question_order(*args, **kwargs):
@@ -69,5 +69,12 @@ HOME=/tmp
 # Every 6 hours at 15 min past
 15 */6 * * * {{ cron }} refresh_old_vidly_tag_domains 2>&1 | grep -Ev '(DeprecationWarning|UserWarning|simplejson|from pkg_resources)'
 
+# Every day at 5 minutes past midnight (UTC)
+5 0 * * * {{ cron }} dashboard_rollup 2>&1 | grep -Ev '(DeprecationWarning|UserWarning|simplejson|from pkg_resources)'
+# Every minute
+* * * * * {{ cron }} flush_live_hits 2>&1 | grep -Ev '(DeprecationWarning|UserWarning|simplejson|from pkg_resources)'
+* * * * * {{ cron }} flush_logged_searches 2>&1 | grep -Ev '(DeprecationWarning|UserWarning|simplejson|from pkg_resources)'
+# Every day at 10 minutes past midnight (UTC)
+10 0 * * * {{ cron }} logged_searches_rollup 2>&1 | grep -Ev '(DeprecationWarning|UserWarning|simplejson|from pkg_resources)'
 
 MAILTO=root
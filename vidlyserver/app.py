@@ -3,12 +3,15 @@
 import uuid
 import re
 import json
+from tornado import gen
 from tornado import ioloop
 from tornado import web
 from tornado.options import define, options
 
 define("debug", default=False, help="run in debug mode", type=bool)
 define("port", default=9999, help="run on the given port", type=int)
+define("delay", default=1.0, help="seconds to sleep on every request",
+       type=float)
 
 
 GET_STATUS_XML = (
@@ -76,6 +79,20 @@ _SAMPLE_ADD_MEDIA_ERROR_XML = (
     '</Response>'
 )
 
+_SAMPLE_STATISTICS_XML = (
+    '<?xml version="1.0"?>'
+    '<Response><Message/><MessageCode/><Success><StatsInfo>'
+    '<Others>0</Others><TotalHits>%(hits)s</TotalHits>'
+    '</StatsInfo></Success></Response>'
+)
+
+_SAMPLE_TOKEN_XML = (
+    '<?xml version="1.0"?>'
+    '<Response><Message>OK</Message><MessageCode>7.4</MessageCode>'
+    '<Success><MediaShortLink>%(tag)s</MediaShortLink>'
+    '<Token>%(token)s</Token></Success></Response>'
+)
+
 _SAMPLE_DELETE_MEDIA_XML = (
     '<?xml version="1.0"?>'
     '<Response>'
@@ -166,16 +183,26 @@ class MainHandler(web.RequestHandler):
             print "No local_database.json file :("
             return Database()
 
+    @gen.coroutine
     def post(self):
-        from time import sleep
-        sleep(1)# hack to slow things down
+        # hack to slow things down (without blocking other requests)
+        yield gen.sleep(options.delay)
         xml_incoming = self.get_argument('xml')
         print "INCOMING ".ljust(79, '=')
         print xml_incoming
 
         if '<Action>GetStatus</Action>' in xml_incoming:
+            tags = MEDIA_SHORT_LINK_REGEX.findall(xml_incoming)
+            xml_outgoing = self._get_status(tags)
+        elif '<Action>GetStatistics</Action>' in xml_incoming:
             tag = MEDIA_SHORT_LINK_REGEX.findall(xml_incoming)[0]
-            xml_outgoing = self._get_status(tag)
+            xml_outgoing = self._get_statistics(tag)
+        elif '<Action>GetSecurityToken</Action>' in xml_incoming:
+            tag = MEDIA_SHORT_LINK_REGEX.findall(xml_incoming)[0]
+            xml_outgoing = _SAMPLE_TOKEN_XML % {
+                'tag': tag,
+                'token': uuid.uuid4().hex,
+            }
         elif '<Action>GetMediaList</Action>' in xml_incoming:
             status = STATUS_REGEX.findall(xml_incoming)[0]
             xml_outgoing = self._get_medialist(status)
@@ -192,16 +219,31 @@ class MainHandler(web.RequestHandler):
         print xml_outgoing
         self.write(xml_outgoing)
 
-    def _get_status(self, tag):
-        status = self.DATABASE.get(tag, {'status': 'Finished'})['status']
-
-        xml_outgoing = (
-            GET_STATUS_XML
-            % {'tag': tag,
-               'status': status,
-               }
-        )
-        return xml_outgoing
+    def _get_status(self, tags):
+        database = self.DATABASE
+        tasks = []
+        for tag in tags:
+            status = database.get(tag, {'status': 'Finished'})['status']
+            xml_outgoing = (
+                GET_STATUS_XML
+                % {'tag': tag,
+                   'status': status,
+                   }
+            )
+            tasks.append(
+                xml_outgoing[
+                    xml_outgoing.find('<Task>'):
+                    xml_outgoing.find('</Success>')
+                ]
+            )
+        # put all the tasks in one response
+        start = GET_STATUS_XML.find('<Task>')
+        end = GET_STATUS_XML.find('</Success>')
+        return GET_STATUS_XML[:start] + ''.join(tasks) + GET_STATUS_XML[end:]
+
+    def _get_statistics(self, tag):
+        hits = self.DATABASE.get(tag, {}).get('hits', len(tag) * 100)
+        return _SAMPLE_STATISTICS_XML % {'hits': hits}
 
     def _get_medialist(self, status):
         tags = []